@@ -8,6 +8,8 @@ import re
 from typing import Optional, List, Dict, Any
 from dotenv import load_dotenv
 
+from ai_singleflight import text_generation_cache, prompt_key
+
 load_dotenv()
 
 EMERGENT_KEY = os.getenv("EMERGENT_LLM_KEY", "")
@@ -27,6 +29,41 @@ class UzumCardGenerator:
         description: str = "",
         detected_info: dict = None,  # AI Scanner natijasi
         competitor_analysis: dict = None
+    ) -> dict:
+        """
+        To'liq mahsulot kartochkasi (bir xil so'rovlar bitta LLM chaqiruvida)
+        
+        Kalit - prompt'ga kiradigan maydonlar (quantity ishlatilmaydi).
+        """
+        detected = detected_info or {}
+        analysis = (competitor_analysis or {}).get("analysis", {})
+        market = analysis.get("market_analysis", {})
+        key = prompt_key(
+            "uzum_full_card", product_name, category, cost_price, brand, description,
+            detected.get("name", ""), detected.get("category", ""), detected.get("brand", ""),
+            detected.get("specifications", []),
+            analysis.get("demand_level"), market.get("avg_price"), market.get("min_price")
+        )
+        return await text_generation_cache.run(
+            key,
+            lambda: cls._generate_full_card(
+                product_name, category, cost_price, quantity, brand, description,
+                detected_info, competitor_analysis
+            ),
+            cacheable=lambda result: result.get("success", False)
+        )
+    
+    @classmethod
+    async def _generate_full_card(
+        cls,
+        product_name: str,
+        category: str,
+        cost_price: float,
+        quantity: int,
+        brand: str = "",
+        description: str = "",
+        detected_info: dict = None,  # AI Scanner natijasi
+        competitor_analysis: dict = None
     ) -> dict:
         """
         To'liq mahsulot kartochkasi yaratish
@@ -4,21 +4,39 @@ AI LOAD BALANCER & QUEUE SYSTEM
 Minglab parallel so'rovlar uchun optimallashtirilgan
 
 Features:
-- Auto rate limit handling
+- Auto rate limit handling (RPM + TPM token bucket, Retry-After)
 - Multiple provider failover
-- Request queuing
+- Health-aware routing (EWMA latency / error rate, circuit breaker)
+- Priority request queue (deadline, partner fairness, backpressure)
+- Opt-in hedged requests (adaptive p90 threshold, hedge budget)
+- Streaming text generation (failover birinchi chunk'gacha)
+- Prompt-level batching (bulk matn generatsiya)
+- Perceptual hash scan result cache
+- Latency histogram / token / cost / failover telemetry (JSON + Prometheus)
 - Concurrent request management
 """
 
 import os
+import re
 import asyncio
+import json
 import time
-from typing import Dict, Any, Optional, List, Callable
-from collections import deque
-from dataclasses import dataclass
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, List, Callable, AsyncIterator
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+import httpx
+
+from ai_rate_limiter import ProviderRateLimiter, ProviderRateLimitError, parse_retry_after
+from ai_provider_health import ProviderHealth
+from ai_request_queue import AIRequestQueue, QueueRejectedError
+from ai_prompt_batcher import PromptBatcher
+from ai_telemetry import ai_telemetry
+from http_clients import http_clients, http_client, HTTP_POOL_MAX_CONNECTIONS
+from scan_cache import scan_result_cache
+
 load_dotenv()
 
 # API Keys
@@ -27,6 +45,72 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
 EMERGENT_LLM_KEY = os.getenv("EMERGENT_LLM_KEY", "")
 
+# API manzillari (load test uchun benchmarks/fake_ai_server.py ga yo'naltirish mumkin)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1").rstrip("/")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta").rstrip("/")
+
+# Provider javob bermaguncha token sarfi taxmini (TPM limit uchun)
+ESTIMATED_TOKENS = {
+    "vision": 1500,
+    "text": 1500,
+}
+
+# Bir vaqtda bajariladigan AI so'rovlar soni
+AI_MAX_CONCURRENT = int(os.getenv("AI_MAX_CONCURRENT", "50"))
+
+# Provider hostlari uchun pool: barcha concurrency slotlari bitta provider'ga tushishi mumkin
+for _base_url in (OPENAI_BASE_URL, ANTHROPIC_BASE_URL, GEMINI_BASE_URL):
+    _pool_size = max(AI_MAX_CONCURRENT, HTTP_POOL_MAX_CONNECTIONS)
+    http_clients.register(_base_url, max_connections=_pool_size, max_keepalive=_pool_size)
+
+# Bitta provider chaqiruvi uchun maksimal vaqt (timeout -> failover)
+AI_PROVIDER_TIMEOUT = float(os.getenv("AI_PROVIDER_TIMEOUT", "40"))
+
+# Hedging: hedge=True so'rovlarning qancha ulushi ikkinchi provider'ga yuborilishi mumkin
+AI_HEDGE_BUDGET = float(os.getenv("AI_HEDGE_BUDGET", "0.1"))
+# Bir zumda ishlatilishi mumkin bo'lgan hedge'lar (budget to'planishi chegarasi)
+AI_HEDGE_BURST = float(os.getenv("AI_HEDGE_BURST", "5"))
+# Hedge kutish chegarasi: primary provider p90 latency, shu oraliqda
+AI_HEDGE_QUANTILE = float(os.getenv("AI_HEDGE_QUANTILE", "0.9"))
+AI_HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "1"))
+AI_HEDGE_MAX_DELAY = float(os.getenv("AI_HEDGE_MAX_DELAY", "15"))
+
+# Joriy so'rovning haqiqiy token sarfi (provider funksiyasi yozadi)
+_request_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar("ai_request_usage", default=None)
+
+
+def report_token_usage(tokens: Optional[int]):
+    """Provider javobidagi token sarfini load balancer'ga bildirish"""
+    usage = _request_usage.get()
+    if usage is not None and tokens:
+        usage["tokens"] = usage.get("tokens", 0) + int(tokens)
+
+
+def _raise_for_rate_limit(provider: str, response):
+    """429 -> ProviderRateLimitError (Retry-After bilan), 5xx -> xato"""
+    if response.status_code == 429:
+        raise ProviderRateLimitError(
+            f"{provider} rate limit (429)",
+            retry_after=parse_retry_after(response.headers.get("retry-after"))
+        )
+    if response.status_code >= 500:
+        raise Exception(f"{provider} server error ({response.status_code})")
+
+
+# SDK / matnli xatolar uchun: "rate limit", "rate_limit_exceeded", "too many requests", alohida "429"
+# ("generate", "moderate", "separate" kabi so'zlar mos kelmasligi kerak)
+_RATE_LIMIT_PATTERN = re.compile(r"rate[ _-]?limit|too many requests|\b429\b")
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    if isinstance(error, ProviderRateLimitError):
+        return True
+    response = getattr(error, "response", None)
+    if getattr(error, "status_code", None) == 429 or getattr(response, "status_code", None) == 429:
+        return True
+    return bool(_RATE_LIMIT_PATTERN.search(str(error).lower()))
+
 
 @dataclass
 class AIProvider:
@@ -36,26 +120,41 @@ class AIProvider:
     rpm_limit: int  # Requests per minute
     priority: int   # 1 = highest
     enabled: bool
-    current_rpm: int = 0
-    last_reset: datetime = None
+    tpm_limit: int = 0  # Tokens per minute (0 = cheklanmagan)
+    limiter: ProviderRateLimiter = field(default=None, repr=False)
+    health: ProviderHealth = field(default=None, repr=False)
     
     def __post_init__(self):
-        self.last_reset = datetime.now()
+        self.limiter = ProviderRateLimiter(self.rpm_limit, self.tpm_limit)
+        # Ma'lumot yo'q paytda priority tartibi saqlanadi
+        self.health = ProviderHealth(latency_bias=1 + 0.25 * (self.priority - 1))
     
-    def can_make_request(self) -> bool:
-        """Rate limit tekshirish"""
-        now = datetime.now()
-        
-        # Reset RPM every minute
-        if (now - self.last_reset).seconds >= 60:
-            self.current_rpm = 0
-            self.last_reset = now
-        
-        return self.enabled and self.api_key and self.current_rpm < self.rpm_limit
+    @property
+    def current_rpm(self) -> int:
+        """Oxirgi 60 soniyadagi so'rovlar"""
+        return self.limiter.current_rpm
     
-    def record_request(self):
-        """So'rov yozish"""
-        self.current_rpm += 1
+    def can_make_request(self, estimated_tokens: int = 0) -> bool:
+        """Rate limit + circuit breaker tekshirish"""
+        return bool(
+            self.enabled and self.api_key
+            and self.health.allow_request()
+            and self.limiter.can_acquire(estimated_tokens)
+        )
+    
+    def time_until_available(self, estimated_tokens: int = 0) -> float:
+        """Keyingi so'rov slotigacha soniyalar"""
+        return max(
+            self.limiter.time_until_available(estimated_tokens),
+            self.health.time_until_allowed()
+        )
+    
+    def record_request(self, estimated_tokens: int = 0) -> bool:
+        """So'rov yozish (slot olinmasa False)"""
+        if not self.health.allow_request() or not self.limiter.acquire(estimated_tokens):
+            return False
+        self.health.start()
+        return True
 
 
 class AILoadBalancer:
@@ -75,46 +174,61 @@ class AILoadBalancer:
             "openai": AIProvider(
                 name="OpenAI GPT-4o",
                 api_key=OPENAI_API_KEY,
-                rpm_limit=10000,  # Tier 5
+                rpm_limit=int(os.getenv("OPENAI_RPM_LIMIT", "10000")),  # Tier 5
+                tpm_limit=int(os.getenv("OPENAI_TPM_LIMIT", "2000000")),
                 priority=1,
                 enabled=bool(OPENAI_API_KEY)
             ),
             "anthropic": AIProvider(
                 name="Anthropic Claude",
                 api_key=ANTHROPIC_API_KEY,
-                rpm_limit=4000,  # Default tier
+                rpm_limit=int(os.getenv("ANTHROPIC_RPM_LIMIT", "4000")),  # Default tier
+                tpm_limit=int(os.getenv("ANTHROPIC_TPM_LIMIT", "400000")),
                 priority=2,
                 enabled=bool(ANTHROPIC_API_KEY)
             ),
             "emergent": AIProvider(
                 name="Emergent LLM",
                 api_key=EMERGENT_LLM_KEY,
-                rpm_limit=1000,  # Estimated
+                rpm_limit=int(os.getenv("EMERGENT_RPM_LIMIT", "1000")),  # Estimated
+                tpm_limit=int(os.getenv("EMERGENT_TPM_LIMIT", "0")),
                 priority=3,
                 enabled=bool(EMERGENT_LLM_KEY)
             ),
             "gemini": AIProvider(
                 name="Google Gemini",
                 api_key=GOOGLE_API_KEY,
-                rpm_limit=60,  # Free tier: 15 RPM, paid: higher
+                rpm_limit=int(os.getenv("GEMINI_RPM_LIMIT", "60")),  # Free tier: 15 RPM, paid: higher
+                tpm_limit=int(os.getenv("GEMINI_TPM_LIMIT", "1000000")),
                 priority=4,
                 enabled=bool(GOOGLE_API_KEY)
             )
         }
         
-        # Request queue
-        self.queue: deque = deque()
-        self.processing = False
+        # Request queue (dispatcher birinchi so'rovda ishga tushadi)
+        self.queue = AIRequestQueue()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop = None
         
-        # Semaphore for concurrent requests
-        self.max_concurrent = 50  # Max parallel requests
-        self.semaphore = asyncio.Semaphore(self.max_concurrent)
+        # Concurrent requests
+        self.max_concurrent = AI_MAX_CONCURRENT  # Max parallel requests
+        self.in_flight = 0
         
         # Stats
         self.total_requests = 0
         self.successful_requests = 0
         self.failed_requests = 0
         
+        # Hedging
+        self._hedge_credit = AI_HEDGE_BURST
+        self.hedge_stats = {
+            "eligible": 0,
+            "sent": 0,
+            "won": 0,
+            "skipped_budget": 0
+        }
+        
         self._log_status()
     
     def _log_status(self):
@@ -125,98 +239,404 @@ class AILoadBalancer:
         
         for name, provider in self.providers.items():
             status = "✅ ENABLED" if provider.enabled else "❌ DISABLED"
-            print(f"  {provider.name}: {status} (RPM: {provider.rpm_limit})")
+            print(f"  {provider.name}: {status} (RPM: {provider.rpm_limit}, TPM: {provider.tpm_limit or '-'})")
         
         print("="*50 + "\n")
     
-    def get_available_provider(self) -> Optional[str]:
-        """Mavjud provider'ni topish (priority bo'yicha)"""
+    def get_available_provider(
+        self,
+        estimated_tokens: int = 0,
+        exclude: Optional[List[str]] = None,
+        request_type: str = "text"
+    ) -> Optional[str]:
+        """
+        Mavjud provider'ni topish
+        
+        Kutilayotgan bajarilish vaqti (EWMA latency / (1 - error rate))
+        eng kichik provider tanlanadi; teng bo'lsa - priority.
+        """
+        candidates = [
+            (provider.health.expected_time(request_type), provider.priority, name)
+            for name, provider in self.providers.items()
+            if not (exclude and name in exclude) and provider.can_make_request(estimated_tokens)
+        ]
+        
+        if not candidates:
+            return None
+        return min(candidates)[2]
+    
+    def time_until_capacity(self, estimated_tokens: int = 0) -> Optional[float]:
+        """Eng tez bo'shaydigan provider slotigacha soniyalar (None - provider yo'q)"""
+        waits = [
+            p.time_until_available(estimated_tokens)
+            for p in self.providers.values()
+            if p.enabled and p.api_key
+        ]
+        return min(waits) if waits else None
+    
+    def _ensure_dispatcher(self):
+        """Joriy event loop'da dispatcher task'ni ishga tushirish"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Yangi loop (masalan testlarda) - eski navbat shu loop bilan yo'qoladi
+            self._loop = loop
+            self.queue.fail_all(QueueRejectedError("Event loop almashdi", "QUEUE_RESET"))
+            self.in_flight = 0
+            self._wakeup = asyncio.Event()
+            self._dispatcher = None
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch_loop())
+    
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    def _release(self):
+        """Concurrency slotini bo'shatish"""
+        self.in_flight -= 1
+        self._notify()
+    
+    async def _dispatch_loop(self):
+        """
+        Navbatdagi so'rovlarga provider berish
+        
+        Navbat boshidagi so'rov concurrency slot va provider slotini
+        olguncha kutadi (priority + partner round-robin tartibi saqlanadi).
+        """
+        while True:
+            try:
+                timeout = self._dispatch_once()
+                if timeout == 0:
+                    continue
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ AI queue dispatcher error: {e}")
+                await asyncio.sleep(0.1)
+    
+    def _dispatch_once(self) -> Optional[float]:
+        """Bitta qadam: 0 - davom etish, aks holda kutish vaqti (None - cheksiz)"""
+        now = time.monotonic()
+        self.queue.expire(now)
+        
+        ticket = self.queue.peek()
+        if ticket is None:
+            return None
+        if ticket.future.done():
+            # So'rov bekor qilingan (klient uzildi)
+            self.queue.remove(ticket)
+            return 0
+        
+        wait = None
+        if self.in_flight < self.max_concurrent:
+            provider_name = self.get_available_provider(
+                ticket.estimated_tokens, request_type=ticket.request_type
+            )
+            if provider_name and self.providers[provider_name].record_request(ticket.estimated_tokens):
+                self.queue.pop(ticket)
+                self.in_flight += 1
+                ticket.future.set_result(provider_name)
+                return 0
+            
+            wait = self.time_until_capacity(ticket.estimated_tokens)
+            if wait is None:
+                self.queue.fail_all(
+                    QueueRejectedError("AI providerlar sozlanmagan", "RATE_LIMIT_EXCEEDED")
+                )
+                return 0
+            wait = max(wait, 0.005)
+        
+        next_deadline = self.queue.next_deadline()
+        if next_deadline is not None:
+            until_deadline = max(next_deadline - now, 0.005)
+            wait = until_deadline if wait is None else min(wait, until_deadline)
+        return wait
+    
+    async def _acquire_provider(
+        self,
+        request_type: str,
+        estimated_tokens: int,
+        priority: str,
+        partner_id: Optional[str],
+        deadline: Optional[float]
+    ) -> str:
+        """Navbat orqali provider olish (QueueRejectedError - olinmadi)"""
+        self._ensure_dispatcher()
+        ticket = self.queue.ticket(priority, partner_id, estimated_tokens, deadline, request_type)
+        self.queue.put(ticket)
+        self._notify()
         
-        # Sort by priority
-        sorted_providers = sorted(
-            self.providers.items(),
-            key=lambda x: x[1].priority
+        try:
+            return await ticket.future
+        except asyncio.CancelledError:
+            if not self.queue.remove(ticket) and ticket.future.done() \
+                    and not ticket.future.cancelled() and ticket.future.exception() is None:
+                # Provider berilgan, lekin so'rov bekor qilindi - band qilingan tokenlar qaytadi
+                provider = self.providers[ticket.future.result()]
+                provider.health.release()
+                provider.limiter.record_tokens(0, reserved=estimated_tokens)
+                self._release()
+            raise
+    
+    async def _call_provider(
+        self,
+        provider_name: str,
+        request_type: str,
+        estimated_tokens: int,
+        request_func: Callable,
+        *args,
+        **kwargs
+    ):
+        """Provider chaqiruvi + token sarfi va sog'liq ko'rsatkichlarini yozish"""
+        provider = self.providers[provider_name]
+        usage: Dict[str, int] = {}
+        token = _request_usage.set(usage)
+        started = time.monotonic()
+        outcome = "cancelled"
+        try:
+            result = await asyncio.wait_for(
+                request_func(provider_name, *args, **kwargs),
+                timeout=AI_PROVIDER_TIMEOUT
+            )
+        except asyncio.CancelledError:
+            provider.health.release()
+            raise
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            outcome = "timeout"
+            provider.health.record_failure(request_type, time.monotonic() - started, timed_out=True)
+            raise Exception(f"{provider_name} timeout ({time.monotonic() - started:.1f}s)") from e
+        except Exception as e:
+            if _is_rate_limit_error(e):
+                outcome = "rate_limited"
+                provider.health.release()
+            else:
+                outcome = "error"
+                provider.health.record_failure(request_type, time.monotonic() - started)
+            raise
+        else:
+            outcome = "success"
+            provider.health.record_success(request_type, time.monotonic() - started)
+            return result
+        finally:
+            _request_usage.reset(token)
+            self._record_usage(
+                provider_name, request_type, outcome, time.monotonic() - started, usage, estimated_tokens
+            )
+    
+    def _record_usage(
+        self,
+        provider_name: str,
+        request_type: str,
+        outcome: str,
+        latency: float,
+        usage: Dict[str, int],
+        estimated_tokens: int
+    ):
+        """
+        Token sarfini limiter va telemetriyaga yozish
+
+        estimated_tokens - slot olinganda band qilingan taxmin (batch uchun
+        item'lar soniga ko'paytirilgan); provider usage bermasa shu ishlatiladi.
+        """
+        self.providers[provider_name].limiter.record_tokens(
+            usage.get("tokens") or estimated_tokens, reserved=estimated_tokens
         )
+        # Xarajat: javob kelmagan (xato / 429) chaqiruvlar uchun taxmin qo'shilmaydi
+        tokens = usage.get("tokens") or (estimated_tokens if outcome == "success" else 0)
+        ai_telemetry.record_call(provider_name, request_type, outcome, latency, tokens)
+    
+    def hedge_delay(self, provider_name: str, request_type: str) -> float:
+        """Hedge yuborishdan oldin kutish: primary provider p90 latency (adaptiv)"""
+        health = self.providers[provider_name].health
+        delay = health.latency_quantile(request_type, AI_HEDGE_QUANTILE)
+        if delay is None:
+            # Ma'lumot kam - EWMA asosidagi taxmin
+            delay = health.expected_time(request_type) * 1.5
+        return min(max(delay, AI_HEDGE_MIN_DELAY), AI_HEDGE_MAX_DELAY)
+    
+    def _start_hedge(self, exclude: List[str], request_type: str, estimated_tokens: int) -> Optional[str]:
+        """Budget va slot bo'lsa hedge uchun ikkinchi provider olish"""
+        if self._hedge_credit < 1:
+            self.hedge_stats["skipped_budget"] += 1
+            return None
+        if self.in_flight >= self.max_concurrent:
+            return None
+        hedge_provider = self.get_available_provider(estimated_tokens, exclude=exclude, request_type=request_type)
+        if not hedge_provider or not self.providers[hedge_provider].record_request(estimated_tokens):
+            return None
+        self._hedge_credit -= 1
+        self.in_flight += 1
+        self.hedge_stats["sent"] += 1
+        return hedge_provider
+    
+    async def _call_hedged(
+        self,
+        provider_name: str,
+        request_type: str,
+        estimated_tokens: int,
+        tried: List[str],
+        request_func: Callable,
+        *args,
+        **kwargs
+    ):
+        """
+        Hedged chaqiruv: primary p90 ichida javob bermasa ikkinchi provider
+        ham chaqiriladi, birinchi yaroqli javob yutadi, qolgani bekor qilinadi.
         
-        for name, provider in sorted_providers:
-            if provider.can_make_request():
-                return name
+        Returns:
+            (provider, result)
+        """
+        self.hedge_stats["eligible"] += 1
+        self._hedge_credit = min(self._hedge_credit + AI_HEDGE_BUDGET, AI_HEDGE_BURST)
         
-        return None
+        tasks: Dict[asyncio.Task, str] = {
+            asyncio.create_task(
+                self._call_provider(provider_name, request_type, estimated_tokens, request_func, *args, **kwargs)
+            ): provider_name
+        }
+        hedge_provider = None
+        first_error: Optional[Exception] = None
+        empty_result = None
+        
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(provider_name, request_type))
+            if not done:
+                hedge_provider = self._start_hedge(tried, request_type, estimated_tokens)
+                if hedge_provider:
+                    tried.append(hedge_provider)
+                    tasks[asyncio.create_task(
+                        self._call_provider(hedge_provider, request_type, estimated_tokens, request_func, *args, **kwargs)
+                    )] = hedge_provider
+            
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = tasks.pop(task)
+                    error = task.exception()
+                    if error is None and task.result():
+                        if name == hedge_provider:
+                            self.hedge_stats["won"] += 1
+                        return name, task.result()
+                    if error is None:
+                        # Bo'sh javob - boshqa provider javobini kutamiz
+                        empty_result = empty_result or (name, task.result())
+                        continue
+                    self._handle_rate_limit(name, error)
+                    first_error = first_error or error
+            
+            if empty_result:
+                return empty_result
+            raise first_error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            if hedge_provider:
+                self._release()
+    
+    def _handle_rate_limit(self, provider_name: str, error: Exception) -> bool:
+        """Rate limit xatosi bo'lsa provider'ni bloklash"""
+        if not _is_rate_limit_error(error):
+            return False
+        self.providers[provider_name].limiter.block_for(getattr(error, "retry_after", None))
+        return True
     
     async def process_request(
         self,
         request_type: str,
         request_func: Callable,
         *args,
+        priority: str = "default",
+        partner_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+        hedge: bool = False,
+        estimated_tokens: Optional[int] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
-        So'rovni qayta ishlash (auto failover bilan)
+        So'rovni qayta ishlash (navbat + auto failover bilan)
         
         Args:
             request_type: vision, text, image, etc.
             request_func: Async function to call
             *args, **kwargs: Function arguments
+            priority: interactive | default | background
+            partner_id: Navbatda adolatli taqsimlash kaliti
+            deadline: Navbatda kutish chegarasi (soniya)
+            hedge: Sekin javobda ikkinchi provider'ga parallel so'rov (kritik yo'l uchun)
+            estimated_tokens: TPM limit uchun taxmin (default - ESTIMATED_TOKENS)
         
         Returns:
             AI response
         """
-        async with self.semaphore:
-            self.total_requests += 1
-            
-            # Get available provider
-            provider_name = self.get_available_provider()
-            
-            if not provider_name:
-                # All providers busy - wait and retry
-                await asyncio.sleep(1)
-                provider_name = self.get_available_provider()
-                
-                if not provider_name:
-                    self.failed_requests += 1
-                    return {
-                        "success": False,
-                        "error": "Barcha AI providerlar band. Keyinroq urinib ko'ring.",
-                        "code": "RATE_LIMIT_EXCEEDED"
-                    }
-            
-            provider = self.providers[provider_name]
-            provider.record_request()
-            
+        if estimated_tokens is None:
+            estimated_tokens = ESTIMATED_TOKENS.get(request_type, 0)
+        self.total_requests += 1
+        ai_telemetry.record_request(request_type)
+        
+        # Get available provider (navbatda slot kutib)
+        try:
+            provider_name = await self._acquire_provider(request_type, estimated_tokens, priority, partner_id, deadline)
+        except QueueRejectedError as e:
+            self.failed_requests += 1
+            return {
+                "success": False,
+                "error": str(e),
+                "code": e.code
+            }
+        
+        tried = [provider_name]
+        try:
             try:
                 # Execute request
-                result = await request_func(provider_name, *args, **kwargs)
+                if hedge:
+                    winner, result = await self._call_hedged(
+                        provider_name, request_type, estimated_tokens, tried, request_func, *args, **kwargs
+                    )
+                else:
+                    winner = provider_name
+                    result = await self._call_provider(
+                        provider_name, request_type, estimated_tokens, request_func, *args, **kwargs
+                    )
                 self.successful_requests += 1
                 
                 return {
                     "success": True,
                     "data": result,
-                    "provider": provider_name
+                    "provider": winner
                 }
                 
             except Exception as e:
                 error_msg = str(e)
+                if not hedge:
+                    # Hedged chaqiruvda har bir provider xatosi alohida ko'rilgan
+                    self._handle_rate_limit(provider_name, e)
                 
-                # Rate limit error - try another provider
-                if "rate" in error_msg.lower() or "429" in error_msg:
-                    # Disable this provider temporarily
-                    provider.current_rpm = provider.rpm_limit
-                    
-                    # Try another provider
-                    fallback_provider = self.get_available_provider()
-                    
-                    if fallback_provider:
-                        try:
-                            result = await request_func(fallback_provider, *args, **kwargs)
-                            self.successful_requests += 1
-                            return {
-                                "success": True,
-                                "data": result,
-                                "provider": fallback_provider
-                            }
-                        except Exception as e2:
-                            pass
+                # Rate limit / timeout / xato - boshqa provider bilan urinish
+                fallback_provider = self.get_available_provider(
+                    estimated_tokens, exclude=tried, request_type=request_type
+                )
+                
+                if fallback_provider and self.providers[fallback_provider].record_request(estimated_tokens):
+                    ai_telemetry.record_failover(request_type, provider_name, fallback_provider)
+                    try:
+                        result = await self._call_provider(
+                            fallback_provider, request_type, estimated_tokens, request_func, *args, **kwargs
+                        )
+                        self.successful_requests += 1
+                        return {
+                            "success": True,
+                            "data": result,
+                            "provider": fallback_provider
+                        }
+                    except Exception as e2:
+                        self._handle_rate_limit(fallback_provider, e2)
                 
                 self.failed_requests += 1
                 return {
@@ -224,6 +644,97 @@ class AILoadBalancer:
                     "error": error_msg,
                     "provider": provider_name
                 }
+        finally:
+            self._release()
+    
+    async def stream_request(
+        self,
+        request_type: str,
+        stream_func: Callable,
+        *args,
+        priority: str = "default",
+        partner_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Streaming so'rov: provider chunk'lari kelishi bilan uzatiladi
+        
+        stream_func(provider, usage, *args, **kwargs) - async generator,
+        usage["tokens"] ga haqiqiy token sarfini yozadi. Birinchi chunk
+        kelmaguncha xato bo'lsa boshqa provider bilan urinib ko'riladi;
+        chunk uzatilgandan keyingi xato chaqiruvchiga ko'tariladi.
+        AI_PROVIDER_TIMEOUT - chunk'lar orasidagi maksimal kutish.
+        
+        Raises:
+            QueueRejectedError: navbatga olinmadi / kutish vaqti tugadi
+        """
+        estimated_tokens = ESTIMATED_TOKENS.get(request_type, 0)
+        self.total_requests += 1
+        ai_telemetry.record_request(request_type)
+        
+        try:
+            provider_name = await self._acquire_provider(request_type, estimated_tokens, priority, partner_id, deadline)
+        except QueueRejectedError:
+            self.failed_requests += 1
+            raise
+        
+        tried = [provider_name]
+        try:
+            while True:
+                provider = self.providers[provider_name]
+                usage: Dict[str, int] = {}
+                emitted = False
+                outcome = "cancelled"
+                current_provider = provider_name
+                started = time.monotonic()
+                stream = stream_func(provider_name, usage, *args, **kwargs)
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(stream.__anext__(), timeout=AI_PROVIDER_TIMEOUT)
+                        except StopAsyncIteration:
+                            break
+                        emitted = True
+                        yield chunk
+                except (asyncio.CancelledError, GeneratorExit):
+                    # Klient uzildi
+                    provider.health.release()
+                    raise
+                except Exception as e:
+                    if isinstance(e, (asyncio.TimeoutError, httpx.TimeoutException)):
+                        outcome = "timeout"
+                        provider.health.record_failure(request_type, time.monotonic() - started, timed_out=True)
+                        e = Exception(f"{provider_name} timeout ({time.monotonic() - started:.1f}s)")
+                    elif self._handle_rate_limit(provider_name, e):
+                        outcome = "rate_limited"
+                        provider.health.release()
+                    else:
+                        outcome = "error"
+                        provider.health.record_failure(request_type, time.monotonic() - started)
+                    
+                    fallback_provider = None if emitted else self.get_available_provider(
+                        estimated_tokens, exclude=tried, request_type=request_type
+                    )
+                    if fallback_provider and self.providers[fallback_provider].record_request(estimated_tokens):
+                        ai_telemetry.record_failover(request_type, provider_name, fallback_provider)
+                        tried.append(fallback_provider)
+                        provider_name = fallback_provider
+                        continue
+                    self.failed_requests += 1
+                    raise e
+                else:
+                    outcome = "success"
+                    provider.health.record_success(request_type, time.monotonic() - started)
+                    self.successful_requests += 1
+                    return
+                finally:
+                    await stream.aclose()
+                    self._record_usage(
+                        current_provider, request_type, outcome, time.monotonic() - started, usage, estimated_tokens
+                    )
+        finally:
+            self._release()
     
     def get_stats(self) -> Dict[str, Any]:
         """Statistikalarni olish"""
@@ -235,11 +746,21 @@ class AILoadBalancer:
             "providers": {
                 name: {
                     "enabled": p.enabled,
-                    "current_rpm": p.current_rpm,
-                    "rpm_limit": p.rpm_limit,
-                    "available": p.can_make_request()
+                    **p.limiter.get_stats(),
+                    "available": p.can_make_request(),
+                    "health": p.health.get_stats()
                 }
                 for name, p in self.providers.items()
+            },
+            "queue": {
+                **self.queue.get_stats(),
+                "in_flight": self.in_flight,
+                "max_concurrent": self.max_concurrent
+            },
+            "hedging": {
+                **self.hedge_stats,
+                "hedge_rate": round(self.hedge_stats["sent"] / max(self.hedge_stats["eligible"], 1), 3),
+                "budget": AI_HEDGE_BUDGET
             }
         }
 
@@ -256,10 +777,9 @@ async def _scan_with_provider(provider: str, image_base64: str) -> Dict[str, Any
     """Provider bilan rasm skanerlash"""
     
     if provider == "openai":
-        import httpx
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_client(OPENAI_BASE_URL) as client:
             response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
+                f"{OPENAI_BASE_URL}/chat/completions",
                 headers={
                     "Authorization": f"Bearer {OPENAI_API_KEY}",
                     "Content-Type": "application/json"
@@ -296,7 +816,9 @@ async def _scan_with_provider(provider: str, image_base64: str) -> Dict[str, Any
                 }
             )
             
+            _raise_for_rate_limit(provider, response)
             data = response.json()
+            report_token_usage(data.get("usage", {}).get("total_tokens"))
             content = data["choices"][0]["message"]["content"]
             
             # Parse JSON
@@ -309,10 +831,9 @@ async def _scan_with_provider(provider: str, image_base64: str) -> Dict[str, Any
             return {"name": "Unknown", "category": "general"}
     
     elif provider == "anthropic":
-        import httpx
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_client(ANTHROPIC_BASE_URL) as client:
             response = await client.post(
-                "https://api.anthropic.com/v1/messages",
+                f"{ANTHROPIC_BASE_URL}/messages",
                 headers={
                     "x-api-key": ANTHROPIC_API_KEY,
                     "anthropic-version": "2023-06-01",
@@ -352,7 +873,10 @@ async def _scan_with_provider(provider: str, image_base64: str) -> Dict[str, Any
                 }
             )
             
+            _raise_for_rate_limit(provider, response)
             data = response.json()
+            usage = data.get("usage", {})
+            report_token_usage(usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
             content = data["content"][0]["text"]
             
             import json
@@ -365,37 +889,62 @@ async def _scan_with_provider(provider: str, image_base64: str) -> Dict[str, Any
     
     else:
         # Fallback to Emergent (existing logic)
-        from ai_service import scan_product_image
-        result = await scan_product_image(image_base64)
+        # Keshsiz variant - natija balanced_scan_product darajasida keshlanadi
+        from ai_service import _scan_product_image
+        result = await _scan_product_image(image_base64)
+        if result.get("success") is False:
+            # Circuit breaker / failover uchun xato sifatida hisoblanadi
+            raise Exception(result.get("error") or "Emergent scan failed")
         return result.get("product", {})
 
 
-async def balanced_scan_product(image_base64: str) -> Dict[str, Any]:
-    """Load balanced product scanning"""
-    return await load_balancer.process_request(
-        "vision",
-        _scan_with_provider,
-        image_base64
+async def balanced_scan_product(
+    image_base64: str,
+    priority: str = "interactive",
+    partner_id: Optional[str] = None,
+    hedge: bool = False,
+    cache_owner: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Load balanced product scanning (perceptual hash cache bilan)
+
+    cache_owner - autentifikatsiya qilingan partner ID; near-duplicate kesh
+    hit'lari faqat shu partner natijalaridan olinadi. partner_id esa faqat
+    navbat adolati uchun (header / IP bo'lishi mumkin).
+    """
+    return await scan_result_cache.get_or_scan(
+        "balanced",
+        image_base64,
+        lambda: load_balancer.process_request(
+            "vision",
+            _scan_with_provider,
+            image_base64,
+            priority=priority,
+            partner_id=partner_id,
+            hedge=hedge
+        ),
+        cacheable=lambda result: result.get("success", False),
+        owner=cache_owner
     )
 
 
 async def _generate_text_with_provider(
     provider: str,
     prompt: str,
-    system: str = ""
+    system: str = "",
+    max_tokens: int = 1000
 ) -> str:
     """Provider bilan matn generatsiya"""
     
     if provider == "openai":
-        import httpx
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_client(OPENAI_BASE_URL) as client:
             messages = []
             if system:
                 messages.append({"role": "system", "content": system})
             messages.append({"role": "user", "content": prompt})
             
             response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
+                f"{OPENAI_BASE_URL}/chat/completions",
                 headers={
                     "Authorization": f"Bearer {OPENAI_API_KEY}",
                     "Content-Type": "application/json"
@@ -403,18 +952,19 @@ async def _generate_text_with_provider(
                 json={
                     "model": "gpt-4o-mini",
                     "messages": messages,
-                    "max_tokens": 1000
+                    "max_tokens": max_tokens
                 }
             )
             
+            _raise_for_rate_limit(provider, response)
             data = response.json()
+            report_token_usage(data.get("usage", {}).get("total_tokens"))
             return data["choices"][0]["message"]["content"]
     
     elif provider == "anthropic":
-        import httpx
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_client(ANTHROPIC_BASE_URL) as client:
             response = await client.post(
-                "https://api.anthropic.com/v1/messages",
+                f"{ANTHROPIC_BASE_URL}/messages",
                 headers={
                     "x-api-key": ANTHROPIC_API_KEY,
                     "anthropic-version": "2023-06-01",
@@ -422,28 +972,33 @@ async def _generate_text_with_provider(
                 },
                 json={
                     "model": "claude-3-5-haiku-20241022",
-                    "max_tokens": 1000,
+                    "max_tokens": max_tokens,
                     "system": system or "You are a helpful assistant.",
                     "messages": [{"role": "user", "content": prompt}]
                 }
             )
             
+            _raise_for_rate_limit(provider, response)
             data = response.json()
+            usage = data.get("usage", {})
+            report_token_usage(usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
             return data["content"][0]["text"]
     
     elif provider == "gemini":
-        import httpx
         if not GOOGLE_API_KEY:
             raise Exception("GOOGLE_API_KEY not set. Please configure it in environment variables.")
         
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_client(GEMINI_BASE_URL) as client:
             response = await client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={GOOGLE_API_KEY}",
+                f"{GEMINI_BASE_URL}/models/gemini-1.5-flash:generateContent?key={GOOGLE_API_KEY}",
                 json={
-                    "contents": [{"parts": [{"text": f"{system}\n\n{prompt}"}]}]
+                    "contents": [{"parts": [{"text": f"{system}\n\n{prompt}"}]}],
+                    "generationConfig": {"maxOutputTokens": max_tokens}
                 }
             )
             
+            _raise_for_rate_limit(provider, response)
+            
             if response.status_code == 400:
                 data = response.json()
                 error_msg = data.get("error", {}).get("message", "Unknown error")
@@ -458,6 +1013,7 @@ async def _generate_text_with_provider(
             if "candidates" not in data or not data.get("candidates"):
                 raise Exception(f"Gemini API returned unexpected format: {data}")
             
+            report_token_usage(data.get("usageMetadata", {}).get("totalTokenCount"))
             return data["candidates"][0]["content"]["parts"][0]["text"]
     
     else:
@@ -472,19 +1028,221 @@ async def _generate_text_with_provider(
         return await chat.send_message(UserMessage(text=prompt))
 
 
+def _sse_data(line: str) -> Optional[Dict[str, Any]]:
+    """SSE 'data: {...}' qatoridan JSON ([DONE] va boshqa qatorlar - None)"""
+    if not line.startswith("data:"):
+        return None
+    payload = line[5:].strip()
+    if not payload or payload == "[DONE]":
+        return None
+    try:
+        return json.loads(payload)
+    except json.JSONDecodeError:
+        return None
+
+
+async def _raise_for_stream_status(provider: str, response):
+    """Stream javobi: 429 / 5xx / boshqa xato status"""
+    _raise_for_rate_limit(provider, response)
+    if response.status_code != 200:
+        body = (await response.aread()).decode("utf-8", "replace")
+        raise Exception(f"{provider} API returned status {response.status_code}: {body[:300]}")
+
+
+async def _stream_text_with_provider(
+    provider: str,
+    usage: Dict[str, int],
+    prompt: str,
+    system: str = "",
+    max_tokens: int = 1000
+) -> AsyncIterator[str]:
+    """Provider bilan streaming matn generatsiya (token chunk'lari)"""
+    
+    if provider == "openai":
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+        
+        async with http_client(OPENAI_BASE_URL) as client:
+            async with client.stream(
+                "POST",
+                f"{OPENAI_BASE_URL}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {OPENAI_API_KEY}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": "gpt-4o-mini",
+                    "messages": messages,
+                    "max_tokens": max_tokens,
+                    "stream": True,
+                    "stream_options": {"include_usage": True}
+                }
+            ) as response:
+                await _raise_for_stream_status(provider, response)
+                async for line in response.aiter_lines():
+                    data = _sse_data(line)
+                    if not data:
+                        continue
+                    if data.get("usage"):
+                        usage["tokens"] = data["usage"].get("total_tokens", 0)
+                    for choice in data.get("choices") or []:
+                        text = (choice.get("delta") or {}).get("content")
+                        if text:
+                            yield text
+    
+    elif provider == "anthropic":
+        async with http_client(ANTHROPIC_BASE_URL) as client:
+            async with client.stream(
+                "POST",
+                f"{ANTHROPIC_BASE_URL}/messages",
+                headers={
+                    "x-api-key": ANTHROPIC_API_KEY,
+                    "anthropic-version": "2023-06-01",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": "claude-3-5-haiku-20241022",
+                    "max_tokens": max_tokens,
+                    "system": system or "You are a helpful assistant.",
+                    "messages": [{"role": "user", "content": prompt}],
+                    "stream": True
+                }
+            ) as response:
+                await _raise_for_stream_status(provider, response)
+                async for line in response.aiter_lines():
+                    data = _sse_data(line)
+                    if not data:
+                        continue
+                    event_type = data.get("type")
+                    if event_type == "content_block_delta":
+                        text = data.get("delta", {}).get("text")
+                        if text:
+                            yield text
+                    elif event_type == "message_start":
+                        usage["tokens"] = data.get("message", {}).get("usage", {}).get("input_tokens", 0)
+                    elif event_type == "message_delta":
+                        usage["tokens"] = usage.get("tokens", 0) + data.get("usage", {}).get("output_tokens", 0)
+                    elif event_type == "error":
+                        raise Exception(f"anthropic stream error: {data.get('error', {}).get('message')}")
+    
+    elif provider == "gemini":
+        if not GOOGLE_API_KEY:
+            raise Exception("GOOGLE_API_KEY not set. Please configure it in environment variables.")
+        
+        async with http_client(GEMINI_BASE_URL) as client:
+            async with client.stream(
+                "POST",
+                f"{GEMINI_BASE_URL}/models/gemini-1.5-flash:streamGenerateContent?alt=sse&key={GOOGLE_API_KEY}",
+                json={
+                    "contents": [{"parts": [{"text": f"{system}\n\n{prompt}"}]}],
+                    "generationConfig": {"maxOutputTokens": max_tokens}
+                }
+            ) as response:
+                await _raise_for_stream_status(provider, response)
+                async for line in response.aiter_lines():
+                    data = _sse_data(line)
+                    if not data:
+                        continue
+                    if data.get("usageMetadata"):
+                        usage["tokens"] = data["usageMetadata"].get("totalTokenCount", 0)
+                    for candidate in data.get("candidates") or []:
+                        for part in candidate.get("content", {}).get("parts", []):
+                            if part.get("text"):
+                                yield part["text"]
+    
+    else:
+        # Emergent: streaming API yo'q - javob bitta chunk
+        yield await _generate_text_with_provider(provider, prompt, system)
+
+
+async def _execute_text_batch(
+    prompt: str,
+    system: str,
+    max_tokens: int,
+    item_count: int,
+    priority: str,
+    partner_id: Optional[str]
+) -> Dict[str, Any]:
+    """PromptBatcher uchun: bitta (batch) prompt'ni navbat orqali yuborish"""
+    return await load_balancer.process_request(
+        "text",
+        _generate_text_with_provider,
+        prompt,
+        system,
+        max_tokens,
+        priority=priority,
+        partner_id=partner_id,
+        estimated_tokens=ESTIMATED_TOKENS["text"] * item_count
+    )
+
+
+# Bulk job'lar uchun prompt batcher
+prompt_batcher = PromptBatcher(_execute_text_batch)
+
+
 async def balanced_generate_text(
     prompt: str,
-    system: str = ""
+    system: str = "",
+    priority: str = "default",
+    partner_id: Optional[str] = None,
+    batch: bool = False
 ) -> Dict[str, Any]:
-    """Load balanced text generation"""
+    """
+    Load balanced text generation
+    
+    batch=True: prompt boshqa kichik prompt'lar bilan bitta so'rovga
+    yig'iladi (bulk job'lar uchun; linger vaqti qo'shiladi).
+    """
+    if batch:
+        return await prompt_batcher.submit(prompt, system, priority, partner_id)
     return await load_balancer.process_request(
         "text",
         _generate_text_with_provider,
         prompt,
-        system
+        system,
+        priority=priority,
+        partner_id=partner_id
+    )
+
+
+def balanced_stream_text(
+    prompt: str,
+    system: str = "",
+    max_tokens: int = 1000,
+    priority: str = "interactive",
+    partner_id: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Load balanced streaming text generation (QueueRejectedError - navbat rad etdi)"""
+    return load_balancer.stream_request(
+        "text",
+        _stream_text_with_provider,
+        prompt,
+        system,
+        max_tokens,
+        priority=priority,
+        partner_id=partner_id
     )
 
 
 def get_ai_stats() -> Dict[str, Any]:
     """AI statistikalarini olish"""
-    return load_balancer.get_stats()
+    stats = load_balancer.get_stats()
+    stats["batching"] = prompt_batcher.get_stats()
+    stats["telemetry"] = ai_telemetry.snapshot()
+    return stats
+
+
+def get_ai_metrics() -> str:
+    """AI telemetriyasi Prometheus text formatida"""
+    queue = load_balancer.queue.get_stats()
+    return ai_telemetry.render_prometheus(extra={
+        "ai_in_flight_requests": ("gauge", load_balancer.in_flight, "AI provider calls in flight"),
+        "ai_max_concurrent_requests": ("gauge", load_balancer.max_concurrent, "AI concurrency limit"),
+        "ai_queue_depth": ("gauge", queue["depth"], "Requests waiting in the AI queue"),
+        "ai_queue_rejected_total": ("counter", queue["rejected"], "Requests rejected by the AI queue"),
+        "ai_queue_expired_total": ("counter", queue["expired"], "Requests expired in the AI queue"),
+        "ai_hedges_sent_total": ("counter", load_balancer.hedge_stats["sent"], "Hedged AI requests sent"),
+        "ai_hedges_won_total": ("counter", load_balancer.hedge_stats["won"], "Hedged AI requests that won"),
+    })
@@ -0,0 +1,219 @@
+"""
+AI PROMPT BATCHER - Prompt-level batching for bulk text generation
+==================================================================
+Bulk kartochka / tarjima / SEO job'larida har bir kichik prompt
+alohida so'rov bo'lib ketmasligi uchun bir nechta prompt bitta
+ko'p elementli (JSON) so'rovga yig'iladi va natijalar kutayotgan
+chaqiruvchilarga qaytariladi.
+
+Features:
+- Maksimal batch hajmi va linger vaqti (birinchi prompt'dan keyin kutish)
+- Batch kaliti: system prompt + priority + partner (aralash kontekst yo'q)
+- Javob id bo'yicha ajratiladi (demultiplex)
+- Javobda yo'q / parse bo'lmagan elementlar alohida so'rov bilan qayta yuboriladi
+- Tejalgan so'rovlar statistikasi (/api/ai/stats)
+"""
+
+import asyncio
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Tuple
+
+AI_BATCH_MAX_SIZE = int(os.getenv("AI_BATCH_MAX_SIZE", "10"))
+# Birinchi prompt kelgandan keyin batch to'lishini kutish (ms)
+AI_BATCH_LINGER_MS = float(os.getenv("AI_BATCH_LINGER_MS", "50"))
+# Batch javobida bitta element uchun token
+AI_BATCH_ITEM_MAX_TOKENS = int(os.getenv("AI_BATCH_ITEM_MAX_TOKENS", "800"))
+
+# execute(prompt, system, max_tokens, item_count, priority, partner_id) -> process_request javobi
+Executor = Callable[[str, str, int, int, str, Optional[str]], Awaitable[Dict[str, Any]]]
+
+BatchKey = Tuple[str, str, Optional[str]]
+
+
+@dataclass
+class BatchItem:
+    prompt: str
+    future: asyncio.Future
+
+
+def build_batch_prompt(prompts: List[str]) -> str:
+    """N ta mustaqil vazifa -> bitta JSON javob so'raydigan prompt"""
+    tasks = "\n\n".join(f"### VAZIFA {i}\n{prompt}" for i, prompt in enumerate(prompts))
+    return f"""Quyida {len(prompts)} ta MUSTAQIL vazifa berilgan. Har birini alohida bajaring.
+
+Javobni FAQAT quyidagi JSON formatda qaytaring:
+{{"results": [{{"id": 0, "output": "..."}}, {{"id": 1, "output": "..."}}]}}
+
+- "id" - vazifa raqami
+- "output" - shu vazifaga to'liq javob (vazifa JSON so'rasa - JSON obyekt)
+
+{tasks}"""
+
+
+def parse_batch_response(text: str, count: int) -> Dict[int, str]:
+    """Batch javobi -> {id: javob matni} (JSON output'lar matnga aylantiriladi)"""
+    match = re.search(r'\{[\s\S]*\}', text or "")
+    if not match:
+        return {}
+    try:
+        data = json.loads(match.group())
+    except json.JSONDecodeError:
+        return {}
+
+    outputs: Dict[int, str] = {}
+    for entry in data.get("results", []) if isinstance(data, dict) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            item_id = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        output = entry.get("output")
+        if 0 <= item_id < count and output not in (None, ""):
+            outputs[item_id] = output if isinstance(output, str) else json.dumps(output, ensure_ascii=False)
+    return outputs
+
+
+class PromptBatcher:
+    """
+    Prompt'larni batch'larga yig'ish
+
+    submit() batch yuborilib, javob ajratilguncha kutadi. Batch
+    max_size'ga yetsa darhol, aks holda linger vaqtidan keyin yuboriladi.
+    """
+
+    def __init__(
+        self,
+        execute: Executor,
+        max_size: int = AI_BATCH_MAX_SIZE,
+        linger: float = AI_BATCH_LINGER_MS / 1000,
+        item_max_tokens: int = AI_BATCH_ITEM_MAX_TOKENS
+    ):
+        self.execute = execute
+        self.max_size = max(1, max_size)
+        self.linger = linger
+        self.item_max_tokens = item_max_tokens
+        self._pending: Dict[BatchKey, List[BatchItem]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._loop = None
+
+        # Statistika
+        self.items = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.single_requests = 0
+        self.retried_items = 0
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Yangi event loop (masalan testlarda) - eski kutuvchilar yo'qoladi
+            self._loop = loop
+            self._pending.clear()
+            self._timers.clear()
+        return loop
+
+    async def submit(
+        self,
+        prompt: str,
+        system: str = "",
+        priority: str = "background",
+        partner_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Prompt'ni batch'ga qo'shish va natijasini kutish (process_request formatida)"""
+        loop = self._ensure_loop()
+        key = (system, priority, partner_id)
+        item = BatchItem(prompt=prompt, future=loop.create_future())
+        self.items += 1
+
+        pending = self._pending.setdefault(key, [])
+        pending.append(item)
+        if len(pending) >= self.max_size:
+            self._flush(key)
+        elif len(pending) == 1:
+            self._timers[key] = loop.call_later(self.linger, self._flush, key)
+
+        return await item.future
+
+    def _flush(self, key: BatchKey):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(key, [])
+        # Kutishda bekor qilinganlar yuborilmaydi
+        items = [item for item in items if not item.future.done()]
+        if items:
+            asyncio.get_running_loop().create_task(self._run(key, items))
+
+    async def _run(self, key: BatchKey, items: List[BatchItem]):
+        try:
+            if len(items) == 1:
+                await self._run_single(key, items[0])
+            else:
+                await self._run_batch(key, items)
+        except Exception as e:
+            for item in items:
+                if not item.future.done():
+                    item.future.set_result({"success": False, "error": str(e)})
+
+    async def _run_single(self, key: BatchKey, item: BatchItem):
+        system, priority, partner_id = key
+        self.single_requests += 1
+        result = await self.execute(item.prompt, system, self.item_max_tokens, 1, priority, partner_id)
+        if not item.future.done():
+            item.future.set_result(result)
+
+    async def _run_batch(self, key: BatchKey, items: List[BatchItem]):
+        system, priority, partner_id = key
+        self.batches += 1
+        self.batched_items += len(items)
+
+        result = await self.execute(
+            build_batch_prompt([item.prompt for item in items]),
+            system,
+            self.item_max_tokens * len(items),
+            len(items),
+            priority,
+            partner_id
+        )
+        if not result.get("success"):
+            # Butun batch muvaffaqiyatsiz (navbat / provider xatosi) - hammasiga shu javob
+            for item in items:
+                if not item.future.done():
+                    item.future.set_result(dict(result))
+            return
+
+        outputs = parse_batch_response(result.get("data"), len(items))
+        missing = []
+        for i, item in enumerate(items):
+            if i not in outputs:
+                missing.append(item)
+            elif not item.future.done():
+                item.future.set_result({
+                    "success": True,
+                    "data": outputs[i],
+                    "provider": result.get("provider"),
+                    "batch_size": len(items)
+                })
+
+        # Javobda yo'q elementlar alohida yuboriladi
+        if missing:
+            self.retried_items += len(missing)
+            await asyncio.gather(*(self._run_single(key, item) for item in missing))
+
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.batches + self.single_requests
+        return {
+            "max_batch_size": self.max_size,
+            "linger_ms": round(self.linger * 1000, 1),
+            "items": self.items,
+            "batches": self.batches,
+            "single_requests": self.single_requests,
+            "retried_items": self.retried_items,
+            "avg_batch_size": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+            "requests_saved": max(0, self.items - requests),
+            "pending": sum(len(items) for items in self._pending.values())
+        }
@@ -0,0 +1,214 @@
+"""
+AI PROVIDER HEALTH - EWMA metrics & circuit breaker
+===================================================
+Har bir AI provider uchun sog'liq ko'rsatkichlari: load balancer
+statik priority o'rniga kutilayotgan bajarilish vaqti bo'yicha tanlaydi.
+
+Features:
+- So'rov turi bo'yicha EWMA latency (vision / text)
+- EWMA xato va timeout ulushi
+- Kutilayotgan bajarilish vaqti: latency / (1 - error_rate)
+- Oxirgi muvaffaqiyatli so'rovlar latency kvantillari (hedging uchun p90)
+- Eski ma'lumot asta-sekin boshlang'ich qiymatga qaytadi (sekin provider qayta sinaladi)
+- Circuit breaker: ketma-ket xatolarda ochiladi, probe so'rovlar bilan half-open
+"""
+
+import math
+import os
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+# EWMA koeffitsiyenti (yangi o'lchov ulushi)
+AI_HEALTH_EWMA_ALPHA = float(os.getenv("AI_HEALTH_EWMA_ALPHA", "0.3"))
+# Shuncha soniya so'rov bo'lmasa ko'rsatkichlar boshlang'ich qiymatga yaqinlashadi
+AI_HEALTH_DECAY_SECONDS = float(os.getenv("AI_HEALTH_DECAY_SECONDS", "120"))
+
+# Circuit breaker
+AI_CB_FAILURE_THRESHOLD = int(os.getenv("AI_CB_FAILURE_THRESHOLD", "5"))
+AI_CB_OPEN_SECONDS = float(os.getenv("AI_CB_OPEN_SECONDS", "30"))
+AI_CB_MAX_OPEN_SECONDS = float(os.getenv("AI_CB_MAX_OPEN_SECONDS", "300"))
+AI_CB_HALF_OPEN_PROBES = int(os.getenv("AI_CB_HALF_OPEN_PROBES", "1"))
+AI_CB_CLOSE_AFTER = int(os.getenv("AI_CB_CLOSE_AFTER", "2"))
+
+# Ma'lumot bo'lmaganda taxminiy latency (soniya)
+DEFAULT_LATENCY = {
+    "vision": 8.0,
+    "text": 4.0,
+}
+
+# Error rate 1 ga yaqinlashganda score cheksiz bo'lmasligi uchun
+MAX_ERROR_RATE = 0.95
+
+# Kvantil uchun saqlanadigan oxirgi latency'lar
+LATENCY_SAMPLES = 200
+MIN_QUANTILE_SAMPLES = 20
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """
+    Provider sog'lig'i + circuit breaker
+
+    - start(): so'rov yuborildi (half-open'da probe slotini band qiladi)
+    - record_success() / record_failure(): natija
+    - release(): natija hisobga olinmaydi (masalan 429 - buni limiter boshqaradi)
+    """
+
+    def __init__(self, latency_bias: float = 1.0):
+        # latency_bias: ma'lumot yo'q paytda statik priority tartibini saqlash
+        self.latency_bias = latency_bias
+        self.latency: Dict[str, float] = {}
+        self._samples: Dict[str, deque] = {}
+        self.error_rate = 0.0
+        self.timeout_rate = 0.0
+        self.updated = 0.0
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.open_seconds = AI_CB_OPEN_SECONDS
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+
+        # Statistika
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.circuit_opened = 0
+
+    # ---------- circuit breaker ----------
+
+    def _refresh(self, now: float):
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+            self.probes_in_flight = 0
+            self.probe_successes = 0
+
+    def allow_request(self, now: Optional[float] = None) -> bool:
+        """Circuit so'rov o'tkazadimi"""
+        now = time.monotonic() if now is None else now
+        self._refresh(now)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN:
+            return self.probes_in_flight < AI_CB_HALF_OPEN_PROBES
+        return False
+
+    def time_until_allowed(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        self._refresh(now)
+        if self.state == OPEN:
+            return self.open_until - now
+        return 0.0
+
+    def start(self):
+        self.requests += 1
+        if self.state == HALF_OPEN:
+            self.probes_in_flight += 1
+
+    def release(self):
+        if self.state == HALF_OPEN and self.probes_in_flight:
+            self.probes_in_flight -= 1
+
+    def _open(self, now: float):
+        if self.state == HALF_OPEN:
+            # Probe muvaffaqiyatsiz - keyingi ochiq davr uzunroq
+            self.open_seconds = min(self.open_seconds * 2, AI_CB_MAX_OPEN_SECONDS)
+        self.state = OPEN
+        self.open_until = now + self.open_seconds
+        self.circuit_opened += 1
+        print(f"⚡ Circuit OPEN ({self.open_seconds:.0f}s), ketma-ket xatolar: {self.consecutive_failures}")
+
+    # ---------- EWMA ----------
+
+    def _decay_weight(self, now: float) -> float:
+        """Oxirgi o'lchovdan beri o'tgan vaqtga qarab EWMA og'irligi"""
+        if not self.updated:
+            return 0.0
+        return math.exp(-(now - self.updated) / AI_HEALTH_DECAY_SECONDS)
+
+    def _observe(self, request_type: str, latency: float, failed: bool, timed_out: bool, now: float):
+        weight = self._decay_weight(now)
+        prior = self._prior_latency(request_type)
+        current = self.latency.get(request_type, prior)
+        current = weight * current + (1 - weight) * prior
+        self.latency[request_type] = current + AI_HEALTH_EWMA_ALPHA * (latency - current)
+
+        error_rate = weight * self.error_rate
+        timeout_rate = weight * self.timeout_rate
+        self.error_rate = error_rate + AI_HEALTH_EWMA_ALPHA * (float(failed) - error_rate)
+        self.timeout_rate = timeout_rate + AI_HEALTH_EWMA_ALPHA * (float(timed_out) - timeout_rate)
+        self.updated = now
+
+    def _prior_latency(self, request_type: str) -> float:
+        return DEFAULT_LATENCY.get(request_type, DEFAULT_LATENCY["text"]) * self.latency_bias
+
+    def record_success(self, request_type: str, latency: float):
+        now = time.monotonic()
+        self._observe(request_type, latency, False, False, now)
+        self._samples.setdefault(request_type, deque(maxlen=LATENCY_SAMPLES)).append(latency)
+        self.consecutive_failures = 0
+        if self.state == HALF_OPEN:
+            self.release()
+            self.probe_successes += 1
+            if self.probe_successes >= AI_CB_CLOSE_AFTER:
+                self.state = CLOSED
+                self.open_seconds = AI_CB_OPEN_SECONDS
+                print("✅ Circuit CLOSED")
+
+    def record_failure(self, request_type: str, latency: float, timed_out: bool = False):
+        now = time.monotonic()
+        self._observe(request_type, latency, True, timed_out, now)
+        self.failures += 1
+        self.timeouts += int(timed_out)
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self.release()
+            self._open(now)
+        elif self.state == CLOSED and self.consecutive_failures >= AI_CB_FAILURE_THRESHOLD:
+            self._open(now)
+
+    def expected_time(self, request_type: str, now: Optional[float] = None) -> float:
+        """Kutilayotgan bajarilish vaqti (qayta urinishlar bilan)"""
+        now = time.monotonic() if now is None else now
+        weight = self._decay_weight(now)
+        prior = self._prior_latency(request_type)
+        latency = weight * self.latency.get(request_type, prior) + (1 - weight) * prior
+        error_rate = min(weight * self.error_rate, MAX_ERROR_RATE)
+        return latency / (1 - error_rate)
+
+    def latency_quantile(self, request_type: str, q: float) -> Optional[float]:
+        """Oxirgi muvaffaqiyatli so'rovlar latency kvantili (kam ma'lumot - None)"""
+        samples = self._samples.get(request_type)
+        if not samples or len(samples) < MIN_QUANTILE_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self._refresh(now)
+        weight = self._decay_weight(now)
+        return {
+            "circuit": self.state,
+            "circuit_open_for_seconds": round(max(0.0, self.open_until - now), 1) if self.state == OPEN else 0.0,
+            "circuit_opened": self.circuit_opened,
+            "latency_ms": {
+                request_type: round(latency * 1000)
+                for request_type, latency in self.latency.items()
+            },
+            "expected_ms": {
+                request_type: round(self.expected_time(request_type, now) * 1000)
+                for request_type in DEFAULT_LATENCY
+            },
+            "error_rate": round(weight * self.error_rate, 3),
+            "timeout_rate": round(weight * self.timeout_rate, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "requests": self.requests,
+            "failures": self.failures,
+            "timeouts": self.timeouts
+        }
@@ -0,0 +1,189 @@
+"""
+AI PROVIDER RATE LIMITER
+========================
+Har bir AI provider uchun RPM + TPM token bucket
+
+Features:
+- Uzluksiz to'ldiriladigan token bucket (daqiqa chegarasida burst yo'q)
+- So'rovlar (RPM) va tokenlar (TPM) alohida hisoblanadi
+- TPM taxmini slot olinganda band qilinadi, javobdan keyin farqi hisoblanadi
+- Retry-After header'iga amal qilish (provider vaqtincha bloklanadi)
+- Keyingi slot qachon bo'shashini hisoblash (kutish uchun)
+- Oxirgi 60 soniyadagi haqiqiy so'rov/token soni (statistika)
+"""
+
+import os
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+# Burst: necha soniyalik limit bir zumda ishlatilishi mumkin
+AI_RATE_BURST_SECONDS = float(os.getenv("AI_RATE_BURST_SECONDS", "5"))
+# Retry-After header bo'lmagan 429 uchun bloklash vaqti
+AI_RATE_LIMIT_COOLDOWN = float(os.getenv("AI_RATE_LIMIT_COOLDOWN", "20"))
+
+
+class ProviderRateLimitError(Exception):
+    """Provider 429 qaytardi (retry_after - soniyalarda, ma'lum bo'lsa)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header: soniyalar yoki HTTP sana"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Uzluksiz token bucket
+
+    rate = limit / 60 (soniyasiga), capacity = burst_seconds ichidagi limit.
+    Bucket qarzga kirishi mumkin (haqiqiy token sarfi taxmindan ko'p bo'lsa).
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = AI_RATE_BURST_SECONDS):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_minute <= 0
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, amount: float, now: float) -> bool:
+        if self.unlimited:
+            return True
+        self._refill(now)
+        # Capacity'dan katta so'rov to'la bucket bilan o'tkaziladi
+        return self.level >= min(amount, self.capacity)
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """amount uchun yetarli token to'planishigacha soniyalar"""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float, now: float):
+        """amount < 0 - ortiqcha band qilingan tokenlarni qaytarish"""
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.level = min(self.capacity, self.level - amount)
+
+
+class ProviderRateLimiter:
+    """
+    Provider uchun RPM + TPM limiter
+
+    - acquire(): so'rov slotini olish, tokenlar taxmini band qilinadi
+    - record_tokens(): haqiqiy token sarfi - band qilingan taxmin bilan farqi hisoblanadi
+    - block_for(): 429 / Retry-After bo'yicha vaqtincha bloklash
+    """
+
+    def __init__(self, rpm_limit: int, tpm_limit: int = 0, burst_seconds: float = AI_RATE_BURST_SECONDS):
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.requests = TokenBucket(rpm_limit, burst_seconds)
+        self.tokens = TokenBucket(tpm_limit, burst_seconds)
+        self.blocked_until = 0.0
+
+        # Oxirgi 60 soniya (statistika)
+        self._request_log: deque = deque()
+        self._token_log: deque = deque()
+        self.rate_limited = 0
+
+    def _trim(self, now: float):
+        cutoff = now - 60
+        while self._request_log and self._request_log[0] < cutoff:
+            self._request_log.popleft()
+        while self._token_log and self._token_log[0][0] < cutoff:
+            self._token_log.popleft()
+
+    def can_acquire(self, estimated_tokens: int = 0) -> bool:
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return False
+        return self.requests.available(1, now) and self.tokens.available(estimated_tokens, now)
+
+    def time_until_available(self, estimated_tokens: int = 0) -> float:
+        now = time.monotonic()
+        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+        return max(wait, self.blocked_until - now)
+
+    def acquire(self, estimated_tokens: int = 0) -> bool:
+        """
+        Slot olish (olingan bo'lsa True)
+
+        estimated_tokens TPM bucket'dan darhol band qilinadi - parallel
+        so'rovlar bitta bo'sh budget'ni bir necha marta ko'rmaydi.
+        """
+        if not self.can_acquire(estimated_tokens):
+            return False
+        now = time.monotonic()
+        self.requests.consume(1, now)
+        self.tokens.consume(max(0, estimated_tokens), now)
+        self._request_log.append(now)
+        return True
+
+    def record_tokens(self, tokens: int, reserved: int = 0):
+        """
+        Haqiqiy (yoki taxminiy) token sarfi
+
+        reserved - acquire() da band qilingan taxmin; bucket'dan faqat
+        farqi (tokens - reserved) yechiladi yoki qaytariladi.
+        """
+        now = time.monotonic()
+        if tokens != reserved:
+            self.tokens.consume(max(0, tokens) - max(0, reserved), now)
+        if tokens > 0:
+            self._token_log.append((now, tokens))
+
+    def block_for(self, seconds: Optional[float] = None):
+        """429: Retry-After (yoki cooldown) davomida so'rov yubormaslik"""
+        self.rate_limited += 1
+        seconds = AI_RATE_LIMIT_COOLDOWN if seconds is None else seconds
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        # Bucket'ni bo'shatish - blokdan keyin sekin qayta boshlanadi
+        self.requests.level = min(self.requests.level, 0)
+
+    @property
+    def current_rpm(self) -> int:
+        self._trim(time.monotonic())
+        return len(self._request_log)
+
+    @property
+    def current_tpm(self) -> int:
+        self._trim(time.monotonic())
+        return sum(tokens for _, tokens in self._token_log)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "current_rpm": self.current_rpm,
+            "current_tpm": self.current_tpm,
+            "rpm_limit": self.rpm_limit,
+            "tpm_limit": self.tpm_limit,
+            "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 1),
+            "rate_limited": self.rate_limited
+        }
@@ -0,0 +1,240 @@
+"""
+AI REQUEST QUEUE - Priority queue with backpressure
+===================================================
+AILoadBalancer uchun navbat: providerlar band bo'lsa so'rovlar
+darhol xato qaytarmaydi, balki navbatda slot kutadi.
+
+Features:
+- Priority sinflari (interactive > default > background)
+- Bir sinf ichida partnerlar o'rtasida round-robin (adolatli navbat)
+- Cheklangan chuqurlik: to'lganda past priority'dagi so'rov siqib chiqariladi
+- Har bir so'rov uchun deadline (navbatda kutish chegarasi)
+- Navbat chuqurligi va kutish vaqti statistikasi
+"""
+
+import asyncio
+import itertools
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List
+
+# Priority sinflari (kichik raqam - yuqori priority)
+PRIORITY_CLASSES = {
+    "interactive": 0,  # Mobil skaner, foydalanuvchi kutmoqda
+    "default": 1,
+    "background": 2,   # Kartochka / infografika job'lari
+}
+
+# Navbatdagi maksimal so'rovlar soni
+AI_QUEUE_MAX_DEPTH = int(os.getenv("AI_QUEUE_MAX_DEPTH", "500"))
+
+# Priority bo'yicha navbatda kutish chegarasi (soniya)
+AI_QUEUE_DEADLINES = {
+    "interactive": float(os.getenv("AI_QUEUE_DEADLINE_INTERACTIVE", "30")),
+    "default": float(os.getenv("AI_QUEUE_DEADLINE_DEFAULT", "60")),
+    "background": float(os.getenv("AI_QUEUE_DEADLINE_BACKGROUND", "300")),
+}
+
+_sequence = itertools.count()
+
+
+class QueueRejectedError(Exception):
+    """So'rov navbatga olinmadi yoki navbatdan chiqarildi (code - javob kodi)"""
+
+    def __init__(self, message: str, code: str):
+        super().__init__(message)
+        self.code = code
+
+
+@dataclass
+class QueueTicket:
+    """Navbatdagi bitta so'rov"""
+    priority: str
+    partner_id: str
+    estimated_tokens: int
+    deadline: float
+    future: asyncio.Future
+    request_type: str = "text"
+    enqueued_at: float = field(default_factory=time.monotonic)
+    seq: int = field(default_factory=lambda: next(_sequence))
+
+    @property
+    def rank(self) -> int:
+        return PRIORITY_CLASSES[self.priority]
+
+
+class AIRequestQueue:
+    """
+    Priority sinflari bo'yicha navbat
+
+    Har bir sinf: partner_id -> deque[QueueTicket] (OrderedDict).
+    Keyingi so'rov: eng yuqori sinf, undagi navbatdagi partner
+    (xizmat qilingandan keyin partner oxiriga o'tadi).
+    """
+
+    def __init__(self, max_depth: int = AI_QUEUE_MAX_DEPTH):
+        self.max_depth = max_depth
+        self._classes: List["OrderedDict[str, deque]"] = [OrderedDict() for _ in PRIORITY_CLASSES]
+        self.depth = 0
+
+        # Statistika
+        self.enqueued = 0
+        self.dispatched = 0
+        self.rejected = 0
+        self.evicted = 0
+        self.expired = 0
+        self._wait_times: deque = deque(maxlen=1000)
+
+    def __len__(self) -> int:
+        return self.depth
+
+    def ticket(
+        self,
+        priority: str = "default",
+        partner_id: Optional[str] = None,
+        estimated_tokens: int = 0,
+        deadline: Optional[float] = None,
+        request_type: str = "text"
+    ) -> QueueTicket:
+        """Yangi ticket (deadline - soniyalarda, navbatga kirgan paytdan)"""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Noma'lum priority: {priority}")
+        if deadline is None:
+            deadline = AI_QUEUE_DEADLINES[priority]
+        return QueueTicket(
+            priority=priority,
+            partner_id=partner_id or "anonymous",
+            estimated_tokens=estimated_tokens,
+            deadline=time.monotonic() + deadline,
+            future=asyncio.get_running_loop().create_future(),
+            request_type=request_type
+        )
+
+    def put(self, ticket: QueueTicket):
+        """
+        Navbatga qo'shish
+
+        Navbat to'la bo'lsa: pastroq priority'dagi eng oxirgi so'rov
+        QUEUE_FULL bilan chiqariladi, bunday so'rov yo'q bo'lsa yangisi rad etiladi.
+        """
+        if self.depth >= self.max_depth:
+            victim = self._lowest_below(ticket.rank)
+            if victim is None:
+                self.rejected += 1
+                raise QueueRejectedError("AI navbati to'la. Keyinroq urinib ko'ring.", "QUEUE_FULL")
+            self.remove(victim)
+            self.evicted += 1
+            if not victim.future.done():
+                victim.future.set_exception(
+                    QueueRejectedError("Yuqori priority'dagi so'rovlar uchun navbatdan chiqarildi", "QUEUE_FULL")
+                )
+
+        partners = self._classes[ticket.rank]
+        partners.setdefault(ticket.partner_id, deque()).append(ticket)
+        self.depth += 1
+        self.enqueued += 1
+
+    def _lowest_below(self, rank: int) -> Optional[QueueTicket]:
+        """rank'dan past sinfdagi eng oxirgi kelgan so'rov"""
+        for lower in range(len(self._classes) - 1, rank, -1):
+            tickets = [partner_queue[-1] for partner_queue in self._classes[lower].values()]
+            if tickets:
+                return max(tickets, key=lambda t: t.seq)
+        return None
+
+    def remove(self, ticket: QueueTicket) -> bool:
+        """Navbatdan olib tashlash (timeout / eviction)"""
+        partners = self._classes[ticket.rank]
+        partner_queue = partners.get(ticket.partner_id)
+        if not partner_queue:
+            return False
+        try:
+            partner_queue.remove(ticket)
+        except ValueError:
+            return False
+        if not partner_queue:
+            del partners[ticket.partner_id]
+        self.depth -= 1
+        return True
+
+    def peek(self) -> Optional[QueueTicket]:
+        """Keyingi so'rov (navbatdan olinmaydi)"""
+        for partners in self._classes:
+            for partner_queue in partners.values():
+                return partner_queue[0]
+        return None
+
+    def pop(self, ticket: QueueTicket):
+        """peek() natijasini navbatdan olish, partner round-robin oxiriga o'tadi"""
+        partners = self._classes[ticket.rank]
+        partner_queue = partners[ticket.partner_id]
+        partner_queue.popleft()
+        if partner_queue:
+            partners.move_to_end(ticket.partner_id)
+        else:
+            del partners[ticket.partner_id]
+        self.depth -= 1
+        self.dispatched += 1
+        self._wait_times.append(time.monotonic() - ticket.enqueued_at)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Deadline o'tgan so'rovlarni QUEUE_TIMEOUT bilan yakunlash"""
+        now = time.monotonic() if now is None else now
+        expired = [
+            ticket
+            for partners in self._classes
+            for partner_queue in partners.values()
+            for ticket in partner_queue
+            if ticket.deadline <= now
+        ]
+        for ticket in expired:
+            self.remove(ticket)
+            self.expired += 1
+            if not ticket.future.done():
+                ticket.future.set_exception(
+                    QueueRejectedError("AI navbatida kutish vaqti tugadi", "QUEUE_TIMEOUT")
+                )
+        return len(expired)
+
+    def next_deadline(self) -> Optional[float]:
+        deadlines = [
+            ticket.deadline
+            for partners in self._classes
+            for partner_queue in partners.values()
+            for ticket in partner_queue
+        ]
+        return min(deadlines) if deadlines else None
+
+    def fail_all(self, error: Exception):
+        """Barcha kutayotgan so'rovlarni xato bilan yakunlash"""
+        for partners in self._classes:
+            for partner_queue in partners.values():
+                for ticket in partner_queue:
+                    if not ticket.future.done():
+                        ticket.future.set_exception(error)
+            partners.clear()
+        self.depth = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        waits = sorted(self._wait_times)
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "by_priority": {
+                name: sum(len(q) for q in self._classes[rank].values())
+                for name, rank in PRIORITY_CLASSES.items()
+            },
+            "partners_waiting": len({
+                partner for partners in self._classes for partner in partners
+            }),
+            "enqueued": self.enqueued,
+            "dispatched": self.dispatched,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+            "max_wait_ms": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
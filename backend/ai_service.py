@@ -8,6 +8,9 @@ import base64
 from typing import Optional
 from dotenv import load_dotenv
 
+from scan_cache import scan_result_cache
+from ai_singleflight import text_generation_cache, prompt_key
+
 # Load environment variables
 load_dotenv('/app/backend/.env')
 
@@ -20,6 +23,92 @@ async def generate_product_card(
     description: str = "",
     price: float = 100000,
     marketplace: str = "uzum"
+) -> dict:
+    """Generate AI-powered product card (bir xil so'rovlar bitta LLM chaqiruvida)"""
+    return await text_generation_cache.run(
+        prompt_key("product_card", name, category, description, price, marketplace),
+        lambda: _generate_product_card(name, category, description, price, marketplace),
+        cacheable=lambda result: result.get("success", False)
+    )
+
+
+CARD_SYSTEM_MESSAGE = "Siz professional marketplace SEO mutaxassisisiz. Faqat JSON formatda javob bering."
+
+# Marketplace rules
+CARD_MARKETPLACE_RULES = {
+    "uzum": "Uzum Market: O'zbek tilida, 80 belgigacha sarlavha",
+    "wildberries": "Wildberries: Rus tilida, SEO kalit so'zlar muhim",
+    "yandex": "Yandex Market: Rus tilida, texnik xususiyatlar",
+    "ozon": "Ozon: Rus tilida, batafsil tavsif"
+}
+
+
+def build_product_card_prompt(
+    name: str,
+    category: str = "general",
+    description: str = "",
+    price: float = 100000,
+    marketplace: str = "uzum"
+) -> str:
+    """Kartochka prompt'i (maydonlar tartibi: qisqa maydonlar avval - streaming uchun)"""
+    return f"""MAHSULOT: {name}
+KATEGORIYA: {category}
+TAVSIF: {description if description else "yo'q"}
+NARX: {price} so'm
+MARKETPLACE: {marketplace}
+QOIDALAR: {CARD_MARKETPLACE_RULES.get(marketplace, CARD_MARKETPLACE_RULES['uzum'])}
+
+Quyidagi JSON formatda professional mahsulot kartochkasi yarat:
+
+{{
+  "title": "SEO-optimizatsiya qilingan sarlavha",
+  "shortDescription": "Qisqa tavsif (150 belgi)",
+  "bulletPoints": ["Xususiyat 1", "Xususiyat 2", "...5 tagacha"],
+  "description": "Toliq SEO tavsif (300-500 soz)",
+  "keywords": ["kalit1", "kalit2", "...10 tagacha"],
+  "seoScore": 85,
+  "suggestedPrice": {price},
+  "categoryPath": ["Kategoriya", "Subkategoriya"]
+}}"""
+
+
+def parse_card_json(response: str) -> Optional[dict]:
+    """AI javobidan kartochka JSON'ini ajratish (topilmasa None)"""
+    try:
+        # Try to extract JSON from response
+        json_text = response
+        if "```json" in response:
+            json_text = response.split("```json")[1].split("```")[0]
+        elif "```" in response:
+            json_text = response.split("```")[1].split("```")[0]
+        return json.loads(json_text)
+    except (json.JSONDecodeError, IndexError):
+        # Try to find JSON in response
+        import re
+        json_match = re.search(r'\{[\s\S]*\}', response)
+        if json_match:
+            try:
+                return json.loads(json_match.group())
+            except json.JSONDecodeError:
+                return None
+        return None
+
+
+def card_result(card: dict) -> dict:
+    """generate_product_card javobi"""
+    return {
+        "success": True,
+        "card": card,
+        "message": f"Kartochka yaratildi. SEO ball: {card.get('seoScore', 0)}/100"
+    }
+
+
+async def _generate_product_card(
+    name: str,
+    category: str = "general",
+    description: str = "",
+    price: float = 100000,
+    marketplace: str = "uzum"
 ) -> dict:
     """Generate AI-powered product card"""
     
@@ -36,71 +125,23 @@ async def generate_product_card(
         chat = LlmChat(
             api_key=EMERGENT_KEY,
             session_id=f"card-{name[:20]}",
-            system_message="Siz professional marketplace SEO mutaxassisisiz. Faqat JSON formatda javob bering."
+            system_message=CARD_SYSTEM_MESSAGE
         ).with_model("openai", "gpt-4o")
         
-        # Marketplace rules
-        rules = {
-            "uzum": "Uzum Market: O'zbek tilida, 80 belgigacha sarlavha",
-            "wildberries": "Wildberries: Rus tilida, SEO kalit so'zlar muhim",
-            "yandex": "Yandex Market: Rus tilida, texnik xususiyatlar",
-            "ozon": "Ozon: Rus tilida, batafsil tavsif"
-        }
-        
-        prompt = f"""MAHSULOT: {name}
-KATEGORIYA: {category}
-TAVSIF: {description if description else "yo'q"}
-NARX: {price} so'm
-MARKETPLACE: {marketplace}
-QOIDALAR: {rules.get(marketplace, rules['uzum'])}
-
-Quyidagi JSON formatda professional mahsulot kartochkasi yarat:
-
-{{
-  "title": "SEO-optimizatsiya qilingan sarlavha",
-  "description": "Toliq SEO tavsif (300-500 soz)",
-  "shortDescription": "Qisqa tavsif (150 belgi)",
-  "keywords": ["kalit1", "kalit2", "...10 tagacha"],
-  "bulletPoints": ["Xususiyat 1", "Xususiyat 2", "...5 tagacha"],
-  "seoScore": 85,
-  "suggestedPrice": {price},
-  "categoryPath": ["Kategoriya", "Subkategoriya"]
-}}"""
+        prompt = build_product_card_prompt(name, category, description, price, marketplace)
         
         # Send message
         response = await chat.send_message(UserMessage(text=prompt))
         
         # Parse JSON
-        try:
-            # Try to extract JSON from response
-            json_text = response
-            if "```json" in response:
-                json_text = response.split("```json")[1].split("```")[0]
-            elif "```" in response:
-                json_text = response.split("```")[1].split("```")[0]
-            
-            card = json.loads(json_text)
-            return {
-                "success": True,
-                "card": card,
-                "message": f"Kartochka yaratildi. SEO ball: {card.get('seoScore', 0)}/100"
-            }
-        except json.JSONDecodeError:
-            # Try to find JSON in response
-            import re
-            json_match = re.search(r'\{[\s\S]*\}', response)
-            if json_match:
-                card = json.loads(json_match.group())
-                return {
-                    "success": True,
-                    "card": card,
-                    "message": f"Kartochka yaratildi. SEO ball: {card.get('seoScore', 0)}/100"
-                }
+        card = parse_card_json(response)
+        if card is None:
             return {
                 "success": False,
                 "error": "Could not parse AI response",
                 "raw_response": response[:500]
             }
+        return card_result(card)
             
     except Exception as e:
         return {
@@ -110,6 +151,16 @@ Quyidagi JSON formatda professional mahsulot kartochkasi yarat:
 
 
 async def scan_product_image(image_base64: str) -> dict:
+    """Scan product from image using AI vision (perceptual hash cache bilan)"""
+    return await scan_result_cache.get_or_scan(
+        "ai_service",
+        image_base64,
+        lambda: _scan_product_image(image_base64),
+        cacheable=lambda result: result.get("success", False)
+    )
+
+
+async def _scan_product_image(image_base64: str) -> dict:
     """Scan product from image using AI vision"""
     
     if not EMERGENT_KEY:
@@ -0,0 +1,141 @@
+"""
+AI SINGLE-FLIGHT - Text generation request coalescing
+=====================================================
+Mobil ilovadan bir xil mahsulot uchun bir necha soniya ichida kelgan
+kartochka so'rovlari bitta upstream LLM chaqiruvini baham ko'radi.
+
+Features:
+- Normallashtirilgan prompt maydonlari bo'yicha hash kalit
+- Bir xil kalit uchun bitta in-flight chaqiruv, barcha kutuvchilar natijani oladi
+- Qisqa muddatli natija keshi (bounded LRU + TTL)
+- Kutuvchi bekor qilinsa ham umumiy chaqiruv to'xtamaydi (shield)
+- Hit / coalesced / miss statistikasi (/api/ai/stats)
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Awaitable, Tuple
+
+AI_TEXT_CACHE_SIZE = int(os.getenv("AI_TEXT_CACHE_SIZE", "1024"))
+AI_TEXT_CACHE_TTL = float(os.getenv("AI_TEXT_CACHE_TTL", "120"))
+
+
+def _normalize(value: Any) -> Any:
+    """Kalit uchun: matn - kichik harf + bitta bo'shliq, dict - tartiblangan"""
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def prompt_key(namespace: str, *parts: Any) -> str:
+    """Prompt'ga kiradigan qiymatlardan normallashtirilgan hash kalit"""
+    payload = json.dumps(_normalize(list(parts)), ensure_ascii=False, sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode()).hexdigest()[:32]}"
+
+
+class SingleFlightCache:
+    """
+    Single-flight + qisqa muddatli natija keshi
+
+    run(key, func): keshda bo'lsa - nusxasi, in-flight bo'lsa - o'sha
+    chaqiruv natijasi, aks holda func() bitta marta chaqiriladi.
+    """
+
+    def __init__(self, max_size: int = AI_TEXT_CACHE_SIZE, ttl: float = AI_TEXT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._results: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # Stats
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _get_cached(self, key: str):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] >= self.ttl:
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return entry
+
+    def _remember(self, key: str, result: Any):
+        self._results[key] = (result, time.monotonic())
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+
+    async def _execute(self, key: str, func: Callable[[], Awaitable[Any]], cacheable: Callable[[Any], bool]):
+        try:
+            result = await func()
+        except Exception:
+            self.errors += 1
+            raise
+        if cacheable(result):
+            self._remember(key, result)
+        return result
+
+    async def run(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = bool
+    ) -> Any:
+        """
+        Bitta kalit uchun bitta upstream chaqiruv
+
+        Xato (exception) barcha kutuvchilarga uzatiladi va keshlanmaydi;
+        cacheable(natija) False bo'lsa natija faqat in-flight kutuvchilarga beriladi.
+        """
+        entry = self._get_cached(key)
+        if entry is not None:
+            self.hits += 1
+            return copy.deepcopy(entry[0])
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._execute(key, func, cacheable))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result)
+
+    def clear(self):
+        self._results.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "size": len(self._results),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "errors": self.errors,
+            "saved_calls_rate": round((self.hits + self.coalesced) / lookups * 100, 1) if lookups else 0.0
+        }
+
+
+# Singleton
+text_generation_cache = SingleFlightCache()
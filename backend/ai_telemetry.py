@@ -0,0 +1,402 @@
+"""
+AI TELEMETRY - Provider latency / token / cost metrics
+======================================================
+Har bir provider va so'rov turi (vision / text) bo'yicha sirpanuvchi
+oyna (rolling window) latency histogrammalari, token va xarajat
+hisoblagichlari hamda failover chastotasi. Capacity rejalash uchun.
+
+Features:
+- Rolling window latency histogram (p50 / p95 / p99 / max)
+- Natija bo'yicha hisoblagichlar: success / error / timeout / rate_limited / cancelled
+- Token sarfi va taxminiy xarajat (USD, 1K token narxi env orqali)
+- So'rov turi bo'yicha failover chastotasi va yo'nalishlari (openai->anthropic)
+- JSON (/api/ai/stats) va Prometheus text format (/api/ai/metrics)
+"""
+
+import os
+import time
+from collections import deque
+from typing import Dict, Any, Optional, List, Tuple
+
+# Sirpanuvchi oyna uzunligi va bitta slot (soniya)
+AI_TELEMETRY_WINDOW_SECONDS = float(os.getenv("AI_TELEMETRY_WINDOW_SECONDS", "300"))
+AI_TELEMETRY_SLOT_SECONDS = float(os.getenv("AI_TELEMETRY_SLOT_SECONDS", "10"))
+
+# Histogram chegaralari (soniya), oxirida +Inf
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+OUTCOMES = ("success", "error", "timeout", "rate_limited", "cancelled")
+
+# 1K token narxi (USD, kirish/chiqish aralash ~3:1) - provider va so'rov turi bo'yicha
+# vision: gpt-4o / claude-3-5-sonnet, text: gpt-4o-mini / claude-3-5-haiku, gemini-1.5-flash
+DEFAULT_COST_PER_1K = {
+    ("openai", "vision"): 0.0044,
+    ("openai", "text"): 0.00026,
+    ("anthropic", "vision"): 0.006,
+    ("anthropic", "text"): 0.0016,
+    ("gemini", "vision"): 0.00013,
+    ("gemini", "text"): 0.00013,
+    ("emergent", "vision"): 0.0044,
+    ("emergent", "text"): 0.00026,
+}
+
+
+def cost_per_1k(provider: str, request_type: str) -> float:
+    """1K token narxi: AI_COST_PER_1K_<PROVIDER>_<TYPE> env yoki default"""
+    env_value = os.getenv(f"AI_COST_PER_1K_{provider.upper()}_{request_type.upper()}")
+    if env_value:
+        try:
+            return float(env_value)
+        except ValueError:
+            pass
+    return DEFAULT_COST_PER_1K.get((provider, request_type), 0.0)
+
+
+class _Slot:
+    """Oynaning bitta vaqt bo'lagi"""
+
+    __slots__ = ("start", "counts", "latency_sum", "latency_max", "outcomes", "tokens", "cost")
+
+    def __init__(self, start: float, buckets: int):
+        self.start = start
+        self.counts = [0] * buckets
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.outcomes = dict.fromkeys(OUTCOMES, 0)
+        self.tokens = 0
+        self.cost = 0.0
+
+
+class RollingHistogram:
+    """
+    Sirpanuvchi oyna histogrammasi
+
+    Oyna slot'larga bo'lingan: eski slot'lar tashlanadi, kvantillar
+    oynadagi bucket'lar bo'yicha chiziqli interpolyatsiya bilan.
+    Umumiy (lifetime) bucket'lar Prometheus uchun alohida saqlanadi.
+    """
+
+    def __init__(
+        self,
+        bounds: Tuple[float, ...] = LATENCY_BUCKETS,
+        window: float = AI_TELEMETRY_WINDOW_SECONDS,
+        slot: float = AI_TELEMETRY_SLOT_SECONDS
+    ):
+        self.bounds = bounds
+        self.window = window
+        self.slot = max(slot, 0.001)
+        self._slots: deque = deque()
+
+        # Lifetime
+        self.counts = [0] * (len(bounds) + 1)
+        self.latency_sum = 0.0
+        self.outcomes = dict.fromkeys(OUTCOMES, 0)
+        self.tokens = 0
+        self.cost = 0.0
+
+    def _bucket(self, value: float) -> int:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                return i
+        return len(self.bounds)
+
+    def _prune(self, now: float):
+        while self._slots and self._slots[0].start <= now - self.window:
+            self._slots.popleft()
+
+    def _current(self, now: float) -> _Slot:
+        self._prune(now)
+        start = now - (now % self.slot)
+        if not self._slots or self._slots[-1].start != start:
+            self._slots.append(_Slot(start, len(self.bounds) + 1))
+        return self._slots[-1]
+
+    def record(
+        self,
+        outcome: str,
+        latency: Optional[float] = None,
+        tokens: int = 0,
+        cost: float = 0.0,
+        now: Optional[float] = None
+    ):
+        """Natija yozish (latency faqat berilsa histogrammaga tushadi)"""
+        slot = self._current(time.monotonic() if now is None else now)
+        slot.outcomes[outcome] = slot.outcomes.get(outcome, 0) + 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        slot.tokens += tokens
+        slot.cost += cost
+        self.tokens += tokens
+        self.cost += cost
+        if latency is not None:
+            bucket = self._bucket(latency)
+            slot.counts[bucket] += 1
+            slot.latency_sum += latency
+            slot.latency_max = max(slot.latency_max, latency)
+            self.counts[bucket] += 1
+            self.latency_sum += latency
+
+    def window_stats(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Oynadagi yig'indi: bucket'lar, natijalar, tokenlar, xarajat"""
+        self._prune(time.monotonic() if now is None else now)
+        counts = [0] * (len(self.bounds) + 1)
+        outcomes = dict.fromkeys(OUTCOMES, 0)
+        latency_sum = latency_max = cost = 0.0
+        tokens = 0
+        for slot in self._slots:
+            for i, count in enumerate(slot.counts):
+                counts[i] += count
+            for outcome, count in slot.outcomes.items():
+                outcomes[outcome] = outcomes.get(outcome, 0) + count
+            latency_sum += slot.latency_sum
+            latency_max = max(latency_max, slot.latency_max)
+            tokens += slot.tokens
+            cost += slot.cost
+        return {
+            "counts": counts,
+            "observed": sum(counts),
+            "latency_sum": latency_sum,
+            "latency_max": latency_max,
+            "outcomes": outcomes,
+            "tokens": tokens,
+            "cost": cost
+        }
+
+    def quantile(self, q: float, window: Optional[Dict[str, Any]] = None) -> Optional[float]:
+        """Oynadagi latency kvantili (soniya), ma'lumot yo'q - None"""
+        window = window or self.window_stats()
+        total = window["observed"]
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(window["counts"]):
+            if count and seen + count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                # +Inf bucket - oynadagi maksimal qiymat yuqori chegara
+                upper = self.bounds[i] if i < len(self.bounds) else max(window["latency_max"], lower)
+                return min(lower + (upper - lower) * (rank - seen) / count, window["latency_max"])
+            seen += count
+        return window["latency_max"]
+
+
+class AITelemetry:
+    """
+    Load balancer telemetriyasi
+
+    - record_request(type): balancer'ga so'rov keldi
+    - record_call(provider, type, outcome, latency, tokens): bitta provider chaqiruvi
+    - record_failover(type, from, to): xatodan keyin boshqa provider'ga o'tildi
+    """
+
+    def __init__(
+        self,
+        window: float = AI_TELEMETRY_WINDOW_SECONDS,
+        slot: float = AI_TELEMETRY_SLOT_SECONDS
+    ):
+        self.window = window
+        self.slot = slot
+        self.calls: Dict[Tuple[str, str], RollingHistogram] = {}
+        self.requests: Dict[str, RollingHistogram] = {}
+        self.failovers: Dict[Tuple[str, str, str], int] = {}
+        self._failover_window: Dict[str, RollingHistogram] = {}
+
+    def _histogram(self, store: Dict, key) -> RollingHistogram:
+        histogram = store.get(key)
+        if histogram is None:
+            histogram = store[key] = RollingHistogram(window=self.window, slot=self.slot)
+        return histogram
+
+    def record_request(self, request_type: str, now: Optional[float] = None):
+        self._histogram(self.requests, request_type).record("submitted", now=now)
+
+    def record_call(
+        self,
+        provider: str,
+        request_type: str,
+        outcome: str,
+        latency: float,
+        tokens: int = 0,
+        now: Optional[float] = None
+    ):
+        """Provider chaqiruvi: latency histogrammaga faqat muvaffaqiyatli javoblar tushadi"""
+        cost = tokens / 1000 * cost_per_1k(provider, request_type)
+        self._histogram(self.calls, (provider, request_type)).record(
+            outcome,
+            latency=latency if outcome == "success" else None,
+            tokens=tokens,
+            cost=cost,
+            now=now
+        )
+
+    def record_failover(self, request_type: str, from_provider: str, to_provider: str, now: Optional[float] = None):
+        key = (request_type, from_provider, to_provider)
+        self.failovers[key] = self.failovers.get(key, 0) + 1
+        self._histogram(self._failover_window, request_type).record("failover", now=now)
+
+    # ---------- export ----------
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """JSON ko'rinish (/api/ai/stats -> telemetry)"""
+        now = time.monotonic() if now is None else now
+        providers: Dict[str, Dict[str, Any]] = {}
+        type_totals: Dict[str, Dict[str, float]] = {}
+
+        for (provider, request_type), histogram in sorted(self.calls.items()):
+            window = histogram.window_stats(now)
+            latency = {
+                name: round(value * 1000) if value is not None else None
+                for name, value in (
+                    ("p50", histogram.quantile(0.5, window)),
+                    ("p95", histogram.quantile(0.95, window)),
+                    ("p99", histogram.quantile(0.99, window))
+                )
+            }
+            latency["max"] = round(window["latency_max"] * 1000) if window["observed"] else None
+            calls = sum(window["outcomes"].values())
+            providers.setdefault(provider, {})[request_type] = {
+                "window": {
+                    "calls": calls,
+                    **window["outcomes"],
+                    "error_rate": round(1 - window["outcomes"]["success"] / calls, 3) if calls else 0.0,
+                    "latency_ms": latency,
+                    "tokens": window["tokens"],
+                    "cost_usd": round(window["cost"], 4)
+                },
+                "total": {
+                    "calls": sum(histogram.outcomes.values()),
+                    **histogram.outcomes,
+                    "tokens": histogram.tokens,
+                    "cost_usd": round(histogram.cost, 4)
+                },
+                "cost_per_1k_tokens": cost_per_1k(provider, request_type)
+            }
+            totals = type_totals.setdefault(request_type, {"tokens": 0, "cost": 0.0, "window_cost": 0.0})
+            totals["tokens"] += histogram.tokens
+            totals["cost"] += histogram.cost
+            totals["window_cost"] += window["cost"]
+
+        request_types: Dict[str, Dict[str, Any]] = {}
+        for request_type in sorted(set(self.requests) | set(type_totals)):
+            requests = self.requests.get(request_type)
+            total_requests = requests.outcomes["submitted"] if requests else 0
+            window_requests = requests.window_stats(now)["outcomes"]["submitted"] if requests else 0
+            failover_window = self._failover_window.get(request_type)
+            window_failovers = failover_window.window_stats(now)["outcomes"]["failover"] if failover_window else 0
+            paths = {
+                f"{from_provider}->{to_provider}": count
+                for (kind, from_provider, to_provider), count in sorted(self.failovers.items())
+                if kind == request_type
+            }
+            totals = type_totals.get(request_type, {"tokens": 0, "cost": 0.0, "window_cost": 0.0})
+            request_types[request_type] = {
+                "requests": total_requests,
+                "window_requests": window_requests,
+                "failovers": sum(paths.values()),
+                "window_failovers": window_failovers,
+                "failover_rate": round(window_failovers / window_requests, 3) if window_requests else 0.0,
+                "failover_paths": paths,
+                "tokens": totals["tokens"],
+                "cost_usd": round(totals["cost"], 4),
+                "cost_per_request_usd": round(totals["cost"] / total_requests, 6) if total_requests else 0.0,
+                "window_cost_usd": round(totals["window_cost"], 4)
+            }
+
+        return {
+            "window_seconds": self.window,
+            "providers": providers,
+            "request_types": request_types
+        }
+
+    def render_prometheus(
+        self,
+        extra: Optional[Dict[str, Tuple[str, float, str]]] = None,
+        now: Optional[float] = None
+    ) -> str:
+        """
+        Prometheus text exposition format (0.0.4)
+
+        extra: {nom: (gauge | counter, qiymat, izoh)} - balancer navbati va h.k.
+        """
+        now = time.monotonic() if now is None else now
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def labels(**values) -> str:
+            return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in values.items()) + "}"
+
+        header("ai_requests_total", "counter", "Requests submitted to the AI load balancer")
+        for request_type, histogram in sorted(self.requests.items()):
+            lines.append(f"ai_requests_total{labels(type=request_type)} {histogram.outcomes['submitted']}")
+
+        header("ai_provider_calls_total", "counter", "AI provider calls by outcome")
+        for (provider, request_type), histogram in sorted(self.calls.items()):
+            for outcome, count in histogram.outcomes.items():
+                lines.append(
+                    f"ai_provider_calls_total{labels(provider=provider, type=request_type, outcome=outcome)} {count}"
+                )
+
+        header("ai_provider_latency_seconds", "histogram", "Latency of successful AI provider calls")
+        for (provider, request_type), histogram in sorted(self.calls.items()):
+            cumulative = 0
+            for i, count in enumerate(histogram.counts):
+                cumulative += count
+                le = _format_float(histogram.bounds[i]) if i < len(histogram.bounds) else "+Inf"
+                lines.append(
+                    f"ai_provider_latency_seconds_bucket{labels(provider=provider, type=request_type, le=le)} {cumulative}"
+                )
+            lines.append(
+                f"ai_provider_latency_seconds_sum{labels(provider=provider, type=request_type)} "
+                f"{_format_float(histogram.latency_sum)}"
+            )
+            lines.append(f"ai_provider_latency_seconds_count{labels(provider=provider, type=request_type)} {cumulative}")
+
+        header(
+            "ai_provider_latency_window_seconds", "gauge",
+            f"Rolling {int(self.window)}s latency quantiles of successful AI provider calls"
+        )
+        for (provider, request_type), histogram in sorted(self.calls.items()):
+            window = histogram.window_stats(now)
+            for q in (0.5, 0.95, 0.99):
+                value = histogram.quantile(q, window)
+                if value is not None:
+                    lines.append(
+                        f"ai_provider_latency_window_seconds"
+                        f"{labels(provider=provider, type=request_type, quantile=_format_float(q))} {_format_float(value)}"
+                    )
+
+        header("ai_provider_tokens_total", "counter", "Tokens used by AI provider calls")
+        for (provider, request_type), histogram in sorted(self.calls.items()):
+            lines.append(f"ai_provider_tokens_total{labels(provider=provider, type=request_type)} {histogram.tokens}")
+
+        header("ai_provider_cost_usd_total", "counter", "Estimated AI provider cost in USD")
+        for (provider, request_type), histogram in sorted(self.calls.items()):
+            lines.append(
+                f"ai_provider_cost_usd_total{labels(provider=provider, type=request_type)} {_format_float(histogram.cost)}"
+            )
+
+        header("ai_failovers_total", "counter", "Failovers from one AI provider to another")
+        for (request_type, from_provider, to_provider), count in sorted(self.failovers.items()):
+            lines.append(
+                f"ai_failovers_total{labels(type=request_type, **{'from': from_provider, 'to': to_provider})} {count}"
+            )
+
+        for name, (kind, value, help_text) in (extra or {}).items():
+            header(name, kind, help_text)
+            lines.append(f"{name} {_format_float(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# Singleton
+ai_telemetry = AITelemetry()
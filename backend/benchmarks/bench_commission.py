@@ -0,0 +1,156 @@
+"""
+Commission / logistics lookup microbenchmark
+=============================================
+Oldingi (chiziqli dict skan) va hozirgi (bisect + kompilyatsiya
+qilingan jadvallar) implementatsiyalarning bitta chaqiruv narxi.
+Natijalar bir xilligi ham tekshiriladi.
+
+Ishga tushirish:
+    python backend/benchmarks/bench_commission.py [--calls 200000]
+"""
+
+import os
+import sys
+import random
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import uzum_rules
+import yandex_rules
+from uzum_rules import PRICE_BASED_COMMISSION, COMMISSION_RATES, LOGISTICS_FEES
+from yandex_rules import YANDEX_COMMISSION_RATES, YANDEX_LOGISTICS_FEES
+
+
+# ========================================
+# OLDINGI IMPLEMENTATSIYALAR (taqqoslash uchun)
+# ========================================
+
+def legacy_get_commission_by_price(price):
+    for level, (min_price, max_price, commission) in PRICE_BASED_COMMISSION.items():
+        if min_price <= price < max_price:
+            return commission
+    return 17
+
+
+def legacy_get_commission_rate(category, subcategory=None, price=None):
+    category_lower = category.lower()
+    if price is not None and price > 0:
+        price_commission = legacy_get_commission_by_price(price)
+        if category_lower in ["appliances", "electronics"]:
+            if subcategory and subcategory.lower() in ["refrigerators", "washing_machines", "air_conditioners",
+                                                         "appliances_large", "tv", "laptops"]:
+                return max(price_commission, 8)
+        return price_commission
+    base_commission = 17
+    if category_lower in COMMISSION_RATES:
+        cat_data = COMMISSION_RATES[category_lower]
+        if subcategory and subcategory.lower() in cat_data:
+            sub_data = cat_data[subcategory.lower()]
+            base_commission = sub_data.get("base", 17) if isinstance(sub_data, dict) else sub_data
+        elif "default" in cat_data:
+            default_data = cat_data["default"]
+            base_commission = default_data.get("base", 17) if isinstance(default_data, dict) else default_data
+    elif isinstance(COMMISSION_RATES.get("default"), dict):
+        base_commission = COMMISSION_RATES["default"].get("base", 17)
+    return base_commission
+
+
+def legacy_logistics_fee(fees_table, weight_kg, fulfillment="fbs"):
+    fees = fees_table.get(fulfillment, fees_table["fbs"])
+    if weight_kg < 1:
+        return fees["small"]
+    elif weight_kg < 5:
+        return fees["medium"]
+    elif weight_kg < 15:
+        return fees["large"]
+    return fees["oversized"]
+
+
+def legacy_get_yandex_commission_rate(category, subcategory=None):
+    category_lower = category.lower()
+    if category_lower in YANDEX_COMMISSION_RATES:
+        cat_data = YANDEX_COMMISSION_RATES[category_lower]
+        if subcategory and subcategory.lower() in cat_data:
+            return cat_data[subcategory.lower()]["base"]
+        return cat_data.get("default", {"base": 12})["base"]
+    return YANDEX_COMMISSION_RATES["default"]["base"]
+
+
+def legacy_calculate_full_price(*args):
+    """calculate_full_price oldingi lookup funksiyalari bilan"""
+    compiled = (uzum_rules.get_commission_rate, uzum_rules.calculate_logistics_fee)
+    uzum_rules.get_commission_rate = legacy_get_commission_rate
+    uzum_rules.calculate_logistics_fee = lambda w, f="fbs": legacy_logistics_fee(LOGISTICS_FEES, w, f)
+    try:
+        return uzum_rules.calculate_full_price(*args)
+    finally:
+        uzum_rules.get_commission_rate, uzum_rules.calculate_logistics_fee = compiled
+
+
+def _inputs(count):
+    rng = random.Random(9)
+    categories = [c for c in COMMISSION_RATES if c != "default"] + ["Electronics", "unknown"]
+    subcategories = [None, "tv", "Refrigerators", "men", "default", "xyz", "accessories"]
+    return [
+        (
+            rng.choice(categories),
+            rng.choice(subcategories),
+            rng.choice([None, 0, rng.uniform(1, 2e7), 5e6, 1e7, 2e8]),
+            rng.choice([0.2, 1, 3, 5, 14.9, 15, 40]),
+            rng.choice(["fbs", "fbo", "fby", "dbs", "unknown"]),
+        )
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    inputs = _inputs(2000)
+
+    # Natijalar bir xil bo'lishi shart
+    for category, subcategory, price, weight, fulfillment in inputs:
+        assert uzum_rules.get_commission_rate(category, subcategory, price) == \
+            legacy_get_commission_rate(category, subcategory, price)
+        assert uzum_rules.calculate_logistics_fee(weight, fulfillment) == \
+            legacy_logistics_fee(LOGISTICS_FEES, weight, fulfillment)
+        assert yandex_rules.get_yandex_commission_rate(category, subcategory) == \
+            legacy_get_yandex_commission_rate(category, subcategory)
+        assert yandex_rules.get_yandex_logistics_fee(weight, fulfillment) == \
+            legacy_logistics_fee(YANDEX_LOGISTICS_FEES, weight, fulfillment)
+    print(f"✅ {len(inputs)} inputs: legacy and compiled lookups agree")
+
+    cases = [
+        ("get_commission_by_price",
+         lambda c, s, p, w, f: legacy_get_commission_by_price(p or 1),
+         lambda c, s, p, w, f: uzum_rules.get_commission_by_price(p or 1)),
+        ("get_commission_rate",
+         lambda c, s, p, w, f: legacy_get_commission_rate(c, s, p),
+         lambda c, s, p, w, f: uzum_rules.get_commission_rate(c, s, p)),
+        ("calculate_logistics_fee",
+         lambda c, s, p, w, f: legacy_logistics_fee(LOGISTICS_FEES, w, f),
+         lambda c, s, p, w, f: uzum_rules.calculate_logistics_fee(w, f)),
+        ("get_yandex_commission_rate",
+         lambda c, s, p, w, f: legacy_get_yandex_commission_rate(c, s),
+         lambda c, s, p, w, f: yandex_rules.get_yandex_commission_rate(c, s)),
+        ("calculate_full_price",
+         lambda c, s, p, w, f: legacy_calculate_full_price(p or 100000, c, s, w, f),
+         lambda c, s, p, w, f: uzum_rules.calculate_full_price(p or 100000, c, s, w, f)),
+    ]
+
+    loops = max(1, args.calls // len(inputs))
+    print(f"\n{'function':<28}{'before ns/call':>16}{'after ns/call':>16}{'speedup':>10}")
+    for name, before, after in cases:
+        def run(fn):
+            return timeit.timeit(lambda: [fn(*i) for i in inputs], number=loops) / (loops * len(inputs)) * 1e9
+        after_ns = run(after)
+        before_ns = run(before)
+        print(f"{name:<28}{before_ns:>16.0f}{after_ns:>16.0f}{before_ns / after_ns:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,548 @@
+"""
+Fake AI provider server - offline load testing
+==============================================
+ai_load_balancer.py ishlatadigan OpenAI / Anthropic / Gemini API
+qismini (va Emergent proxy'ning OpenAI-mos chat/completions'ini)
+taqlid qiluvchi lokal server. Real API kvotasi sarflanmaydi.
+
+Features:
+- Provider bo'yicha latency taqsimoti (fixed / uniform / lognormal)
+- 429 (Retry-After bilan) va 5xx xatolarini berilgan ulushda qaytarish
+- Provider RPM limiti (token bucket, haqiqiy 429)
+- "Osilib qolgan" so'rovlar (provider timeout / failover sinovi)
+- Streaming (SSE) javoblar, vision uchun tayyor mahsulot JSON'lari
+- /_stats, /_config, /_reset boshqaruv endpointlari
+
+Ishga tushirish:
+    python backend/benchmarks/fake_ai_server.py --port 8900 \
+        --latency lognormal:1.5:0.4 --error-429 0.02 --error-5xx 0.01
+
+Backend'ni yo'naltirish:
+    OPENAI_BASE_URL=http://127.0.0.1:8900/openai/v1
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8900/anthropic/v1
+    GEMINI_BASE_URL=http://127.0.0.1:8900/gemini/v1beta
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PROVIDERS = ("openai", "anthropic", "gemini", "emergent")
+
+# Vision so'rovlari uchun tayyor javoblar (navbat bilan qaytariladi)
+CANNED_PRODUCTS = [
+    {
+        "name": "Фен для волос Philips BHD300",
+        "category": "beauty",
+        "description": "Компактный фен мощностью 1600 Вт с тремя режимами",
+        "brand": "Philips",
+        "estimatedPrice": 320000,
+        "keywords": ["фен", "philips", "для волос"],
+        "confidence": 92
+    },
+    {
+        "name": "Смартфон Samsung Galaxy A15 128 ГБ",
+        "category": "electronics",
+        "description": "Смартфон с экраном 6.5 дюйма и камерой 50 Мп",
+        "brand": "Samsung",
+        "estimatedPrice": 2100000,
+        "keywords": ["смартфон", "samsung", "galaxy"],
+        "confidence": 88
+    },
+    {
+        "name": "Кроссовки Nike Revolution 6",
+        "category": "clothing",
+        "description": "Лёгкие беговые кроссовки с сетчатым верхом",
+        "brand": "Nike",
+        "estimatedPrice": 890000,
+        "keywords": ["кроссовки", "nike", "беговые"],
+        "confidence": 85
+    },
+]
+
+CANNED_CARD = {
+    "title": "Fen Philips BHD300 1600 Vt, 3 rejim",
+    "shortDescription": "Ixcham va kuchli fen kundalik foydalanish uchun",
+    "bulletPoints": ["1600 Vt quvvat", "3 harorat rejimi", "Ixcham korpus"],
+    "description": "Philips BHD300 - sochni tez va ehtiyotkorlik bilan quritadigan fen. " * 8,
+    "keywords": ["fen", "philips", "soch quritgich"],
+    "seoScore": 86,
+    "suggestedPrice": 320000,
+    "categoryPath": ["Go'zallik", "Fenlar"]
+}
+
+CANNED_YANDEX_CARD = {
+    "name": "Фен Philips BHD300 1600 Вт",
+    "name_uz": "Fen Philips BHD300 1600 Vt",
+    "bullet_points": ["Мощность 1600 Вт", "3 режима температуры", "Компактный корпус"],
+    "description": "Фен Philips BHD300 быстро и бережно сушит волосы. " * 10,
+    "description_uz": "Philips BHD300 sochni tez va ehtiyotkorlik bilan quritadi. " * 10,
+    "vendor": "Philips",
+    "vendorCode": "BHD300",
+    "category": "beauty",
+    "keywords": ["фен", "philips"],
+    "specifications": {"Мощность": "1600 Вт", "Страна производства": "Китай"},
+    "seo_score": 88
+}
+
+
+# ========================================
+# KONFIGURATSIYA
+# ========================================
+
+@dataclass
+class LatencyDistribution:
+    """
+    Latency taqsimoti (soniya)
+
+    - fixed:0.5
+    - uniform:0.2:1.5
+    - lognormal:MEDIAN:SIGMA (og'ir dum, real LLM'larga yaqin)
+    """
+    kind: str = "lognormal"
+    a: float = 1.0
+    b: float = 0.4
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        parts = spec.split(":")
+        kind = parts[0]
+        values = [float(v) for v in parts[1:]]
+        if kind == "fixed" and len(values) == 1:
+            return cls(kind, values[0], 0.0)
+        if kind in ("uniform", "lognormal") and len(values) == 2:
+            return cls(kind, values[0], values[1])
+        raise ValueError(f"Noto'g'ri latency: {spec} (fixed:S | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA)")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        return self.a * math.exp(rng.gauss(0.0, self.b))
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{self.a:g}" if self.kind == "fixed" else f"{self.kind}:{self.a:g}:{self.b:g}"
+
+
+@dataclass
+class ProviderProfile:
+    """Bitta provider xulqi"""
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    error_429: float = 0.0      # 429 ulushi
+    error_5xx: float = 0.0      # 503 ulushi
+    hang: float = 0.0           # javob bermaydigan so'rovlar ulushi
+    hang_seconds: float = 120.0
+    retry_after: float = 2.0    # 429 Retry-After (soniya)
+    rpm_limit: int = 0          # 0 - cheklanmagan
+    stream_chunks: int = 20
+
+    def update(self, values: Dict[str, Any]):
+        for key, value in values.items():
+            if key == "latency":
+                value = LatencyDistribution.parse(value) if isinstance(value, str) else value
+            elif not hasattr(self, key):
+                raise ValueError(f"Noma'lum parametr: {key}")
+            setattr(self, key, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["latency"] = str(self.latency)
+        return data
+
+
+@dataclass
+class ProviderState:
+    """Provider statistikasi + RPM bucket"""
+    requests: int = 0
+    ok: int = 0
+    rate_limited: int = 0
+    server_errors: int = 0
+    hung: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    tokens: int = 0
+    bucket_level: float = -1.0
+    bucket_updated: float = 0.0
+
+    def take_rpm_slot(self, rpm_limit: int, now: float) -> bool:
+        if rpm_limit <= 0:
+            return True
+        rate = rpm_limit / 60.0
+        if self.bucket_level < 0:
+            self.bucket_level = float(rpm_limit) / 12  # 5 soniyalik burst
+            self.bucket_updated = now
+        self.bucket_level = min(rpm_limit / 12, self.bucket_level + (now - self.bucket_updated) * rate)
+        self.bucket_updated = now
+        if self.bucket_level < 1:
+            return False
+        self.bucket_level -= 1
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            key: value for key, value in asdict(self).items()
+            if not key.startswith("bucket_")
+        }
+
+
+class FakeAIBackend:
+    """Provider profillari, statistika va javob generatsiyasi"""
+
+    def __init__(self, profiles: Optional[Dict[str, ProviderProfile]] = None, seed: Optional[int] = None):
+        self.profiles = {name: ProviderProfile() for name in PROVIDERS}
+        self.profiles.update(profiles or {})
+        self.state = {name: ProviderState() for name in PROVIDERS}
+        self.rng = random.Random(seed)
+        self._product_index = 0
+
+    def reset(self):
+        self.state = {name: ProviderState() for name in PROVIDERS}
+
+    def next_product(self) -> Dict[str, Any]:
+        product = CANNED_PRODUCTS[self._product_index % len(CANNED_PRODUCTS)]
+        self._product_index += 1
+        return product
+
+    def canned_text(self, prompt: str, vision: bool) -> str:
+        """So'rov turiga mos tayyor JSON matn"""
+        if vision:
+            payload = self.next_product()
+        elif "name_uz" in prompt:
+            payload = CANNED_YANDEX_CARD
+        else:
+            payload = CANNED_CARD
+        return json.dumps(payload, ensure_ascii=False)
+
+    async def admit(self, provider: str) -> Optional[JSONResponse]:
+        """
+        So'rovni qabul qilish: xato javobi (429 / 503) yoki None
+
+        "Osilgan" so'rov shu yerda hang_seconds kutadi (klient timeout'i).
+        """
+        profile = self.profiles[provider]
+        state = self.state[provider]
+        state.requests += 1
+
+        if not state.take_rpm_slot(profile.rpm_limit, time.monotonic()) or self.rng.random() < profile.error_429:
+            state.rate_limited += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": f"{profile.retry_after:g}"},
+                content={"error": {"type": "rate_limit_error", "message": "Rate limit exceeded (fake)"}}
+            )
+        if self.rng.random() < profile.error_5xx:
+            state.server_errors += 1
+            return JSONResponse(
+                status_code=503,
+                content={"error": {"type": "overloaded_error", "message": "Service unavailable (fake)"}}
+            )
+        if self.rng.random() < profile.hang:
+            state.hung += 1
+            await asyncio.sleep(profile.hang_seconds)
+        return None
+
+    async def run(self, provider: str, prompt: str, output: str):
+        """Latency kutish (in-flight hisobi bilan)"""
+        state = self.state[provider]
+        state.in_flight += 1
+        state.max_in_flight = max(state.max_in_flight, state.in_flight)
+        try:
+            await asyncio.sleep(self.profiles[provider].latency.sample(self.rng))
+        finally:
+            state.in_flight -= 1
+        state.ok += 1
+        state.tokens += estimate_tokens(prompt) + estimate_tokens(output)
+
+    async def stream(self, provider: str, prompt: str, output: str) -> AsyncIterator[str]:
+        """Matnni bo'laklarga bo'lib latency davomida uzatish (birinchi bo'lak ~30% da)"""
+        profile = self.profiles[provider]
+        state = self.state[provider]
+        state.in_flight += 1
+        state.max_in_flight = max(state.max_in_flight, state.in_flight)
+        try:
+            total = profile.latency.sample(self.rng)
+            count = max(1, profile.stream_chunks)
+            size = max(1, math.ceil(len(output) / count))
+            pieces = [output[i:i + size] for i in range(0, len(output), size)]
+            await asyncio.sleep(total * 0.3)
+            for piece in pieces:
+                yield piece
+                await asyncio.sleep(total * 0.7 / len(pieces))
+        finally:
+            state.in_flight -= 1
+        state.ok += 1
+        state.tokens += estimate_tokens(prompt) + estimate_tokens(output)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            name: {**self.state[name].to_dict(), "profile": self.profiles[name].to_dict()}
+            for name in PROVIDERS
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _openai_prompt(body: Dict[str, Any]) -> Tuple[str, bool]:
+    """OpenAI messages -> (matn, rasm bormi)"""
+    texts: List[str] = []
+    vision = False
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "text":
+                texts.append(part.get("text", ""))
+            elif part.get("type") == "image_url":
+                vision = True
+    return "\n".join(texts), vision
+
+
+def _anthropic_prompt(body: Dict[str, Any]) -> Tuple[str, bool]:
+    texts: List[str] = [body.get("system") or ""]
+    vision = False
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "text":
+                texts.append(part.get("text", ""))
+            elif part.get("type") == "image":
+                vision = True
+    return "\n".join(texts), vision
+
+
+def _gemini_prompt(body: Dict[str, Any]) -> Tuple[str, bool]:
+    texts: List[str] = []
+    vision = False
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            if "text" in part:
+                texts.append(part["text"])
+            if "inline_data" in part or "inlineData" in part:
+                vision = True
+    return "\n".join(texts), vision
+
+
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# ========================================
+# APP
+# ========================================
+
+def build_app(backend: Optional[FakeAIBackend] = None) -> FastAPI:
+    """Fake provider API ilovasi"""
+    backend = backend or FakeAIBackend()
+    app = FastAPI(title="Fake AI providers")
+    app.state.backend = backend
+
+    async def openai_compatible(provider: str, request: Request):
+        body = await request.json()
+        error = await backend.admit(provider)
+        if error is not None:
+            return error
+
+        prompt, vision = _openai_prompt(body)
+        output = backend.canned_text(prompt, vision)
+        model = body.get("model", "gpt-4o-mini")
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(output),
+            "total_tokens": estimate_tokens(prompt) + estimate_tokens(output)
+        }
+
+        if body.get("stream"):
+            async def events():
+                async for piece in backend.stream(provider, prompt, output):
+                    yield _sse({"object": "chat.completion.chunk", "model": model,
+                                "choices": [{"index": 0, "delta": {"content": piece}}]})
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    yield _sse({"object": "chat.completion.chunk", "model": model, "choices": [], "usage": usage})
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await backend.run(provider, prompt, output)
+        return {
+            "id": f"chatcmpl-fake-{backend.state[provider].requests}",
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": output}, "finish_reason": "stop"}],
+            "usage": usage
+        }
+
+    @app.post("/openai/v1/chat/completions")
+    async def openai_chat(request: Request):
+        return await openai_compatible("openai", request)
+
+    @app.post("/emergent/v1/chat/completions")
+    async def emergent_chat(request: Request):
+        return await openai_compatible("emergent", request)
+
+    @app.post("/anthropic/v1/messages")
+    async def anthropic_messages(request: Request):
+        body = await request.json()
+        error = await backend.admit("anthropic")
+        if error is not None:
+            return error
+
+        prompt, vision = _anthropic_prompt(body)
+        output = backend.canned_text(prompt, vision)
+        input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(output)
+
+        if body.get("stream"):
+            async def events():
+                yield _sse({"type": "message_start", "message": {"usage": {"input_tokens": input_tokens}}}, "message_start")
+                async for piece in backend.stream("anthropic", prompt, output):
+                    yield _sse({"type": "content_block_delta", "index": 0,
+                                "delta": {"type": "text_delta", "text": piece}}, "content_block_delta")
+                yield _sse({"type": "message_delta", "usage": {"output_tokens": output_tokens}}, "message_delta")
+                yield _sse({"type": "message_stop"}, "message_stop")
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await backend.run("anthropic", prompt, output)
+        return {
+            "id": f"msg_fake_{backend.state['anthropic'].requests}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model"),
+            "content": [{"type": "text", "text": output}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens}
+        }
+
+    @app.post("/gemini/v1beta/models/{model_action}")
+    async def gemini_generate(model_action: str, request: Request):
+        model, _, action = model_action.partition(":")
+        if action not in ("generateContent", "streamGenerateContent"):
+            raise HTTPException(status_code=404, detail=f"Unknown action: {action}")
+        if not request.query_params.get("key"):
+            return JSONResponse(status_code=400, content={"error": {"message": "API key not valid (fake)"}})
+
+        body = await request.json()
+        error = await backend.admit("gemini")
+        if error is not None:
+            return error
+
+        prompt, vision = _gemini_prompt(body)
+        output = backend.canned_text(prompt, vision)
+        usage = {"totalTokenCount": estimate_tokens(prompt) + estimate_tokens(output)}
+
+        if action == "streamGenerateContent":
+            async def events():
+                async for piece in backend.stream("gemini", prompt, output):
+                    yield _sse({"candidates": [{"content": {"parts": [{"text": piece}], "role": "model"}}]})
+                yield _sse({"candidates": [], "usageMetadata": usage})
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await backend.run("gemini", prompt, output)
+        return {
+            "candidates": [{"content": {"parts": [{"text": output}], "role": "model"}, "finishReason": "STOP"}],
+            "usageMetadata": usage
+        }
+
+    @app.get("/_stats")
+    async def stats():
+        return backend.get_stats()
+
+    @app.post("/_config")
+    async def configure(request: Request):
+        """{"openai": {"error_429": 0.1, "latency": "fixed:0.2"}, ...}"""
+        body = await request.json()
+        try:
+            for provider, values in body.items():
+                if provider not in backend.profiles:
+                    raise ValueError(f"Noma'lum provider: {provider}")
+                backend.profiles[provider].update(values)
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return backend.get_stats()
+
+    @app.post("/_reset")
+    async def reset():
+        backend.reset()
+        return {"success": True}
+
+    return app
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """fake_ai_server va load_test_ai uchun umumiy parametrlar"""
+    parser.add_argument("--latency", default="lognormal:1.5:0.4",
+                        help="fixed:S | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA (barcha providerlar)")
+    parser.add_argument("--error-429", type=float, default=0.0, help="429 ulushi (0..1)")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="503 ulushi (0..1)")
+    parser.add_argument("--hang", type=float, default=0.0, help="Javob bermaydigan so'rovlar ulushi")
+    parser.add_argument("--retry-after", type=float, default=2.0, help="429 Retry-After (soniya)")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="Provider RPM limiti (0 - cheklanmagan)")
+    parser.add_argument("--profile", action="append", default=[], metavar="PROVIDER:KEY=VALUE,...",
+                        help="Provider uchun alohida qiymatlar, masalan openai:error_5xx=0.2,latency=fixed:3")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def profiles_from_args(args) -> Dict[str, ProviderProfile]:
+    profiles = {}
+    for name in PROVIDERS:
+        profiles[name] = ProviderProfile(
+            latency=LatencyDistribution.parse(args.latency),
+            error_429=args.error_429,
+            error_5xx=args.error_5xx,
+            hang=args.hang,
+            retry_after=args.retry_after,
+            rpm_limit=args.rpm_limit
+        )
+    for spec in args.profile:
+        provider, _, assignments = spec.partition(":")
+        if provider not in profiles:
+            raise SystemExit(f"Noma'lum provider: {provider}")
+        values: Dict[str, Any] = {}
+        for assignment in assignments.split(","):
+            key, _, value = assignment.partition("=")
+            if key == "latency":
+                values[key] = value
+            elif key in ("rpm_limit", "stream_chunks"):
+                values[key] = int(value)
+            else:
+                values[key] = float(value)
+        profiles[provider].update(values)
+    return profiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake AI provider server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    backend = FakeAIBackend(profiles_from_args(args), seed=args.seed)
+    base = f"http://{args.host}:{args.port}"
+    print("🧪 Fake AI providers:")
+    for name, profile in backend.profiles.items():
+        print(f"   {name}: {profile.to_dict()}")
+    print(f"   OPENAI_BASE_URL={base}/openai/v1")
+    print(f"   ANTHROPIC_BASE_URL={base}/anthropic/v1")
+    print(f"   GEMINI_BASE_URL={base}/gemini/v1beta")
+    uvicorn.run(build_app(backend), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Shared HTTP client pool benchmark
+=================================
+Har bir chaqiruvda yangi httpx.AsyncClient (eski usul) va http_clients
+registry'dagi umumiy pool'li klient bir xil lokal HTTPS serverga
+yuborilib, chaqiruv boshiga latency va ochilgan ulanishlar solishtiriladi.
+
+Lokal server TLS sertifikati o'z-o'zidan imzolanadi (cryptography) va
+certifi to'plamiga qo'shiladi: yangi klient production'dagidek butun
+CA to'plamini yuklaydi + TCP va TLS handshake qiladi.
+
+Ishga tushirish:
+    python backend/benchmarks/http_pool_benchmark.py --requests 300 --concurrency 20
+    python backend/benchmarks/http_pool_benchmark.py --no-tls --latency-ms 20 --json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import datetime
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def generate_certificate(directory: str) -> Tuple[str, str, str]:
+    """Self-signed sertifikat (127.0.0.1 / localhost) -> (cert, key, CA to'plami)"""
+    import ipaddress
+    import certifi
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .add_extension(
+            x509.SubjectAlternativeName([x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+            critical=False
+        )
+        .sign(key, hashes.SHA256())
+    )
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM)
+
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    bundle_path = os.path.join(directory, "ca-bundle.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert_pem)
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    with open(certifi.where(), "rb") as src, open(bundle_path, "wb") as f:
+        f.write(src.read() + b"\n" + cert_pem)
+    return cert_path, key_path, bundle_path
+
+
+def start_server(latency: float, tls: Optional[Tuple[str, str]]) -> Tuple[str, set]:
+    """Yandex/Uzum API'ga o'xshash lokal server; ochilgan ulanishlar (client port) yig'iladi"""
+    import uvicorn
+    from fastapi import FastAPI, Request
+
+    app = FastAPI()
+    connections: set = set()
+
+    @app.get("/v2/campaigns")
+    async def campaigns(request: Request):
+        connections.add(request.client.port)
+        if latency:
+            await asyncio.sleep(latency)
+        return {"campaigns": [{"id": 1, "domain": "shop.example", "business": {"id": 42}}]}
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    config = uvicorn.Config(
+        app, host="127.0.0.1", port=port, log_level="warning", backlog=2048,
+        ssl_certfile=tls[0] if tls else None, ssl_keyfile=tls[1] if tls else None
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise SystemExit("❌ Benchmark server ishga tushmadi")
+        time.sleep(0.05)
+    scheme = "https" if tls else "http"
+    return f"{scheme}://127.0.0.1:{port}", connections
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def call_fresh(base_url: str):
+    """Eski usul: har chaqiruvda yangi klient"""
+    import httpx
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        response = await client.get(f"{base_url}/v2/campaigns")
+        response.raise_for_status()
+
+
+async def call_pooled(base_url: str):
+    """Yangi usul: http_clients registry"""
+    from http_clients import http_client
+    async with http_client(base_url) as client:
+        response = await client.get(f"{base_url}/v2/campaigns")
+        response.raise_for_status()
+
+
+async def run_phase(call, base_url: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call(base_url)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+            **{name: round(percentile(ordered, q) * 1000, 2) for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+        }
+    }
+
+
+async def run_benchmark(args, base_url: str, connections: set) -> Dict[str, Any]:
+    from http_clients import http_clients
+
+    report: Dict[str, Any] = {}
+    for mode, call in (("fresh_client", call_fresh), ("pooled_client", call_pooled)):
+        report[mode] = {}
+        for phase, concurrency in (("sequential", 1), ("concurrent", args.concurrency)):
+            # Isitish (import, JIT keshlari) - natijaga kirmaydi
+            await run_phase(call, base_url, 5, 1)
+            connections.clear()
+            result = await run_phase(call, base_url, args.requests, concurrency)
+            result["connections_opened"] = len(connections)
+            report[mode][phase] = result
+    await http_clients.aclose()
+
+    for phase in ("sequential", "concurrent"):
+        fresh = report["fresh_client"][phase]["latency_ms"]["mean"]
+        pooled = report["pooled_client"][phase]["latency_ms"]["mean"]
+        report.setdefault("per_call_saving_ms", {})[phase] = round(fresh - pooled, 2)
+    return report
+
+
+def print_report(report: Dict[str, Any], args):
+    print("\n" + "=" * 72)
+    print(f"{'rejim':<15}{'faza':<12}{'mean':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'rps':>9}{'ulanish':>9}")
+    for mode in ("fresh_client", "pooled_client"):
+        for phase, result in report[mode].items():
+            latency = result["latency_ms"]
+            print(f"{mode:<15}{phase:<12}{latency['mean']:>8}{latency['p50']:>8}{latency['p95']:>8}"
+                  f"{latency['p99']:>8}{result['throughput_rps']:>9}{result['connections_opened']:>9}")
+    saving = report["per_call_saving_ms"]
+    print(f"\nChaqiruv boshiga tejov (mean): ketma-ket {saving['sequential']} ms, "
+          f"parallel ({args.concurrency}) {saving['concurrent']} ms")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yangi klient vs umumiy pool'li klient (http_clients)")
+    parser.add_argument("--requests", type=int, default=200, help="Har bir faza uchun so'rovlar")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Server javob kechikishi")
+    parser.add_argument("--no-tls", action="store_true", help="Oddiy HTTP (TLS handshake'siz)")
+    parser.add_argument("--json", action="store_true", help="Natijani JSON ko'rinishida chiqarish")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        tls = None
+        if not args.no_tls:
+            cert_path, key_path, bundle_path = generate_certificate(directory)
+            # httpx (trust_env) shu to'plam bilan sertifikatni tekshiradi
+            os.environ["SSL_CERT_FILE"] = bundle_path
+            tls = (cert_path, key_path)
+
+        base_url, connections = start_server(args.latency_ms / 1000, tls)
+        print(f"🚀 {base_url}: {args.requests} so'rov x 2 faza, parallel={args.concurrency}")
+        report = asyncio.run(run_benchmark(args, base_url, connections))
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report, args)
+
+
+if __name__ == "__main__":
+    main()
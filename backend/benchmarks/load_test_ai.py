@@ -0,0 +1,223 @@
+"""
+AI load balancer load test
+==========================
+Minglab parallel scan / matn so'rovlarini AILoadBalancer orqali
+fake_ai_server.py ga yuborib, throughput va tail latency o'lchanadi.
+max_concurrent, RPM limitlari, failover va hedging sozlamalarini
+real API kvotasini sarflamasdan tanlash uchun.
+
+Ishga tushirish (fake server shu jarayonda ko'tariladi):
+    python backend/benchmarks/load_test_ai.py --requests 5000 --clients 2000 \
+        --max-concurrent 50 --latency lognormal:1.5:0.4 --error-429 0.02
+
+Alohida jarayondagi fake server bilan (aniqroq o'lchov):
+    python backend/benchmarks/fake_ai_server.py --port 8900 ...
+    python backend/benchmarks/load_test_ai.py --url http://127.0.0.1:8900 ...
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fake_ai_server import FakeAIBackend, build_app, add_profile_arguments, profiles_from_args
+
+# 1x1 JPEG (scan kesh o'chirilgan, rasm mazmuni ahamiyatsiz)
+TEST_IMAGE_BASE64 = (
+    "/9j/4AAQSkZJRgABAQEASABIAAD/2wBDAP//////////////////////////////////////////////////////////////"
+    "////////////////////////wgALCAABAAEBAREA/8QAFBABAAAAAAAAAAAAAAAAAAAAAP/aAAgBAQABPxA="
+)
+
+
+def start_fake_server(args) -> str:
+    """Fake serverni fon thread'ida ko'tarish, base URL qaytaradi"""
+    import uvicorn
+
+    backend = FakeAIBackend(profiles_from_args(args), seed=args.seed)
+    config = uvicorn.Config(
+        build_app(backend), host="127.0.0.1", port=args.port,
+        log_level="warning", backlog=4096, limit_concurrency=None
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise SystemExit("❌ Fake server ishga tushmadi")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{args.port}"
+
+
+def configure_environment(base_url: str, providers: List[str], args):
+    """ai_load_balancer import qilinishidan OLDIN: kalitlar, manzillar, limitlar"""
+    keys = {
+        "openai": "OPENAI_API_KEY",
+        "anthropic": "ANTHROPIC_API_KEY",
+        "gemini": "GOOGLE_API_KEY",
+        "emergent": "EMERGENT_LLM_KEY",
+    }
+    for provider, env_name in keys.items():
+        os.environ[env_name] = "fake-key" if provider in providers else ""
+    os.environ["OPENAI_BASE_URL"] = f"{base_url}/openai/v1"
+    os.environ["ANTHROPIC_BASE_URL"] = f"{base_url}/anthropic/v1"
+    os.environ["GEMINI_BASE_URL"] = f"{base_url}/gemini/v1beta"
+    os.environ["AI_SCAN_CACHE_ENABLED"] = "false"
+    os.environ["AI_MAX_CONCURRENT"] = str(args.max_concurrent)
+    if args.provider_timeout:
+        os.environ["AI_PROVIDER_TIMEOUT"] = str(args.provider_timeout)
+    for provider in providers:
+        if args.provider_rpm:
+            os.environ[f"{provider.upper()}_RPM_LIMIT"] = str(args.provider_rpm)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def run_load(args) -> Dict[str, Any]:
+    import ai_load_balancer
+    from ai_load_balancer import load_balancer, balanced_scan_product, balanced_generate_text
+
+    async def one_request(i: int) -> Dict[str, Any]:
+        started = time.monotonic()
+        if args.type == "vision":
+            result = await balanced_scan_product(
+                TEST_IMAGE_BASE64, priority=args.priority, partner_id=f"partner-{i % args.partners}", hedge=args.hedge
+            )
+        else:
+            result = await balanced_generate_text(
+                f"Mahsulot #{i} uchun kartochka", priority=args.priority, partner_id=f"partner-{i % args.partners}"
+            )
+        return {
+            "latency": time.monotonic() - started,
+            "success": result.get("success", False),
+            "provider": result.get("provider"),
+            "code": result.get("code") or ("OK" if result.get("success") else "PROVIDER_ERROR")
+        }
+
+    semaphore = asyncio.Semaphore(args.clients)
+    results: List[Dict[str, Any]] = []
+
+    async def client(i: int):
+        async with semaphore:
+            try:
+                results.append(await one_request(i))
+            except Exception as e:
+                results.append({"latency": 0.0, "success": False, "provider": None, "code": type(e).__name__})
+
+    print(f"🚀 {args.requests} ta {args.type} so'rov, {args.clients} parallel klient, "
+          f"max_concurrent={load_balancer.max_concurrent}, hedge={args.hedge}")
+    started = time.monotonic()
+    await asyncio.gather(*(client(i) for i in range(args.requests)))
+    elapsed = time.monotonic() - started
+
+    ok = sorted(r["latency"] for r in results if r["success"])
+    stats = load_balancer.get_stats()
+    return {
+        "requests": len(results),
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(len(results) / elapsed, 1) if elapsed else 0.0,
+        "success": len(ok),
+        "outcomes": dict(Counter(r["code"] for r in results)),
+        "providers": dict(Counter(r["provider"] for r in results if r["success"])),
+        "latency_ms": {
+            name: round(percentile(ok, q) * 1000)
+            for name, q in (("p50", 0.5), ("p90", 0.9), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+        },
+        "queue": stats["queue"],
+        "hedging": stats["hedging"],
+        "balancer_providers": {
+            name: {
+                "rate_limited": p["rate_limited"],
+                "circuit": p["health"]["circuit"],
+                "circuit_opened": p["health"]["circuit_opened"],
+                "failures": p["health"]["failures"],
+                "timeouts": p["health"]["timeouts"],
+            }
+            for name, p in stats["providers"].items() if p["enabled"]
+        },
+        "timeout_seconds": ai_load_balancer.AI_PROVIDER_TIMEOUT,
+    }
+
+
+def fetch_server_stats(base_url: str) -> Optional[Dict[str, Any]]:
+    import httpx
+    try:
+        return httpx.get(f"{base_url}/_stats", timeout=5).json()
+    except Exception:
+        return None
+
+
+def print_report(report: Dict[str, Any], server_stats: Optional[Dict[str, Any]]):
+    latency = report["latency_ms"]
+    print("\n" + "=" * 60)
+    print(f"So'rovlar: {report['requests']}  muvaffaqiyatli: {report['success']}  "
+          f"vaqt: {report['elapsed_seconds']}s")
+    print(f"Throughput: {report['throughput_rps']} req/s")
+    print(f"Latency (ms): p50={latency['p50']} p90={latency['p90']} p95={latency['p95']} "
+          f"p99={latency['p99']} max={latency['max']}")
+    print(f"Natijalar: {report['outcomes']}")
+    print(f"Providerlar: {report['providers']}")
+    queue = report["queue"]
+    print(f"Navbat: avg_wait={queue['avg_wait_ms']}ms p95_wait={queue['p95_wait_ms']}ms "
+          f"max_wait={queue['max_wait_ms']}ms rejected={queue['rejected']} expired={queue['expired']}")
+    hedging = report["hedging"]
+    print(f"Hedging: sent={hedging['sent']} won={hedging['won']} rate={hedging['hedge_rate']}")
+    for name, p in report["balancer_providers"].items():
+        print(f"  {name}: {p}")
+    if server_stats:
+        print("Fake server:")
+        for name, s in server_stats.items():
+            if s["requests"]:
+                print(f"  {name}: requests={s['requests']} ok={s['ok']} 429={s['rate_limited']} "
+                      f"5xx={s['server_errors']} hung={s['hung']} max_in_flight={s['max_in_flight']}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AILoadBalancer load test (fake providers)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=1000, help="Bir vaqtdagi klientlar")
+    parser.add_argument("--type", choices=("vision", "text"), default="vision")
+    parser.add_argument("--priority", choices=("interactive", "default", "background"), default="interactive")
+    parser.add_argument("--partners", type=int, default=50, help="Navbat adolati uchun partnerlar soni")
+    parser.add_argument("--hedge", action="store_true", help="vision so'rovlarda hedging")
+    parser.add_argument("--providers", default="openai,anthropic", help="Yoqilgan providerlar (vergul bilan)")
+    parser.add_argument("--max-concurrent", type=int, default=50)
+    parser.add_argument("--provider-rpm", type=int, default=0, help="Balancer RPM limiti (0 - env/default)")
+    parser.add_argument("--provider-timeout", type=float, default=0, help="AI_PROVIDER_TIMEOUT (0 - env/default)")
+    parser.add_argument("--url", default=None, help="Tashqi fake server (bo'lmasa shu jarayonda ko'tariladi)")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--json", action="store_true", help="Natijani JSON ko'rinishida chiqarish")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    providers = [p.strip() for p in args.providers.split(",") if p.strip()]
+    if "emergent" in providers:
+        # Emergent emergentintegrations kutubxonasi orqali chaqiriladi (base URL sozlanmaydi)
+        raise SystemExit("❌ emergent provider load testda qo'llab-quvvatlanmaydi")
+
+    base_url = args.url.rstrip("/") if args.url else start_fake_server(args)
+    configure_environment(base_url, providers, args)
+
+    report = asyncio.run(run_load(args))
+    server_stats = fetch_server_stats(base_url)
+    if args.json:
+        print(json.dumps({**report, "server": server_stats}, indent=2, ensure_ascii=False))
+    else:
+        print_report(report, server_stats)
+
+
+if __name__ == "__main__":
+    main()
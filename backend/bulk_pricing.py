@@ -0,0 +1,408 @@
+"""
+BULK PRICING ENGINE - NumPy vectorized catalog repricing
+=========================================================
+calculate_full_price (Uzum) va calculate_yandex_price (Yandex) ning
+vektorlashtirilgan varianti: 10k SKU bitta chaqiruvda hisoblanadi.
+
+Features:
+- Kolonkali kirish: cost, category id, weight, fulfillment (numpy array)
+- Kategoriya / fulfillment jadvallari import vaqtida skalyar
+  funksiyalarning o'zidan quriladi (natija bir xil bo'lishi uchun)
+- min / optimal / max narx + to'liq xarajatlar tafsiloti
+- to_records(): skalyar funksiyalar bilan bir xil dict strukturasi
+"""
+
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from uzum_rules import (
+    COMMISSION_RATES,
+    LARGE_APPLIANCE_CATEGORIES,
+    LARGE_APPLIANCE_MIN_COMMISSION,
+    LARGE_APPLIANCE_SUBCATEGORIES,
+    LOGISTICS_FEES,
+    LOGISTICS_WEIGHT_BREAKPOINTS,
+    PRICE_BREAKPOINTS as UZUM_PRICE_BREAKPOINTS,
+    PRICE_COMMISSIONS as UZUM_PRICE_COMMISSIONS,
+    TAX_RATES,
+    calculate_logistics_fee,
+    get_commission_rate,
+)
+from yandex_rules import (
+    YANDEX_COMMISSION_RATES,
+    YANDEX_PAYOUT_COMMISSION,
+    YANDEX_LOGISTICS_FEES,
+    get_yandex_commission_rate,
+    get_yandex_logistics_fee,
+)
+
+ArrayLike = Union[Sequence[float], np.ndarray]
+
+MARKETPLACES = ("uzum", "yandex")
+
+
+def _category_keys() -> List[Tuple[str, Optional[str]]]:
+    """Barcha ma'lum (category, subcategory) juftliklari; 0 - noma'lum kategoriya"""
+    keys: List[Tuple[str, Optional[str]]] = [("", None)]
+    for rates in (COMMISSION_RATES, YANDEX_COMMISSION_RATES):
+        for category, subs in rates.items():
+            keys.append((category, None))
+            if isinstance(subs, dict):
+                keys.extend((category, sub) for sub in subs if isinstance(subs[sub], dict))
+    for category in LARGE_APPLIANCE_CATEGORIES:
+        keys.append((category, None))
+        keys.extend((category, sub) for sub in LARGE_APPLIANCE_SUBCATEGORIES)
+    return list(dict.fromkeys(keys))
+
+
+CATEGORY_KEYS = _category_keys()
+CATEGORY_IDS = {key: i for i, key in enumerate(CATEGORY_KEYS)}
+
+# Narx berilmaganda (price <= 0) Uzum bazaviy komissiyasi
+UZUM_BASE_COMMISSION = np.array(
+    [get_commission_rate(c or "", s) for c, s in CATEGORY_KEYS], dtype=np.float64
+)
+# Katta texnika: narxga asoslangan komissiya kamida 8%
+UZUM_LARGE_APPLIANCE = np.array(
+    [get_commission_rate(c or "", s, 1e12) == LARGE_APPLIANCE_MIN_COMMISSION for c, s in CATEGORY_KEYS], dtype=bool
+)
+YANDEX_COMMISSION = np.array(
+    [get_yandex_commission_rate(c or "", s) for c, s in CATEGORY_KEYS], dtype=np.float64
+)
+
+# Narx diapazonlari -> komissiya (uzum_rules jadvallari, searchsorted uchun)
+PRICE_BREAKPOINTS = np.array(UZUM_PRICE_BREAKPOINTS[1:], dtype=np.float64)
+PRICE_COMMISSIONS = np.array(UZUM_PRICE_COMMISSIONS, dtype=np.float64)
+
+# ========================================
+# FULFILLMENT / LOGISTIKA JADVALI
+# ========================================
+
+FULFILLMENT_TYPES = list(dict.fromkeys(list(LOGISTICS_FEES) + list(YANDEX_LOGISTICS_FEES)))
+FULFILLMENT_IDS = {f: i for i, f in enumerate(FULFILLMENT_TYPES)}
+
+# Og'irlik chegaralari: <1kg small, <5kg medium, <15kg large, qolgani oversized
+WEIGHT_BREAKPOINTS = np.array(LOGISTICS_WEIGHT_BREAKPOINTS, dtype=np.float64)
+_WEIGHT_SAMPLES = [0.5, 1, 5, 15]
+
+UZUM_LOGISTICS = np.array(
+    [[calculate_logistics_fee(w, f) for w in _WEIGHT_SAMPLES] for f in FULFILLMENT_TYPES], dtype=np.float64
+)
+YANDEX_LOGISTICS = np.array(
+    [[get_yandex_logistics_fee(w, f) for w in _WEIGHT_SAMPLES] for f in FULFILLMENT_TYPES], dtype=np.float64
+)
+
+
+def encode_categories(
+    categories: Sequence[str],
+    subcategories: Optional[Sequence[Optional[str]]] = None
+) -> np.ndarray:
+    """
+    (category, subcategory) -> category id
+
+    Noma'lum subkategoriya kategoriyaning default'iga,
+    noma'lum kategoriya umumiy default'ga tushadi (skalyar funksiyalar kabi).
+    """
+    if subcategories is None:
+        subcategories = [None] * len(categories)
+    ids = np.empty(len(categories), dtype=np.int32)
+    cache: Dict[Tuple[str, Optional[str]], int] = {}
+    for i, (category, subcategory) in enumerate(zip(categories, subcategories)):
+        raw = (category or "", subcategory or None)
+        cat_id = cache.get(raw)
+        if cat_id is None:
+            cat = raw[0].lower()
+            sub = raw[1].lower() if raw[1] else None
+            cat_id = CATEGORY_IDS.get((cat, sub))
+            if cat_id is None:
+                cat_id = CATEGORY_IDS.get((cat, None), 0)
+            cache[raw] = cat_id
+        ids[i] = cat_id
+    return ids
+
+
+def encode_fulfillment(fulfillments: Sequence[str]) -> np.ndarray:
+    """Fulfillment turi -> id (noma'lum -> fbs)"""
+    fbs = FULFILLMENT_IDS["fbs"]
+    return np.array([FULFILLMENT_IDS.get(f, fbs) for f in fulfillments], dtype=np.int32)
+
+
+def _weight_class(weight_kg: np.ndarray) -> np.ndarray:
+    return np.searchsorted(WEIGHT_BREAKPOINTS, weight_kg, side="right")
+
+
+def uzum_commission_rates(price: np.ndarray, category_id: np.ndarray) -> np.ndarray:
+    """get_commission_rate(category, subcategory, price) - vektorlashtirilgan (foizda)"""
+    by_price = PRICE_COMMISSIONS[np.searchsorted(PRICE_BREAKPOINTS, price, side="right").clip(max=len(PRICE_COMMISSIONS) - 1)]
+    by_price = np.where(np.isinf(price), 17.0, by_price)
+    by_price = np.where(UZUM_LARGE_APPLIANCE[category_id], np.maximum(by_price, LARGE_APPLIANCE_MIN_COMMISSION), by_price)
+    return np.where(price > 0, by_price, UZUM_BASE_COMMISSION[category_id])
+
+
+def _as_array(value: Union[float, ArrayLike], n: int) -> np.ndarray:
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (n,))
+
+
+def calculate_uzum_prices(
+    cost_price: ArrayLike,
+    category_id: ArrayLike,
+    weight_kg: Union[float, ArrayLike] = 1.0,
+    fulfillment_id: Union[int, ArrayLike] = 0,
+    target_margin: Union[float, ArrayLike] = 25,
+    business_type: str = "ip",
+    selling_price: Optional[ArrayLike] = None
+) -> Dict[str, np.ndarray]:
+    """calculate_full_price - butun katalog uchun (kolonkalar)"""
+    cost = np.asarray(cost_price, dtype=np.float64)
+    n = len(cost)
+    cat = np.asarray(category_id, dtype=np.int32)
+    weight = _as_array(weight_kg, n)
+    ff = np.broadcast_to(np.asarray(fulfillment_id, dtype=np.int32), (n,))
+    margin = _as_array(target_margin, n)
+
+    if selling_price is None:
+        estimated = cost * 1.5
+    else:
+        sp = _as_array(selling_price, n)
+        estimated = np.where(np.nan_to_num(sp) != 0, sp, cost * 1.5)
+
+    commission_rate = uzum_commission_rates(estimated, cat) / 100
+    logistics = UZUM_LOGISTICS[ff, _weight_class(weight)]
+
+    tax_rate = (TAX_RATES["income_tax_ip"] if business_type == "ip" else TAX_RATES["income_tax_llc"]) / 100
+    vat_rate = TAX_RATES["vat"] / 100
+
+    total_rate = commission_rate + tax_rate
+    total_rate = np.where(total_rate >= 1, 0.5, total_rate)
+
+    min_price = (cost + logistics) / (1 - total_rate)
+    optimal_price = min_price * (1 + margin / 100)
+
+    final_rate = uzum_commission_rates(optimal_price, cat) / 100
+    commission_amount = optimal_price * final_rate
+    tax_amount = optimal_price * tax_rate
+    vat_amount = optimal_price * vat_rate / (1 + vat_rate)
+    net_profit = optimal_price - cost - commission_amount - logistics - tax_amount
+    with np.errstate(divide="ignore", invalid="ignore"):
+        actual_margin = np.where(optimal_price > 0, net_profit / optimal_price * 100, 0.0)
+
+    return {
+        "cost_price": cost,
+        "min_price": min_price,
+        "optimal_price": optimal_price,
+        "max_price": optimal_price * 1.3,
+        "commission_rate": final_rate * 100,
+        "commission_amount": commission_amount,
+        "logistics": logistics,
+        "tax_rate": np.full(n, tax_rate * 100),
+        "tax_amount": tax_amount,
+        "vat_included": vat_amount,
+        "total_expenses": cost + commission_amount + logistics + tax_amount,
+        "net_profit": net_profit,
+        "actual_margin": actual_margin,
+    }
+
+
+def calculate_yandex_prices(
+    cost_price: ArrayLike,
+    category_id: ArrayLike,
+    weight_kg: Union[float, ArrayLike] = 1.0,
+    fulfillment_id: Union[int, ArrayLike] = 0,
+    target_margin: Union[float, ArrayLike] = 25,
+    payout_frequency: str = "weekly"
+) -> Dict[str, np.ndarray]:
+    """calculate_yandex_price - butun katalog uchun (kolonkalar)"""
+    cost = np.asarray(cost_price, dtype=np.float64)
+    n = len(cost)
+    cat = np.asarray(category_id, dtype=np.int32)
+    weight = _as_array(weight_kg, n)
+    ff = np.broadcast_to(np.asarray(fulfillment_id, dtype=np.int32), (n,))
+    margin = _as_array(target_margin, n)
+
+    commission_rate = YANDEX_COMMISSION[cat] / 100
+    payout_rate = YANDEX_PAYOUT_COMMISSION.get(payout_frequency, 2.8) / 100
+    logistics = YANDEX_LOGISTICS[ff, _weight_class(weight)]
+
+    total_rate = commission_rate + payout_rate
+    total_rate = np.where(total_rate >= 1, 0.5, total_rate)
+
+    min_price = (cost + logistics) / (1 - total_rate)
+    optimal_price = min_price * (1 + margin / 100)
+
+    commission_amount = optimal_price * commission_rate
+    payout_amount = optimal_price * payout_rate
+    net_profit = optimal_price - cost - commission_amount - payout_amount - logistics
+    with np.errstate(divide="ignore", invalid="ignore"):
+        actual_margin = np.where(optimal_price > 0, net_profit / optimal_price * 100, 0.0)
+
+    return {
+        "cost_price": cost,
+        "min_price": min_price,
+        "optimal_price": optimal_price,
+        "max_price": optimal_price * 1.3,
+        "commission_rate": commission_rate * 100,
+        "commission_amount": commission_amount,
+        "payout_rate": np.full(n, payout_rate * 100),
+        "payout_amount": payout_amount,
+        "logistics": logistics,
+        "total_expenses": cost + commission_amount + payout_amount + logistics,
+        "net_profit": net_profit,
+        "actual_margin": actual_margin,
+    }
+
+
+# Kolonka -> kasr xonalari (skalyar funksiyalardagi round() bilan bir xil)
+_ROUND_DIGITS = {"commission_rate": 1, "tax_rate": 1, "payout_rate": 1, "actual_margin": 1}
+
+
+def round_columns(columns: Dict[str, np.ndarray]) -> Dict[str, List[Any]]:
+    """JSON uchun: skalyar funksiyalardagi kabi yaxlitlangan ro'yxatlar"""
+    rounded = {}
+    for name, values in columns.items():
+        digits = _ROUND_DIGITS.get(name, 0)
+        if digits:
+            rounded[name] = np.round(values, digits).tolist()
+        else:
+            rounded[name] = np.rint(values).astype(np.int64).tolist()
+    rounded["is_profitable"] = (columns["net_profit"] > 0).tolist()
+    return rounded
+
+
+def to_records(
+    marketplace: str,
+    columns: Dict[str, np.ndarray],
+    fulfillments: Sequence[str],
+    business_type: str = "ip",
+    payout_frequency: str = "weekly"
+) -> List[Dict[str, Any]]:
+    """Kolonkalar -> calculate_full_price / calculate_yandex_price natijasi shaklida"""
+    c = round_columns(columns)
+    records = []
+    for i in range(len(c["cost_price"])):
+        breakdown: Dict[str, Any] = {
+            "cost_price": c["cost_price"][i],
+            "commission": {"rate": c["commission_rate"][i], "amount": c["commission_amount"][i]},
+        }
+        if marketplace == "uzum":
+            breakdown["commission"]["note"] = "Narxga asoslangan komissiya"
+            breakdown["logistics"] = {"type": fulfillments[i].upper(), "amount": c["logistics"][i]}
+            breakdown["tax"] = {"type": business_type.upper(), "rate": c["tax_rate"][i], "amount": c["tax_amount"][i]}
+            breakdown["vat_included"] = c["vat_included"][i]
+        else:
+            breakdown["payout_fee"] = {
+                "rate": c["payout_rate"][i],
+                "amount": c["payout_amount"][i],
+                "frequency": payout_frequency
+            }
+            breakdown["logistics"] = {"type": fulfillments[i].upper(), "amount": c["logistics"][i]}
+        breakdown["total_expenses"] = c["total_expenses"][i]
+        breakdown["net_profit"] = c["net_profit"][i]
+        breakdown["actual_margin"] = c["actual_margin"][i]
+
+        records.append({
+            "cost_price": c["cost_price"][i],
+            "min_price": c["min_price"][i],
+            "optimal_price": c["optimal_price"][i],
+            "max_price": c["max_price"][i],
+            "breakdown": breakdown,
+            "recommendation": {
+                "price": c["optimal_price"][i],
+                "margin": c["actual_margin"][i],
+                "is_profitable": c["is_profitable"][i]
+            }
+        })
+    return records
+
+
+def calculate_bulk_prices(
+    marketplace: str,
+    cost_price: ArrayLike,
+    categories: Sequence[str],
+    subcategories: Optional[Sequence[Optional[str]]] = None,
+    weight_kg: Union[float, ArrayLike] = 1.0,
+    fulfillment: Union[str, Sequence[str]] = "fbs",
+    target_margin: Union[float, ArrayLike] = 25,
+    business_type: str = "ip",
+    payout_frequency: str = "weekly",
+    selling_price: Optional[ArrayLike] = None
+) -> Dict[str, np.ndarray]:
+    """Kategoriya/fulfillment nomlaridan to'g'ridan-to'g'ri hisoblash"""
+    if marketplace not in MARKETPLACES:
+        raise ValueError(f"Noma'lum marketplace: {marketplace}")
+
+    n = len(cost_price)
+    fulfillments = [fulfillment] * n if isinstance(fulfillment, str) else list(fulfillment)
+    category_id = encode_categories(categories, subcategories)
+    fulfillment_id = encode_fulfillment(fulfillments)
+
+    if marketplace == "uzum":
+        return calculate_uzum_prices(
+            cost_price, category_id, weight_kg, fulfillment_id,
+            target_margin, business_type, selling_price
+        )
+    return calculate_yandex_prices(
+        cost_price, category_id, weight_kg, fulfillment_id,
+        target_margin, payout_frequency
+    )
+
+
+# ========================================
+# MARKETPLACE x FULFILLMENT MATRITSASI
+# ========================================
+
+# Har bir marketplace o'z logistika jadvalidagi fulfillment turlari bilan
+PRICE_MATRIX_CHANNELS = [("uzum", f) for f in LOGISTICS_FEES] + [("yandex", f) for f in YANDEX_LOGISTICS_FEES]
+
+
+def calculate_price_matrix(
+    cost_price: ArrayLike,
+    categories: Sequence[str],
+    subcategories: Optional[Sequence[Optional[str]]] = None,
+    weight_kg: Union[float, ArrayLike] = 1.0,
+    target_margin: Union[float, ArrayLike] = 25,
+    business_type: str = "ip",
+    payout_frequency: str = "weekly",
+    channels: Optional[Sequence[Tuple[str, str]]] = None
+) -> Dict[str, Any]:
+    """
+    SKU x (marketplace, fulfillment) matritsasi
+
+    Kategoriyalar bir marta kodlanadi, har bir kanal bitta
+    vektorlashtirilgan o'tishda hisoblanadi.
+
+    Returns:
+        {"channels", "optimal_price", "net_profit", "actual_margin"}
+        - matritsalar (n_sku, n_channel) shaklida
+    """
+    channels = list(channels or PRICE_MATRIX_CHANNELS)
+    for marketplace, fulfillment in channels:
+        if marketplace not in MARKETPLACES or fulfillment not in FULFILLMENT_IDS:
+            raise ValueError(f"Noma'lum kanal: {marketplace}/{fulfillment}")
+
+    cost = np.asarray(cost_price, dtype=np.float64)
+    category_id = encode_categories(categories, subcategories)
+
+    optimal = np.empty((len(cost), len(channels)))
+    profit = np.empty_like(optimal)
+    margin = np.empty_like(optimal)
+    for j, (marketplace, fulfillment) in enumerate(channels):
+        fulfillment_id = FULFILLMENT_IDS[fulfillment]
+        if marketplace == "uzum":
+            columns = calculate_uzum_prices(
+                cost, category_id, weight_kg, fulfillment_id, target_margin, business_type
+            )
+        else:
+            columns = calculate_yandex_prices(
+                cost, category_id, weight_kg, fulfillment_id, target_margin, payout_frequency
+            )
+        optimal[:, j] = columns["optimal_price"]
+        profit[:, j] = columns["net_profit"]
+        margin[:, j] = columns["actual_margin"]
+
+    return {
+        "channels": channels,
+        "optimal_price": optimal,
+        "net_profit": profit,
+        "actual_margin": margin,
+    }
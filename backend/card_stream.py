@@ -0,0 +1,280 @@
+"""
+CARD STREAM - Server-Sent Events card generation
+================================================
+Kartochka JSON'i to'liq tayyor bo'lishini kutmasdan, LLM token'lari
+kelishi bilan tayyor maydonlar (sarlavha, qisqa tavsif, bullet'lar,
+to'liq tavsif) klientga SSE event sifatida yuboriladi.
+
+Features:
+- Oqimdagi JSON'dan tugallangan top-level maydonlarni ajratish
+- Load balancer orqali streaming (navbat, rate limit, failover)
+- Oxirida mavjud stop so'z validatsiyasi (compliance / Yandex qoidalari)
+- Event'lar: start -> field* -> validation -> done (yoki error)
+"""
+
+import json
+import os
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator, Callable
+
+from ai_load_balancer import balanced_stream_text
+from ai_request_queue import QueueRejectedError
+from ai_service import CARD_SYSTEM_MESSAGE, build_product_card_prompt, parse_card_json, card_result
+from compliance_engine import compliance_engine
+from yandex_service import YandexCardGenerator
+
+# RU + UZ to'liq tavsiflar uchun yetarli token
+CARD_STREAM_MAX_TOKENS = int(os.getenv("CARD_STREAM_MAX_TOKENS", "3000"))
+
+# generate-card maydonlari: to'liq tekshiruv (compliance_engine maydon turi)
+CARD_TEXT_FIELDS = {
+    "title": "title",
+    "description": "description",
+}
+# Uzunlik talablari qo'llanmaydigan maydonlar - faqat stop so'zlar
+CARD_STOP_WORD_FIELDS = ("shortDescription", "bulletPoints")
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # nginx buffering o'chiriladi
+}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Bitta SSE event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class JSONFieldExtractor:
+    """
+    Qism-qism kelayotgan JSON obyektidan tugallangan top-level maydonlar
+
+    feed(chunk) -> [(kalit, qiymat), ...] - shu chunk bilan yopilgan maydonlar.
+    Obyektdan oldingi matn (masalan ```json) o'tkazib yuboriladi.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        # key -> colon -> value -> in_value -> comma -> key ...
+        self._expect = "key"
+        self._key: Optional[str] = None
+        self._token_start = 0
+
+    @property
+    def complete(self) -> bool:
+        return self._started and self._depth == 0
+
+    def _emit(self, found: List[Tuple[str, Any]], raw: str):
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        self.fields[self._key] = value
+        found.append((self._key, value))
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.buffer += chunk
+        buf = self.buffer
+        found: List[Tuple[str, Any]] = []
+
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == "key_string":
+                        try:
+                            self._key = json.loads(buf[self._token_start:i + 1])
+                        except json.JSONDecodeError:
+                            self._key = buf[self._token_start + 1:i]
+                        self._expect = "colon"
+                    elif self._depth == 1 and self._expect == "value_string":
+                        self._emit(found, buf[self._token_start:i + 1])
+                        self._expect = "comma"
+                continue
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+            if self._depth == 0:
+                # Obyekt yopildi - qolgan matn e'tiborsiz
+                break
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect == "key":
+                    self._token_start = i
+                    self._expect = "key_string"
+                elif self._depth == 1 and self._expect == "value":
+                    self._token_start = i
+                    self._expect = "value_string"
+            elif ch in "{[":
+                if self._depth == 1 and self._expect == "value":
+                    self._token_start = i
+                    self._expect = "in_value"
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == "in_value":
+                    self._emit(found, buf[self._token_start:i + 1])
+                    self._expect = "comma"
+                elif self._depth == 0 and self._expect == "scalar":
+                    self._emit(found, buf[self._token_start:i].strip())
+            elif self._depth == 1:
+                if ch == ":" and self._expect == "colon":
+                    self._expect = "value"
+                elif ch == ",":
+                    if self._expect == "scalar":
+                        self._emit(found, buf[self._token_start:i].strip())
+                    self._expect = "key"
+                elif not ch.isspace() and self._expect == "value":
+                    # Raqam / true / false / null
+                    self._token_start = i
+                    self._expect = "scalar"
+
+        self._pos = len(buf)
+        return found
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """To'liq kartochka: butun javob parse qilinadi, bo'lmasa ajratilgan maydonlar"""
+        card = parse_card_json(self.buffer)
+        if isinstance(card, dict):
+            return card
+        return dict(self.fields) or None
+
+
+def validate_card_text(card: Dict[str, Any], marketplace: str = "uzum") -> Dict[str, Any]:
+    """
+    generate-card kartochkasi matnlarini marketplace qoidalariga tekshirish
+
+    Noma'lum marketplace (wildberries, ozon) uchun Uzum qoidalari.
+    """
+    if marketplace not in compliance_engine.marketplaces:
+        marketplace = "uzum"
+
+    errors = []
+    found_words: List[str] = []
+
+    def check(name: str, text: Any, field: str, full: bool):
+        if not isinstance(text, str) or not text:
+            return
+        result = compliance_engine.validate(text, field, [marketplace])["marketplaces"][marketplace]
+        for word in result["found_words"]:
+            if word not in found_words:
+                found_words.append(word)
+        violations = result["violations"] if full else [
+            v for v in result["violations"] if v["rule"] == "stop_words"
+        ]
+        errors.extend(f"{name}: {violation['message']}" for violation in violations)
+
+    for name, field in CARD_TEXT_FIELDS.items():
+        check(name, card.get(name), field, True)
+    for name in CARD_STOP_WORD_FIELDS:
+        value = card.get(name)
+        if isinstance(value, list):
+            for i, item in enumerate(value):
+                check(f"{name}[{i}]", item, "description", False)
+        else:
+            check(name, value, "description", False)
+
+    return {
+        "is_valid": not errors,
+        "marketplace": marketplace,
+        "found_words": found_words,
+        "errors": errors
+    }
+
+
+async def stream_card_events(
+    text_stream: AsyncIterator[str],
+    finalize: Callable[[Dict[str, Any]], Dict[str, Any]],
+    meta: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[str]:
+    """
+    LLM token oqimi -> SSE event'lar
+
+    field event'lari - model yozgan qiymat; yakuniy (validatsiyadan o'tgan,
+    masalan qisqartirilgan nom) kartochka done event'ida.
+    """
+    yield sse_event("start", {"success": True, **(meta or {})})
+
+    extractor = JSONFieldExtractor()
+    try:
+        async for chunk in text_stream:
+            for key, value in extractor.feed(chunk):
+                yield sse_event("field", {"field": key, "value": value})
+    except QueueRejectedError as e:
+        yield sse_event("error", {"success": False, "error": str(e), "code": e.code})
+        return
+    except Exception as e:
+        yield sse_event("error", {"success": False, "error": str(e)})
+        return
+
+    card = extractor.result()
+    if not card:
+        yield sse_event("error", {
+            "success": False,
+            "error": "AI javobini parse qilib bo'lmadi",
+            "raw_response": extractor.buffer[:500]
+        })
+        return
+
+    result = finalize(card)
+    yield sse_event("validation", result["validation"])
+    yield sse_event("done", result)
+
+
+def stream_product_card(
+    name: str,
+    category: str = "general",
+    description: str = "",
+    price: float = 100000,
+    marketplace: str = "uzum",
+    partner_id: Optional[str] = None
+) -> AsyncIterator[str]:
+    """/api/ai/generate-card streaming varianti"""
+    prompt = build_product_card_prompt(name, category, description, price, marketplace)
+
+    def finalize(card: Dict[str, Any]) -> Dict[str, Any]:
+        return {**card_result(card), "validation": validate_card_text(card, marketplace)}
+
+    return stream_card_events(
+        balanced_stream_text(
+            prompt, CARD_SYSTEM_MESSAGE, CARD_STREAM_MAX_TOKENS,
+            priority="interactive", partner_id=partner_id
+        ),
+        finalize,
+        {"marketplace": marketplace}
+    )
+
+
+def stream_yandex_card(
+    product_name: str,
+    category: str,
+    brand: str = "",
+    description: str = "",
+    detected_info: dict = None,
+    partner_id: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Yandex auto-create kartochka qadamining streaming varianti"""
+    prompt = YandexCardGenerator.build_prompt(product_name, category, brand, description, detected_info)
+    return stream_card_events(
+        balanced_stream_text(
+            prompt, YandexCardGenerator.SYSTEM_MESSAGE, CARD_STREAM_MAX_TOKENS,
+            priority="interactive", partner_id=partner_id
+        ),
+        YandexCardGenerator.finalize_card,
+        {"marketplace": "yandex"}
+    )
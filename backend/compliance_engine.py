@@ -0,0 +1,244 @@
+"""
+COMPLIANCE ENGINE - Multi-marketplace card text validation
+===========================================================
+Bitta matn barcha marketplace qoidalariga bir martada tekshiriladi:
+STOP_WORDS + YANDEX_STOP_WORDS bitta Aho–Corasick avtomatida,
+CARD_REQUIREMENTS / YANDEX_CARD_REQUIREMENTS esa bitta matn
+profili ustida baholanadi.
+
+Features:
+- Barcha marketplace stop so'zlari uchun bitta avtomat (bitta o'tish)
+- Matn profili (uzunlik, katta harflar, emoji, link, kontakt) bir marta hisoblanadi
+- Marketplace bo'yicha alohida violations
+- Batch validatsiya (bir xil matnlar bir marta tekshiriladi)
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Iterable, FrozenSet
+
+from stop_word_automaton import StopWordAutomaton
+from uzum_rules import STOP_WORDS, CARD_REQUIREMENTS, STOP_WORDS_AUTOMATON
+from yandex_rules import YANDEX_STOP_WORDS, YANDEX_CARD_REQUIREMENTS, YANDEX_STOP_WORDS_AUTOMATON
+
+
+# Marketplace -> (stop so'zlar, kartochka talablari, tozalash avtomati)
+MARKETPLACE_RULES = {
+    "uzum": {
+        "stop_words": STOP_WORDS,
+        "card_requirements": CARD_REQUIREMENTS,
+        "automaton": STOP_WORDS_AUTOMATON,
+    },
+    "yandex": {
+        "stop_words": YANDEX_STOP_WORDS,
+        "card_requirements": YANDEX_CARD_REQUIREMENTS,
+        "automaton": YANDEX_STOP_WORDS_AUTOMATON,
+    },
+}
+
+TEXT_FIELDS = ("title", "description")
+
+# Caps lock: kamida shuncha harf va shu ulushdan ko'p katta harf
+CAPS_LOCK_MIN_LETTERS = 10
+CAPS_LOCK_RATIO = 0.7
+
+_EMOJI_RE = re.compile("[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B50\u2B55\u203C\u2049]")
+_LINK_RE = re.compile(r"https?://|www\.|\b[\w-]+\.(?:uz|ru|com|net|org|me)\b", re.IGNORECASE)
+_CONTACT_RE = re.compile(r"\+?\d[\d\s\-()]{7,}\d|@[A-Za-z0-9_]{3,}|t\.me/")
+_SPECIAL_CHARS_RE = re.compile(r"[!?]{2,}|[*#$%^~|<>{}\[\]★☆✓✔✅❗]")
+
+
+@dataclass
+class TextProfile:
+    """Matn haqida bir marta hisoblanadigan ma'lumot"""
+    length: int
+    stop_word_ids: FrozenSet[int]
+    starts_lowercase: bool
+    caps_lock: bool
+    has_emoji: bool
+    has_links: bool
+    has_contacts: bool
+    has_special_chars: bool
+
+
+class ComplianceEngine:
+    """
+    Barcha marketplace qoidalari uchun bitta validator
+
+    Stop so'zlar birlashtirilgan avtomatda qidiriladi, har bir so'z
+    qaysi marketplace'larga tegishli ekani oldindan belgilanadi.
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, Any]] = MARKETPLACE_RULES):
+        self.rules = rules
+        self.marketplaces = list(rules)
+
+        all_words: List[str] = []
+        for marketplace_rules in rules.values():
+            all_words.extend(marketplace_rules["stop_words"])
+        self.automaton = StopWordAutomaton(all_words)
+
+        # word id -> marketplace'lar
+        self._word_marketplaces: List[FrozenSet[str]] = [
+            frozenset(
+                mp for mp, marketplace_rules in rules.items()
+                if word in marketplace_rules["stop_words"]
+            )
+            for word in self.automaton.words
+        ]
+
+    def profile(self, text: str) -> TextProfile:
+        """Matn profilini hisoblash (stop so'zlar - bitta o'tishda)"""
+        stripped = text.strip()
+        letters = [ch for ch in stripped if ch.isalpha()]
+        upper = sum(1 for ch in letters if ch.isupper())
+
+        return TextProfile(
+            length=len(text),
+            stop_word_ids=frozenset(self.automaton.match_ids(text)),
+            starts_lowercase=bool(stripped) and stripped[0].isalpha() and not stripped[0].isupper(),
+            caps_lock=len(letters) >= CAPS_LOCK_MIN_LETTERS and upper / len(letters) > CAPS_LOCK_RATIO,
+            has_emoji=bool(_EMOJI_RE.search(text)),
+            has_links=bool(_LINK_RE.search(text)),
+            has_contacts=bool(_CONTACT_RE.search(text)),
+            has_special_chars=bool(_SPECIAL_CHARS_RE.search(text)),
+        )
+
+    def _check_field(self, profile: TextProfile, requirements: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """CARD_REQUIREMENTS[field] bo'yicha qoidabuzarliklar"""
+        violations = []
+
+        max_length = requirements.get("max_length")
+        if max_length and profile.length > max_length:
+            violations.append({
+                "rule": "max_length",
+                "message": f"Matn juda uzun: {profile.length} > {max_length} belgi"
+            })
+        min_length = requirements.get("min_length")
+        if min_length and profile.length < min_length:
+            violations.append({
+                "rule": "min_length",
+                "message": f"Matn juda qisqa: {profile.length} < {min_length} belgi"
+            })
+        if requirements.get("start_capital") and profile.starts_lowercase:
+            violations.append({"rule": "start_capital", "message": "Katta harf bilan boshlanishi kerak"})
+        if requirements.get("no_caps_lock") and profile.caps_lock:
+            violations.append({"rule": "no_caps_lock", "message": "CAPS LOCK ishlatilmasin"})
+        if requirements.get("no_emoji") and profile.has_emoji:
+            violations.append({"rule": "no_emoji", "message": "Emoji taqiqlangan"})
+        if requirements.get("no_links") and profile.has_links:
+            violations.append({"rule": "no_links", "message": "Havolalar taqiqlangan"})
+        if requirements.get("no_contacts") and profile.has_contacts:
+            violations.append({"rule": "no_contacts", "message": "Kontakt ma'lumotlari taqiqlangan"})
+        if requirements.get("no_special_chars") and profile.has_special_chars:
+            violations.append({"rule": "no_special_chars", "message": "Maxsus belgilar taqiqlangan"})
+
+        return violations
+
+    def validate(
+        self,
+        text: str,
+        field: str = "description",
+        marketplaces: Optional[Iterable[str]] = None,
+        include_cleaned: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Matnni tanlangan marketplace'lar qoidalariga tekshirish
+
+        Returns:
+            {"is_valid", "length", "marketplaces": {mp: {"is_valid",
+             "found_words", "violations", ["cleaned_text"]}}}
+        """
+        if field not in TEXT_FIELDS:
+            raise ValueError(f"Noma'lum maydon: {field}")
+
+        selected = list(marketplaces) if marketplaces else self.marketplaces
+        profile = self.profile(text)
+
+        results = {}
+        for mp in selected:
+            rules = self.rules[mp]
+            found_words = [
+                self.automaton.words[word_id]
+                for word_id in sorted(profile.stop_word_ids)
+                if mp in self._word_marketplaces[word_id]
+            ]
+            violations = self._check_field(profile, rules["card_requirements"].get(field, {}))
+            if found_words:
+                violations.insert(0, {
+                    "rule": "stop_words",
+                    "message": f"Taqiqlangan so'zlar: {', '.join(found_words)}"
+                })
+
+            result = {
+                "is_valid": not violations,
+                "found_words": found_words,
+                "violations": violations
+            }
+            if include_cleaned:
+                result["cleaned_text"] = rules["automaton"].remove(text) if found_words else text
+            results[mp] = result
+
+        return {
+            "is_valid": all(r["is_valid"] for r in results.values()),
+            "length": profile.length,
+            "marketplaces": results
+        }
+
+    def validate_batch(
+        self,
+        items: Iterable[Dict[str, Any]],
+        marketplaces: Optional[Iterable[str]] = None,
+        include_cleaned: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Ko'p kartochkani tekshirish (item: {"id", "title", "description"})
+
+        Bir xil (maydon, matn) juftliklari faqat bir marta tekshiriladi.
+        """
+        selected = list(marketplaces) if marketplaces else self.marketplaces
+        cache: Dict[tuple, Dict[str, Any]] = {}
+        summary = {mp: {"valid": 0, "invalid": 0, "stop_words": {}} for mp in selected}
+
+        results = []
+        for index, item in enumerate(items):
+            entry: Dict[str, Any] = {"index": index, "id": item.get("id")}
+            item_markets = {mp: True for mp in selected}
+
+            for field in TEXT_FIELDS:
+                text = item.get(field)
+                if text is None:
+                    continue
+                key = (field, text)
+                checked = cache.get(key)
+                if checked is None:
+                    checked = self.validate(text, field, selected, include_cleaned)
+                    cache[key] = checked
+                entry[field] = checked
+                for mp, result in checked["marketplaces"].items():
+                    item_markets[mp] = item_markets[mp] and result["is_valid"]
+                    for word in result["found_words"]:
+                        counts = summary[mp]["stop_words"]
+                        counts[word] = counts.get(word, 0) + 1
+
+            entry["marketplaces"] = item_markets
+            entry["is_valid"] = all(item_markets.values())
+            for mp, ok in item_markets.items():
+                summary[mp]["valid" if ok else "invalid"] += 1
+            results.append(entry)
+
+        for mp_summary in summary.values():
+            top = sorted(mp_summary["stop_words"].items(), key=lambda x: -x[1])[:20]
+            mp_summary["stop_words"] = dict(top)
+
+        return {
+            "total": len(results),
+            "valid_count": sum(1 for r in results if r["is_valid"]),
+            "unique_texts": len(cache),
+            "summary": summary,
+            "results": results
+        }
+
+
+# Singleton
+compliance_engine = ComplianceEngine()
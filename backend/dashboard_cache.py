@@ -0,0 +1,165 @@
+"""
+DASHBOARD CACHE - Per-partner marketplace dashboard cache
+=========================================================
+Partner dashboard har sahifa ochilganda marketplace API'ga 4 ta so'rov
+yuborardi. Yig'ilgan dashboard partner bo'yicha qisqa muddat xotirada
+saqlanadi.
+
+Features:
+- Partner (+ kredensiallar izi) bo'yicha bounded LRU
+- TTL + stale-while-revalidate (eskirgan dashboard darhol, yangilanish fonda)
+- Bir partner uchun bitta in-flight yig'ish (parallel ochilgan sahifalar)
+- Muvaffaqiyatsiz yoki qisman (partial) yig'ish keshlanmaydi; eski dashboard qaytariladi
+- Hit / stale / miss statistikasi (/api/health/full)
+"""
+
+import asyncio
+import copy
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Awaitable, Optional, Tuple
+
+# Konfiguratsiya (sekundlarda)
+YANDEX_DASHBOARD_CACHE_SIZE = int(os.getenv("YANDEX_DASHBOARD_CACHE_SIZE", "1024"))
+YANDEX_DASHBOARD_CACHE_TTL = float(os.getenv("YANDEX_DASHBOARD_CACHE_TTL", "60"))          # Yangi hisoblanadi
+YANDEX_DASHBOARD_STALE_TTL = float(os.getenv("YANDEX_DASHBOARD_STALE_TTL", "600"))         # Stale, lekin ishlatiladi
+
+Fetcher = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+def is_complete_dashboard(data: Dict[str, Any]) -> bool:
+    """Ulanish faol, umumiy xato yo'q va hech bir bo'lim yiqilmagan (partial emas)"""
+    return data.get("connection_status") == "active" and "error" not in data and not data.get("partial")
+
+
+class DashboardCache:
+    """
+    Partner dashboard keshi
+
+    - age < ttl: "fresh" - keshdan
+    - ttl <= age < stale_ttl: "stale" - keshdan, fonda yangilanadi
+    - aks holda: "miss" - yig'ish kutiladi
+    """
+
+    def __init__(
+        self,
+        max_size: int = YANDEX_DASHBOARD_CACHE_SIZE,
+        ttl: float = YANDEX_DASHBOARD_CACHE_TTL,
+        stale_ttl: float = YANDEX_DASHBOARD_STALE_TTL
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+
+        # key -> (dashboard, fetched_at monotonic)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # Stats
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    @staticmethod
+    def make_key(partner_id: str, *credentials: Any) -> str:
+        """Partner + kredensiallar izi (token o'zgarsa eski dashboard ishlatilmaydi)"""
+        fingerprint = hashlib.sha256("|".join(str(c or "") for c in credentials).encode()).hexdigest()[:16]
+        return f"{partner_id}:{fingerprint}"
+
+    def _remember(self, key: str, dashboard: Dict[str, Any]):
+        self._entries[key] = (dashboard, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def _fetch_and_store(
+        self,
+        key: str,
+        fetcher: Fetcher,
+        cacheable: Callable[[Dict[str, Any]], bool]
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            dashboard = await fetcher()
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Dashboard fetch error: {e}")
+            return None
+        if not cacheable(dashboard):
+            self.errors += 1
+            return dashboard
+        self._remember(key, dashboard)
+        return dashboard
+
+    def _start_fetch(self, key: str, fetcher: Fetcher, cacheable: Callable[[Dict[str, Any]], bool]) -> asyncio.Task:
+        """Bitta partner uchun bitta yig'ish"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(key, fetcher, cacheable))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetcher: Fetcher,
+        cacheable: Callable[[Dict[str, Any]], bool] = lambda data: bool(data),
+        force: bool = False
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Dashboard -> (dashboard nusxasi, "fresh" / "stale" / "miss")
+
+        force=True - kesh chetlab o'tiladi (yangi yig'ish kutiladi).
+        Yig'ish xato bersa va eski dashboard bo'lsa, eskisi qaytariladi.
+        """
+        entry = self._entries.get(key)
+        age = time.monotonic() - entry[1] if entry is not None else None
+
+        if entry is not None and not force:
+            self._entries.move_to_end(key)
+            if age < self.ttl:
+                self.hits += 1
+                return copy.deepcopy(entry[0]), "fresh"
+            if age < self.stale_ttl:
+                # Stale-while-revalidate
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self.refreshes += 1
+                    self._start_fetch(key, fetcher, cacheable)
+                return copy.deepcopy(entry[0]), "stale"
+
+        self.misses += 1
+        dashboard = await asyncio.shield(self._start_fetch(key, fetcher, cacheable))
+        if entry is not None and (dashboard is None or not cacheable(dashboard)):
+            # Marketplace ishlamayapti - eski dashboard bo'lmagandan yaxshi
+            return copy.deepcopy(entry[0]), "stale"
+        return copy.deepcopy(dashboard), "miss"
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Kesh statistikasi"""
+        hits = self.hits + self.stale_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "hit_rate": round(hits / lookups * 100, 1) if lookups else 0.0
+        }
+
+
+# Singleton
+yandex_dashboard_cache = DashboardCache()
@@ -68,6 +68,73 @@ if USE_POSTGRES:
             await conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_user_sessions_token ON user_sessions(token)
             """)
+            # tasnif.soliq.uz qidiruv keshi (persistent tier)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS ikpu_search_cache (
+                    query_key VARCHAR(512) PRIMARY KEY,
+                    results JSONB NOT NULL,
+                    fetched_at TIMESTAMP NOT NULL
+                )
+            """)
+            # AI scan natijalari keshi (rasm digest'i + perceptual hash bo'yicha)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS scan_result_cache (
+                    namespace VARCHAR(32) NOT NULL,
+                    digest VARCHAR(64) NOT NULL,
+                    phash VARCHAR(16) NOT NULL,
+                    bands TEXT[] NOT NULL,
+                    owner VARCHAR(255),
+                    result JSONB NOT NULL,
+                    created_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (namespace, digest)
+                )
+            """)
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_scan_result_cache_bands ON scan_result_cache USING GIN (bands)
+            """)
+            # Uzum buyurtmalari va SKU qoldiqlari (fon sinxronizatsiyasi)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS uzum_orders (
+                    account_id VARCHAR(255) NOT NULL,
+                    order_id VARCHAR(64) NOT NULL,
+                    status VARCHAR(64),
+                    date_created TIMESTAMP NOT NULL,
+                    modified_at TIMESTAMP NOT NULL,
+                    fingerprint VARCHAR(40),
+                    data JSONB NOT NULL,
+                    synced_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (account_id, order_id)
+                )
+            """)
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_uzum_orders_created ON uzum_orders(account_id, date_created DESC, order_id DESC)
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS uzum_stocks (
+                    account_id VARCHAR(255) NOT NULL,
+                    sku_id BIGINT NOT NULL,
+                    amount INTEGER NOT NULL DEFAULT 0,
+                    fingerprint VARCHAR(40) NOT NULL,
+                    data JSONB NOT NULL,
+                    synced_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (account_id, sku_id)
+                )
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS uzum_sync_state (
+                    account_id VARCHAR(255) NOT NULL,
+                    resource VARCHAR(32) NOT NULL,
+                    cursor TIMESTAMP,
+                    last_run_at TIMESTAMP,
+                    last_success_at TIMESTAMP,
+                    last_error TEXT,
+                    items_synced INTEGER NOT NULL DEFAULT 0,
+                    full_sync_at TIMESTAMP,
+                    resume_offset INTEGER,
+                    resume_from TIMESTAMP,
+                    PRIMARY KEY (account_id, resource)
+                )
+            """)
             print("✅ Tables ensured")
     
     async def seed_admin_pg():
@@ -162,6 +229,12 @@ else:
             await db.messages.create_index("chat_room_id")
             await db.sessions.create_index("token", unique=True)
             await db.sessions.create_index("expires_at", expireAfterSeconds=0)
+            await db.scan_result_cache.create_index([("namespace", 1), ("digest", 1)], unique=True)
+            await db.scan_result_cache.create_index([("namespace", 1), ("owner", 1), ("bands", 1)])
+            await db.uzum_orders.create_index([("account_id", 1), ("order_id", 1)], unique=True)
+            await db.uzum_orders.create_index([("account_id", 1), ("date_created", -1), ("order_id", -1)])
+            await db.uzum_stocks.create_index([("account_id", 1), ("sku_id", 1)], unique=True)
+            await db.uzum_sync_state.create_index([("account_id", 1), ("resource", 1)], unique=True)
             print("✅ MongoDB indexes created")
         except Exception as e:
             print(f"⚠️ Index creation warning: {e}")
@@ -1013,3 +1086,408 @@ async def update_ai_task(task_id: str, updates: dict) -> Optional[dict]:
             return serialize_doc(task)
         except:
             return None
+
+
+# ==================== IKPU SEARCH CACHE ====================
+
+async def get_ikpu_cache_entry(query_key: str) -> Optional[dict]:
+    """Get cached tasnif.soliq.uz search results"""
+    if USE_POSTGRES:
+        if pool is None:
+            return None
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT results, fetched_at FROM ikpu_search_cache WHERE query_key = $1",
+                query_key
+            )
+            if not row:
+                return None
+            results = row["results"]
+            if isinstance(results, str):
+                results = json.loads(results)
+            return {"results": results, "fetched_at": row["fetched_at"]}
+    else:
+        if db is None:
+            return None
+        doc = await db.ikpu_search_cache.find_one({"query_key": query_key})
+        if not doc:
+            return None
+        return {"results": doc["results"], "fetched_at": doc["fetched_at"]}
+
+
+async def save_ikpu_cache_entry(query_key: str, results: List[dict], fetched_at: datetime) -> None:
+    """Upsert tasnif.soliq.uz search results"""
+    if USE_POSTGRES:
+        if pool is None:
+            return
+        async with pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO ikpu_search_cache (query_key, results, fetched_at)
+                VALUES ($1, $2, $3)
+                ON CONFLICT (query_key) DO UPDATE
+                SET results = EXCLUDED.results, fetched_at = EXCLUDED.fetched_at
+            """, query_key, json.dumps(results), fetched_at)
+    else:
+        if db is None:
+            return
+        await db.ikpu_search_cache.update_one(
+            {"query_key": query_key},
+            {"$set": {"results": results, "fetched_at": fetched_at}},
+            upsert=True
+        )
+
+
+# ==================== AI SCAN RESULT CACHE ====================
+
+async def get_scan_cache_candidates(
+    namespace: str,
+    bands: List[str],
+    digest: Optional[str] = None,
+    owner: Optional[str] = None,
+    limit: int = 50
+) -> List[dict]:
+    """Get cached scan results: exact digest match, or owner's entries sharing a perceptual-hash band"""
+    if USE_POSTGRES:
+        if pool is None:
+            return []
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT digest, phash, owner, result, created_at FROM scan_result_cache
+                WHERE namespace = $1
+                  AND (digest = $2 OR (owner = $3 AND bands && $4::text[]))
+                LIMIT $5
+            """, namespace, digest, owner, bands, limit)
+            candidates = []
+            for row in rows:
+                result = row["result"]
+                if isinstance(result, str):
+                    result = json.loads(result)
+                candidates.append({
+                    "digest": row["digest"],
+                    "phash": row["phash"],
+                    "owner": row["owner"],
+                    "result": result,
+                    "created_at": row["created_at"]
+                })
+            return candidates
+    else:
+        if db is None:
+            return []
+        conditions = [{"digest": digest}]
+        if owner is not None:
+            conditions.append({"owner": owner, "bands": {"$in": bands}})
+        cursor = db.scan_result_cache.find(
+            {"namespace": namespace, "$or": conditions},
+            {"_id": 0, "digest": 1, "phash": 1, "owner": 1, "result": 1, "created_at": 1}
+        ).limit(limit)
+        return await cursor.to_list(length=limit)
+
+
+async def save_scan_cache_entry(
+    namespace: str,
+    digest: str,
+    phash: str,
+    bands: List[str],
+    owner: Optional[str],
+    result: Any,
+    created_at: datetime
+) -> None:
+    """Upsert scan result for an image digest"""
+    if USE_POSTGRES:
+        if pool is None:
+            return
+        async with pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO scan_result_cache (namespace, digest, phash, bands, owner, result, created_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+                ON CONFLICT (namespace, digest) DO UPDATE
+                SET phash = EXCLUDED.phash, bands = EXCLUDED.bands, owner = EXCLUDED.owner,
+                    result = EXCLUDED.result, created_at = EXCLUDED.created_at
+            """, namespace, digest, phash, bands, owner, json.dumps(result), created_at)
+    else:
+        if db is None:
+            return
+        await db.scan_result_cache.update_one(
+            {"namespace": namespace, "digest": digest},
+            {"$set": {"phash": phash, "bands": bands, "owner": owner, "result": result, "created_at": created_at}},
+            upsert=True
+        )
+
+
+# ==================== UZUM ORDERS / STOCKS SYNC ====================
+
+def _json_field(value: Any) -> Any:
+    return json.loads(value) if isinstance(value, str) else value
+
+
+async def get_active_marketplace_integrations(marketplace: str) -> List[dict]:
+    """Marketplace ulangan barcha partnerlar: [{"partner_id", "credentials"}]"""
+    if USE_POSTGRES:
+        if pool is None:
+            return []
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT partner_id, api_credentials FROM marketplace_integrations WHERE marketplace = $1 AND is_active = true",
+                marketplace
+            )
+            return [
+                {"partner_id": row["partner_id"], "credentials": _json_field(row["api_credentials"]) or {}}
+                for row in rows
+            ]
+    else:
+        if db is None:
+            return []
+        cursor = db.marketplace_credentials.find(
+            {"marketplace": marketplace, "is_active": True},
+            {"_id": 0, "partner_id": 1, "credentials": 1}
+        )
+        return [
+            {"partner_id": doc["partner_id"], "credentials": doc.get("credentials") or {}}
+            async for doc in cursor
+        ]
+
+
+async def get_uzum_order_fingerprints(account_id: str, order_ids: List[str]) -> Dict[str, str]:
+    """order_id -> oxirgi saqlangan buyurtma izi (faqat berilgan buyurtmalar)"""
+    if not order_ids:
+        return {}
+    if USE_POSTGRES:
+        if pool is None:
+            return {}
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT order_id, fingerprint FROM uzum_orders WHERE account_id = $1 AND order_id = ANY($2::varchar[])",
+                account_id, list(order_ids)
+            )
+            return {row["order_id"]: row["fingerprint"] for row in rows}
+    else:
+        if db is None:
+            return {}
+        cursor = db.uzum_orders.find(
+            {"account_id": account_id, "order_id": {"$in": list(order_ids)}},
+            {"_id": 0, "order_id": 1, "fingerprint": 1}
+        )
+        return {doc["order_id"]: doc.get("fingerprint") async for doc in cursor}
+
+
+async def upsert_uzum_orders(account_id: str, orders: List[dict]) -> None:
+    """Buyurtmalarni upsert qilish: [{"order_id", "status", "date_created", "modified_at", "fingerprint", "data"}]"""
+    if not orders:
+        return
+    synced_at = utc_now()
+    if USE_POSTGRES:
+        if pool is None:
+            return
+        async with pool.acquire() as conn:
+            await conn.executemany("""
+                INSERT INTO uzum_orders (account_id, order_id, status, date_created, modified_at, fingerprint, data, synced_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                ON CONFLICT (account_id, order_id) DO UPDATE
+                SET status = EXCLUDED.status, date_created = EXCLUDED.date_created,
+                    modified_at = EXCLUDED.modified_at, fingerprint = EXCLUDED.fingerprint,
+                    data = EXCLUDED.data, synced_at = EXCLUDED.synced_at
+            """, [
+                (account_id, o["order_id"], o["status"], o["date_created"], o["modified_at"], o.get("fingerprint"),
+                 json.dumps(o["data"]), synced_at)
+                for o in orders
+            ])
+    else:
+        if db is None:
+            return
+        from pymongo import UpdateOne
+        await db.uzum_orders.bulk_write([
+            UpdateOne(
+                {"account_id": account_id, "order_id": o["order_id"]},
+                {"$set": {**o, "account_id": account_id, "synced_at": synced_at}},
+                upsert=True
+            )
+            for o in orders
+        ], ordered=False)
+
+
+async def list_uzum_orders(
+    account_id: str,
+    limit: int,
+    offset: int = 0,
+    after: Optional[tuple] = None,
+    status: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Buyurtmalar (date_created DESC, order_id DESC)
+
+    after=(date_created, order_id) - keyset sahifalash (offset'dan ustun)
+    """
+    if USE_POSTGRES:
+        if pool is None:
+            return {"items": [], "total": 0}
+        async with pool.acquire() as conn:
+            where = ["account_id = $1"]
+            values: List[Any] = [account_id]
+            if status:
+                values.append(status)
+                where.append(f"status = ${len(values)}")
+            total = await conn.fetchval(f"SELECT COUNT(*) FROM uzum_orders WHERE {' AND '.join(where)}", *values)
+            if after:
+                values.extend(after)
+                where.append(f"(date_created, order_id) < (${len(values) - 1}, ${len(values)})")
+            values.extend([limit, 0 if after else offset])
+            rows = await conn.fetch(f"""
+                SELECT order_id, status, date_created, data FROM uzum_orders
+                WHERE {' AND '.join(where)}
+                ORDER BY date_created DESC, order_id DESC
+                LIMIT ${len(values) - 1} OFFSET ${len(values)}
+            """, *values)
+            items = [
+                {"order_id": row["order_id"], "status": row["status"],
+                 "date_created": row["date_created"], "data": _json_field(row["data"])}
+                for row in rows
+            ]
+            return {"items": items, "total": total or 0}
+    else:
+        if db is None:
+            return {"items": [], "total": 0}
+        query: Dict[str, Any] = {"account_id": account_id}
+        if status:
+            query["status"] = status
+        total = await db.uzum_orders.count_documents(query)
+        if after:
+            query["$or"] = [
+                {"date_created": {"$lt": after[0]}},
+                {"date_created": after[0], "order_id": {"$lt": after[1]}}
+            ]
+        cursor = db.uzum_orders.find(
+            query, {"_id": 0, "order_id": 1, "status": 1, "date_created": 1, "data": 1}
+        ).sort([("date_created", -1), ("order_id", -1)]).skip(0 if after else offset).limit(limit)
+        return {"items": await cursor.to_list(length=limit), "total": total}
+
+
+async def get_uzum_stock_fingerprints(account_id: str) -> Dict[int, str]:
+    """sku_id -> oxirgi saqlangan qoldiq izi"""
+    if USE_POSTGRES:
+        if pool is None:
+            return {}
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT sku_id, fingerprint FROM uzum_stocks WHERE account_id = $1", account_id
+            )
+            return {row["sku_id"]: row["fingerprint"] for row in rows}
+    else:
+        if db is None:
+            return {}
+        cursor = db.uzum_stocks.find({"account_id": account_id}, {"_id": 0, "sku_id": 1, "fingerprint": 1})
+        return {doc["sku_id"]: doc["fingerprint"] async for doc in cursor}
+
+
+async def upsert_uzum_stocks(account_id: str, stocks: List[dict], removed_sku_ids: List[int] = ()) -> None:
+    """SKU qoldiqlarini upsert qilish: [{"sku_id", "amount", "fingerprint", "data"}]; removed - o'chiriladi"""
+    synced_at = utc_now()
+    if USE_POSTGRES:
+        if pool is None:
+            return
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                if stocks:
+                    await conn.executemany("""
+                        INSERT INTO uzum_stocks (account_id, sku_id, amount, fingerprint, data, synced_at)
+                        VALUES ($1, $2, $3, $4, $5, $6)
+                        ON CONFLICT (account_id, sku_id) DO UPDATE
+                        SET amount = EXCLUDED.amount, fingerprint = EXCLUDED.fingerprint,
+                            data = EXCLUDED.data, synced_at = EXCLUDED.synced_at
+                    """, [
+                        (account_id, s["sku_id"], s["amount"], s["fingerprint"], json.dumps(s["data"]), synced_at)
+                        for s in stocks
+                    ])
+                if removed_sku_ids:
+                    await conn.execute(
+                        "DELETE FROM uzum_stocks WHERE account_id = $1 AND sku_id = ANY($2::bigint[])",
+                        account_id, list(removed_sku_ids)
+                    )
+    else:
+        if db is None:
+            return
+        from pymongo import UpdateOne
+        if stocks:
+            await db.uzum_stocks.bulk_write([
+                UpdateOne(
+                    {"account_id": account_id, "sku_id": s["sku_id"]},
+                    {"$set": {**s, "account_id": account_id, "synced_at": synced_at}},
+                    upsert=True
+                )
+                for s in stocks
+            ], ordered=False)
+        if removed_sku_ids:
+            await db.uzum_stocks.delete_many({"account_id": account_id, "sku_id": {"$in": list(removed_sku_ids)}})
+
+
+async def list_uzum_stocks(account_id: str, limit: Optional[int] = None, after_sku_id: Optional[int] = None) -> Dict[str, Any]:
+    """SKU qoldiqlari (sku_id ASC); limit=None - hammasi"""
+    if USE_POSTGRES:
+        if pool is None:
+            return {"items": [], "total": 0}
+        async with pool.acquire() as conn:
+            total = await conn.fetchval("SELECT COUNT(*) FROM uzum_stocks WHERE account_id = $1", account_id)
+            rows = await conn.fetch("""
+                SELECT sku_id, data FROM uzum_stocks
+                WHERE account_id = $1 AND sku_id > $2
+                ORDER BY sku_id
+                LIMIT $3
+            """, account_id, after_sku_id if after_sku_id is not None else -1, limit)
+            items = [{"sku_id": row["sku_id"], "data": _json_field(row["data"])} for row in rows]
+            return {"items": items, "total": total or 0}
+    else:
+        if db is None:
+            return {"items": [], "total": 0}
+        total = await db.uzum_stocks.count_documents({"account_id": account_id})
+        query: Dict[str, Any] = {"account_id": account_id}
+        if after_sku_id is not None:
+            query["sku_id"] = {"$gt": after_sku_id}
+        cursor = db.uzum_stocks.find(query, {"_id": 0, "sku_id": 1, "data": 1}).sort("sku_id", 1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return {"items": await cursor.to_list(length=limit), "total": total}
+
+
+async def get_uzum_sync_state(account_id: str) -> Dict[str, dict]:
+    """resource ("orders" / "stocks") -> sinxronizatsiya holati"""
+    if USE_POSTGRES:
+        if pool is None:
+            return {}
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("SELECT * FROM uzum_sync_state WHERE account_id = $1", account_id)
+            return {row["resource"]: dict(row) for row in rows}
+    else:
+        if db is None:
+            return {}
+        cursor = db.uzum_sync_state.find({"account_id": account_id}, {"_id": 0})
+        return {doc["resource"]: doc async for doc in cursor}
+
+
+async def save_uzum_sync_state(account_id: str, resource: str, state: dict) -> None:
+    """
+    Sinxronizatsiya holatini yozish (cursor, last_run_at, last_success_at, last_error, items_synced,
+    full_sync_at, resume_offset, resume_from)
+    """
+    if USE_POSTGRES:
+        if pool is None:
+            return
+        async with pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO uzum_sync_state (account_id, resource, cursor, last_run_at, last_success_at, last_error,
+                                             items_synced, full_sync_at, resume_offset, resume_from)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+                ON CONFLICT (account_id, resource) DO UPDATE
+                SET cursor = EXCLUDED.cursor, last_run_at = EXCLUDED.last_run_at,
+                    last_success_at = EXCLUDED.last_success_at, last_error = EXCLUDED.last_error,
+                    items_synced = EXCLUDED.items_synced, full_sync_at = EXCLUDED.full_sync_at,
+                    resume_offset = EXCLUDED.resume_offset, resume_from = EXCLUDED.resume_from
+            """, account_id, resource, state.get("cursor"), state.get("last_run_at"),
+                state.get("last_success_at"), state.get("last_error"), state.get("items_synced", 0),
+                state.get("full_sync_at"), state.get("resume_offset"), state.get("resume_from"))
+    else:
+        if db is None:
+            return
+        await db.uzum_sync_state.update_one(
+            {"account_id": account_id, "resource": resource},
+            {"$set": {**state, "account_id": account_id, "resource": resource}},
+            upsert=True
+        )
@@ -0,0 +1,184 @@
+"""
+HTTP CLIENT REGISTRY - Shared pooled httpx clients per upstream host
+====================================================================
+Har bir chaqiruvda yangi httpx.AsyncClient yaratilsa har safar yangi
+TCP + TLS handshake bo'ladi. Registry har bir upstream host uchun
+bitta pool'li klient saqlaydi; FastAPI shutdown'da yopiladi.
+
+Features:
+- Host bo'yicha bitta klient (keep-alive, connection pool)
+- HTTP/2 (h2 o'rnatilgan bo'lsa, ALPN orqali - server qo'llamasa HTTP/1.1)
+- Host bo'yicha connection limit va timeout (register())
+- Yangi event loop'da klientlar qayta yaratiladi (testlar, skriptlar);
+  loop tugaganda (asyncio.run) klientlar o'sha loop'da yopiladi
+- Statistika: host bo'yicha yaratilgan klientlar va foydalanishlar
+
+Ishlatish:
+    async with http_client(YANDEX_API_BASE) as client:
+        response = await client.get(f"{YANDEX_API_BASE}/v2/campaigns", headers=headers)
+
+Klient `async with` blokidan keyin YOPILMAYDI - pool keyingi so'rovlar uchun qoladi.
+"""
+
+import asyncio
+import os
+import socket
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Any, AsyncIterator, List
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401 - httpx[http2]
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP_CLIENT_HTTP2 = os.getenv("HTTP_CLIENT_HTTP2", "true").lower() == "true"
+# Host bo'yicha default pool limitlari
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "50"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "30"))
+# Default timeout'lar (soniya); so'rovda timeout= bilan o'zgartirish mumkin
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30"))
+
+
+@dataclass
+class HostConfig:
+    """Bitta upstream host sozlamalari"""
+    timeout: float = HTTP_DEFAULT_TIMEOUT
+    max_connections: int = HTTP_POOL_MAX_CONNECTIONS
+    max_keepalive: int = HTTP_POOL_MAX_KEEPALIVE
+    http2: bool = True
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url if "://" in url else f"https://{url}")
+    return f"{parts.scheme or 'https'}://{parts.netloc.lower()}"
+
+
+def _shutdown_sockets(client: httpx.AsyncClient):
+    """
+    Yopilgan loop'dagi klient: pool ulanishlarini sinxron uzish
+
+    client.aclose() yopilgan loop transport'larida RuntimeError beradi,
+    shuning uchun TCP ulanishlar socket.shutdown() bilan uziladi.
+    """
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    for connection in list(getattr(pool, "connections", [])):
+        stream = getattr(getattr(connection, "_connection", None), "_network_stream", None)
+        if stream is None:
+            continue
+        try:
+            sock = stream.get_extra_info("socket")
+            if sock is not None:
+                sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class HTTPClientRegistry:
+    """Upstream host -> pool'li httpx.AsyncClient"""
+
+    def __init__(self):
+        self._configs: Dict[str, HostConfig] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._loop = None
+        self._reaper = None
+
+        # Statistika
+        self.created: Dict[str, int] = {}
+        self.uses: Dict[str, int] = {}
+
+    def register(self, base_url: str, **config) -> HostConfig:
+        """Host uchun limit / timeout (klient yaratilishidan oldin chaqiriladi)"""
+        key = _host_key(base_url)
+        host_config = HostConfig(**{**self._configs.get(key, HostConfig()).__dict__, **config})
+        self._configs[key] = host_config
+        return host_config
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Eski loop'dagi ulanishlar yangi loop'da ishlatilmaydi
+            old_loop, stale = self._loop, [c for c in self._clients.values() if not c.is_closed]
+            self._loop = loop
+            self._clients = {}
+            self._reaper = loop.create_task(self._close_on_loop_exit(loop))
+            if stale:
+                self._discard(old_loop, stale)
+        return loop
+
+    async def _close_on_loop_exit(self, loop):
+        """asyncio.run oxirida qolgan task'lar bekor qilinadi - klientlar loop yopilishidan oldin yopiladi"""
+        try:
+            await loop.create_future()
+        except asyncio.CancelledError:
+            if self._loop is loop:
+                await self.aclose()
+            raise
+
+    def _discard(self, old_loop, clients: List[httpx.AsyncClient]):
+        """Eski loop'da yopilmay qolgan klientlar (socket'lar oqib ketmasligi uchun)"""
+        if old_loop is not None and old_loop.is_running():
+            # Loop boshqa thread'da ishlayapti - o'sha loop'da yopiladi
+            for client in clients:
+                asyncio.run_coroutine_threadsafe(client.aclose(), old_loop)
+            return
+        for client in clients:
+            _shutdown_sockets(client)
+
+    def _create(self, key: str) -> httpx.AsyncClient:
+        config = self._configs.get(key, HostConfig())
+        self.created[key] = self.created.get(key, 0) + 1
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(config.timeout, connect=min(HTTP_CONNECT_TIMEOUT, config.timeout)),
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive,
+                keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY
+            ),
+            http2=HTTP2_AVAILABLE and HTTP_CLIENT_HTTP2 and config.http2
+        )
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        """URL host'i uchun umumiy klient (joriy event loop'da)"""
+        self._ensure_loop()
+        key = _host_key(url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._clients[key] = self._create(key)
+        self.uses[key] = self.uses.get(key, 0) + 1
+        return client
+
+    async def aclose(self):
+        """Barcha klientlarni yopish (FastAPI shutdown)"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"⚠️ HTTP client close error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "http2": HTTP2_AVAILABLE and HTTP_CLIENT_HTTP2,
+            "open_clients": len(self._clients),
+            "hosts": {
+                key: {"clients_created": self.created.get(key, 0), "uses": count}
+                for key, count in sorted(self.uses.items())
+            }
+        }
+
+
+# Singleton
+http_clients = HTTPClientRegistry()
+
+
+@asynccontextmanager
+async def http_client(url: str) -> AsyncIterator[httpx.AsyncClient]:
+    """`async with httpx.AsyncClient()` o'rniga: umumiy klient, blokdan keyin yopilmaydi"""
+    yield http_clients.get(url)
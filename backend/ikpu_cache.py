@@ -0,0 +1,184 @@
+"""
+IKPU SEARCH CACHE - tasnif.soliq.uz lookups
+============================================
+tasnif.soliq.uz sekin bo'lsa ham scanner so'rovlari kutib qolmasligi uchun
+
+Features:
+- Bounded in-process LRU (normalized query bo'yicha)
+- Persistent tier (PostgreSQL ikpu_search_cache / MongoDB collection)
+- Configurable TTL + stale-while-revalidate (eskirgan natija darhol,
+  yangilanish fonda)
+- Bir xil so'rov uchun bitta upstream fetch (in-flight dedupe)
+- Hit/miss counters (/api/health/full)
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Tuple
+
+from database import get_ikpu_cache_entry, save_ikpu_cache_entry, utc_now
+
+# Konfiguratsiya (sekundlarda)
+IKPU_CACHE_SIZE = int(os.getenv("IKPU_CACHE_SIZE", "2048"))
+IKPU_CACHE_TTL = int(os.getenv("IKPU_CACHE_TTL", str(24 * 3600)))             # Yangi hisoblanadi
+IKPU_CACHE_STALE_TTL = int(os.getenv("IKPU_CACHE_STALE_TTL", str(7 * 24 * 3600)))  # Stale, lekin ishlatiladi
+
+Fetcher = Callable[[str, int], Awaitable[Optional[List[Dict[str, Any]]]]]
+
+
+def _to_epoch(fetched_at: datetime) -> float:
+    """Naive UTC datetime (DB) -> epoch seconds"""
+    return fetched_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+class IKPUSearchCache:
+    """
+    tasnif.soliq.uz qidiruv natijalari uchun 2 bosqichli kesh
+
+    - age < ttl: natija to'g'ridan-to'g'ri qaytariladi
+    - ttl <= age < stale_ttl: eski natija qaytariladi, fonda yangilanadi
+    - aks holda: upstream'dan olinadi (xato bo'lsa eski natija ishlatiladi)
+    """
+
+    def __init__(
+        self,
+        max_size: int = IKPU_CACHE_SIZE,
+        ttl: int = IKPU_CACHE_TTL,
+        stale_ttl: int = IKPU_CACHE_STALE_TTL,
+        persistent: bool = True
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.persistent = persistent
+
+        # key -> (results, fetched_at epoch)
+        self._lru: "OrderedDict[str, Tuple[List[Dict[str, Any]], float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # Stats
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.fetch_errors = 0
+
+    @staticmethod
+    def make_key(query: str, limit: int) -> str:
+        """Normalized query key"""
+        return f"{limit}:{' '.join(query.lower().split())}"
+
+    def _remember(self, key: str, results: List[Dict[str, Any]], fetched_at: float):
+        self._lru[key] = (results, fetched_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    async def _load_persistent(self, key: str) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        if not self.persistent:
+            return None
+        try:
+            row = await get_ikpu_cache_entry(key)
+        except Exception as e:
+            print(f"IKPU cache read error: {e}")
+            return None
+        if not row:
+            return None
+        entry = (row["results"], _to_epoch(row["fetched_at"]))
+        self._remember(key, *entry)
+        return entry
+
+    async def _fetch_and_store(self, key: str, query: str, limit: int, fetcher: Fetcher) -> Optional[List[Dict[str, Any]]]:
+        results = await fetcher(query, limit)
+        if results is None:
+            self.fetch_errors += 1
+            return None
+
+        self._remember(key, results, time.time())
+        if self.persistent:
+            try:
+                await save_ikpu_cache_entry(key, results, utc_now())
+            except Exception as e:
+                print(f"IKPU cache write error: {e}")
+        return results
+
+    def _start_fetch(self, key: str, query: str, limit: int, fetcher: Fetcher) -> asyncio.Task:
+        """Bitta key uchun bitta upstream so'rov"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(key, query, limit, fetcher))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def get_or_fetch(self, query: str, limit: int, fetcher: Fetcher) -> Optional[List[Dict[str, Any]]]:
+        """
+        Keshdan olish yoki fetcher orqali yuklash
+
+        fetcher(query, limit) xato bo'lsa None qaytarishi kerak;
+        None natija keshlanmaydi.
+        """
+        key = self.make_key(query, limit)
+
+        entry = self._lru.get(key)
+        if entry is not None:
+            self._lru.move_to_end(key)
+            tier_hit = "memory"
+        else:
+            entry = await self._load_persistent(key)
+            tier_hit = "persistent"
+
+        if entry is not None:
+            results, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                if tier_hit == "memory":
+                    self.memory_hits += 1
+                else:
+                    self.persistent_hits += 1
+                return results
+            if age < self.stale_ttl:
+                # Stale-while-revalidate
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self.refreshes += 1
+                    self._start_fetch(key, query, limit, fetcher)
+                return results
+
+        self.misses += 1
+        results = await asyncio.shield(self._start_fetch(key, query, limit, fetcher))
+        if results is None and entry is not None:
+            # Upstream ishlamayapti - muddati o'tgan natija ham bo'lmagandan yaxshi
+            return entry[0]
+        return results
+
+    def clear(self):
+        """In-process LRU'ni tozalash (persistent tier saqlanadi)"""
+        self._lru.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Kesh statistikasi"""
+        hits = self.memory_hits + self.persistent_hits + self.stale_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._lru),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "fetch_errors": self.fetch_errors,
+            "hit_rate": round(hits / lookups * 100, 1) if lookups else 0.0
+        }
+
+
+# Singleton
+ikpu_search_cache = IKPUSearchCache()
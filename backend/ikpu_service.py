@@ -12,12 +12,18 @@ Struktura:
 
 Bazaviy kodlar "000000" bilan tugaydi (brend/atribut yo'q)
 """
-import httpx
+import os
 import json
 from typing import Optional, Dict, Any, List
 
-# IKPU API endpoint (tasnif.soliq.uz)
-IKPU_BASE_URL = "https://tasnif.soliq.uz/api"
+from mxik_index import get_mxik_index
+from ikpu_cache import ikpu_search_cache
+from http_clients import http_clients, http_client
+
+# IKPU API endpoint (tasnif.soliq.uz) - testlarda lokal stub server bilan almashtiriladi
+IKPU_BASE_URL = os.getenv("TASNIF_API_URL", "https://tasnif.soliq.uz/api")
+IKPU_API_TIMEOUT = float(os.getenv("TASNIF_API_TIMEOUT", "30"))
+http_clients.register(IKPU_BASE_URL, timeout=IKPU_API_TIMEOUT)
 
 # 17 honali IKPU kodlari - asosiy kategoriyalar
 COMMON_IKPU_CODES = {
@@ -195,9 +201,19 @@ class IKPUService:
     async def search_ikpu(query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Search IKPU codes by query from tasnif.soliq.uz
+        
+        Natijalar TTL kesh orqali (LRU + DB, stale-while-revalidate)
         """
+        results = await ikpu_search_cache.get_or_fetch(query, limit, IKPUService._fetch_from_tasnif)
+        if results is None:
+            return IKPUService._get_from_local_mapping(query)
+        return results
+    
+    @staticmethod
+    async def _fetch_from_tasnif(query: str, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """tasnif.soliq.uz dan qidirish (xato bo'lsa None)"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(IKPU_BASE_URL) as client:
                 response = await client.get(
                     f"{IKPU_BASE_URL}/cls/search",
                     params={
@@ -224,12 +240,13 @@ class IKPUService:
                             "is_valid": IKPUService.validate_ikpu_code(code)
                         })
                     return results
-                else:
-                    return IKPUService._get_from_local_mapping(query)
+                
+                print(f"IKPU API status: {response.status_code}")
+                return None
                     
         except Exception as e:
             print(f"IKPU API error: {e}")
-            return IKPUService._get_from_local_mapping(query)
+            return None
     
     @staticmethod
     def _get_from_local_mapping(query: str) -> List[Dict[str, Any]]:
@@ -313,107 +330,84 @@ class IKPUService:
         }
     
     @staticmethod
-    async def get_ikpu_for_product(
+    def resolve_from_index(
+        product_name: str,
+        category: str = "",
+        brand: str = ""
+    ) -> Optional[Dict[str, Any]]:
+        """
+        MXIK indeksidan IKPU kodini topish (sinxron, tarmoqsiz)
+        
+        Returns None if index is not loaded or nothing matched
+        """
+        try:
+            index = get_mxik_index()
+            best_match = index.best_match(product_name, category, brand) if index else None
+            
+            if best_match:
+                best_score = best_match["score"]
+                return {
+                    "success": True,
+                    "ikpu_code": best_match["code"],
+                    "ikpu_name": best_match["name_uz"] or best_match["name_ru"],
+                    "confidence": "high" if best_score > 10 else "medium",
+                    "source": "json_file",
+                    "is_17_digit": len(best_match["code"]) == 17
+                }
+        except Exception as e:
+            print(f"MXIK index error: {e}")
+        return None
+    
+    @staticmethod
+    def resolve_offline(
         product_name: str,
         category: str = "",
         brand: str = ""
     ) -> Dict[str, Any]:
         """
-        Get best matching IKPU code for a product from JSON file
+        IKPU kodini faqat lokal manbalardan topish (indeks -> kategoriya -> default)
         
-        Returns 17-digit IKPU code
+        get_ikpu_for_product bilan bir xil natija formati, lekin
+        tasnif.soliq.uz ga so'rov yuborilmaydi (batch resolution uchun).
         """
-        import os
-        import json
+        result = IKPUService.resolve_from_index(product_name, category, brand)
+        if result:
+            return result
         
-        # STEP 1: Try to load from JSON file (Excel converted)
-        # Try multiple paths
-        possible_paths = [
-            "/app/server/data/mxik_codes.json",  # Production (Railway)
-            os.path.join(os.path.dirname(__file__), "..", "..", "server", "data", "mxik_codes.json"),  # Relative
-            os.path.join(os.path.dirname(__file__), "..", "..", "..", "server", "data", "mxik_codes.json"),  # Alternative relative
-            "server/data/mxik_codes.json",  # Local dev
-            "../server/data/mxik_codes.json",  # Another relative
-        ]
+        if category:
+            ikpu_data = IKPUService.get_ikpu_by_category(category)
+            return {
+                "success": True,
+                "ikpu_code": ikpu_data["code"],
+                "ikpu_name": ikpu_data["name"],
+                "confidence": "low",
+                "source": "category_mapping",
+                "is_17_digit": len(ikpu_data["code"]) == 17
+            }
         
-        mxik_file_path = None
-        for path in possible_paths:
-            abs_path = os.path.abspath(path) if not os.path.isabs(path) else path
-            if os.path.exists(abs_path):
-                mxik_file_path = abs_path
-                print(f"✅ Found MXIK file at: {mxik_file_path}")
-                break
+        return {
+            "success": True,
+            "ikpu_code": "00000000000000000",
+            "ikpu_name": "Boshqa mahsulotlar",
+            "confidence": "default",
+            "is_17_digit": True
+        }
+    
+    @staticmethod
+    async def get_ikpu_for_product(
+        product_name: str,
+        category: str = "",
+        brand: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Get best matching IKPU code for a product from MXIK index
         
-        if mxik_file_path and os.path.exists(mxik_file_path):
-            try:
-                with open(mxik_file_path, 'r', encoding='utf-8') as f:
-                    mxik_codes = json.load(f)
-                
-                # Build search query
-                search_query = product_name.lower()
-                if brand:
-                    search_query = f"{brand.lower()} {search_query}"
-                
-                # Search in JSON file (improved matching)
-                best_match = None
-                best_score = 0
-                
-                # Normalize search query (remove common words)
-                stop_words = ["va", "to'plami", "uchun", "moslamasi", "vositalari", "и", "для", "набор"]
-                query_words = [w for w in search_query.split() if w not in stop_words and len(w) > 2]
-                normalized_query = " ".join(query_words)
-                
-                for item in mxik_codes:
-                    name_uz = (item.get("nameUz", "") or "").lower()
-                    name_ru = (item.get("nameRu", "") or "").lower()
-                    full_code = item.get("fullCode", "")
-                    
-                    if not full_code or len(full_code) < 8:
-                        continue
-                    
-                    # Calculate match score (improved algorithm)
-                    score = 0
-                    
-                    # Exact phrase match (highest score)
-                    if normalized_query in name_uz or normalized_query in name_ru:
-                        score += 100
-                    
-                    # Word-by-word matching
-                    for word in query_words:
-                        if len(word) < 3:
-                            continue
-                        if word in name_uz or word in name_ru:
-                            score += len(word) * 2  # Longer words = higher score
-                        # Partial match (substring)
-                        elif any(word in n or n in word for n in [name_uz, name_ru]):
-                            score += len(word)
-                    
-                    # Category-based bonus
-                    if category:
-                        cat_lower = category.lower()
-                        if cat_lower in name_uz or cat_lower in name_ru:
-                            score += 20
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_match = {
-                            "code": full_code if len(full_code) == 17 else full_code.ljust(17, '0'),
-                            "name_uz": item.get("nameUz", ""),
-                            "name_ru": item.get("nameRu", ""),
-                            "score": score
-                        }
-                
-                if best_match and best_score > 0:
-                    return {
-                        "success": True,
-                        "ikpu_code": best_match["code"],
-                        "ikpu_name": best_match["name_uz"] or best_match["name_ru"],
-                        "confidence": "high" if best_score > 10 else "medium",
-                        "source": "json_file",
-                        "is_17_digit": len(best_match["code"]) == 17
-                    }
-            except Exception as e:
-                print(f"MXIK JSON file error: {e}")
+        Returns 17-digit IKPU code
+        """
+        # STEP 1: Process-wide MXIK index (mxik_codes.json startup'da bir marta yuklanadi)
+        result = IKPUService.resolve_from_index(product_name, category, brand)
+        if result:
+            return result
         
         # STEP 2: Try API search
         search_query = product_name.lower()
@@ -0,0 +1,386 @@
+"""
+MXIK CATALOG - Compact binary format + offline build tool
+==========================================================
+mxik_codes.json -> mxik_codes.idx (bir marta, deploy vaqtida)
+
+Har bir uvicorn worker faylni read-only mmap qiladi, shuning uchun
+barcha worker'lar bitta page-cache nusxasidan foydalanadi va
+startup'da JSON parse qilinmaydi.
+
+Format (native byte order, 8-byte aligned sections):
+- Header: magic, version, byte-order marker, item soni, section offsetlar
+- codes:             u64[n]   17 honali kodlar (int sifatida)
+- name_uz / name_ru: u32[n]   interned string id'lari
+- strings:           StringTable (nameUz/nameRu, takrorlarsiz)
+- tokens:            PostingTable  token -> item id'lar
+- token_grams:       PostingTable  trigram -> token id'lar
+- whole_names:       PostingTable  bo'shliqsiz nom -> item id'lar
+- fuzzy_tokens:      PostingTable  kanonik (lotin) token -> item id'lar
+- fuzzy_grams:       PostingTable  padded trigram -> fuzzy token id'lar
+- fuzzy_gram_counts: u16[m]   har bir fuzzy token'ning trigram soni
+
+StringTable:  u32 n | u32 offsets[n+1] | utf-8 blob
+PostingTable: u32 n | u32 total | u32 key_offsets[n+1] | u32 post_offsets[n+1]
+              | u32 postings[total] | utf-8 key blob (keys UTF-8 bo'yicha saralangan)
+
+Build:
+    python mxik_catalog.py [--input mxik_codes.json] [--output mxik_codes.idx]
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+from typing import Dict, Any, List, Iterable, Sequence, Optional
+
+MAGIC = b"MXIKIDX\0"
+VERSION = 1
+BYTE_ORDER_MARK = 0x01020304
+
+SECTIONS = [
+    "codes", "name_uz", "name_ru", "strings",
+    "tokens", "token_grams", "whole_names",
+    "fuzzy_tokens", "fuzzy_grams", "fuzzy_gram_counts",
+]
+_HEADER = struct.Struct(f"=8sIIII{len(SECTIONS)}Q")
+
+
+def _pad8(data: bytearray):
+    data.extend(b"\0" * (-len(data) % 8))
+
+
+def _pack_strings(strings: List[str]) -> bytes:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for e in encoded:
+        offsets.append(offsets[-1] + len(e))
+    out = bytearray(struct.pack("=I", len(encoded)))
+    out += struct.pack(f"={len(offsets)}I", *offsets)
+    out += b"".join(encoded)
+    _pad8(out)
+    return bytes(out)
+
+
+def _pack_postings(postings: Dict[str, Iterable[int]]) -> bytes:
+    keys = sorted(postings, key=lambda k: k.encode("utf-8"))
+    encoded = [k.encode("utf-8") for k in keys]
+    key_offsets = [0]
+    for e in encoded:
+        key_offsets.append(key_offsets[-1] + len(e))
+    flat: List[int] = []
+    post_offsets = [0]
+    for k in keys:
+        flat.extend(sorted(set(postings[k])))
+        post_offsets.append(len(flat))
+
+    out = bytearray(struct.pack("=II", len(keys), len(flat)))
+    out += struct.pack(f"={len(key_offsets)}I", *key_offsets)
+    out += struct.pack(f"={len(post_offsets)}I", *post_offsets)
+    out += struct.pack(f"={len(flat)}I", *flat)
+    out += b"".join(encoded)
+    _pad8(out)
+    return bytes(out)
+
+
+def _key_ids(postings: Dict[str, Any]) -> Dict[str, int]:
+    """PostingTable ichidagi key id'lari (saralangan tartib)"""
+    keys = sorted(postings, key=lambda k: k.encode("utf-8"))
+    return {k: i for i, k in enumerate(keys)}
+
+
+def compile_catalog(items: Iterable[Dict[str, Any]], stats: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    mxik_codes.json item'laridan compact katalog qurish
+
+    fullCode < 8 belgi bo'lgan item'lar (asl skan kabi) o'tkazib yuboriladi.
+    u64 ga sig'maydigan kodlar (> 17 belgi yoki raqam emas) ham o'tkazib
+    yuboriladi - ular sanaladi va ogohlantirish chiqariladi; stats berilsa
+    stats["skipped"] / stats["skipped_invalid"] to'ldiriladi.
+    """
+    # Import here: mxik_index normalizatsiya qoidalari yagona manba
+    from mxik_index import normalize_for_search, _trigrams, _padded_trigrams
+
+    codes: List[int] = []
+    name_uz_ids: List[int] = []
+    name_ru_ids: List[int] = []
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+
+    tokens: Dict[str, List[int]] = {}
+    whole_names: Dict[str, List[int]] = {}
+    fuzzy_tokens: Dict[str, List[int]] = {}
+
+    def intern(s: str) -> int:
+        if s not in string_ids:
+            string_ids[s] = len(strings)
+            strings.append(s)
+        return string_ids[s]
+
+    skipped = 0
+    skipped_invalid: List[str] = []
+
+    for item in items:
+        full_code = item.get("fullCode", "") or ""
+        if len(full_code) < 8:
+            skipped += 1
+            continue
+        if len(full_code) > 17 or not full_code.isdigit():
+            # Compact formatda saqlab bo'lmaydi - jim tashlab yubormaymiz
+            skipped += 1
+            skipped_invalid.append(full_code)
+            continue
+
+        item_id = len(codes)
+        name_uz = item.get("nameUz", "") or ""
+        name_ru = item.get("nameRu", "") or ""
+        lower_uz = name_uz.lower()
+        lower_ru = name_ru.lower()
+
+        codes.append(int(full_code.ljust(17, '0')))
+        name_uz_ids.append(intern(name_uz))
+        name_ru_ids.append(intern(name_ru))
+
+        for token in set(lower_uz.split()) | set(lower_ru.split()):
+            tokens.setdefault(token, []).append(item_id)
+
+        for name in {lower_uz, lower_ru}:
+            if not name.split() or name.split() == [name]:
+                whole_names.setdefault(name, []).append(item_id)
+
+        for token in set(normalize_for_search(name_uz)) | set(normalize_for_search(name_ru)):
+            fuzzy_tokens.setdefault(token, []).append(item_id)
+
+    if skipped_invalid:
+        sample = ", ".join(skipped_invalid[:5])
+        print(f"⚠️ MXIK catalog: {len(skipped_invalid)} items with unsupported fullCode skipped (e.g. {sample})")
+    if stats is not None:
+        stats["skipped"] = skipped
+        stats["skipped_invalid"] = len(skipped_invalid)
+
+    token_grams: Dict[str, List[int]] = {}
+    for token, token_id in _key_ids(tokens).items():
+        for gram in _trigrams(token):
+            token_grams.setdefault(gram, []).append(token_id)
+
+    fuzzy_grams: Dict[str, List[int]] = {}
+    fuzzy_ids = _key_ids(fuzzy_tokens)
+    fuzzy_gram_counts = [0] * len(fuzzy_ids)
+    for token, token_id in fuzzy_ids.items():
+        grams = _padded_trigrams(token)
+        fuzzy_gram_counts[token_id] = len(grams)
+        for gram in grams:
+            fuzzy_grams.setdefault(gram, []).append(token_id)
+
+    n = len(codes)
+    sections = {
+        "codes": struct.pack(f"={n}Q", *codes),
+        "name_uz": struct.pack(f"={n}I", *name_uz_ids),
+        "name_ru": struct.pack(f"={n}I", *name_ru_ids),
+        "strings": _pack_strings(strings),
+        "tokens": _pack_postings(tokens),
+        "token_grams": _pack_postings(token_grams),
+        "whole_names": _pack_postings(whole_names),
+        "fuzzy_tokens": _pack_postings(fuzzy_tokens),
+        "fuzzy_grams": _pack_postings(fuzzy_grams),
+        "fuzzy_gram_counts": struct.pack(f"={len(fuzzy_gram_counts)}H", *fuzzy_gram_counts),
+    }
+
+    body = bytearray()
+    offsets = []
+    for name in SECTIONS:
+        offsets.append(_HEADER.size + len(body))
+        body += sections[name]
+        _pad8(body)
+
+    header = _HEADER.pack(MAGIC, VERSION, BYTE_ORDER_MARK, n, len(SECTIONS), *offsets)
+    return header + bytes(body)
+
+
+# ========================================
+# READER (bytes yoki mmap ustida, nusxasiz)
+# ========================================
+
+class StringTable:
+    """u32 offsetlar + utf-8 blob"""
+
+    def __init__(self, buf: memoryview, offset: int):
+        self.n = struct.unpack_from("=I", buf, offset)[0]
+        start = offset + 4
+        self._offsets = buf[start:start + 4 * (self.n + 1)].cast("I")
+        self._blob = start + 4 * (self.n + 1)
+        self._buf = buf
+
+    def __len__(self) -> int:
+        return self.n
+
+    def raw(self, i: int) -> memoryview:
+        return self._buf[self._blob + self._offsets[i]:self._blob + self._offsets[i + 1]]
+
+    def size(self, i: int) -> int:
+        """UTF-8 uzunligi (bayt)"""
+        return self._offsets[i + 1] - self._offsets[i]
+
+    def __getitem__(self, i: int) -> str:
+        return str(self.raw(i), "utf-8")
+
+
+class PostingTable:
+    """Saralangan key -> u32 posting list (binary search bilan)"""
+
+    def __init__(self, buf: memoryview, offset: int):
+        self.n, total = struct.unpack_from("=II", buf, offset)
+        pos = offset + 8
+        self._key_offsets = buf[pos:pos + 4 * (self.n + 1)].cast("I")
+        pos += 4 * (self.n + 1)
+        self._post_offsets = buf[pos:pos + 4 * (self.n + 1)].cast("I")
+        pos += 4 * (self.n + 1)
+        self._postings = buf[pos:pos + 4 * total].cast("I")
+        pos += 4 * total
+        self._blob = pos
+        self._buf = buf
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _raw_key(self, i: int) -> bytes:
+        return bytes(self._buf[self._blob + self._key_offsets[i]:self._blob + self._key_offsets[i + 1]])
+
+    def key(self, i: int) -> str:
+        return self._raw_key(i).decode("utf-8")
+
+    def keys(self) -> List[str]:
+        return [self.key(i) for i in range(self.n)]
+
+    def find(self, key: str) -> int:
+        """Key id (topilmasa -1)"""
+        target = key.encode("utf-8")
+        lo, hi = 0, self.n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._raw_key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n and self._raw_key(lo) == target:
+            return lo
+        return -1
+
+    def postings(self, i: int) -> Sequence[int]:
+        return self._postings[self._post_offsets[i]:self._post_offsets[i + 1]]
+
+    def posting_count(self, i: int) -> int:
+        return self._post_offsets[i + 1] - self._post_offsets[i]
+
+    def get(self, key: str) -> Sequence[int]:
+        i = self.find(key)
+        return self.postings(i) if i >= 0 else ()
+
+
+class MXIKCatalog:
+    """Compact MXIK katalogi (bytes yoki read-only mmap)"""
+
+    def __init__(self, buffer, source: str = "memory"):
+        buf = memoryview(buffer)
+        magic, version, bom, n, n_sections, *offsets = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an MXIK catalog file")
+        if version != VERSION or n_sections != len(SECTIONS):
+            raise ValueError(f"Unsupported MXIK catalog version: {version}")
+        if bom != BYTE_ORDER_MARK:
+            raise ValueError("MXIK catalog was built on a machine with different byte order")
+
+        self._buffer = buffer  # mmap'ni tirik saqlash
+        self.source = source
+        self.n_items = n
+        off = dict(zip(SECTIONS, offsets))
+
+        self._codes = buf[off["codes"]:off["codes"] + 8 * n].cast("Q")
+        self._name_uz = buf[off["name_uz"]:off["name_uz"] + 4 * n].cast("I")
+        self._name_ru = buf[off["name_ru"]:off["name_ru"] + 4 * n].cast("I")
+        self.strings = StringTable(buf, off["strings"])
+        self.tokens = PostingTable(buf, off["tokens"])
+        self.token_grams = PostingTable(buf, off["token_grams"])
+        self.whole_names = PostingTable(buf, off["whole_names"])
+        self.fuzzy_tokens = PostingTable(buf, off["fuzzy_tokens"])
+        self.fuzzy_grams = PostingTable(buf, off["fuzzy_grams"])
+        counts_off = off["fuzzy_gram_counts"]
+        self.fuzzy_gram_counts = buf[counts_off:counts_off + 2 * len(self.fuzzy_tokens)].cast("H")
+
+    @classmethod
+    def from_items(cls, items: Iterable[Dict[str, Any]]) -> "MXIKCatalog":
+        """JSON item'laridan xotirada qurish (compiled fayl bo'lmasa)"""
+        return cls(compile_catalog(items), source="memory")
+
+    @classmethod
+    def open_mapped(cls, path: str) -> "MXIKCatalog":
+        """Compiled faylni read-only mmap qilish"""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mm, source=path)
+
+    def __len__(self) -> int:
+        return self.n_items
+
+    def code(self, i: int) -> str:
+        return str(self._codes[i]).zfill(17)
+
+    def name_uz(self, i: int) -> str:
+        return self.strings[self._name_uz[i]]
+
+    def name_ru(self, i: int) -> str:
+        return self.strings[self._name_ru[i]]
+
+    def name_uz_size(self, i: int) -> int:
+        return self.strings.size(self._name_uz[i])
+
+
+def build_catalog_file(input_path: str, output_path: str) -> Dict[str, Any]:
+    """mxik_codes.json -> compiled .idx (atomik yozish)"""
+    with open(input_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+
+    compile_stats: Dict[str, Any] = {}
+    data = compile_catalog(items, compile_stats)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, output_path)
+
+    catalog = MXIKCatalog(data)
+    return {
+        "items": len(catalog),
+        "skipped": compile_stats["skipped"],
+        "skipped_invalid": compile_stats["skipped_invalid"],
+        "strings": len(catalog.strings),
+        "tokens": len(catalog.tokens),
+        "fuzzy_tokens": len(catalog.fuzzy_tokens),
+        "json_bytes": os.path.getsize(input_path),
+        "idx_bytes": len(data),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from mxik_index import find_mxik_file, compiled_path_for
+
+    parser = argparse.ArgumentParser(description="Compile mxik_codes.json into a memory-mappable MXIK catalog")
+    parser.add_argument("--input", "-i", help="mxik_codes.json path (default: auto-detect)")
+    parser.add_argument("--output", "-o", help="output .idx path (default: next to input)")
+    args = parser.parse_args(argv)
+
+    input_path = args.input or find_mxik_file()
+    if not input_path or not os.path.exists(input_path):
+        print("❌ mxik_codes.json not found")
+        return 1
+    output_path = args.output or compiled_path_for(input_path)
+
+    stats = build_catalog_file(input_path, output_path)
+    print(f"✅ MXIK catalog compiled: {output_path}")
+    for key, value in stats.items():
+        print(f"   {key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
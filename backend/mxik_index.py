@@ -0,0 +1,403 @@
+"""
+MXIK INDEX - Process-wide in-memory index
+==========================================
+mxik_codes.json faqat bir marta (startup'da) yuklanadi va
+so'z -> posting-list indeksiga aylantiriladi.
+
+Features:
+- Normalized token -> item id posting lists (nameUz + nameRu)
+- Vocabulary trigram index (substring so'zlarni tez topish uchun)
+- get_ikpu_for_product bilan bir xil scoring (faqat nomzodlar hisoblanadi)
+- Trigram fuzzy search (lotin/kirill/rus, xatolarga chidamli) - /api/mxik/search
+- Compiled katalog (mxik_catalog.py) bo'lsa read-only mmap, JSON parse qilinmaydi
+"""
+
+import os
+import re
+import json
+import threading
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Set, Iterable, Tuple, Sequence, Callable
+
+from mxik_catalog import MXIKCatalog
+
+
+# mxik_codes.json joylashuvi (env, production, relative, local dev)
+MXIK_FILE_PATHS = [p for p in [os.getenv("MXIK_DATABASE_PATH")] if p] + [
+    "/app/server/data/mxik_codes.json",  # Production (Railway)
+    os.path.join(os.path.dirname(__file__), "..", "server", "data", "mxik_codes.json"),  # Repo root
+    os.path.join(os.path.dirname(__file__), "..", "..", "server", "data", "mxik_codes.json"),  # Relative
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "server", "data", "mxik_codes.json"),  # Alternative relative
+    "server/data/mxik_codes.json",  # Local dev
+    "../server/data/mxik_codes.json",  # Another relative
+]
+
+# Qidiruvda e'tiborga olinmaydigan so'zlar
+MXIK_STOP_WORDS = ["va", "to'plami", "uchun", "moslamasi", "vositalari", "и", "для", "набор"]
+
+# Substring natijalari keshi (so'z -> item id'lar)
+SUBSTRING_CACHE_SIZE = 4096
+
+# Fuzzy search sozlamalari
+FUZZY_MIN_TOKEN_SIMILARITY = 0.3   # Dice koeffitsiyenti (token darajasida)
+FUZZY_PREFIX_SIMILARITY = 0.9      # Typeahead: "telef" -> "telefon"
+FUZZY_CACHE_SIZE = 8192            # Natijalar keshi (so'rov, limit)
+
+# Kirill (o'zbek + rus) -> lotin. Katalog kirillda, so'rovlar ko'pincha lotinda.
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo",
+    "ж": "j", "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m",
+    "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u",
+    "ф": "f", "х": "x", "ц": "s", "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "",
+    "ы": "i", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    "ў": "o", "қ": "q", "ғ": "g", "ҳ": "h",
+}
+_TRANSLIT_TABLE = str.maketrans({
+    **CYRILLIC_TO_LATIN,
+    # o', g' va boshqa apostrof variantlari
+    "'": "", "`": "", "ʻ": "", "ʼ": "", "‘": "", "’": "",
+})
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+def find_mxik_file() -> Optional[str]:
+    """mxik_codes.json faylini topish"""
+    for path in MXIK_FILE_PATHS:
+        abs_path = os.path.abspath(path)
+        if os.path.exists(abs_path):
+            return abs_path
+    return None
+
+
+def compiled_path_for(json_path: str) -> str:
+    """Compiled katalog yo'li (MXIK_INDEX_PATH yoki JSON yonida .idx)"""
+    return os.getenv("MXIK_INDEX_PATH") or os.path.splitext(json_path)[0] + ".idx"
+
+
+def build_query_words(product_name: str, brand: str = "") -> List[str]:
+    """Qidiruv so'zlarini tayyorlash (brand + nom, stop so'zlarsiz)"""
+    search_query = product_name.lower()
+    if brand:
+        search_query = f"{brand.lower()} {search_query}"
+    return [w for w in search_query.split() if w not in MXIK_STOP_WORDS and len(w) > 2]
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def normalize_for_search(text: str) -> List[str]:
+    """
+    Matnni fuzzy qidiruv uchun kanonik token'larga aylantirish
+    (kichik harf, kirill -> lotin, apostroflarsiz)
+
+    "Ko'ylak", "Кўйлак" va "КОЙЛАК" -> ["koylak"]
+    """
+    latin = text.lower().translate(_TRANSLIT_TABLE)
+    return [t for t in _NON_WORD_RE.split(latin) if len(t) > 1]
+
+
+def _padded_trigrams(token: str) -> Set[str]:
+    # So'z boshi/oxiri ham hisobga olinadi ("  t", "on ")
+    return _trigrams(f"  {token} ")
+
+
+def _dice(shared: int, a: int, b: int) -> float:
+    return 2.0 * shared / (a + b) if a + b else 0.0
+
+
+class _ItemView:
+    """Katalog item maydonlariga list kabi murojaat (lazy)"""
+
+    def __init__(self, getter: Callable[[int], str], n: int):
+        self._getter = getter
+        self._n = n
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> str:
+        return self._getter(i)
+
+
+class MXIKIndex:
+    """
+    MXIK kodlari uchun inverted index (MXIKCatalog ustida)
+
+    Katalog compact binary formatda (mmap yoki xotiradagi bytes):
+    token -> posting-list, trigram -> token. So'rov vaqtida faqat
+    kamida bitta so'z mos kelgan item'lar baholanadi.
+    """
+
+    def __init__(self, catalog: MXIKCatalog):
+        self.catalog = catalog
+        self.codes = _ItemView(catalog.code, len(catalog))
+        self.names_uz = _ItemView(catalog.name_uz, len(catalog))
+        self.names_ru = _ItemView(catalog.name_ru, len(catalog))
+
+        # Scoring uchun lowercase nomlar - faqat nomzod bo'lgan item'lar decode qilinadi
+        self._lower_names: List[Optional[Tuple[str, str]]] = [None] * len(catalog)
+        self._whole_names: Optional[List[Tuple[str, Sequence[int]]]] = None
+        self._substring_cache: Dict[str, Set[int]] = {}
+        self._cache_lock = threading.Lock()
+        self._fuzzy_search_cached = lru_cache(maxsize=FUZZY_CACHE_SIZE)(self._fuzzy_search)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Dict[str, Any]]) -> "MXIKIndex":
+        """JSON item'laridan xotirada qurish"""
+        return cls(MXIKCatalog.from_items(items))
+
+    @classmethod
+    def from_file(cls, path: str) -> "MXIKIndex":
+        """JSON fayldan indeks qurish"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_items(json.load(f))
+
+    @classmethod
+    def from_compiled(cls, path: str) -> "MXIKIndex":
+        """Compiled (.idx) faylni read-only mmap qilish"""
+        return cls(MXIKCatalog.open_mapped(path))
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def _tokens_containing(self, word: str) -> List[int]:
+        """word substring bo'lgan vocabulary token id'lari"""
+        tokens = self.catalog.tokens
+        if len(word) < 3:
+            return [t for t in range(len(tokens)) if word in tokens.key(t)]
+
+        grams = sorted((self.catalog.token_grams.get(g) for g in _trigrams(word)), key=len)
+        if not grams or not grams[0]:
+            return []
+        token_ids = set(grams[0])
+        for gram_tokens in grams[1:]:
+            token_ids.intersection_update(gram_tokens)
+        return [t for t in token_ids if word in tokens.key(t)]
+
+    def containing(self, word: str) -> Set[int]:
+        """
+        word'ni nameUz yoki nameRu ichida saqlovchi item'lar
+        (word bo'shliqsiz, shuning uchun bitta token ichida bo'ladi)
+        """
+        cached = self._substring_cache.get(word)
+        if cached is not None:
+            return cached
+
+        ids: Set[int] = set()
+        for token_id in self._tokens_containing(word):
+            ids.update(self.catalog.tokens.postings(token_id))
+
+        with self._cache_lock:
+            if len(self._substring_cache) >= SUBSTRING_CACHE_SIZE:
+                self._substring_cache.clear()
+            self._substring_cache[word] = ids
+        return ids
+
+    def contained_in(self, word: str) -> Set[int]:
+        """To'liq nomi word ichida bo'lgan item'lar"""
+        if self._whole_names is None:
+            whole = self.catalog.whole_names
+            self._whole_names = [(whole.key(i), whole.postings(i)) for i in range(len(whole))]
+
+        ids: Set[int] = set()
+        for name, item_ids in self._whole_names:
+            if name in word:
+                ids.update(item_ids)
+        return ids
+
+    def _phrase_candidates(self, phrase: str) -> Set[int]:
+        """phrase'ni saqlashi mumkin bo'lgan item'lar (superset)"""
+        parts = phrase.split()
+        if not parts:
+            return set(range(len(self)))
+        ids = set(self.containing(parts[0]))
+        for part in parts[1:]:
+            ids &= self.containing(part)
+        return ids
+
+    def score(self, item_id: int, normalized_query: str, query_words: List[str], cat_lower: str = "") -> int:
+        """get_ikpu_for_product scoring algoritmi (bitta item uchun)"""
+        names = self._lower_names[item_id]
+        if names is None:
+            names = (self.names_uz[item_id].lower(), self.names_ru[item_id].lower())
+            self._lower_names[item_id] = names
+        name_uz, name_ru = names
+        score = 0
+
+        # Exact phrase match (highest score)
+        if normalized_query in name_uz or normalized_query in name_ru:
+            score += 100
+
+        # Word-by-word matching
+        for word in query_words:
+            if len(word) < 3:
+                continue
+            if word in name_uz or word in name_ru:
+                score += len(word) * 2  # Longer words = higher score
+            # Partial match (substring)
+            elif any(word in n or n in word for n in [name_uz, name_ru]):
+                score += len(word)
+
+        # Category-based bonus
+        if cat_lower and (cat_lower in name_uz or cat_lower in name_ru):
+            score += 20
+
+        return score
+
+    def _similar_tokens(self, query_token: str) -> Dict[int, float]:
+        """Query token'ga o'xshash vocabulary token'lari (token id -> o'xshashlik)"""
+        query_grams = _padded_trigrams(query_token)
+        shared: Dict[int, int] = {}
+        for gram in query_grams:
+            for token_id in self.catalog.fuzzy_grams.get(gram):
+                shared[token_id] = shared.get(token_id, 0) + 1
+
+        gram_counts = self.catalog.fuzzy_gram_counts
+        similar: Dict[int, float] = {}
+        for token_id, count in shared.items():
+            sim = _dice(count, len(query_grams), gram_counts[token_id])
+            # Prefix bo'lsa oxirgi trigramdan boshqa hammasi umumiy
+            if (len(query_token) >= 3 and count >= len(query_grams) - 1
+                    and self.catalog.fuzzy_tokens.key(token_id).startswith(query_token)):
+                sim = max(sim, FUZZY_PREFIX_SIMILARITY)
+            if sim >= FUZZY_MIN_TOKEN_SIMILARITY:
+                similar[token_id] = sim
+        return similar
+
+    def _fuzzy_search(self, query_tokens: Tuple[str, ...], limit: int) -> Tuple[Tuple[int, int], ...]:
+        """(item id, similarity 0-100) juftliklari, eng o'xshashi birinchi"""
+        item_scores: Dict[int, float] = {}
+        for query_token in query_tokens:
+            # Har bir item uchun shu query token'ning eng yaxshi mosligi
+            best_per_item: Dict[int, float] = {}
+            for token_id, sim in self._similar_tokens(query_token).items():
+                for item_id in self.catalog.fuzzy_tokens.postings(token_id):
+                    if sim > best_per_item.get(item_id, 0.0):
+                        best_per_item[item_id] = sim
+            for item_id, sim in best_per_item.items():
+                item_scores[item_id] = item_scores.get(item_id, 0.0) + sim
+
+        # Teng o'xshashlikda qisqaroq (umumiyroq) nom birinchi
+        ranked = sorted(
+            item_scores.items(),
+            key=lambda x: (-x[1], self.catalog.name_uz_size(x[0]), x[0])
+        )[:limit]
+        return tuple(
+            (item_id, round(100 * score / len(query_tokens)))
+            for item_id, score in ranked
+        )
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Trigram fuzzy search (typeahead uchun, tashqi so'rovsiz)
+
+        Lotin, kirill va rus yozuvlari bir xil kanonik shaklga keltiriladi,
+        shuning uchun "telefon", "телефон" va "telifon" bir xil natija beradi.
+        """
+        query_tokens = tuple(normalize_for_search(query))
+        if not query_tokens or limit <= 0:
+            return []
+
+        return [
+            {
+                "code": self.codes[item_id],
+                "name_uz": self.names_uz[item_id],
+                "name_ru": self.names_ru[item_id],
+                "similarity": similarity
+            }
+            for item_id, similarity in self._fuzzy_search_cached(query_tokens, limit)
+        ]
+
+    def best_match(self, product_name: str, category: str = "", brand: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Mahsulot uchun eng mos MXIK kod
+
+        Natija chiziqli skan bilan bir xil: eng yuqori score,
+        teng bo'lsa fayldagi birinchi item.
+        """
+        query_words = build_query_words(product_name, brand)
+        normalized_query = " ".join(query_words)
+        cat_lower = category.lower() if category else ""
+
+        if not normalized_query:
+            # Bo'sh so'rov har qanday nomga "mos keladi"
+            candidates = set(range(len(self)))
+        else:
+            candidates = set()
+            for word in query_words:
+                candidates |= self.containing(word)
+                candidates |= self.contained_in(word)
+        if cat_lower:
+            candidates |= self._phrase_candidates(cat_lower)
+
+        best_id = None
+        best_score = 0
+        for item_id in sorted(candidates):
+            score = self.score(item_id, normalized_query, query_words, cat_lower)
+            if score > best_score:
+                best_score = score
+                best_id = item_id
+
+        if best_id is None:
+            return None
+
+        return {
+            "code": self.codes[best_id],
+            "name_uz": self.names_uz[best_id],
+            "name_ru": self.names_ru[best_id],
+            "score": best_score
+        }
+
+
+# ========================================
+# PROCESS-WIDE SINGLETON
+# ========================================
+
+_mxik_index: Optional[MXIKIndex] = None
+_mxik_index_loaded = False
+_mxik_index_lock = threading.Lock()
+
+
+def _open_index(json_path: Optional[str]) -> Optional[MXIKIndex]:
+    """Compiled katalogni mmap qilish, bo'lmasa JSON'dan xotirada qurish"""
+    compiled_path = os.getenv("MXIK_INDEX_PATH") or (compiled_path_for(json_path) if json_path else None)
+
+    if compiled_path and os.path.exists(compiled_path):
+        if json_path and os.path.getmtime(json_path) > os.path.getmtime(compiled_path):
+            print(f"⚠️ MXIK compiled catalog is older than {json_path}, rebuild with: python mxik_catalog.py")
+        else:
+            try:
+                return MXIKIndex.from_compiled(compiled_path)
+            except Exception as e:
+                print(f"MXIK compiled catalog error: {e}")
+
+    if not json_path:
+        return None
+    return MXIKIndex.from_file(json_path)
+
+
+def load_mxik_index(path: Optional[str] = None) -> Optional[MXIKIndex]:
+    """Indeksni (qayta) yuklash"""
+    global _mxik_index, _mxik_index_loaded
+
+    with _mxik_index_lock:
+        try:
+            _mxik_index = _open_index(path or find_mxik_file())
+            if _mxik_index is None:
+                print("⚠️ MXIK file not found, index disabled")
+            else:
+                print(f"✅ MXIK index loaded: {len(_mxik_index)} codes, "
+                      f"{len(_mxik_index.catalog.tokens)} tokens ({_mxik_index.catalog.source})")
+        except Exception as e:
+            print(f"MXIK index load error: {e}")
+            _mxik_index = None
+        _mxik_index_loaded = True
+        return _mxik_index
+
+
+def get_mxik_index() -> Optional[MXIKIndex]:
+    """Process-wide indeks (birinchi chaqiruvda yuklanadi)"""
+    if not _mxik_index_loaded:
+        return load_mxik_index()
+    return _mxik_index
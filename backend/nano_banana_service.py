@@ -16,14 +16,16 @@ Reference: Professional marketplace infographics with:
 
 import os
 import base64
-import httpx
 import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from http_clients import http_client
+
 # Emergent LLM Key
 EMERGENT_LLM_KEY = os.getenv("EMERGENT_LLM_KEY", "sk-emergent-c0d5c506030Fa49400")
 IMGBB_API_KEY = os.getenv("IMGBB_API_KEY", "ae8d1c66d2c3b97a5fbed414c9ee4b4f")
+IMGBB_UPLOAD_URL = "https://api.imgbb.com/1/upload"
 
 
 async def upload_to_imgbb(base64_data: str) -> Optional[str]:
@@ -41,9 +43,9 @@ async def upload_to_imgbb(base64_data: str) -> Optional[str]:
             'image': clean_base64
         })
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_client(IMGBB_UPLOAD_URL) as client:
             response = await client.post(
-                'https://api.imgbb.com/1/upload',
+                IMGBB_UPLOAD_URL,
                 content=form_data,
                 headers={'Content-Type': 'application/x-www-form-urlencoded'}
             )
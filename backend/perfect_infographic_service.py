@@ -15,12 +15,13 @@ import os
 import io
 import base64
 import asyncio
-import httpx
 from typing import List, Dict, Any, Optional
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 from datetime import datetime
 from dotenv import load_dotenv
 
+from http_clients import http_client
+
 load_dotenv()
 
 # API Keys
@@ -182,7 +183,7 @@ IMPORTANT: Absolutely NO text or letters in the image!"""
     ) -> Optional[Image.Image]:
         """Replicate Flux Pro bilan rasm yaratish"""
         try:
-            async with httpx.AsyncClient(timeout=60) as client:
+            async with http_client("https://api.replicate.com") as client:
                 # Create prediction
                 response = await client.post(
                     "https://api.replicate.com/v1/predictions",
@@ -199,7 +200,8 @@ IMPORTANT: Absolutely NO text or letters in the image!"""
                             "num_outputs": 1,
                             "guidance_scale": 3.5
                         }
-                    }
+                    },
+                    timeout=60
                 )
                 
                 if response.status_code != 201:
@@ -248,7 +250,7 @@ IMPORTANT: Absolutely NO text or letters in the image!"""
     ) -> Optional[Image.Image]:
         """OpenAI DALL-E bilan rasm yaratish"""
         try:
-            async with httpx.AsyncClient(timeout=60) as client:
+            async with http_client("https://api.openai.com") as client:
                 # DALL-E 3 sizes: 1024x1024, 1024x1792, 1792x1024
                 dalle_size = "1024x1024"
                 if size[1] > size[0]:  # Portrait
@@ -269,7 +271,8 @@ IMPORTANT: Absolutely NO text or letters in the image!"""
                         "size": dalle_size,
                         "quality": "standard",
                         "response_format": "b64_json"
-                    }
+                    },
+                    timeout=60
                 )
                 
                 if response.status_code != 200:
@@ -251,8 +251,8 @@ async def sync_sales_and_calculate_share(
         
         # Get sales data from Yandex
         # Note: Actual implementation depends on Yandex API
-        # For now, we'll use offers data as proxy
-        offers_result = await api.get_all_offers_status(limit=100)
+        # For now, we'll use offers data as proxy (stats - butun katalog bo'yicha)
+        offers_result = await api.get_all_offers_status(limit=0)
         
         if not offers_result.get("success"):
             return {"success": False, "error": "Yandex API xatosi"}
@@ -0,0 +1,309 @@
+"""
+SCAN RESULT CACHE - Perceptual hash AI scan cache
+==================================================
+Bir xil mahsulot rasmi qayta skanerlansa (yoki boshqa partner xuddi
+shu stock rasmni yuklasa) vision model qayta chaqirilmaydi.
+
+Features:
+- Aniq hit: rasm baytlarining SHA-256 digest'i (istalgan partner uchun)
+- 64-bit dHash (qayta siqish / o'lcham o'zgarishiga chidamli)
+- Near-duplicate hit: Hamming masofasi bo'yicha, faqat o'sha partner
+  (owner) o'zi keshlagan natijalar orasida
+- Bounded in-process LRU + persistent tier (PostgreSQL / MongoDB)
+- Persistent tier'da 16-bit band indeksi (bir xil band'li nomzodlar)
+- Scanner bo'yicha alohida namespace (natija formatlari har xil)
+- Hit/miss statistikasi (/api/ai/stats)
+"""
+
+import asyncio
+import base64
+import copy
+import hashlib
+import io
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Tuple
+
+from database import get_scan_cache_candidates, save_scan_cache_entry, utc_now
+
+AI_SCAN_CACHE_ENABLED = os.getenv("AI_SCAN_CACHE_ENABLED", "true").lower() == "true"
+AI_SCAN_CACHE_SIZE = int(os.getenv("AI_SCAN_CACHE_SIZE", "4096"))
+AI_SCAN_CACHE_TTL = int(os.getenv("AI_SCAN_CACHE_TTL", str(30 * 24 * 3600)))
+# Near-duplicate uchun minimal o'xshashlik (1 - hamming / 64)
+AI_SCAN_CACHE_MIN_SIMILARITY = float(os.getenv("AI_SCAN_CACHE_MIN_SIMILARITY", "0.9"))
+
+HASH_BITS = 64
+BAND_BITS = 16
+
+
+def _to_epoch(created_at: datetime) -> float:
+    """Naive UTC datetime (DB) -> epoch seconds"""
+    return created_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _decode_image_bytes(image_base64: str) -> bytes:
+    if "base64," in image_base64:
+        image_base64 = image_base64.split("base64,", 1)[1]
+    return base64.b64decode(image_base64, validate=False)
+
+
+def image_digest(image_base64: str) -> Optional[str]:
+    """Rasm baytlarining SHA-256 digest'i (aniq moslik uchun)"""
+    try:
+        return hashlib.sha256(_decode_image_bytes(image_base64)).hexdigest()
+    except Exception:
+        return None
+
+
+def image_phash(image_base64: str) -> Optional[int]:
+    """
+    Rasmning 64-bit difference hash'i (dHash)
+
+    Rasm 9x8 kulrang ko'rinishga kichraytiriladi va har bir qatorda
+    qo'shni piksellar solishtiriladi. Rasm ochilmasa None.
+    """
+    try:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(_decode_image_bytes(image_base64))) as img:
+            # JPEG: DCT darajasida kichraytirib ochish (to'liq decode'siz)
+            img.draft("L", (64, 64))
+            small = img.convert("L").resize((9, 8), Image.Resampling.BOX)
+            pixels = small.tobytes()
+    except Exception:
+        return None
+
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def phash_bands(phash: int) -> List[str]:
+    """Persistent tier indeksi: 4 ta 16-bit band ('index:hex')"""
+    mask = (1 << BAND_BITS) - 1
+    return [
+        f"{i}:{(phash >> (i * BAND_BITS)) & mask:04x}"
+        for i in range(HASH_BITS // BAND_BITS)
+    ]
+
+
+class ScanResultCache:
+    """
+    AI scan natijalari uchun 2 bosqichli kesh
+
+    - LRU: (namespace, digest) -> (natija, vaqt, phash, owner)
+    - persistent: digest bo'yicha aniq yoki band'lari mos nomzodlar,
+      keyin Hamming masofasi tekshiriladi
+      (4 band: masofa <= 3 bo'lsa albatta topiladi, kattaroq - ehtimoliy)
+
+    Near-duplicate natija boshqa mahsulotniki bo'lishi mumkin, shuning uchun
+    u faqat owner (partner) o'z keshidan oladi; boshqalarga faqat aniq
+    (digest) hit beriladi.
+    """
+
+    def __init__(
+        self,
+        max_size: int = AI_SCAN_CACHE_SIZE,
+        ttl: int = AI_SCAN_CACHE_TTL,
+        min_similarity: float = AI_SCAN_CACHE_MIN_SIMILARITY,
+        persistent: bool = True,
+        enabled: bool = AI_SCAN_CACHE_ENABLED
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.min_similarity = min_similarity
+        self.max_distance = int((1 - min_similarity) * HASH_BITS + 1e-9)
+        self.persistent = persistent
+        self.enabled = enabled
+
+        self._lru: "OrderedDict[Tuple[str, str], Tuple[Any, float, int, Optional[str]]]" = OrderedDict()
+
+        # Stats
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+
+    def _remember(
+        self,
+        namespace: str,
+        digest: str,
+        phash: int,
+        owner: Optional[str],
+        result: Any,
+        created_at: float
+    ):
+        key = (namespace, digest)
+        self._lru[key] = (result, created_at, phash, owner)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def _lookup_memory(
+        self,
+        namespace: str,
+        phash: int,
+        digest: Optional[str],
+        owner: Optional[str]
+    ) -> Optional[Tuple[Any, int]]:
+        """(natija, masofa) - avval aniq digest, keyin owner'ning eng yaqin near-duplicate'i"""
+        now = time.time()
+        entry = self._lru.get((namespace, digest)) if digest else None
+        if entry is not None and now - entry[1] < self.ttl:
+            self._lru.move_to_end((namespace, digest))
+            return entry[0], 0
+
+        if owner is None:
+            return None
+        best = None
+        for (ns, cached_digest), (result, created_at, cached_hash, cached_owner) in self._lru.items():
+            if ns != namespace or cached_owner != owner or now - created_at >= self.ttl:
+                continue
+            distance = hamming(phash, cached_hash)
+            if distance <= self.max_distance and (best is None or distance < best[1]):
+                best = (result, distance, cached_digest)
+        if best is None:
+            return None
+        self._lru.move_to_end((namespace, best[2]))
+        # dHash bir xil bo'lsa ham baytlar boshqa - near-duplicate sifatida hisoblanadi
+        return best[0], max(best[1], 1)
+
+    async def _lookup_persistent(
+        self,
+        namespace: str,
+        phash: int,
+        digest: Optional[str],
+        owner: Optional[str]
+    ) -> Optional[Tuple[Any, int]]:
+        if not self.persistent:
+            return None
+        try:
+            candidates = await get_scan_cache_candidates(namespace, phash_bands(phash), digest, owner)
+        except Exception as e:
+            print(f"Scan cache read error: {e}")
+            return None
+
+        now = time.time()
+        best = None
+        for row in candidates:
+            created_at = _to_epoch(row["created_at"])
+            if now - created_at >= self.ttl:
+                continue
+            cached_hash = int(row["phash"], 16)
+            if digest and row["digest"] == digest:
+                distance = 0
+            elif owner is not None and row.get("owner") == owner:
+                distance = max(hamming(phash, cached_hash), 1)
+            else:
+                continue
+            if distance <= self.max_distance and (best is None or distance < best[1]):
+                best = (row, distance, cached_hash, created_at)
+        if best is None:
+            return None
+        row = best[0]
+        self._remember(namespace, row["digest"], best[2], row.get("owner"), row["result"], best[3])
+        return row["result"], best[1]
+
+    async def lookup(
+        self,
+        namespace: str,
+        phash: int,
+        digest: Optional[str] = None,
+        owner: Optional[str] = None
+    ) -> Optional[Tuple[Any, float]]:
+        """(natija nusxasi, o'xshashlik) yoki None"""
+        found = self._lookup_memory(namespace, phash, digest, owner)
+        if found is not None:
+            if found[1] == 0:
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+        else:
+            found = await self._lookup_persistent(namespace, phash, digest, owner)
+            if found is not None:
+                self.persistent_hits += 1
+        if found is None:
+            self.misses += 1
+            return None
+        result, distance = found
+        return copy.deepcopy(result), 1 - distance / HASH_BITS
+
+    async def store(self, namespace: str, phash: int, digest: str, result: Any, owner: Optional[str] = None):
+        result = copy.deepcopy(result)
+        self._remember(namespace, digest, phash, owner, result, time.time())
+        if self.persistent:
+            try:
+                await save_scan_cache_entry(
+                    namespace, digest, f"{phash:016x}", phash_bands(phash), owner, result, utc_now()
+                )
+            except Exception as e:
+                print(f"Scan cache write error: {e}")
+
+    async def get_or_scan(
+        self,
+        namespace: str,
+        image_base64: str,
+        scan: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = bool,
+        owner: Optional[str] = None
+    ) -> Any:
+        """
+        Keshdan olish yoki scan() chaqirish
+
+        cacheable(natija) False bo'lsa (masalan success=False) natija keshlanmaydi.
+        owner - autentifikatsiya qilingan partner ID; near-duplicate hit faqat
+        shu owner keshlagan natijalardan olinadi (None - faqat aniq hit).
+        """
+        if not self.enabled:
+            return await scan()
+
+        phash = await asyncio.to_thread(image_phash, image_base64)
+        digest = image_digest(image_base64) if phash is not None else None
+        if phash is None or digest is None:
+            self.uncacheable += 1
+            return await scan()
+
+        found = await self.lookup(namespace, phash, digest, owner)
+        if found is not None:
+            return found[0]
+
+        result = await scan()
+        if cacheable(result):
+            await self.store(namespace, phash, digest, result, owner)
+        return result
+
+    def clear(self):
+        """In-process LRU'ni tozalash (persistent tier saqlanadi)"""
+        self._lru.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Kesh statistikasi"""
+        hits = self.exact_hits + self.near_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._lru),
+            "max_size": self.max_size,
+            "min_similarity": self.min_similarity,
+            "hits": hits,
+            "exact_hits": self.exact_hits,
+            "near_duplicate_hits": self.near_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "uncacheable": self.uncacheable,
+            "hit_rate": round(hits / lookups * 100, 1) if lookups else 0.0
+        }
+
+
+# Singleton
+scan_result_cache = ScanResultCache()
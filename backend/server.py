@@ -5,7 +5,7 @@ Full authentication, chat, admin and partner management
 """
 from fastapi import FastAPI, Request, Response, File, UploadFile, Form, HTTPException, Depends, Cookie
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import httpx
@@ -13,6 +13,7 @@ import os
 import base64
 import json
 import asyncio
+from contextlib import aclosing
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 
@@ -33,6 +34,18 @@ from database import (
     serialize_doc, serialize_pg_row, USE_POSTGRES, get_pool
 )
 
+# MXIK/IKPU in-memory index
+from mxik_index import get_mxik_index
+
+# Upstream host bo'yicha umumiy (pool'li) HTTP klientlar
+from http_clients import http_clients, http_client
+
+# Uzum buyurtmalari / qoldiqlari - fon sinxronizatsiyasi (DB'dan o'qish)
+from uzum_sync import (
+    uzum_sync_worker, PLATFORM_ACCOUNT as UZUM_PLATFORM_ACCOUNT,
+    read_orders as read_uzum_orders, read_stocks as read_uzum_stocks, get_sync_status as get_uzum_sync_status
+)
+
 # Import AI service
 from ai_service import generate_product_card, scan_product_image, optimize_price
 
@@ -72,6 +85,8 @@ from yandex_rules import (
     YANDEX_CATEGORIES
 )
 from yandex_service import YandexMarketAPI, YandexCardGenerator
+from compliance_engine import compliance_engine
+from bulk_pricing import calculate_bulk_prices, calculate_price_matrix, round_columns, to_records, PRICE_MATRIX_CHANNELS
 
 # Infographic Generator import
 from infographic_service import InfographicGenerator
@@ -95,8 +110,10 @@ try:
         load_balancer,
         balanced_scan_product,
         balanced_generate_text,
-        get_ai_stats
+        get_ai_stats,
+        get_ai_metrics
     )
+    from card_stream import stream_product_card, stream_yandex_card, SSE_HEADERS
     AI_LOAD_BALANCER_AVAILABLE = True
     print("✅ AI Load Balancer loaded")
 except ImportError as e:
@@ -134,6 +151,17 @@ async def global_exception_handler(request: Request, exc: Exception):
 @app.on_event("startup")
 async def startup():
     await connect_db()
+    # MXIK index - bir marta yuklanadi (har bir so'rovda JSON o'qilmaydi)
+    await asyncio.to_thread(get_mxik_index)
+    # Uzum buyurtmalari / qoldiqlari fonda DB'ga sinxronlanadi
+    uzum_sync_worker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await uzum_sync_worker.stop()
+    # Umumiy HTTP klientlar (keep-alive ulanishlar) yopiladi
+    await http_clients.aclose()
 
 # CORS
 app.add_middleware(
@@ -1064,15 +1092,44 @@ async def delete_marketplace_integration(marketplace: str, request: Request):
 # PRODUCTS ENDPOINTS
 # ========================================
 
+def _yandex_offer_to_product(item: dict) -> dict:
+    """offer-mappings elementi -> mahsulot formati"""
+    offer = item.get("offer", {})
+    status = YandexMarketAPI.offer_status(item)
+    return {
+        "id": offer.get("offerId", ""),
+        "name": offer.get("name", ""),
+        "sku": offer.get("offerId", ""),
+        "category": offer.get("category") or "general",
+        "price": (offer.get("basicPrice") or {}).get("value", 0),
+        "costPrice": 0,  # Not available from Yandex
+        "stockQuantity": 1 if status == "READY" else 0,
+        "isActive": status == "READY",
+        "createdAt": "",
+        "marketplace": "yandex",
+        "marketplaceStatus": status
+    }
+
+
 @app.get("/api/partner/products")
-async def get_partner_products(request: Request):
-    """Get partner's products - REAL DATA from Yandex Market if connected"""
+async def get_partner_products(request: Request, limit: Optional[int] = None, offset: int = 0):
+    """
+    Get partner's products - REAL DATA from Yandex Market if connected
+
+    limit berilmasa butun katalog qaytadi. limit berilsa katalog faqat
+    offset + limit oynasi to'lguncha o'qiladi; total keshlangan dashboard
+    statistikasidan olinadi.
+    """
     user = await require_auth(request)
     partner = await get_partner_by_user_id(user["id"])
     
     if not partner:
         raise HTTPException(status_code=404, detail="Partner topilmadi")
     
+    if limit is not None:
+        limit = max(0, min(limit, 1000))
+    offset = max(0, offset)
+    
     # Try to get real products from Yandex Market if connected
     try:
         creds = await get_marketplace_credentials(partner["id"])
@@ -1099,50 +1156,53 @@ async def get_partner_products(request: Request):
                     business_id=business_id,
                     campaign_id=campaign_id
                 )
-                # Get real offers from Yandex Market
-                offers_result = await yandex_api.get_all_offers_status()
-                if offers_result.get("success") and offers_result.get("offers"):
-                    # Convert Yandex offers to product format
-                    yandex_products = []
-                    for offer in offers_result.get("offers", [])[:100]:  # Limit to 100
-                        # Handle price field - can be dict or number
-                        price_value = 0
-                        price_obj = offer.get("price")
-                        if isinstance(price_obj, dict):
-                            price_value = price_obj.get("value", 0)
-                        elif isinstance(price_obj, (int, float)):
-                            price_value = price_obj
-                        
-                        yandex_products.append({
-                            "id": offer.get("offerId", ""),
-                            "name": offer.get("name", ""),
-                            "sku": offer.get("offerId", ""),
-                            "category": offer.get("category", "general"),
-                            "price": price_value,
-                            "costPrice": 0,  # Not available from Yandex
-                            "stockQuantity": 1 if offer.get("availability") == "ACTIVE" else 0,
-                            "isActive": offer.get("availability") == "ACTIVE",
-                            "createdAt": offer.get("createdAt", ""),
-                            "marketplace": "yandex",
-                            "marketplaceStatus": offer.get("availability", "UNKNOWN")
-                        })
-                    
-                    if yandex_products:
-                        return {
-                            "success": True,
-                            "data": yandex_products,
-                            "total": len(yandex_products),
-                            "source": "yandex_market"
-                        }
+                # Katalog sahifalab o'qiladi va oyna to'lgach to'xtatiladi
+                yandex_products = []
+                seen = 0
+                has_more = False
+                async with aclosing(yandex_api.iter_offer_mappings()) as pages:
+                    async for page in pages:
+                        for item in page:
+                            seen += 1
+                            if seen <= offset:
+                                continue
+                            if limit is not None and len(yandex_products) >= limit:
+                                has_more = True
+                                break
+                            yandex_products.append(_yandex_offer_to_product(item))
+                        if has_more:
+                            break
+                
+                total = seen
+                if has_more:
+                    # Katalog oxirigacha o'qilmadi - total dashboard keshidan (statistika butun katalog bo'yicha)
+                    dashboard, _ = await yandex_dashboard_cache.get_or_fetch(
+                        yandex_dashboard_cache.make_key(partner["id"], oauth_token, business_id, campaign_id),
+                        yandex_api.get_dashboard_data,
+                        cacheable=is_complete_dashboard
+                    )
+                    total = max(((dashboard or {}).get("products") or {}).get("total", 0), seen)
+                
+                if seen:
+                    return {
+                        "success": True,
+                        "data": yandex_products,
+                        "total": total,
+                        "limit": limit,
+                        "offset": offset,
+                        "has_more": has_more,
+                        "source": "yandex_market"
+                    }
     except Exception as e:
         print(f"⚠️ Error fetching Yandex products: {e}")
         # Fall through to local products
     
     # Fallback to local products
     products = await get_products_by_partner(partner["id"])
+    end = offset + limit if limit is not None else None
     return {
         "success": True,
-        "data": products,
+        "data": products[offset:end],
         "total": len(products),
         "source": "local"
     }
@@ -1394,6 +1454,77 @@ async def api_generate_card(request: ProductCardRequest):
     return JSONResponse(content=result)
 
 
+@app.post("/api/ai/generate-card/stream")
+async def api_generate_card_stream(request: ProductCardRequest, http_request: Request):
+    """
+    Kartochka generatsiya - Server-Sent Events
+    
+    Event'lar: start, field (title, shortDescription, bulletPoints,
+    description, ... tayyor bo'lishi bilan), validation (stop so'zlar), done / error
+    """
+    if not AI_LOAD_BALANCER_AVAILABLE:
+        raise HTTPException(status_code=503, detail="AI Load Balancer mavjud emas")
+    
+    partner_key = http_request.headers.get("X-Partner-Id") or (http_request.client.host if http_request.client else None)
+    return StreamingResponse(
+        stream_product_card(
+            name=request.name,
+            category=request.category,
+            description=request.description,
+            price=request.price,
+            marketplace=request.marketplace,
+            partner_id=partner_key
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+class BulkTextGenerationRequest(BaseModel):
+    prompts: List[str]
+    system: Optional[str] = ""
+
+
+AI_BULK_TEXT_MAX_ITEMS = 500
+
+
+@app.post("/api/ai/generate-text/bulk")
+async def api_generate_text_bulk(request: BulkTextGenerationRequest, http_request: Request):
+    """
+    Bulk matn generatsiya (kartochka / tarjima / SEO)
+    
+    Kichik prompt'lar AI_BATCH_MAX_SIZE tadan bitta so'rovga yig'iladi,
+    natijalar kiruvchi tartibda qaytariladi.
+    """
+    if not AI_LOAD_BALANCER_AVAILABLE:
+        raise HTTPException(status_code=503, detail="AI Load Balancer mavjud emas")
+    if len(request.prompts) > AI_BULK_TEXT_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bitta so'rovda maksimum {AI_BULK_TEXT_MAX_ITEMS} ta prompt"
+        )
+    
+    partner_key = http_request.headers.get("X-Partner-Id") or (http_request.client.host if http_request.client else None)
+    results = await asyncio.gather(*(
+        balanced_generate_text(
+            prompt, request.system or "", priority="background", partner_id=partner_key, batch=True
+        )
+        for prompt in request.prompts
+    ))
+    
+    return {
+        "success": True,
+        "total": len(results),
+        "succeeded": sum(1 for r in results if r.get("success")),
+        "results": [
+            {"index": i, "success": True, "text": r["data"], "provider": r.get("provider")}
+            if r.get("success") else
+            {"index": i, "success": False, "error": r.get("error"), "code": r.get("code")}
+            for i, r in enumerate(results)
+        ]
+    }
+
+
 @app.post("/api/ai/scan-image")
 async def api_scan_image(file: UploadFile = File(...)):
     """Scan product from uploaded image"""
@@ -1457,7 +1588,7 @@ async def api_ai_status():
 async def uzum_test_connection():
     """Test Uzum Market API connection"""
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_client(UZUM_BASE_URL) as client:
             response = await client.get(
                 f"{UZUM_BASE_URL}/v2/fbs/sku/stocks",
                 headers={
@@ -1489,10 +1620,26 @@ async def uzum_test_connection():
 
 
 @app.get("/api/uzum-market/stocks")
-async def uzum_get_stocks():
-    """Get all SKU stocks from Uzum Market"""
+async def uzum_get_stocks(limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Get all SKU stocks from Uzum Market
+    
+    Sinxronlangan bo'lsa DB'dan (limit / cursor bilan), aks holda Uzum API'dan.
+    """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        synced = await read_uzum_stocks(UZUM_PLATFORM_ACCOUNT, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if synced is not None:
+        return {
+            "success": True,
+            "data": {"payload": {"skuAmountList": synced.pop("skuAmountList")}},
+            "source": "db",
+            **synced
+        }
+    
+    try:
+        async with http_client(UZUM_BASE_URL) as client:
             response = await client.get(
                 f"{UZUM_BASE_URL}/v2/fbs/sku/stocks",
                 headers={
@@ -1521,10 +1668,27 @@ async def uzum_get_stocks():
 
 
 @app.get("/api/uzum-market/orders")
-async def uzum_get_orders(limit: int = 10, offset: int = 0):
-    """Get FBS orders from Uzum Market"""
+async def uzum_get_orders(limit: int = 10, offset: int = 0, cursor: Optional[str] = None, status: Optional[str] = None):
+    """
+    Get FBS orders from Uzum Market
+    
+    Sinxronlangan bo'lsa DB'dan: eng yangisi birinchi, keyingi sahifa uchun
+    next_cursor (offset o'rniga - yangi buyurtmalar kelganda ham barqaror).
+    """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        synced = await read_uzum_orders(UZUM_PLATFORM_ACCOUNT, limit, offset, cursor, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if synced is not None:
+        return {
+            "success": True,
+            "data": {"payload": {"orders": synced.pop("orders")}},
+            "source": "db",
+            **synced
+        }
+    
+    try:
+        async with http_client(UZUM_BASE_URL) as client:
             response = await client.get(
                 f"{UZUM_BASE_URL}/v2/fbs/orders",
                 params={"limit": limit, "offset": offset},
@@ -1557,7 +1721,7 @@ async def uzum_get_orders(limit: int = 10, offset: int = 0):
 async def uzum_get_orders_count():
     """Get FBS orders count from Uzum Market"""
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_client(UZUM_BASE_URL) as client:
             response = await client.get(
                 f"{UZUM_BASE_URL}/v2/fbs/orders/count",
                 headers={
@@ -1830,7 +1994,7 @@ async def ai_manager_stats():
     """Get AI Manager statistics"""
     try:
         # Get Uzum stocks for stats
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_client(UZUM_BASE_URL) as client:
             response = await client.get(
                 f"{UZUM_BASE_URL}/v2/fbs/sku/stocks",
                 headers={
@@ -1877,6 +2041,10 @@ async def ai_manager_stats():
 
 from credentials_service import MarketplaceCredentials, get_supported_marketplaces
 from ikpu_service import IKPUService, COMMON_IKPU_CODES
+from ikpu_cache import ikpu_search_cache
+from dashboard_cache import yandex_dashboard_cache, is_complete_dashboard
+from scan_cache import scan_result_cache
+from ai_singleflight import text_generation_cache
 from uzum_automation_service import UzumProductPreparer
 from yandex_auto_creator import YandexAutoCreator, PartnerSettings, ProductScanResult
 
@@ -2805,8 +2973,16 @@ async def mobile_scanner_analyze_base64(request: AnalyzeBase64Request):
         if image_base64.startswith('data:'):
             image_base64 = image_base64.split(',')[1]
         
-        # AI bilan rasmni tahlil qilish
-        result = await scan_product_image(image_base64)
+        # AI bilan rasmni tahlil qilish (kritik yo'l - hedged so'rov)
+        if AI_LOAD_BALANCER_AVAILABLE:
+            balanced = await balanced_scan_product(image_base64, priority="interactive", hedge=True)
+            result = {
+                "success": balanced.get("success", False),
+                "product": balanced.get("data") or {},
+                "error": balanced.get("error") or "Mahsulot aniqlanmadi"
+            }
+        else:
+            result = await scan_product_image(image_base64)
         
         if result.get("success"):
             product = result.get("product", {})
@@ -2922,15 +3098,69 @@ async def get_uzum_rules():
 
 @app.post("/api/unified-scanner/validate-text")
 async def validate_text_for_uzum(text: str):
-    """Matnni Uzum qoidalariga tekshirish"""
-    result = check_stop_words(text)
+    """
+    Matnni Uzum qoidalariga tekshirish
+
+    Eski bitta-matnli endpoint; ko'p matn va barcha marketplace'lar
+    uchun /api/compliance/validate-batch ishlatilsin.
+    """
+    result = compliance_engine.validate(text, "description", ["uzum"], include_cleaned=True)["marketplaces"]["uzum"]
+    found_words = result["found_words"]
     return {
         "success": True,
-        "validation": result,
-        "cleaned_text": remove_stop_words(text) if result["has_stop_words"] else text
+        "validation": {
+            "has_stop_words": len(found_words) > 0,
+            "found_words": found_words,
+            "is_valid": len(found_words) == 0
+        },
+        "cleaned_text": result["cleaned_text"]
     }
 
 
+class ComplianceBatchItem(BaseModel):
+    """Tekshiriladigan kartochka matni"""
+    id: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+
+
+class ComplianceBatchRequest(BaseModel):
+    """Batch compliance so'rovi"""
+    items: List[ComplianceBatchItem]
+    marketplaces: List[str] = ["uzum", "yandex"]
+    include_cleaned: bool = False
+
+
+COMPLIANCE_BATCH_MAX_ITEMS = 10000
+
+
+@app.post("/api/compliance/validate-batch")
+async def validate_compliance_batch(request: ComplianceBatchRequest):
+    """
+    Ko'p kartochka sarlavha/tavsifini barcha marketplace qoidalariga tekshirish
+
+    Har bir matn bitta o'tishda STOP_WORDS, YANDEX_STOP_WORDS,
+    CARD_REQUIREMENTS va YANDEX_CARD_REQUIREMENTS bo'yicha tekshiriladi.
+    """
+    if len(request.items) > COMPLIANCE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bitta so'rovda maksimum {COMPLIANCE_BATCH_MAX_ITEMS} ta kartochka"
+        )
+    unknown = [mp for mp in request.marketplaces if mp not in compliance_engine.marketplaces]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Noma'lum marketplace: {', '.join(unknown)} (mavjud: {', '.join(compliance_engine.marketplaces)})"
+        )
+
+    items = [item.model_dump() for item in request.items]
+    result = await asyncio.to_thread(
+        compliance_engine.validate_batch, items, request.marketplaces, request.include_cleaned
+    )
+    return {"success": True, **result}
+
+
 # ========================================
 # YANDEX MARKET INTEGRATION
 # ========================================
@@ -3157,6 +3387,180 @@ async def yandex_calculate_price(
         }
 
 
+class BulkPricingRequest(BaseModel):
+    """Katalog narxlash (kolonkali)"""
+    marketplace: str = "uzum"  # uzum | yandex
+    cost_price: List[float]
+    category: List[str]
+    subcategory: Optional[List[Optional[str]]] = None
+    weight_kg: Optional[List[float]] = None
+    fulfillment: Optional[List[str]] = None
+    selling_price: Optional[List[Optional[float]]] = None  # faqat Uzum
+    target_margin: float = 25
+    business_type: str = "ip"  # Uzum: ip | llc
+    payout_frequency: str = "weekly"  # Yandex
+    format: str = "columns"  # columns | records
+
+
+BULK_PRICING_MAX_ITEMS = 100000
+
+
+@app.post("/api/pricing/bulk")
+async def bulk_pricing(request: BulkPricingRequest):
+    """
+    Butun katalog uchun narx kalkulyatsiyasi (vektorlashtirilgan)
+
+    calculate_full_price / calculate_yandex_price bilan bir xil natija,
+    lekin har bir SKU uchun alohida chaqiruvsiz. format="records"
+    bo'lsa har bir SKU skalyar endpoint'lar shaklida qaytadi.
+    """
+    n = len(request.cost_price)
+    if n > BULK_PRICING_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Bitta so'rovda maksimum {BULK_PRICING_MAX_ITEMS} ta SKU")
+    if request.marketplace not in ("uzum", "yandex"):
+        raise HTTPException(status_code=400, detail="marketplace: uzum yoki yandex")
+    columns = {
+        "category": request.category,
+        "subcategory": request.subcategory,
+        "weight_kg": request.weight_kg,
+        "fulfillment": request.fulfillment,
+        "selling_price": request.selling_price,
+    }
+    for name, values in columns.items():
+        if values is not None and len(values) != n:
+            raise HTTPException(status_code=400, detail=f"{name} uzunligi cost_price bilan bir xil bo'lishi kerak ({n})")
+
+    fulfillment = request.fulfillment or ["fbs"] * n
+    selling_price = None
+    if request.selling_price is not None:
+        selling_price = [p or 0 for p in request.selling_price]
+
+    def compute() -> Dict[str, Any]:
+        result = calculate_bulk_prices(
+            request.marketplace,
+            request.cost_price,
+            request.category,
+            subcategories=request.subcategory,
+            weight_kg=request.weight_kg if request.weight_kg is not None else 1.0,
+            fulfillment=fulfillment,
+            target_margin=request.target_margin,
+            business_type=request.business_type,
+            payout_frequency=request.payout_frequency,
+            selling_price=selling_price
+        )
+        if request.format == "records":
+            return {"results": to_records(
+                request.marketplace, result, fulfillment, request.business_type, request.payout_frequency
+            )}
+        return {"columns": round_columns(result)}
+
+    try:
+        # 100k SKU - event loop'ni band qilmaslik uchun thread'da
+        payload = await asyncio.to_thread(compute)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+    return {
+        "success": True,
+        "marketplace": request.marketplace,
+        "count": n,
+        **payload
+    }
+
+
+class PriceMatrixItem(BaseModel):
+    """Katalogdagi bitta SKU"""
+    sku: Optional[str] = None
+    cost_price: float
+    category: str = "default"
+    subcategory: Optional[str] = None
+    weight_kg: float = 1.0
+
+
+class PriceMatrixRequest(BaseModel):
+    """SKU x marketplace x fulfillment matritsasi so'rovi"""
+    items: List[PriceMatrixItem]
+    channels: Optional[List[str]] = None  # ["uzum:fbs", "yandex:fby", ...], default - hammasi
+    target_margin: float = 25
+    business_type: str = "ip"
+    payout_frequency: str = "weekly"
+    best_by: str = "net_profit"  # net_profit | actual_margin
+
+
+@app.post("/api/pricing/matrix")
+async def pricing_matrix(request: PriceMatrixRequest):
+    """
+    Qayerda sotish foydaliroq: SKU x marketplace x fulfillment matritsasi
+
+    Har bir kanal uchun optimal narx, sof foyda va marja, hamda
+    har bir SKU uchun eng yaxshi kanal - bitta batched hisoblashda.
+    """
+    n = len(request.items)
+    if n > BULK_PRICING_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Bitta so'rovda maksimum {BULK_PRICING_MAX_ITEMS} ta SKU")
+    if request.best_by not in ("net_profit", "actual_margin"):
+        raise HTTPException(status_code=400, detail="best_by: net_profit yoki actual_margin")
+
+    channels = None
+    if request.channels:
+        channels = [tuple(c.lower().split(":", 1)) for c in request.channels]
+        invalid = [c for c, parsed in zip(request.channels, channels) if parsed not in PRICE_MATRIX_CHANNELS]
+        if invalid:
+            available = ", ".join(f"{mp}:{ff}" for mp, ff in PRICE_MATRIX_CHANNELS)
+            raise HTTPException(status_code=400, detail=f"Noma'lum kanal: {', '.join(invalid)} (mavjud: {available})")
+
+    if n == 0:
+        return {
+            "success": True,
+            "count": 0,
+            "channels": [],
+            "best_by": request.best_by,
+            "rows": [],
+            "best_channel_counts": {}
+        }
+
+    items = request.items
+    matrix = await asyncio.to_thread(
+        calculate_price_matrix,
+        [i.cost_price for i in items],
+        [i.category for i in items],
+        [i.subcategory for i in items],
+        weight_kg=[i.weight_kg for i in items],
+        target_margin=request.target_margin,
+        business_type=request.business_type,
+        payout_frequency=request.payout_frequency,
+        channels=channels
+    )
+
+    channel_names = [f"{mp}:{ff}" for mp, ff in matrix["channels"]]
+    best = matrix[request.best_by].argmax(axis=1).tolist()
+    optimal = matrix["optimal_price"].round().astype(int).tolist()
+    profit = matrix["net_profit"].round().astype(int).tolist()
+    margin = matrix["actual_margin"].round(1).tolist()
+
+    rows = []
+    best_counts: Dict[str, int] = {}
+    for i, item in enumerate(items):
+        best_channel = channel_names[best[i]]
+        best_counts[best_channel] = best_counts.get(best_channel, 0) + 1
+        rows.append({
+            "sku": item.sku,
+            "optimal_price": optimal[i],
+            "net_profit": profit[i],
+            "actual_margin": margin[i],
+            "best_channel": best_channel
+        })
+
+    return {
+        "success": True,
+        "count": n,
+        "channels": channel_names,
+        "best_by": request.best_by,
+        "rows": rows,
+        "best_channel_counts": best_counts
+    }
+
+
 # ========================================
 # YANDEX MARKET - TO'LIQ AVTOMATLASHTIRISH (REAL API)
 # ========================================
@@ -3441,6 +3845,86 @@ async def yandex_get_partner_products(partner_id: str, page: int = 1, page_size:
         }
 
 
+class YandexPriceUpdate(BaseModel):
+    offer_id: str
+    price: float
+    currency: Optional[str] = None
+    discount_base: Optional[float] = None
+
+
+class YandexStockUpdate(BaseModel):
+    offer_id: str
+    count: int
+    warehouse_id: Optional[int] = None
+
+
+class YandexBulkUpdateRequest(BaseModel):
+    """Ommaviy narx / qoldiq yangilash (retry_items ni qayta yuborish mumkin)"""
+    prices: List[YandexPriceUpdate] = []
+    stocks: List[YandexStockUpdate] = []
+    currency: str = "UZS"
+
+
+@app.post("/api/partner/yandex/bulk-update")
+async def yandex_partner_bulk_update(body: YandexBulkUpdateRequest, request: Request):
+    """
+    Partner mahsulotlari narx va qoldiqlarini ommaviy yangilash
+    
+    Partner sessiyadan aniqlanadi (path'dan emas). Yandex limitlari
+    bo'yicha chunk'larga bo'linib parallel yuboriladi. Har bir offer
+    natijasi qaytariladi; muvaffaqiyatsiz chunk'lar retry_items orqali
+    qayta yuboriladi.
+    """
+    user = await require_auth(request)
+    partner = await get_partner_by_user_id(user["id"])
+    
+    if not partner:
+        raise HTTPException(status_code=404, detail="Partner topilmadi")
+    
+    if not body.prices and not body.stocks:
+        raise HTTPException(status_code=400, detail="prices yoki stocks kerak")
+    
+    creds = await get_marketplace_credentials(partner["id"])
+    yandex_creds = None
+    for c in creds:
+        if c.get("marketplace") == "yandex":
+            api_creds = c.get("api_credentials") or c.get("credentials", {})
+            if isinstance(api_creds, str):
+                try:
+                    api_creds = json.loads(api_creds)
+                except:
+                    api_creds = {}
+            yandex_creds = api_creds
+            break
+    
+    if not yandex_creds:
+        return {"success": False, "error": "Yandex Market kredensiallar topilmadi"}
+    
+    yandex_token = yandex_creds.get("api_key") or yandex_creds.get("oauth_token")
+    if not yandex_token:
+        return {"success": False, "error": "OAuth token topilmadi"}
+    
+    api = YandexMarketAPI(
+        oauth_token=yandex_token,
+        business_id=yandex_creds.get("business_id"),
+        campaign_id=yandex_creds.get("campaign_id")
+    )
+    
+    tasks = {}
+    if body.prices:
+        tasks["prices"] = api.bulk_update_prices(
+            [item.dict(exclude_none=True) for item in body.prices], currency=body.currency
+        )
+    if body.stocks:
+        tasks["stocks"] = api.bulk_update_stocks([item.dict(exclude_none=True) for item in body.stocks])
+    
+    results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+    return {
+        "success": all(result.get("success") for result in results.values()),
+        **results
+    }
+
+
 # ========================================
 # UZUM MARKET - DIRECT API (NO BROWSER!)
 # ========================================
@@ -3460,8 +3944,21 @@ async def uzum_api_test_connection(api_key: str):
 
 
 @app.get("/api/uzum-api/stocks")
-async def uzum_api_get_stocks(api_key: str):
-    """Barcha SKU zaxiralarini olish"""
+async def uzum_api_get_stocks(api_key: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Barcha SKU zaxiralarini olish (kalit sinxronlanayotgan bo'lsa DB'dan)"""
+    account_id = uzum_sync_worker.account_for_key(api_key)
+    if account_id:
+        try:
+            synced = await read_uzum_stocks(account_id, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if synced is not None:
+            return {
+                "success": True,
+                "data": {"skuAmountList": synced.pop("skuAmountList")},
+                "source": "db",
+                **synced
+            }
     try:
         api = UzumAPI(api_key)
         result = await api.get_stocks()
@@ -3471,8 +3968,21 @@ async def uzum_api_get_stocks(api_key: str):
 
 
 @app.get("/api/uzum-api/orders")
-async def uzum_api_get_orders(api_key: str, limit: int = 10, offset: int = 0):
-    """FBS buyurtmalarini olish"""
+async def uzum_api_get_orders(api_key: str, limit: int = 10, offset: int = 0, cursor: Optional[str] = None):
+    """FBS buyurtmalarini olish (kalit sinxronlanayotgan bo'lsa DB'dan)"""
+    account_id = uzum_sync_worker.account_for_key(api_key)
+    if account_id:
+        try:
+            synced = await read_uzum_orders(account_id, limit, offset, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if synced is not None:
+            return {
+                "success": True,
+                "data": {"orders": synced.pop("orders")},
+                "source": "db",
+                **synced
+            }
     try:
         api = UzumAPI(api_key)
         result = await api.get_orders(limit, offset)
@@ -3503,6 +4013,97 @@ async def uzum_api_update_price(api_key: str, sku_id: int, price: int):
         return {"success": False, "error": str(e)}
 
 
+# ========================================
+# UZUM MARKET - PARTNER DATA (SYNCED DB)
+# ========================================
+
+async def _get_partner_uzum_key(partner_id: str) -> Optional[str]:
+    """Partnerning saqlangan Uzum API kaliti"""
+    for c in await get_marketplace_credentials(partner_id, "uzum"):
+        api_creds = c.get("api_credentials") or c.get("credentials", {})
+        if isinstance(api_creds, str):
+            try:
+                api_creds = json.loads(api_creds)
+            except:
+                api_creds = {}
+        if api_creds.get("api_key"):
+            return api_creds["api_key"]
+    return None
+
+
+async def _require_partner(request: Request) -> dict:
+    user = await require_auth(request)
+    partner = await get_partner_by_user_id(user["id"])
+    if not partner:
+        raise HTTPException(status_code=404, detail="Partner topilmadi")
+    return partner
+
+
+@app.get("/api/partner/uzum/orders")
+async def get_partner_uzum_orders(
+    request: Request,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None
+):
+    """Partner Uzum buyurtmalari (sinxronlangan DB'dan, next_cursor bilan)"""
+    partner = await _require_partner(request)
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit 1..500 oralig'ida bo'lishi kerak")
+    try:
+        synced = await read_uzum_orders(partner["id"], limit, offset, cursor, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if synced is None:
+        return {
+            "success": False,
+            "error": "Uzum buyurtmalari hali sinxronlanmagan",
+            "sync": await get_uzum_sync_status(partner["id"])
+        }
+    return {"success": True, **synced}
+
+
+@app.get("/api/partner/uzum/stocks")
+async def get_partner_uzum_stocks(request: Request, limit: int = 100, cursor: Optional[str] = None):
+    """Partner Uzum SKU qoldiqlari (sinxronlangan DB'dan, next_cursor bilan)"""
+    partner = await _require_partner(request)
+    if not 1 <= limit <= 2000:
+        raise HTTPException(status_code=400, detail="limit 1..2000 oralig'ida bo'lishi kerak")
+    try:
+        synced = await read_uzum_stocks(partner["id"], limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if synced is None:
+        return {
+            "success": False,
+            "error": "Uzum qoldiqlari hali sinxronlanmagan",
+            "sync": await get_uzum_sync_status(partner["id"])
+        }
+    return {"success": True, **synced}
+
+
+@app.get("/api/partner/uzum/sync")
+async def get_partner_uzum_sync(request: Request):
+    """Uzum sinxronizatsiya holati (cursor, oxirgi muvaffaqiyat, xato)"""
+    partner = await _require_partner(request)
+    return {"success": True, "sync": await get_uzum_sync_status(partner["id"])}
+
+
+@app.post("/api/partner/uzum/sync")
+async def run_partner_uzum_sync(request: Request, full: bool = False):
+    """
+    Uzum ma'lumotlarini darhol sinxronlash
+    
+    full=true - buyurtmalar boshidan qayta olinadi.
+    """
+    partner = await _require_partner(request)
+    api_key = await _get_partner_uzum_key(partner["id"])
+    if not api_key:
+        return {"success": False, "error": "Uzum Market ulanmagan"}
+    return await uzum_sync_worker.sync_account(partner["id"], api_key, full=full)
+
+
 # ========================================
 # UZUM MARKET - BROWSER AUTOMATION (Fallback)
 # ========================================
@@ -4766,7 +5367,7 @@ Respond ONLY with valid JSON:
                     # ImgBB ga yuklash
                     imgbb_key = os.getenv("IMGBB_API_KEY", "")
                     if imgbb_key:
-                        async with httpx.AsyncClient() as client:
+                        async with http_client("https://api.imgbb.com/1/upload") as client:
                             upload_response = await client.post(
                                 "https://api.imgbb.com/1/upload",
                                 data={
@@ -5028,11 +5629,12 @@ async def yandex_perfect_create_product(request: YandexPerfectCreateRequest):
             "Content-Type": "application/json"
         }
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with http_client("https://api.partner.market.yandex.ru") as client:
             response = await client.post(
                 f"https://api.partner.market.yandex.ru/v2/businesses/{business_id}/offer-mappings/update",
                 headers=headers,
-                json=product_data
+                json=product_data,
+                timeout=60.0
             )
             
             if response.status_code == 200:
@@ -5657,33 +6259,43 @@ async def generate_single_image(
 async def mxik_status():
     """MXIK database status"""
     try:
+        index = get_mxik_index()
         return {
             "success": True,
-            "loaded": True,
-            "totalCodes": len(COMMON_IKPU_CODES) if 'COMMON_IKPU_CODES' in dir() else 250,
-            "source": "file",
+            "loaded": index is not None,
+            "totalCodes": len(index) if index else len(COMMON_IKPU_CODES),
+            "source": "file" if index else "local_mapping",
             "description": "tasnif.soliq.uz MXIK/IKPU kodlari"
         }
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+def _format_mxik_result(r: Dict[str, Any], similarity: int) -> Dict[str, Any]:
+    """MXIK natijasini frontend formatiga o'tkazish"""
+    return {
+        "code": r.get("code", "")[:8] if r.get("code") else "",
+        "fullCode": r.get("code", ""),
+        "nameUz": r.get("name_uz") or r.get("name", ""),
+        "nameRu": r.get("name_ru") or r.get("name", ""),
+        "similarity": similarity
+    }
+
+
 @app.get("/api/mxik/search")
-async def mxik_search(q: str, lang: str = "uz"):
-    """MXIK kodni mahsulot nomi bo'yicha qidirish"""
+async def mxik_search(q: str, lang: str = "uz", limit: int = 5):
+    """MXIK kodni mahsulot nomi bo'yicha qidirish (lokal trigram indeks, typeahead)"""
     try:
-        # Search in API first, fallback to local
-        results = await IKPUService.search_ikpu(q, limit=5)
-        
-        formatted_results = []
-        for r in results:
-            formatted_results.append({
-                "code": r.get("code", "")[:8] if r.get("code") else "",
-                "fullCode": r.get("code", ""),
-                "nameUz": r.get("name_uz") or r.get("name", ""),
-                "nameRu": r.get("name_ru") or r.get("name", ""),
-                "similarity": 90 if r else 0
-            })
+        index = get_mxik_index()
+        if index:
+            formatted_results = [
+                _format_mxik_result(r, r["similarity"])
+                for r in index.search(q, limit=limit)
+            ]
+        else:
+            # Indeks yo'q - tasnif API / lokal mapping
+            results = await IKPUService.search_ikpu(q, limit=limit)
+            formatted_results = [_format_mxik_result(r, 90) for r in results]
         
         return {
             "success": True,
@@ -5700,7 +6312,7 @@ async def mxik_search(q: str, lang: str = "uz"):
 async def mxik_best_match(q: str, category: str = None):
     """Mahsulotga eng mos MXIK kodni topish"""
     try:
-        # Get from category or search
+        # Get from category
         if category:
             result = IKPUService.get_ikpu_by_category(category)
             if result:
@@ -5717,21 +6329,17 @@ async def mxik_best_match(q: str, category: str = None):
                     }
                 }
         
-        # Search by query
-        results = await IKPUService.search_ikpu(q, limit=1)
+        # Search by query: lokal trigram indeks (lotin / kirill / xatoli yozuv), keyin tasnif
+        index = get_mxik_index()
+        results = index.search(q, limit=1) if index else []
+        if not results:
+            results = [dict(r, similarity=90) for r in await IKPUService.search_ikpu(q, limit=1)]
         if results:
-            r = results[0]
             return {
                 "success": True,
                 "query": q,
                 "category": category,
-                "match": {
-                    "code": r.get("code", "")[:8] if r.get("code") else "47190000",
-                    "fullCode": r.get("code", "") or "47190000000000000",
-                    "nameUz": r.get("name_uz") or r.get("name", "") or "Boshqa chakana savdo",
-                    "nameRu": r.get("name_ru") or r.get("name", "") or "Прочая розничная торговля",
-                    "similarity": 90
-                }
+                "match": _format_mxik_result(results[0], results[0]["similarity"])
             }
         
         # Default fallback
@@ -5772,6 +6380,70 @@ async def mxik_validate(code: str):
         return {"success": False, "error": str(e)}
 
 
+class MXIKBatchItem(BaseModel):
+    name: str
+    category: str = ""
+    brand: str = ""
+
+
+class MXIKBatchRequest(BaseModel):
+    items: List[MXIKBatchItem]
+
+
+MXIK_BATCH_MAX_ITEMS = 10000
+MXIK_BATCH_YIELD_EVERY = 100  # Event loop'ga navbat berish (har N ta noyob nom)
+
+
+@app.post("/api/mxik/resolve-batch")
+async def mxik_resolve_batch(request: MXIKBatchRequest):
+    """
+    Butun katalog uchun MXIK kodlarini bitta so'rovda topish
+    
+    - Bir xil (name, category, brand) faqat bir marta hisoblanadi
+    - Natijalar NDJSON sifatida hisoblanishi bilan stream qilinadi
+    - confidence get_ikpu_for_product bilan bir xil (tasnif API chaqirilmaydi)
+    """
+    if len(request.items) > MXIK_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bitta so'rovda maksimum {MXIK_BATCH_MAX_ITEMS} ta mahsulot"
+        )
+    
+    # Noyob nomlar -> kiruvchi indekslar
+    groups: Dict[tuple, List[int]] = {}
+    for i, item in enumerate(request.items):
+        key = (
+            " ".join(item.name.lower().split()),
+            item.category.lower(),
+            " ".join(item.brand.lower().split())
+        )
+        groups.setdefault(key, []).append(i)
+    
+    async def stream_results():
+        get_mxik_index()
+        confidence_counts: Dict[str, int] = {}
+        
+        for n, indices in enumerate(groups.values(), start=1):
+            first = request.items[indices[0]]
+            result = IKPUService.resolve_offline(first.name, first.category, first.brand)
+            confidence_counts[result["confidence"]] = confidence_counts.get(result["confidence"], 0) + len(indices)
+            
+            for i in indices:
+                yield json.dumps({"index": i, "name": request.items[i].name, **result}, ensure_ascii=False) + "\n"
+            
+            if n % MXIK_BATCH_YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+        
+        yield json.dumps({
+            "done": True,
+            "total": len(request.items),
+            "unique": len(groups),
+            "confidence": confidence_counts
+        }) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
 # ========================================
 # REVENUE SHARE & BILLING ENDPOINTS
 # ========================================
@@ -7271,6 +7943,8 @@ async def get_ai_statistics():
     try:
         if AI_LOAD_BALANCER_AVAILABLE:
             stats = get_ai_stats()
+            stats["scan_cache"] = scan_result_cache.get_stats()
+            stats["text_cache"] = text_generation_cache.get_stats()
             return {
                 "success": True,
                 "data": stats,
@@ -7281,13 +7955,23 @@ async def get_ai_statistics():
                 "success": True,
                 "data": {
                     "load_balancer": False,
-                    "message": "Load balancer is not available, using default AI service"
+                    "message": "Load balancer is not available, using default AI service",
+                    "scan_cache": scan_result_cache.get_stats(),
+                    "text_cache": text_generation_cache.get_stats()
                 }
             }
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+@app.get("/api/ai/metrics")
+async def get_ai_prometheus_metrics():
+    """AI provider latency / token / cost / failover metrics (Prometheus text format)"""
+    if not AI_LOAD_BALANCER_AVAILABLE:
+        raise HTTPException(status_code=503, detail="AI load balancer mavjud emas")
+    return PlainTextResponse(get_ai_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 class BalancedScanRequest(BaseModel):
     image_base64: str
 
@@ -7300,7 +7984,10 @@ async def balanced_ai_scan(body: BalancedScanRequest, request: Request):
     """
     try:
         if AI_LOAD_BALANCER_AVAILABLE:
-            result = await balanced_scan_product(body.image_base64)
+            partner_key = request.headers.get("X-Partner-Id") or (request.client.host if request.client else None)
+            result = await balanced_scan_product(
+                body.image_base64, priority="interactive", partner_id=partner_key, hedge=True
+            )
             return result
         else:
             # Fallback to standard AI service
@@ -7391,6 +8078,35 @@ class YandexAutoCreateRequest(BaseModel):
     generate_infographics: bool = True
     use_perfect_infographics: bool = True
     parallel_processing: bool = False  # NEW: Enable parallel processing
+    card_data: Optional[Dict[str, Any]] = None  # /api/yandex/auto-create/card-stream natijasi (AI qayta chaqirilmaydi)
+
+
+class YandexCardStreamRequest(BaseModel):
+    """Auto-create kartochka qadami (SSE) - skaner natijasi bilan"""
+    product_name: str
+    category: Optional[str] = "general"
+    brand: Optional[str] = ""
+    description: Optional[str] = ""
+    scan_result: Optional[Dict[str, Any]] = None
+
+
+async def _auto_create_card(
+    body: YandexAutoCreateRequest,
+    product_name: str,
+    category: str,
+    brand: str,
+    detected_info: dict
+) -> dict:
+    """Auto-create kartochka qadami: oldindan stream qilingan kartochka yoki AI generatsiya"""
+    if body.card_data:
+        # Klient o'zgartirgan bo'lishi mumkin - validatsiya qayta bajariladi
+        return YandexCardGenerator.finalize_card(dict(body.card_data))
+    return await YandexCardGenerator.generate_card(
+        product_name=product_name,
+        category=category,
+        brand=brand,
+        detected_info=detected_info
+    )
 
 
 async def _create_card_background(
@@ -7426,11 +8142,9 @@ async def _create_card_background(
         # === STEP 3: AI CARD GENERATION (RU + UZ) ===
         card = {}
         try:
-            card_result = await YandexCardGenerator.generate_card(
-                product_name=product_name,
-                category=category,
-                brand=brand,
-                detected_info={"name": product_name, "brand": brand, "category": category}
+            card_result = await _auto_create_card(
+                body, product_name, category, brand,
+                {"name": product_name, "brand": brand, "category": category}
             )
             if card_result.get("success"):
                 card = card_result.get("card", {})
@@ -7667,6 +8381,33 @@ async def _create_card_background(
         result["background_error"] = str(e)
 
 
+@app.post("/api/yandex/auto-create/card-stream")
+async def yandex_auto_create_card_stream(body: YandexCardStreamRequest, request: Request):
+    """
+    Auto-create kartochka qadami - Server-Sent Events
+    
+    RU + UZ kartochka maydonlari tayyor bo'lishi bilan yuboriladi,
+    oxirida Yandex stop so'z validatsiyasi. done event'idagi card
+    /api/yandex/auto-create ga card_data sifatida yuboriladi.
+    """
+    if not AI_LOAD_BALANCER_AVAILABLE:
+        raise HTTPException(status_code=503, detail="AI Load Balancer mavjud emas")
+    
+    partner_key = request.headers.get("X-Partner-Id") or (request.client.host if request.client else None)
+    return StreamingResponse(
+        stream_yandex_card(
+            product_name=body.product_name,
+            category=body.category or "general",
+            brand=body.brand or "",
+            description=body.description or "",
+            detected_info=body.scan_result,
+            partner_id=partner_key
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 @app.post("/api/yandex/auto-create")
 async def yandex_auto_create_product(body: YandexAutoCreateRequest, request: Request):
     """
@@ -7733,7 +8474,9 @@ async def yandex_auto_create_product(body: YandexAutoCreateRequest, request: Req
         # === STEP 1: AI SCANNER FIRST (doesn't need credentials) ===
         print("1️⃣ AI Scanner...")
         if AI_LOAD_BALANCER_AVAILABLE:
-            scan_result = await balanced_scan_product(body.image_base64)
+            scan_result = await balanced_scan_product(
+                body.image_base64, priority="background", partner_id=partner_id, cache_owner=partner_id
+            )
             if scan_result.get("success"):
                 product_info = scan_result.get("data", {})
             else:
@@ -7900,12 +8643,7 @@ async def yandex_auto_create_product(body: YandexAutoCreateRequest, request: Req
         # === STEP 3: AI CARD GENERATION ===
         print("3️⃣ AI Card generation...")
         try:
-            card_result = await YandexCardGenerator.generate_card(
-                product_name=product_name,
-                category=category,
-                brand=brand,
-                detected_info=product_info
-            )
+            card_result = await _auto_create_card(body, product_name, category, brand, product_info)
             
             if card_result.get("success"):
                 result["card_data"] = card_result.get("card", {})
@@ -8133,6 +8871,21 @@ async def full_health_check():
     else:
         health["services"]["ai_load_balancer"] = {"status": "not_available"}
     
+    # tasnif.soliq.uz IKPU cache
+    try:
+        health["services"]["ikpu_cache"] = {"status": "healthy", **ikpu_search_cache.get_stats()}
+    except:
+        health["services"]["ikpu_cache"] = {"status": "unknown"}
+    
+    # Partner Yandex dashboard keshi
+    health["services"]["yandex_dashboard_cache"] = {"status": "healthy", **yandex_dashboard_cache.get_stats()}
+    
+    # Uzum buyurtmalari / qoldiqlari sinxronizatsiyasi
+    health["services"]["uzum_sync"] = {"status": "healthy", **uzum_sync_worker.get_stats()}
+    
+    # Umumiy HTTP klientlar (upstream host bo'yicha pool)
+    health["services"]["http_clients"] = {"status": "healthy", **http_clients.get_stats()}
+    
     # Perfect Infographic
     health["services"]["perfect_infographics"] = {
         "status": "available" if PERFECT_INFOGRAPHIC_AVAILABLE else "not_available"
@@ -8233,8 +8986,13 @@ async def get_admin_users(request: Request):
 # ========================================
 
 @app.get("/api/partner/yandex/dashboard")
-async def get_yandex_dashboard_data(request: Request):
-    """Get Yandex Market dashboard data - products, orders, revenue"""
+async def get_yandex_dashboard_data(request: Request, refresh: bool = False):
+    """
+    Get Yandex Market dashboard data - products, orders, revenue
+    
+    Partner bo'yicha keshlanadi (TTL + stale-while-revalidate);
+    refresh=true - keshni chetlab o'tib qayta yig'ish.
+    """
     user = await require_auth(request)
     partner = await get_partner_by_user_id(user["id"])
     
@@ -8283,11 +9041,18 @@ async def get_yandex_dashboard_data(request: Request):
         campaign_id=yandex_creds.get("campaign_id")
     )
     
-    dashboard = await api.get_dashboard_data()
+    cache_key = yandex_dashboard_cache.make_key(partner["id"], yandex_token, api.business_id, api.campaign_id)
+    dashboard, cache_state = await yandex_dashboard_cache.get_or_fetch(
+        cache_key,
+        api.get_dashboard_data,
+        cacheable=is_complete_dashboard,
+        force=refresh
+    )
     
     return {
         "success": True,
-        "data": dashboard
+        "data": dashboard,
+        "cache": cache_state
     }
 
 
@@ -0,0 +1,161 @@
+"""
+STOP WORD AUTOMATON - Aho–Corasick multi-pattern matcher
+=========================================================
+STOP_WORDS / YANDEX_STOP_WORDS uchun bitta oldindan qurilgan avtomat:
+6000 belgili tavsif ham bitta chiziqli o'tishda tekshiriladi.
+
+Features:
+- Import vaqtida bir marta quriladi (goto + fail -> to'liq DFA)
+- find(): str.lower() ichida substring testi bilan bir xil natija
+- remove(): re.IGNORECASE bilan uzundan qisqaga o'chirish bilan bir xil
+  (uzun so'z ustun, keyin ro'yxatdagi tartib, keyin chapdan o'ngga);
+  o'chirishdan yangi stop so'z hosil bo'lsa ("bhitu" -> "bu") u ham o'chiriladi
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+
+class StopWordAutomaton:
+    """
+    Aho–Corasick avtomati (lowercase pattern'lar ustida)
+
+    Holatlar to'liq DFA'ga aylantiriladi: har bir belgi uchun
+    bitta dict lookup, fail-link bo'ylab qaytish yo'q.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        # Tartib saqlanadi: find() natijasi asl to'plam tartibida
+        self.words: List[str] = list(dict.fromkeys(words))
+        self.patterns: List[str] = [w.lower() for w in self.words]
+
+        self._delta: List[Dict[str, int]] = [{}]
+        self._output: List[Tuple[int, ...]] = [()]
+        self._build()
+
+        self._alphabet = frozenset(ch for p in self.patterns for ch in p)
+        self._fold_table: Dict[int, str] = {}
+        self._irregular: Set[str] = set()  # fold(ch) != ch.lower()
+
+        # remove_stop_words tartibi: sorted(words, key=len, reverse=True)
+        removal_order = sorted(range(len(self.words)), key=lambda i: len(self.words[i]), reverse=True)
+        self._removal_rank = {word_id: rank for rank, word_id in enumerate(removal_order)}
+
+    def _build(self):
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+
+        for word_id, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append(word_id)
+
+        # BFS: fail link'lar va to'liq o'tish jadvali
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict() for _ in goto]
+        delta[0] = dict(goto[0])
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            delta[state] = dict(delta[fail[state]])
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                delta[state][ch] = nxt
+                queue.append(nxt)
+
+        self._delta = delta
+        self._output = [tuple(o) for o in outputs]
+
+    def _fold_char(self, ch: str) -> str:
+        """re.IGNORECASE bo'yicha pattern alifbosidagi ekvivalent belgi"""
+        folded = ch.lower()[:1] or ch
+        if folded not in self._alphabet:
+            # Maxsus holatlar (masalan "ſ" ~ "s", "K" ~ "k")
+            for candidate in self._alphabet:
+                if re.fullmatch(re.escape(candidate), ch, re.IGNORECASE):
+                    return candidate
+        return folded
+
+    def fold(self, text: str) -> str:
+        """Uzunlikni saqlovchi case-fold (pozitsiyalar asl matnga mos)"""
+        table = self._fold_table
+        chars = set(text)
+        for ch in chars:
+            if ord(ch) not in table:
+                folded = self._fold_char(ch)
+                table[ord(ch)] = folded
+                if folded != ch.lower():
+                    self._irregular.add(ch)
+        if chars.isdisjoint(self._irregular):
+            return text.lower()
+        return text.translate(table)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """(start, end, word id) - barcha (ustma-ust ham) moslar, bitta o'tishda"""
+        delta = self._delta
+        output = self._output
+        patterns = self.patterns
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if output[state]:
+                for word_id in output[state]:
+                    yield i + 1 - len(patterns[word_id]), i + 1, word_id
+
+    def match_ids(self, text: str) -> Set[int]:
+        """Matnda uchragan so'zlarning id'lari (self.words indekslari)"""
+        return {word_id for _, _, word_id in self.iter_matches(text.lower())}
+
+    def find(self, text: str) -> List[str]:
+        """Matnda uchragan so'zlar (word.lower() in text.lower() bilan bir xil)"""
+        return [self.words[word_id] for word_id in sorted(self.match_ids(text))]
+
+    def remove(self, text: str) -> str:
+        """
+        Barcha moslarni o'chirish va bo'shliqlarni normallashtirish
+
+        Ustma-ust moslarda uzunroq so'z yutadi; bir xil so'zning
+        takrorlari chapdan o'ngga, ustma-ust tushmasdan olinadi.
+        Qoldiq matnda mos qolmaguncha takrorlanadi.
+        """
+        while True:
+            cleaned = self._remove_once(text)
+            if cleaned is None:
+                return " ".join(text.split())
+            text = cleaned
+
+    def _remove_once(self, text: str):
+        """Bitta o'tish: moslar o'chirilgan matn (mos bo'lmasa None)"""
+        matches = sorted(
+            self.iter_matches(self.fold(text)),
+            key=lambda m: (self._removal_rank[m[2]], m[0])
+        )
+        if not matches:
+            return None
+
+        taken = bytearray(len(text))
+        removed = []
+        for start, end, _ in matches:
+            if not any(taken[start:end]):
+                taken[start:end] = b"\x01" * (end - start)
+                removed.append((start, end))
+
+        pieces = []
+        pos = 0
+        for start, end in sorted(removed):
+            pieces.append(text[pos:start])
+            pos = end
+        pieces.append(text[pos:])
+        return "".join(pieces)
@@ -0,0 +1,102 @@
+"""
+Test hedged AI requests in the load balancer
+Tests:
+1. Slow primary triggers a hedge; the first valid answer wins, loser is cancelled
+2. Fast primary answers before the hedge threshold (no hedge)
+3. Hedge budget caps the share of hedged traffic
+4. Hedge threshold adapts to the primary provider's p90 latency
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ai_load_balancer
+from ai_load_balancer import AILoadBalancer
+
+
+def _balancer(monkeypatch, min_delay=0.05):
+    monkeypatch.setattr(ai_load_balancer, "AI_HEDGE_MIN_DELAY", min_delay)
+    monkeypatch.setattr(ai_load_balancer, "AI_HEDGE_MAX_DELAY", min_delay)
+    balancer = AILoadBalancer()
+    for name, provider in balancer.providers.items():
+        provider.api_key = "test"
+        provider.enabled = name in ("openai", "anthropic")
+    return balancer
+
+
+class TestHedging:
+    def test_slow_primary_is_hedged(self, monkeypatch):
+        balancer = _balancer(monkeypatch)
+        cancelled = []
+
+        async def request(provider, image):
+            if provider == "openai":
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(provider)
+                    raise
+            return {"name": provider}
+
+        result = asyncio.run(balancer.process_request("vision", request, "img", hedge=True))
+        assert result == {"success": True, "data": {"name": "anthropic"}, "provider": "anthropic"}
+        assert cancelled == ["openai"]
+        assert balancer.in_flight == 0
+
+        stats = balancer.get_stats()["hedging"]
+        assert stats["sent"] == 1 and stats["won"] == 1
+        print("✅ Hedge wins and the slow primary is cancelled")
+
+    def test_fast_primary_not_hedged(self, monkeypatch):
+        balancer = _balancer(monkeypatch, min_delay=1)
+        calls = []
+
+        async def request(provider, image):
+            calls.append(provider)
+            return {"name": provider}
+
+        result = asyncio.run(balancer.process_request("vision", request, "img", hedge=True))
+        assert result["provider"] == "openai"
+        assert calls == ["openai"]
+        assert balancer.get_stats()["hedging"]["sent"] == 0
+        print("✅ Fast primary is not hedged")
+
+    def test_hedge_budget(self, monkeypatch):
+        monkeypatch.setattr(ai_load_balancer, "AI_HEDGE_BUDGET", 0.1)
+        monkeypatch.setattr(ai_load_balancer, "AI_HEDGE_BURST", 1)
+        balancer = _balancer(monkeypatch, min_delay=0.01)
+        balancer._hedge_credit = 1
+
+        async def request(provider, image):
+            await asyncio.sleep(0.03)
+            return {"name": provider}
+
+        async def scenario():
+            for _ in range(20):
+                await balancer.process_request("vision", request, "img", hedge=True)
+
+        asyncio.run(scenario())
+        stats = balancer.get_stats()["hedging"]
+        assert stats["eligible"] == 20
+        # 1 (burst) + 20 * 0.1 budget
+        assert 1 <= stats["sent"] <= 3
+        assert stats["skipped_budget"] >= 17
+        print("✅ Hedges stay within the configured budget")
+
+    def test_adaptive_threshold(self, monkeypatch):
+        monkeypatch.setattr(ai_load_balancer, "AI_HEDGE_MIN_DELAY", 0.1)
+        monkeypatch.setattr(ai_load_balancer, "AI_HEDGE_MAX_DELAY", 30)
+        balancer = AILoadBalancer()
+        health = balancer.providers["openai"].health
+        for i in range(100):
+            health.record_success("vision", 1.0 + i * 0.05)  # 1.0 .. 5.95
+        assert balancer.hedge_delay("openai", "vision") == pytest.approx(5.5, abs=0.1)
+        print("✅ Hedge threshold follows p90 latency")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,146 @@
+"""
+Test prompt-level batching for bulk text generation
+Tests:
+1. Concurrent prompts are packed up to max batch size and demultiplexed in order
+2. A lone prompt is sent as-is after the linger time
+3. Items missing from the batch answer are retried individually
+4. Whole-batch failures reach every caller; different system prompts never mix
+5. A batch reserves N x the text estimate of TPM and falls back to it without usage
+"""
+
+import pytest
+import asyncio
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ai_load_balancer
+from ai_load_balancer import AILoadBalancer, ESTIMATED_TOKENS
+from ai_prompt_batcher import PromptBatcher, build_batch_prompt, parse_batch_response
+
+
+def _answer(prompt, drop=()):
+    """Fake LLM: har bir VAZIFA uchun 'echo:<prompt>'"""
+    tasks = re.findall(r"### VAZIFA (\d+)\n(.*?)(?=\n\n### VAZIFA|\Z)", prompt, re.S)
+    if not tasks:
+        return f"echo:{prompt}"
+    return json.dumps({"results": [
+        {"id": int(i), "output": f"echo:{text}"} for i, text in tasks if text not in drop
+    ]})
+
+
+class FakeExecutor:
+    def __init__(self, drop=(), fail=False):
+        self.calls = []
+        self.drop = drop
+        self.fail = fail
+
+    async def __call__(self, prompt, system, max_tokens, item_count, priority, partner_id):
+        self.calls.append({"prompt": prompt, "system": system, "max_tokens": max_tokens, "items": item_count})
+        await asyncio.sleep(0.01)
+        if self.fail:
+            return {"success": False, "error": "AI navbati to'la", "code": "QUEUE_FULL"}
+        return {"success": True, "data": _answer(prompt, self.drop), "provider": "openai"}
+
+
+class TestPromptBatcher:
+    def test_batches_and_demultiplexes(self):
+        executor = FakeExecutor()
+        batcher = PromptBatcher(executor, max_size=10, linger=0.05, item_max_tokens=100)
+
+        async def scenario():
+            return await asyncio.gather(*(batcher.submit(f"mahsulot {i}") for i in range(25)))
+
+        results = asyncio.run(scenario())
+        assert [r["data"] for r in results] == [f"echo:mahsulot {i}" for i in range(25)]
+        assert sorted(call["items"] for call in executor.calls) == [5, 10, 10]
+        assert max(call["max_tokens"] for call in executor.calls) == 1000
+
+        stats = batcher.get_stats()
+        assert stats["batches"] == 3 and stats["requests_saved"] == 22
+        assert stats["avg_batch_size"] == pytest.approx(25 / 3, abs=0.01)
+        print("✅ 25 prompts -> 3 requests, results demultiplexed")
+
+    def test_single_prompt_after_linger(self):
+        executor = FakeExecutor()
+        batcher = PromptBatcher(executor, max_size=10, linger=0.02)
+
+        result = asyncio.run(batcher.submit("yolg'iz prompt", system="SEO"))
+        assert result["data"] == "echo:yolg'iz prompt"
+        assert executor.calls[0]["prompt"] == "yolg'iz prompt"
+        assert executor.calls[0]["system"] == "SEO"
+        assert batcher.get_stats()["single_requests"] == 1
+        print("✅ Lone prompt is sent unwrapped after linger")
+
+    def test_missing_items_retried(self):
+        executor = FakeExecutor(drop=("b",))
+        batcher = PromptBatcher(executor, max_size=3, linger=0.05)
+
+        async def scenario():
+            return await asyncio.gather(*(batcher.submit(p) for p in ("a", "b", "c")))
+
+        results = asyncio.run(scenario())
+        assert [r["data"] for r in results] == ["echo:a", "echo:b", "echo:c"]
+        assert results[0]["batch_size"] == 3 and "batch_size" not in results[1]
+        assert len(executor.calls) == 2 and executor.calls[1]["prompt"] == "b"
+        assert batcher.get_stats()["retried_items"] == 1
+        print("✅ Missing batch items are retried individually")
+
+    def test_failure_and_isolation(self):
+        executor = FakeExecutor(fail=True)
+        batcher = PromptBatcher(executor, max_size=10, linger=0.02)
+
+        async def scenario():
+            return await asyncio.gather(
+                batcher.submit("a", system="tarjima"),
+                batcher.submit("b", system="tarjima"),
+                batcher.submit("c", system="SEO")
+            )
+
+        results = asyncio.run(scenario())
+        assert all(r == {"success": False, "error": "AI navbati to'la", "code": "QUEUE_FULL"} for r in results)
+        assert sorted((call["system"], call["items"]) for call in executor.calls) == [("SEO", 1), ("tarjima", 2)]
+        print("✅ Batch failures propagate; system prompts are not mixed")
+
+    def test_parse_batch_response(self):
+        prompt = build_batch_prompt(["x", "y"])
+        assert "### VAZIFA 0\nx" in prompt and "### VAZIFA 1\ny" in prompt
+
+        text = '```json\n{"results": [{"id": 1, "output": {"title": "T"}}, {"id": 7, "output": "z"}, {"id": "0", "output": "x"}]}\n```'
+        assert parse_batch_response(text, 2) == {0: "x", 1: '{"title": "T"}'}
+        assert parse_batch_response("not json", 2) == {}
+        print("✅ Batch answers are parsed by id")
+
+    def test_batch_tpm_estimate(self, monkeypatch):
+        balancer = AILoadBalancer()
+        for name, provider in balancer.providers.items():
+            provider.api_key = "test"
+            provider.enabled = name == "openai"
+        limiter = balancer.providers["openai"].limiter
+        limiter.tokens.capacity = limiter.tokens.level = 10 ** 6
+        limiter.tokens.rate = 0
+        reserved = []
+
+        async def generate(provider, prompt, system, max_tokens):
+            # Slot olinganda batch taxmini allaqachon band qilingan
+            reserved.append(10 ** 6 - limiter.tokens.level)
+            return "ok"
+
+        monkeypatch.setattr(ai_load_balancer, "load_balancer", balancer)
+        monkeypatch.setattr(ai_load_balancer, "_generate_text_with_provider", generate)
+
+        result = asyncio.run(ai_load_balancer._execute_text_batch("p", "", 100, 8, "background", None))
+        assert result["success"]
+        estimate = ESTIMATED_TOKENS["text"] * 8
+        assert reserved == [estimate]
+        # Provider usage bermadi - bitta so'rov emas, batch taxmini yoziladi
+        assert limiter.current_tpm == estimate
+        assert 10 ** 6 - limiter.tokens.level == estimate
+        print("✅ Batch TPM estimate reserved and used as usage fallback")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,145 @@
+"""
+Test AI provider health tracking and circuit breaker
+Tests:
+1. Routing prefers the provider with the lowest expected completion time
+2. Circuit opens after consecutive failures and half-opens with probes
+3. Failed probe re-opens the circuit with a longer cooldown
+4. Timeouts and generic errors fail over to the next provider
+5. Only real rate limit errors (429 / "rate limit") block a provider
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ai_load_balancer
+import ai_provider_health
+from ai_load_balancer import AILoadBalancer, _is_rate_limit_error
+from ai_rate_limiter import ProviderRateLimitError
+from ai_provider_health import ProviderHealth, AI_CB_FAILURE_THRESHOLD, CLOSED, OPEN, HALF_OPEN
+
+
+def _balancer(*enabled):
+    balancer = AILoadBalancer()
+    for name, provider in balancer.providers.items():
+        provider.api_key = "test"
+        provider.enabled = name in enabled
+    return balancer
+
+
+class TestProviderHealth:
+    def test_prior_keeps_priority_order(self):
+        balancer = _balancer("openai", "anthropic", "gemini")
+        assert balancer.get_available_provider(request_type="vision") == "openai"
+        print("✅ Without data the static priority order is kept")
+
+    def test_routes_on_expected_time(self):
+        balancer = _balancer("openai", "anthropic")
+        for _ in range(5):
+            balancer.providers["openai"].health.record_success("vision", 25.0)
+            balancer.providers["anthropic"].health.record_success("vision", 3.0)
+        assert balancer.get_available_provider(request_type="vision") == "anthropic"
+
+        # Tez, lekin tez-tez xato qiladigan provider
+        health = ProviderHealth()
+        for _ in range(3):
+            health.record_success("text", 2.0)
+            health.record_failure("text", 2.0)
+        assert health.expected_time("text") > 2.0 / (1 - 0.3)
+        print("✅ Slow or failing providers lose traffic")
+
+    def test_circuit_breaker(self, monkeypatch):
+        monkeypatch.setattr(ai_provider_health, "AI_CB_CLOSE_AFTER", 2)
+        health = ProviderHealth()
+        for _ in range(AI_CB_FAILURE_THRESHOLD):
+            assert health.state == CLOSED
+            health.start()
+            health.record_failure("text", 1.0)
+        assert health.state == OPEN
+        assert not health.allow_request()
+        assert health.time_until_allowed() > 0
+
+        # Cooldown tugadi -> half-open, bitta probe
+        health.open_until = 0
+        assert health.allow_request()
+        assert health.state == HALF_OPEN
+        health.start()
+        assert not health.allow_request()
+        health.record_success("text", 1.0)
+        health.start()
+        health.record_success("text", 1.0)
+        assert health.state == CLOSED
+        print("✅ Circuit opens, half-opens with probes, then closes")
+
+    def test_failed_probe_reopens(self):
+        health = ProviderHealth()
+        for _ in range(AI_CB_FAILURE_THRESHOLD):
+            health.record_failure("text", 1.0)
+        first_cooldown = health.open_seconds
+        health.open_until = 0
+        assert health.allow_request()
+        health.start()
+        health.record_failure("text", 1.0)
+        assert health.state == OPEN
+        assert health.open_seconds == first_cooldown * 2
+        print("✅ Failed probe re-opens with backoff")
+
+
+class TestFailover:
+    def test_timeout_fails_over(self, monkeypatch):
+        monkeypatch.setattr(ai_load_balancer, "AI_PROVIDER_TIMEOUT", 0.05)
+        balancer = _balancer("openai", "anthropic")
+
+        async def request(provider, prompt):
+            if provider == "openai":
+                await asyncio.sleep(1)
+            return provider
+
+        result = asyncio.run(balancer.process_request("text", request, "hi"))
+        assert result["success"] and result["provider"] == "anthropic"
+        health = balancer.get_stats()["providers"]["openai"]["health"]
+        assert health["timeouts"] == 1 and health["timeout_rate"] > 0
+        print("✅ Timeout fails over and is recorded")
+
+    def test_failing_provider_loses_traffic(self):
+        balancer = _balancer("openai", "anthropic")
+        calls = []
+
+        async def request(provider, prompt):
+            calls.append(provider)
+            if provider == "openai":
+                raise Exception("openai server error (503)")
+            return provider
+
+        async def scenario():
+            for _ in range(AI_CB_FAILURE_THRESHOLD + 3):
+                result = await balancer.process_request("text", request, "hi")
+                assert result["success"] and result["provider"] == "anthropic"
+
+        asyncio.run(scenario())
+        # EWMA xato ulushi tufayli openai tez orada ikkinchi o'ringa tushadi
+        assert calls.count("openai") <= AI_CB_FAILURE_THRESHOLD
+        assert balancer.providers["anthropic"].health.consecutive_failures == 0
+        print("✅ Failing provider stops receiving traffic")
+
+    def test_rate_limit_detection(self):
+        class StatusError(Exception):
+            status_code = 429
+
+        assert _is_rate_limit_error(ProviderRateLimitError("openai rate limit (429)"))
+        assert _is_rate_limit_error(StatusError("slow down"))
+        assert _is_rate_limit_error(Exception("Rate limit reached for gpt-4o"))
+        assert _is_rate_limit_error(Exception("rate_limit_error: too many tokens"))
+        assert _is_rate_limit_error(Exception("HTTP 429 Too Many Requests"))
+        # "rate" so'z ichida - rate limit emas
+        for message in ["gemini generateContent failed", "content failed moderation", "could not separate images",
+                        "openai server error (503)", "request id 14290"]:
+            assert not _is_rate_limit_error(Exception(message)), message
+        print("✅ Only real rate limit errors block a provider")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,142 @@
+"""
+Test AI provider rate limiter and load balancer integration
+Tests:
+1. Token bucket refills smoothly (no burst at the minute boundary)
+2. TPM budget blocks requests until tokens refill; estimates are reserved at acquire
+3. Retry-After (seconds / HTTP date) blocks the provider for that long
+4. Load balancer fails over on 429 and records reported token usage
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+import time
+from email.utils import formatdate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ai_rate_limiter import ProviderRateLimiter, ProviderRateLimitError, TokenBucket, parse_retry_after
+from ai_load_balancer import AILoadBalancer, report_token_usage
+
+
+class TestTokenBucket:
+    def test_smooth_refill(self):
+        bucket = TokenBucket(600, burst_seconds=1)  # 10/s, capacity 10
+        now = bucket.updated
+        for _ in range(10):
+            assert bucket.available(1, now)
+            bucket.consume(1, now)
+        assert not bucket.available(1, now)
+        assert bucket.wait_time(1, now) == pytest.approx(0.1)
+        assert bucket.available(1, now + 0.11)
+        # Uzoq kutishdan keyin ham capacity'dan oshmaydi
+        bucket._refill(now + 3600)
+        assert bucket.level == bucket.capacity
+        print("✅ Token bucket refills smoothly")
+
+    def test_unlimited(self):
+        bucket = TokenBucket(0)
+        assert bucket.available(10 ** 9, time.monotonic())
+        assert bucket.wait_time(10 ** 9, time.monotonic()) == 0.0
+        print("✅ Zero limit means unlimited")
+
+
+class TestProviderRateLimiter:
+    def test_tpm_budget(self):
+        limiter = ProviderRateLimiter(rpm_limit=1000, tpm_limit=6000, burst_seconds=10)  # 1000 token capacity
+        assert limiter.acquire(500)
+        limiter.record_tokens(1200, reserved=500)  # taxmindan ko'p - qarz
+        assert not limiter.can_acquire(500)
+        assert limiter.time_until_available(500) > 0
+        assert limiter.current_rpm == 1
+        assert limiter.current_tpm == 1200
+        print("✅ TPM budget enforced")
+
+    def test_tpm_reserved_at_acquire(self):
+        limiter = ProviderRateLimiter(rpm_limit=1000, tpm_limit=6000, burst_seconds=10)  # 1000 token capacity
+        # Javob kelmasdan parallel so'rovlar budget'dan oshmaydi
+        assert limiter.acquire(500) and limiter.acquire(500)
+        assert not limiter.can_acquire(500)
+        # Haqiqiy sarf taxmindan kam - farqi qaytariladi
+        limiter.record_tokens(100, reserved=500)
+        limiter.record_tokens(100, reserved=500)
+        assert limiter.acquire(500)
+        assert limiter.tokens.level == pytest.approx(300, abs=5)
+        assert limiter.current_tpm == 200
+        print("✅ TPM estimate reserved at acquire and settled on response")
+
+    def test_retry_after(self):
+        assert parse_retry_after("7") == 7.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("garbage") is None
+        assert 25 <= parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+
+        limiter = ProviderRateLimiter(rpm_limit=1000)
+        limiter.block_for(5)
+        assert not limiter.can_acquire()
+        assert limiter.time_until_available() == pytest.approx(5, abs=0.1)
+        stats = limiter.get_stats()
+        assert stats["rate_limited"] == 1
+        assert stats["blocked_for_seconds"] > 4
+        print("✅ Retry-After blocks provider")
+
+
+class TestLoadBalancerRateLimits:
+    def _balancer(self):
+        balancer = AILoadBalancer()
+        for name, provider in balancer.providers.items():
+            provider.api_key = "test"
+            provider.enabled = name in ("openai", "anthropic")
+        return balancer
+
+    def test_failover_on_429(self):
+        balancer = self._balancer()
+        calls = []
+
+        async def request(provider, prompt):
+            calls.append(provider)
+            if provider == "openai":
+                raise ProviderRateLimitError("openai rate limit (429)", retry_after=30)
+            report_token_usage(321)
+            return f"{provider}:{prompt}"
+
+        result = asyncio.run(balancer.process_request("text", request, "hi"))
+        assert result == {"success": True, "data": "anthropic:hi", "provider": "anthropic"}
+        assert calls == ["openai", "anthropic"]
+
+        stats = balancer.get_stats()["providers"]
+        assert stats["openai"]["available"] is False
+        assert stats["openai"]["blocked_for_seconds"] > 29
+        assert stats["anthropic"]["current_tpm"] == 321
+        print("✅ 429 fails over and blocks provider for Retry-After")
+
+    def test_all_blocked(self):
+        balancer = self._balancer()
+        for provider in balancer.providers.values():
+            provider.limiter.block_for(60)
+
+        async def request(provider):
+            return provider
+
+        result = asyncio.run(balancer.process_request("text", request, deadline=0.3))
+        assert result["code"] == "QUEUE_TIMEOUT"
+        print("✅ Saturated providers fail once the queue deadline passes")
+
+    def test_waits_for_refill(self):
+        balancer = self._balancer()
+        for provider in balancer.providers.values():
+            provider.limiter.block_for(0.2)
+
+        async def request(provider):
+            return provider
+
+        started = time.monotonic()
+        result = asyncio.run(balancer.process_request("text", request))
+        assert result["success"] and result["provider"] == "openai"
+        assert 0.15 < time.monotonic() - started < 2
+        print("✅ Request waits for the next slot instead of failing")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,148 @@
+"""
+Test AI load balancer priority queue
+Tests:
+1. Interactive requests are served before queued background jobs
+2. Partners within a priority class are served round-robin
+3. Bounded depth evicts lower priority requests, then rejects
+4. Queue deadline, cancellation and stats (depth / wait time)
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ai_load_balancer import AILoadBalancer
+from ai_request_queue import AIRequestQueue, QueueRejectedError
+
+
+def _balancer(max_concurrent=1):
+    balancer = AILoadBalancer()
+    for name, provider in balancer.providers.items():
+        provider.api_key = "test"
+        provider.enabled = name == "openai"
+    balancer.max_concurrent = max_concurrent
+    return balancer
+
+
+async def _run_ordered(balancer, jobs):
+    """Birinchi so'rov slotni band qiladi, qolganlari navbatda turadi"""
+    order = []
+    gate = asyncio.Event()
+
+    async def request(provider, label):
+        if label == "blocker":
+            await gate.wait()
+        order.append(label)
+        return label
+
+    tasks = [asyncio.create_task(balancer.process_request("text", request, "blocker"))]
+    await asyncio.sleep(0.01)
+    for label, priority, partner in jobs:
+        tasks.append(asyncio.create_task(
+            balancer.process_request("text", request, label, priority=priority, partner_id=partner)
+        ))
+    await asyncio.sleep(0.01)
+    depth = balancer.get_stats()["queue"]["depth"]
+    gate.set()
+    results = await asyncio.gather(*tasks)
+    return order, results, depth
+
+
+class TestPriorityQueue:
+    def test_priority_order(self):
+        balancer = _balancer()
+        order, results, depth = asyncio.run(_run_ordered(balancer, [
+            ("bg1", "background", "p1"),
+            ("bg2", "background", "p1"),
+            ("scan", "interactive", "p2"),
+            ("text", "default", "p3"),
+        ]))
+        assert depth == 4
+        assert order == ["blocker", "scan", "text", "bg1", "bg2"]
+        assert all(r["success"] for r in results)
+        print("✅ Interactive requests jump ahead of background jobs")
+
+    def test_partner_round_robin(self):
+        balancer = _balancer()
+        order, _, _ = asyncio.run(_run_ordered(balancer, [
+            ("a1", "default", "a"),
+            ("a2", "default", "a"),
+            ("a3", "default", "a"),
+            ("b1", "default", "b"),
+            ("c1", "default", "c"),
+        ]))
+        assert order == ["blocker", "a1", "b1", "c1", "a2", "a3"]
+        print("✅ Partners are served round-robin")
+
+    def test_bounded_depth(self):
+        async def scenario():
+            queue = AIRequestQueue(max_depth=2)
+            background = queue.ticket("background", "p1")
+            queue.put(background)
+            queue.put(queue.ticket("default", "p1"))
+
+            # To'la navbat: background so'rov siqib chiqariladi
+            queue.put(queue.ticket("interactive", "p2"))
+            with pytest.raises(QueueRejectedError) as exc:
+                await background.future
+            assert exc.value.code == "QUEUE_FULL"
+
+            # Pastroq priority yo'q - yangi so'rov rad etiladi
+            with pytest.raises(QueueRejectedError):
+                queue.put(queue.ticket("default", "p3"))
+            stats = queue.get_stats()
+            assert stats["depth"] == 2
+            assert stats["evicted"] == 1 and stats["rejected"] == 1
+            assert stats["by_priority"] == {"interactive": 1, "default": 1, "background": 0}
+
+        asyncio.run(scenario())
+        print("✅ Bounded depth sheds lower priority work first")
+
+
+class TestDeadlines:
+    def test_deadline_and_stats(self):
+        balancer = _balancer()
+
+        async def scenario():
+            gate = asyncio.Event()
+
+            async def request(provider, label):
+                if label == "blocker":
+                    await gate.wait()
+                if label == "hang":
+                    await asyncio.sleep(10)
+                return label
+
+            blocker = asyncio.create_task(balancer.process_request("text", request, "blocker"))
+            await asyncio.sleep(0.01)
+            late = await balancer.process_request("text", request, "late", deadline=0.05)
+            assert late["success"] is False and late["code"] == "QUEUE_TIMEOUT"
+
+            waiting = asyncio.create_task(balancer.process_request("text", request, "waiting"))
+            await asyncio.sleep(0.05)
+            gate.set()
+            assert (await waiting)["data"] == "waiting"
+            await blocker
+
+            # Bekor qilingan so'rov slotni band qilib qolmaydi
+            cancelled = asyncio.create_task(balancer.process_request("text", request, "hang"))
+            await asyncio.sleep(0.01)
+            cancelled.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+            assert balancer.in_flight == 0
+
+        asyncio.run(scenario())
+        stats = balancer.get_stats()["queue"]
+        assert stats["expired"] == 1
+        assert stats["depth"] == 0
+        assert stats["max_wait_ms"] >= 40
+        assert stats["max_concurrent"] == 1
+        print("✅ Deadlines expire queued requests and wait time is reported")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,134 @@
+"""
+Test single-flight coalescing for AI text generation
+Tests:
+1. Concurrent identical requests share one upstream call
+2. Normalized keys (case / whitespace) coalesce; different prompts do not
+3. Short-lived result cache expires; failures are not cached
+4. A cancelled waiter does not cancel the shared call
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ai_service
+from ai_singleflight import SingleFlightCache, prompt_key
+
+
+class TestSingleFlight:
+    def test_concurrent_requests_share_call(self):
+        cache = SingleFlightCache()
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"success": True, "card": {"title": "Fen"}}
+
+        async def scenario():
+            key = prompt_key("card", "Fen Philips", "electronics")
+            results = await asyncio.gather(*[cache.run(key, generate) for _ in range(20)])
+            # Har bir kutuvchi alohida nusxa oladi
+            results[0]["card"]["title"] = "changed"
+            return results
+
+        results = asyncio.run(scenario())
+        assert len(calls) == 1
+        assert all(r["card"]["title"] == "Fen" for r in results[1:])
+        stats = cache.get_stats()
+        assert stats["misses"] == 1 and stats["coalesced"] == 19
+        print("✅ 20 concurrent requests -> 1 upstream call")
+
+    def test_normalized_keys(self):
+        assert prompt_key("card", "Fen  Philips", "Electronics", 100000.0) == \
+            prompt_key("card", " fen philips", "electronics", 100000)
+        assert prompt_key("card", "Fen", {"b": 1, "a": ["X "]}) == prompt_key("card", "fen", {"a": ["x"], "b": 1})
+        assert prompt_key("card", "Fen", "electronics") != prompt_key("card", "Fen", "beauty")
+        assert prompt_key("card", "Fen") != prompt_key("other", "Fen")
+        print("✅ Keys normalize case / whitespace / ordering")
+
+    def test_ttl_and_failures(self):
+        cache = SingleFlightCache(ttl=0.05)
+        calls = []
+
+        async def ok():
+            calls.append("ok")
+            return {"success": True}
+
+        async def failed():
+            calls.append("failed")
+            return {"success": False}
+
+        async def broken():
+            calls.append("broken")
+            raise RuntimeError("upstream down")
+
+        async def scenario():
+            cacheable = lambda r: r["success"]
+            await cache.run("a", ok, cacheable)
+            await cache.run("a", ok, cacheable)
+            await asyncio.sleep(0.06)
+            await cache.run("a", ok, cacheable)
+
+            await cache.run("b", failed, cacheable)
+            await cache.run("b", failed, cacheable)
+
+            for _ in range(2):
+                with pytest.raises(RuntimeError):
+                    await cache.run("c", broken)
+
+        asyncio.run(scenario())
+        assert calls == ["ok", "ok", "failed", "failed", "broken", "broken"]
+        assert cache.get_stats()["errors"] == 2
+        print("✅ Results expire after TTL, failures are retried")
+
+    def test_cancelled_waiter(self):
+        cache = SingleFlightCache()
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "card"
+
+        async def scenario():
+            first = asyncio.create_task(cache.run("k", generate))
+            await asyncio.sleep(0.01)
+            second = asyncio.create_task(cache.run("k", generate))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(scenario()) == "card"
+        assert len(calls) == 1
+        print("✅ Cancelled waiter does not cancel the shared call")
+
+    def test_generate_product_card_coalesces(self, monkeypatch):
+        calls = []
+
+        async def fake_generate(name, category, description, price, marketplace):
+            calls.append(name)
+            await asyncio.sleep(0.02)
+            return {"success": True, "card": {"title": name}}
+
+        monkeypatch.setattr(ai_service, "_generate_product_card", fake_generate)
+        monkeypatch.setattr(ai_service, "text_generation_cache", SingleFlightCache())
+
+        async def scenario():
+            return await asyncio.gather(
+                ai_service.generate_product_card("Fen Philips", "electronics"),
+                ai_service.generate_product_card("fen  philips", "Electronics"),
+                ai_service.generate_product_card("Fen Philips", "electronics", marketplace="yandex"),
+            )
+
+        results = asyncio.run(scenario())
+        assert len(calls) == 2
+        assert results[0] == results[1]
+        print("✅ generate_product_card shares identical in-flight calls")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,109 @@
+"""
+Test AI provider telemetry (latency histograms, tokens, cost, failovers)
+Tests:
+1. Rolling window quantiles and slot expiry
+2. Token cost uses per-provider / per-type price (env override)
+3. Load balancer records calls, tokens and failovers per request type
+4. Prometheus text format (cumulative histogram buckets, labels)
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ai_load_balancer
+from ai_load_balancer import AILoadBalancer, report_token_usage
+from ai_telemetry import AITelemetry, RollingHistogram, cost_per_1k
+
+
+class TestRollingHistogram:
+    def test_quantiles_and_expiry(self):
+        histogram = RollingHistogram(bounds=(1.0, 2.0, 4.0), window=60, slot=10)
+        for i in range(100):
+            histogram.record("success", latency=0.5 if i < 90 else 3.0, now=1000.0)
+
+        window = histogram.window_stats(now=1005.0)
+        assert window["observed"] == 100
+        assert histogram.quantile(0.5, window) == pytest.approx(0.55, abs=0.01)
+        assert 2.0 < histogram.quantile(0.95, window) <= 3.0
+        assert histogram.quantile(0.99, window) <= 3.0
+
+        # Oyna o'tgach - oyna bo'sh, lifetime saqlanadi
+        assert histogram.window_stats(now=1100.0)["observed"] == 0
+        assert histogram.quantile(0.5, histogram.window_stats(now=1100.0)) is None
+        assert sum(histogram.counts) == 100
+        print("✅ Rolling window quantiles and expiry")
+
+    def test_cost_env_override(self, monkeypatch):
+        telemetry = AITelemetry()
+        telemetry.record_call("anthropic", "text", "success", 1.0, tokens=2000)
+        assert telemetry.calls[("anthropic", "text")].cost == pytest.approx(2 * cost_per_1k("anthropic", "text"))
+
+        monkeypatch.setenv("AI_COST_PER_1K_OPENAI_VISION", "0.01")
+        telemetry.record_call("openai", "vision", "success", 1.0, tokens=500)
+        assert telemetry.calls[("openai", "vision")].cost == pytest.approx(0.005)
+        print("✅ Token cost per provider and request type")
+
+
+class TestBalancerTelemetry:
+    def test_calls_and_failovers(self, monkeypatch):
+        telemetry = AITelemetry()
+        monkeypatch.setattr(ai_load_balancer, "ai_telemetry", telemetry)
+        balancer = AILoadBalancer()
+        for name, provider in balancer.providers.items():
+            provider.api_key = "test"
+            provider.enabled = name in ("openai", "anthropic")
+
+        async def request(provider, prompt):
+            if provider == "openai" and prompt == "fail":
+                raise Exception("openai server error (502)")
+            report_token_usage(300)
+            return provider
+
+        async def scenario():
+            for prompt in ("ok", "ok", "fail"):
+                await balancer.process_request("text", request, prompt)
+
+        asyncio.run(scenario())
+        snapshot = telemetry.snapshot()
+
+        openai = snapshot["providers"]["openai"]["text"]
+        assert openai["total"]["success"] == 2 and openai["total"]["error"] == 1
+        assert openai["total"]["tokens"] == 600
+        assert openai["window"]["latency_ms"]["p50"] is not None
+        assert snapshot["providers"]["anthropic"]["text"]["total"]["success"] == 1
+
+        text = snapshot["request_types"]["text"]
+        assert text["requests"] == 3 and text["failovers"] == 1
+        assert text["failover_paths"] == {"openai->anthropic": 1}
+        assert text["failover_rate"] == pytest.approx(0.333, abs=0.001)
+        assert text["tokens"] == 900 and text["cost_usd"] > 0
+        print("✅ Balancer records calls, tokens and failovers")
+
+    def test_prometheus_format(self):
+        telemetry = AITelemetry()
+        telemetry.record_request("vision")
+        telemetry.record_call("openai", "vision", "success", 0.3, tokens=1000)
+        telemetry.record_call("openai", "vision", "timeout", 40.0)
+        telemetry.record_failover("vision", "openai", "anthropic")
+
+        text = telemetry.render_prometheus(extra={"ai_queue_depth": ("gauge", 3, "Queue depth")})
+        lines = text.splitlines()
+        assert "# TYPE ai_provider_latency_seconds histogram" in lines
+        assert 'ai_provider_latency_seconds_bucket{provider="openai",type="vision",le="0.25"} 0' in lines
+        assert 'ai_provider_latency_seconds_bucket{provider="openai",type="vision",le="0.5"} 1' in lines
+        assert 'ai_provider_latency_seconds_bucket{provider="openai",type="vision",le="+Inf"} 1' in lines
+        assert 'ai_provider_calls_total{provider="openai",type="vision",outcome="timeout"} 1' in lines
+        assert 'ai_provider_tokens_total{provider="openai",type="vision"} 1000' in lines
+        assert 'ai_failovers_total{type="vision",from="openai",to="anthropic"} 1' in lines
+        assert 'ai_requests_total{type="vision"} 1' in lines
+        assert "ai_queue_depth 3" in lines
+        assert text.endswith("\n")
+        print("✅ Prometheus text format")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
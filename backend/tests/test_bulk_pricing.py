@@ -0,0 +1,102 @@
+"""
+Test vectorized bulk pricing against the scalar price calculators
+Tests:
+1. Uzum columns/records match calculate_full_price
+2. Yandex columns/records match calculate_yandex_price
+3. Unknown categories / fulfillment fall back like the scalar functions
+4. SKU x marketplace x fulfillment matrix matches per-channel scalar results
+"""
+
+import pytest
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bulk_pricing import CATEGORY_KEYS, calculate_bulk_prices, calculate_price_matrix, to_records
+from uzum_rules import calculate_full_price
+from yandex_rules import calculate_yandex_price
+
+
+def _catalog(count=2000):
+    rng = random.Random(8)
+    categories = CATEGORY_KEYS + [("unknown", None), ("Electronics", "TV"), ("home", "tv")]
+    rows = []
+    for _ in range(count):
+        category, subcategory = rng.choice(categories)
+        rows.append({
+            "cost_price": rng.choice([0, 25000, 99999, 150000, 600000, 1.5e6, 9e6, rng.uniform(0, 2e7)]),
+            "category": category,
+            "subcategory": subcategory,
+            "weight_kg": rng.choice([0.2, 1, 4.9, 5, 15, 40]),
+            "fulfillment": rng.choice(["fbs", "fbo", "fby", "dbs", "unknown"]),
+            "target_margin": rng.choice([10, 25, 40])
+        })
+    return rows
+
+
+def _assert_close(expected, actual, path=""):
+    if isinstance(expected, dict):
+        assert expected.keys() == actual.keys(), path
+        for key in expected:
+            _assert_close(expected[key], actual[key], f"{path}.{key}")
+    elif isinstance(expected, bool) or isinstance(expected, str):
+        assert expected == actual, path
+    else:
+        # Yaxlitlash farqi (round half-even, 0.1 xona) ruxsat etiladi
+        assert abs(expected - actual) <= 0.1 + 1e-9 * abs(expected), f"{path}: {expected} != {actual}"
+
+
+def _bulk(marketplace, rows):
+    columns = calculate_bulk_prices(
+        marketplace,
+        [r["cost_price"] for r in rows],
+        [r["category"] for r in rows],
+        [r["subcategory"] for r in rows],
+        weight_kg=[r["weight_kg"] for r in rows],
+        fulfillment=[r["fulfillment"] for r in rows],
+        target_margin=[r["target_margin"] for r in rows]
+    )
+    return to_records(marketplace, columns, [r["fulfillment"] for r in rows])
+
+
+class TestBulkPricing:
+    """Vectorized pricing vs scalar calculators"""
+
+    def test_uzum_matches_scalar(self):
+        rows = _catalog()
+        for row, record in zip(rows, _bulk("uzum", rows)):
+            _assert_close(calculate_full_price(**row), record)
+        print(f"✅ {len(rows)} Uzum SKUs match calculate_full_price")
+
+    def test_yandex_matches_scalar(self):
+        rows = _catalog()
+        for row, record in zip(rows, _bulk("yandex", rows)):
+            _assert_close(calculate_yandex_price(**row), record)
+        print(f"✅ {len(rows)} Yandex SKUs match calculate_yandex_price")
+
+    def test_unknown_marketplace(self):
+        with pytest.raises(ValueError):
+            calculate_bulk_prices("ozon", [1000], ["clothing"])
+        print("✅ Unknown marketplace rejected")
+
+    def test_price_matrix_matches_scalar(self):
+        rows = _catalog(300)
+        matrix = calculate_price_matrix(
+            [r["cost_price"] for r in rows],
+            [r["category"] for r in rows],
+            [r["subcategory"] for r in rows],
+            weight_kg=[r["weight_kg"] for r in rows]
+        )
+        for j, (marketplace, fulfillment) in enumerate(matrix["channels"]):
+            calculate = calculate_full_price if marketplace == "uzum" else calculate_yandex_price
+            for i, r in enumerate(rows):
+                expected = calculate(r["cost_price"], r["category"], r["subcategory"], r["weight_kg"], fulfillment)
+                assert abs(matrix["optimal_price"][i, j] - expected["optimal_price"]) <= 0.5
+                assert abs(matrix["net_profit"][i, j] - expected["breakdown"]["net_profit"]) <= 0.5
+        print(f"✅ {len(rows)} x {len(matrix['channels'])} price matrix matches scalar calculators")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,181 @@
+"""
+Test streaming card generation over Server-Sent Events
+Tests:
+1. JSON field extractor emits top-level fields as soon as they are complete
+2. Event sequence: start -> field* -> validation -> done
+3. Stop-word validation still runs at the end of the stream
+4. Balancer stream fails over before the first chunk, not after it
+"""
+
+import pytest
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ai_load_balancer import AILoadBalancer
+from card_stream import JSONFieldExtractor, stream_card_events, validate_card_text, sse_event
+from yandex_service import YandexCardGenerator
+
+
+def _parse_events(raw_events):
+    events = []
+    for raw in raw_events:
+        lines = raw.strip().split("\n")
+        events.append((lines[0][len("event: "):], json.loads(lines[1][len("data: "):])))
+    return events
+
+
+async def _chunks(text, size=3):
+    for i in range(0, len(text), size):
+        await asyncio.sleep(0)
+        yield text[i:i + size]
+
+
+async def _collect(agen):
+    return [event async for event in agen]
+
+
+class TestJSONFieldExtractor:
+    def test_fields_emitted_incrementally(self):
+        card = {
+            "title": "Fen \"Philips\" BHD",
+            "shortDescription": "Ixcham, {kuchli} fen",
+            "bulletPoints": ["2200 Vt", "3 rejim"],
+            "specifications": {"Rang": "qora", "Nested": [1, 2]},
+            "seoScore": 87,
+            "ready": True
+        }
+        text = "```json\n" + json.dumps(card, ensure_ascii=False, indent=2) + "\n```"
+
+        extractor = JSONFieldExtractor()
+        found = []
+        first_seen = {}
+        for i, ch in enumerate(text):
+            for key, value in extractor.feed(ch):
+                found.append((key, value))
+                first_seen[key] = i
+
+        assert [key for key, _ in found] == list(card)
+        assert dict(found) == card
+        # Sarlavha javob oxirigacha kutilmasdan ajratiladi
+        assert first_seen["title"] < len(text) // 3
+        assert extractor.complete
+        assert extractor.result() == card
+        print("✅ Fields are extracted as soon as they close")
+
+    def test_truncated_response_keeps_completed_fields(self):
+        extractor = JSONFieldExtractor()
+        extractor.feed('{"title": "Fen", "description": "Uzun tav')
+        assert extractor.fields == {"title": "Fen"}
+        assert not extractor.complete
+        assert extractor.result() == {"title": "Fen"}
+        print("✅ Truncated stream keeps completed fields")
+
+
+class TestCardStreamEvents:
+    def test_event_sequence_with_validation(self):
+        card = {
+            "name": "Фен Philips BHD 2200 Вт — хит продаж и лучший выбор",
+            "bullet_points": ["2200 Вт"],
+            "description": "Описание"
+        }
+        events = _parse_events(asyncio.run(_collect(stream_card_events(
+            _chunks(json.dumps(card, ensure_ascii=False)),
+            YandexCardGenerator.finalize_card,
+            {"marketplace": "yandex"}
+        ))))
+
+        names = [name for name, _ in events]
+        assert names == ["start", "field", "field", "field", "validation", "done"]
+        assert [data["field"] for name, data in events if name == "field"] == ["name", "bullet_points", "description"]
+
+        validation = events[-2][1]
+        assert not validation["is_valid"]
+        assert "хит" in validation["errors"][0]
+
+        done = events[-1][1]
+        assert done["success"] and len(done["card"]["name"]) <= 60
+        print("✅ Stream ends with stop-word validation and the final card")
+
+    def test_generic_card_validation(self):
+        result = validate_card_text({
+            "title": "Fen Philips",
+            "shortDescription": "Ixcham fen",
+            "bulletPoints": ["Kuchli motor, оригинал"],
+            "description": "Yaxshi fen. " * 30
+        }, "wildberries")
+        assert result["marketplace"] == "uzum"
+        assert not result["is_valid"]
+        assert "оригинал" in result["found_words"]
+        assert result["errors"] == ["bulletPoints[0]: Taqiqlangan so'zlar: оригинал"]
+        print("✅ Generic cards are validated with the marketplace stop words")
+
+    def test_stream_error_event(self):
+        async def failing():
+            yield '{"title": "Fen",'
+            raise Exception("openai server error (500)")
+
+        events = _parse_events(asyncio.run(_collect(
+            stream_card_events(failing(), YandexCardGenerator.finalize_card)
+        )))
+        assert [name for name, _ in events] == ["start", "field", "error"]
+        assert events[-1][1] == {"success": False, "error": "openai server error (500)"}
+        assert sse_event("done", {}) == "event: done\ndata: {}\n\n"
+        print("✅ Upstream failure ends the stream with an error event")
+
+
+class TestBalancedStream:
+    def _balancer(self):
+        balancer = AILoadBalancer()
+        for name, provider in balancer.providers.items():
+            provider.api_key = "test"
+            provider.enabled = name in ("openai", "anthropic")
+        return balancer
+
+    def test_failover_before_first_chunk(self):
+        balancer = self._balancer()
+        calls = []
+
+        async def stream(provider, usage, prompt):
+            calls.append(provider)
+            if provider == "openai":
+                raise Exception("openai server error (503)")
+            usage["tokens"] = 42
+            for word in ("a", "b", "c"):
+                yield word
+
+        chunks = asyncio.run(_collect(balancer.stream_request("text", stream, "prompt")))
+        assert chunks == ["a", "b", "c"]
+        assert calls == ["openai", "anthropic"]
+        assert balancer.in_flight == 0
+        assert balancer.providers["anthropic"].limiter.current_tpm == 42
+        print("✅ Stream fails over before the first chunk")
+
+    def test_no_failover_after_first_chunk(self):
+        balancer = self._balancer()
+        calls = []
+
+        async def stream(provider, usage, prompt):
+            calls.append(provider)
+            yield "partial"
+            raise Exception("connection reset")
+
+        async def scenario():
+            received = []
+            with pytest.raises(Exception, match="connection reset"):
+                async for chunk in balancer.stream_request("text", stream, "prompt"):
+                    received.append(chunk)
+            return received
+
+        assert asyncio.run(scenario()) == ["partial"]
+        assert calls == ["openai"]
+        assert balancer.in_flight == 0
+        assert balancer.failed_requests == 1
+        print("✅ Errors after the first chunk are not retried")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,93 @@
+"""
+Test compiled commission / logistics lookups against the scalar rules
+Tests:
+1. Uzum get_commission_by_price / get_commission_rate match the linear dict scan
+2. Yandex get_yandex_commission_rate matches the nested dict lookup
+3. Logistics fees match the weight if/elif chain for every fulfillment type
+4. calculate_full_price gives the same result with the old lookups
+"""
+
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import uzum_rules
+import yandex_rules
+from uzum_rules import PRICE_BASED_COMMISSION, COMMISSION_RATES, LOGISTICS_FEES
+from yandex_rules import YANDEX_COMMISSION_RATES, YANDEX_LOGISTICS_FEES
+from benchmarks.bench_commission import (
+    legacy_get_commission_by_price,
+    legacy_get_commission_rate,
+    legacy_get_yandex_commission_rate,
+    legacy_logistics_fee,
+    legacy_calculate_full_price,
+)
+
+
+def _prices():
+    """Har bir narx diapazoni chegarasi va uning atrofi"""
+    prices = {None, 0, -1, 0.5, 2e8}
+    for min_price, max_price, _ in PRICE_BASED_COMMISSION.values():
+        prices.update({min_price - 1, min_price, min_price + 0.5, max_price - 0.5, max_price})
+    return sorted(prices, key=lambda p: -2 if p is None else p)
+
+
+def _category_pairs(rates):
+    """Barcha (category, subcategory) juftliklari + registr / noma'lum variantlari"""
+    pairs = [("unknown", None), ("unknown", "tv"), ("default", None)]
+    for category, subs in rates.items():
+        pairs.extend([(category, None), (category.upper(), None), (category, "xyz")])
+        if isinstance(subs, dict):
+            # "default" yozuvidagi base / max kabi maydonlar subkategoriya emas
+            for sub in (sub for sub, data in subs.items() if isinstance(data, dict)):
+                pairs.extend([(category, sub), (category.title(), sub.upper())])
+    for category in uzum_rules.LARGE_APPLIANCE_CATEGORIES:
+        pairs.extend((category, sub) for sub in uzum_rules.LARGE_APPLIANCE_SUBCATEGORIES)
+    return pairs
+
+
+WEIGHTS = [0, 0.2, 0.999, 1, 3, 4.999, 5, 14.9, 15, 40]
+
+
+class TestCommissionLookup:
+    def test_uzum_commission(self):
+        prices = _prices()
+        for price in prices:
+            if price is not None:
+                assert uzum_rules.get_commission_by_price(price) == legacy_get_commission_by_price(price), price
+        pairs = _category_pairs(COMMISSION_RATES)
+        for category, subcategory in pairs:
+            for price in prices:
+                assert uzum_rules.get_commission_rate(category, subcategory, price) == \
+                    legacy_get_commission_rate(category, subcategory, price), (category, subcategory, price)
+        print(f"✅ Uzum commission: {len(pairs) * len(prices)} lookups agree")
+
+    def test_yandex_commission(self):
+        pairs = _category_pairs(YANDEX_COMMISSION_RATES)
+        for category, subcategory in pairs:
+            assert yandex_rules.get_yandex_commission_rate(category, subcategory) == \
+                legacy_get_yandex_commission_rate(category, subcategory), (category, subcategory)
+        print(f"✅ Yandex commission: {len(pairs)} lookups agree")
+
+    def test_logistics_fees(self):
+        for fulfillment in list(LOGISTICS_FEES) + list(YANDEX_LOGISTICS_FEES) + ["unknown"]:
+            for weight in WEIGHTS:
+                assert uzum_rules.calculate_logistics_fee(weight, fulfillment) == \
+                    legacy_logistics_fee(LOGISTICS_FEES, weight, fulfillment), (fulfillment, weight)
+                assert yandex_rules.get_yandex_logistics_fee(weight, fulfillment) == \
+                    legacy_logistics_fee(YANDEX_LOGISTICS_FEES, weight, fulfillment), (fulfillment, weight)
+        print("✅ Logistics fees agree")
+
+    def test_full_price(self):
+        for category, subcategory in _category_pairs(COMMISSION_RATES)[::3]:
+            for cost_price in [25000, 150000, 1.5e6]:
+                for weight, fulfillment in [(0.5, "fbs"), (7, "fbo"), (20, "unknown")]:
+                    args = (cost_price, category, subcategory, weight, fulfillment)
+                    assert uzum_rules.calculate_full_price(*args) == legacy_calculate_full_price(*args), args
+        print("✅ calculate_full_price unchanged")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
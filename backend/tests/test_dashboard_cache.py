@@ -0,0 +1,179 @@
+"""
+Test Yandex dashboard fan-out and per-partner dashboard cache
+Tests:
+1. get_dashboard_data runs its calls concurrently (latency ~ slowest call); failed sections mark it partial
+2. Fresh hits served from memory; stale entries returned and refreshed in background
+3. Concurrent misses share one fetch; failed refresh keeps the last dashboard
+4. Credentials change the key; force bypasses the cache
+5. Partial dashboards are not cached; the previous full dashboard is served
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dashboard_cache import DashboardCache, is_complete_dashboard
+from yandex_service import YandexMarketAPI
+
+CALL_DELAY = 0.2
+
+
+def _slow_api():
+    api = YandexMarketAPI(oauth_token="test", business_id="42", campaign_id="7")
+
+    async def check_connection():
+        await asyncio.sleep(CALL_DELAY)
+        return True
+
+    async def get_all_offers_status(limit=50):
+        await asyncio.sleep(CALL_DELAY)
+        return {"success": True, "stats": {"total": 12, "ready": 9, "in_moderation": 3}}
+
+    async def get_orders(page=1, status=None):
+        await asyncio.sleep(CALL_DELAY)
+        return {"success": True, "orders": [{"status": "PROCESSING"}, {"status": "DELIVERED"}]}
+
+    async def get_sales_statistics(date_from=None, date_to=None):
+        raise RuntimeError("stats API down")
+
+    api.check_connection = check_connection
+    api.get_all_offers_status = get_all_offers_status
+    api.get_orders = get_orders
+    api.get_sales_statistics = get_sales_statistics
+    return api
+
+
+class Counter:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("Yandex API down")
+        return {"connection_status": "active", "version": self.calls}
+
+
+class TestDashboardFanOut:
+    def test_calls_run_concurrently(self):
+        started = time.monotonic()
+        dashboard = asyncio.run(_slow_api().get_dashboard_data())
+        elapsed = time.monotonic() - started
+
+        assert elapsed < CALL_DELAY * 2
+        assert dashboard["connection_status"] == "active"
+        assert dashboard["products"]["total"] == 12 and dashboard["products"]["active"] == 9
+        assert dashboard["orders"] == {"total": 2, "pending": 1, "completed": 1}
+        # Bitta so'rov xatosi boshqalarini buzmaydi, lekin dashboard qisman deb belgilanadi
+        assert dashboard["revenue"] == {"total": 0, "this_month": 0}
+        assert dashboard["partial"] is True and dashboard["errors"] == {"revenue": "stats API down"}
+        assert not is_complete_dashboard(dashboard)
+        print(f"✅ Dashboard fan-out: {elapsed:.2f}s")
+
+
+class TestDashboardCache:
+    def test_fresh_and_stale(self):
+        cache = DashboardCache(ttl=0.2, stale_ttl=5)
+        fetcher = Counter()
+
+        async def scenario():
+            first = await cache.get_or_fetch("p1", fetcher)
+            second = await cache.get_or_fetch("p1", fetcher)
+            await asyncio.sleep(0.25)
+            stale = await cache.get_or_fetch("p1", fetcher)
+            await asyncio.sleep(0.05)
+            refreshed = await cache.get_or_fetch("p1", fetcher)
+            return first, second, stale, refreshed
+
+        first, second, stale, refreshed = asyncio.run(scenario())
+        assert first == ({"connection_status": "active", "version": 1}, "miss")
+        assert second[1] == "fresh" and second[0]["version"] == 1
+        assert stale[1] == "stale" and stale[0]["version"] == 1
+        assert refreshed[1] == "fresh" and refreshed[0]["version"] == 2
+        assert fetcher.calls == 2
+        stats = cache.get_stats()
+        assert stats["hits"] == 2 and stats["stale_hits"] == 1 and stats["refreshes"] == 1
+        print("✅ Fresh hits from memory, stale refreshed in background")
+
+    def test_single_flight_and_failure_fallback(self):
+        cache = DashboardCache(ttl=0.1, stale_ttl=0.1)
+        fetcher = Counter(delay=0.1)
+
+        async def scenario():
+            results = await asyncio.gather(*(cache.get_or_fetch("p1", fetcher) for _ in range(10)))
+            await asyncio.sleep(0.15)
+            fetcher.fail = True
+            fallback = await cache.get_or_fetch("p1", fetcher)
+            return results, fallback
+
+        results, fallback = asyncio.run(scenario())
+        assert all(result == ({"connection_status": "active", "version": 1}, "miss") for result in results)
+        assert fallback == ({"connection_status": "active", "version": 1}, "stale")
+        assert fetcher.calls == 2 and cache.errors == 1
+
+        # Ulanish xatosi keshlanmaydi
+        async def broken():
+            return {"connection_status": "error"}
+
+        result = asyncio.run(cache.get_or_fetch(
+            "p2", broken, cacheable=lambda data: data["connection_status"] == "active"
+        ))
+        assert result == ({"connection_status": "error"}, "miss") and cache.get_stats()["size"] == 1
+        print("✅ One fetch per partner, failures keep last dashboard")
+
+    def test_key_and_force(self):
+        cache = DashboardCache(ttl=60, stale_ttl=600)
+        fetcher = Counter()
+        key = cache.make_key("p1", "token-a", "42", "7")
+        assert key == cache.make_key("p1", "token-a", "42", "7")
+        assert key != cache.make_key("p1", "token-b", "42", "7")
+
+        async def scenario():
+            await cache.get_or_fetch(key, fetcher)
+            return await cache.get_or_fetch(key, fetcher, force=True)
+
+        dashboard, state = asyncio.run(scenario())
+        assert state == "miss" and dashboard["version"] == 2
+        print("✅ Credentials in key, force bypasses cache")
+
+    def test_partial_not_cached(self):
+        cache = DashboardCache(ttl=0.05, stale_ttl=0.1)
+        full = {"connection_status": "active", "revenue": {"total": 500, "this_month": 500}}
+        partial = {"connection_status": "active", "revenue": {"total": 0, "this_month": 0},
+                   "partial": True, "errors": {"revenue": "stats API down"}}
+        responses = [full, partial, partial]
+
+        async def fetcher():
+            return responses.pop(0)
+
+        async def scenario():
+            first = await cache.get_or_fetch("p1", fetcher, cacheable=is_complete_dashboard)
+            await asyncio.sleep(0.06)
+            # Stale: fonda yangilash qisman - keshdagi to'liq dashboard qoladi
+            stale = await cache.get_or_fetch("p1", fetcher, cacheable=is_complete_dashboard)
+            await asyncio.sleep(0.1)
+            expired = await cache.get_or_fetch("p1", fetcher, cacheable=is_complete_dashboard)
+            return first, stale, expired
+
+        first, stale, expired = asyncio.run(scenario())
+        assert first == (full, "miss")
+        assert stale == (full, "stale")
+        assert expired == (full, "stale")
+        assert not responses and cache.errors == 2
+
+        # Oldingi dashboard yo'q - qisman natija qaytadi, lekin keshlanmaydi
+        responses.append(partial)
+        only_partial = asyncio.run(cache.get_or_fetch("p2", fetcher, cacheable=is_complete_dashboard))
+        assert only_partial == (partial, "miss") and cache.get_stats()["size"] == 1
+        print("✅ Partial dashboards are not cached, last full one is served")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,158 @@
+"""
+Test the fake AI provider server used for offline load testing
+Tests:
+1. OpenAI / Anthropic / Gemini response shapes (vision returns canned products)
+2. 429 / 5xx injection with Retry-After, runtime /_config and /_stats
+3. Latency distribution parsing
+4. ai_load_balancer provider functions work against the fake server
+"""
+
+import pytest
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from fastapi.testclient import TestClient
+
+import ai_load_balancer
+from fake_ai_server import FakeAIBackend, ProviderProfile, LatencyDistribution, build_app, CANNED_PRODUCTS
+
+
+def _client(**profile):
+    profiles = {
+        name: ProviderProfile(latency=LatencyDistribution("fixed", 0.0, 0.0), **profile)
+        for name in ("openai", "anthropic", "gemini", "emergent")
+    }
+    return TestClient(build_app(FakeAIBackend(profiles, seed=1)))
+
+
+class TestFakeProviders:
+    def test_openai_vision_and_text(self):
+        client = _client()
+        vision = client.post("/openai/v1/chat/completions", json={
+            "model": "gpt-4o",
+            "messages": [{"role": "user", "content": [
+                {"type": "text", "text": "Analyze"},
+                {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,AAAA"}}
+            ]}]
+        }).json()
+        assert json.loads(vision["choices"][0]["message"]["content"]) == CANNED_PRODUCTS[0]
+        assert vision["usage"]["total_tokens"] > 0
+
+        text = client.post("/openai/v1/chat/completions", json={
+            "messages": [{"role": "user", "content": "Kartochka"}]
+        }).json()
+        assert "title" in json.loads(text["choices"][0]["message"]["content"])
+        print("✅ OpenAI vision/text responses")
+
+    def test_anthropic_stream(self):
+        client = _client()
+        response = client.post("/anthropic/v1/messages", json={
+            "messages": [{"role": "user", "content": "name_uz kartochka"}], "stream": True
+        })
+        events = [json.loads(line[5:]) for line in response.text.splitlines() if line.startswith("data:")]
+        text = "".join(e["delta"]["text"] for e in events if e["type"] == "content_block_delta")
+        assert "name_uz" in json.loads(text)
+        assert events[0]["type"] == "message_start" and events[-1]["type"] == "message_stop"
+        print("✅ Anthropic streaming response")
+
+    def test_gemini_requires_key(self):
+        client = _client()
+        path = "/gemini/v1beta/models/gemini-1.5-flash:generateContent"
+        body = {"contents": [{"parts": [{"text": "salom"}]}]}
+        assert client.post(path, json=body).status_code == 400
+        data = client.post(f"{path}?key=fake", json=body).json()
+        assert data["candidates"][0]["content"]["parts"][0]["text"]
+        assert data["usageMetadata"]["totalTokenCount"] > 0
+        print("✅ Gemini generateContent")
+
+    def test_error_injection_and_config(self):
+        client = _client(error_429=1.0, retry_after=7)
+        response = client.post("/openai/v1/chat/completions", json={"messages": []})
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "7"
+
+        client.post("/_config", json={"openai": {"error_429": 0.0, "error_5xx": 1.0}})
+        assert client.post("/openai/v1/chat/completions", json={"messages": []}).status_code == 503
+
+        stats = client.get("/_stats").json()["openai"]
+        assert stats["requests"] == 2 and stats["rate_limited"] == 1 and stats["server_errors"] == 1
+        assert client.post("/_config", json={"openai": {"bogus": 1}}).status_code == 400
+        print("✅ 429/5xx injection and runtime config")
+
+    def test_rpm_limit(self):
+        client = _client(rpm_limit=60)
+        codes = [client.post("/openai/v1/chat/completions", json={"messages": []}).status_code for _ in range(8)]
+        # 5 soniyalik burst: 5 ta o'tadi
+        assert codes.count(200) == 5 and codes.count(429) == 3
+        print("✅ Provider RPM limit")
+
+    def test_latency_distributions(self):
+        rng = random.Random(3)
+        assert LatencyDistribution.parse("fixed:0.5").sample(rng) == 0.5
+        assert 0.2 <= LatencyDistribution.parse("uniform:0.2:0.4").sample(rng) <= 0.4
+        samples = sorted(LatencyDistribution.parse("lognormal:1:0.5").sample(rng) for _ in range(2000))
+        assert 0.9 < samples[1000] < 1.1
+        with pytest.raises(ValueError):
+            LatencyDistribution.parse("normal:1")
+        print("✅ Latency distributions")
+
+
+class TestBalancerAgainstFakeServer:
+    def test_provider_functions(self, monkeypatch):
+        import uvicorn
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        backend = FakeAIBackend(seed=1)
+        for profile in backend.profiles.values():
+            profile.latency = LatencyDistribution("fixed", 0.01, 0.0)
+        server = uvicorn.Server(uvicorn.Config(build_app(backend), host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.02)
+
+        base = f"http://127.0.0.1:{port}"
+        monkeypatch.setattr(ai_load_balancer, "OPENAI_BASE_URL", f"{base}/openai/v1")
+        monkeypatch.setattr(ai_load_balancer, "ANTHROPIC_BASE_URL", f"{base}/anthropic/v1")
+        monkeypatch.setattr(ai_load_balancer, "GEMINI_BASE_URL", f"{base}/gemini/v1beta")
+        for key in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "GOOGLE_API_KEY"):
+            monkeypatch.setattr(ai_load_balancer, key, "fake")
+
+        async def scenario():
+            scans = [await ai_load_balancer._scan_with_provider(p, "AAAA") for p in ("openai", "anthropic")]
+            texts = [
+                await ai_load_balancer._generate_text_with_provider(p, "salom")
+                for p in ("openai", "anthropic", "gemini")
+            ]
+            streamed = []
+            for provider in ("openai", "anthropic", "gemini"):
+                usage = {}
+                chunks = [c async for c in ai_load_balancer._stream_text_with_provider(provider, usage, "salom")]
+                streamed.append(("".join(chunks), usage.get("tokens", 0)))
+            return scans, texts, streamed
+
+        try:
+            scans, texts, streamed = asyncio.run(scenario())
+        finally:
+            server.should_exit = True
+            thread.join(timeout=5)
+
+        assert all(scan["name"] for scan in scans)
+        assert all("title" in json.loads(text) for text in texts)
+        assert all(json.loads(text) and tokens > 0 for text, tokens in streamed)
+        print("✅ Balancer provider functions speak the fake server protocol")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
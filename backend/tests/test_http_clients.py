@@ -0,0 +1,127 @@
+"""
+Test shared pooled HTTP clients
+Tests:
+1. One client per upstream host, reused across calls (not closed by `async with`)
+2. Host config (timeout, limits) applied; new event loop gets fresh clients
+3. Pooled client reuses the keep-alive connection against a real server
+4. aclose() closes all clients (FastAPI shutdown)
+5. Clients are closed when their event loop finishes (asyncio.run)
+"""
+
+import pytest
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI, Request
+
+from http_clients import HTTPClientRegistry, http_clients, http_client
+
+
+def _start_server():
+    import uvicorn
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping(request: Request):
+        return {"port": request.client.port}
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.02)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+class TestHTTPClientRegistry:
+    def test_one_client_per_host(self):
+        registry = HTTPClientRegistry()
+
+        async def scenario():
+            a = registry.get("https://api.partner.market.yandex.ru/v2/campaigns")
+            b = registry.get("https://API.partner.market.yandex.ru")
+            c = registry.get("https://api-seller.uzum.uz/api/seller-openapi")
+            return a, b, c
+
+        a, b, c = asyncio.run(scenario())
+        assert a is b and a is not c
+        stats = registry.get_stats()
+        assert stats["hosts"]["https://api.partner.market.yandex.ru"] == {"clients_created": 1, "uses": 2}
+        print("✅ One pooled client per host")
+
+    def test_config_and_new_loop(self):
+        registry = HTTPClientRegistry()
+        registry.register("https://tasnif.soliq.uz/api", timeout=12, max_connections=7)
+
+        async def get():
+            return registry.get("https://tasnif.soliq.uz/api/cls/search")
+
+        first = asyncio.run(get())
+        assert first.timeout.read == 12 and first.timeout.connect <= 10
+        assert first._transport._pool._max_connections == 7
+
+        second = asyncio.run(get())
+        assert second is not first
+        assert registry.created["https://tasnif.soliq.uz"] == 2
+        print("✅ Host config applied, new loop gets a new client")
+
+    def test_keepalive_reuse(self):
+        server, thread, base = _start_server()
+
+        async def scenario():
+            ports = []
+            for _ in range(10):
+                async with http_client(base) as client:
+                    ports.append((await client.get(f"{base}/ping")).json()["port"])
+            client = http_clients.get(base)
+            await http_clients.aclose()
+            return ports, client
+
+        try:
+            ports, client = asyncio.run(scenario())
+        finally:
+            server.should_exit = True
+            thread.join(timeout=5)
+
+        # Barcha so'rovlar bitta TCP ulanish orqali
+        assert len(set(ports)) == 1
+        assert client.is_closed
+        print("✅ Keep-alive connection reused, aclose() closes clients")
+
+    def test_old_loop_sockets_closed(self):
+        registry = HTTPClientRegistry()
+        server, thread, base = _start_server()
+
+        async def request():
+            client = registry.get(base)
+            await client.get(f"{base}/ping")
+            stream = client._transport._pool.connections[0]._connection._network_stream
+            sock = stream.get_extra_info("socket")
+            assert sock.fileno() != -1
+            return client, sock
+
+        try:
+            first, first_socket = asyncio.run(request())
+            second, second_socket = asyncio.run(request())
+        finally:
+            server.should_exit = True
+            thread.join(timeout=5)
+
+        # asyncio.run tugaganda klient va uning socket'i yopilgan
+        assert first.is_closed and second.is_closed and first is not second
+        assert first_socket.fileno() == -1 and second_socket.fileno() == -1
+        print("✅ Clients closed when their event loop finishes")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,144 @@
+"""
+Test IKPU search cache against a local stub tasnif.soliq.uz server
+Tests:
+1. Fresh hits are served from memory without calling upstream
+2. Stale entries are returned immediately and refreshed in background
+3. Upstream failures fall back to the last cached result
+4. Concurrent misses for the same query share one upstream call
+"""
+
+import pytest
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ikpu_service
+from ikpu_cache import IKPUSearchCache
+
+
+class StubTasnifHandler(BaseHTTPRequestHandler):
+    """Minimal /cls/search stand-in for tasnif.soliq.uz"""
+    calls = 0
+    status = 200
+    delay = 0.0
+
+    def do_GET(self):
+        StubTasnifHandler.calls += 1
+        time.sleep(StubTasnifHandler.delay)
+        body = json.dumps({
+            "data": [{"mxik": "08517001001000000", "name_uz": f"Telefon #{StubTasnifHandler.calls}"}]
+        }).encode()
+        self.send_response(StubTasnifHandler.status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    server = HTTPServer(("127.0.0.1", 0), StubTasnifHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    original_url = ikpu_service.IKPU_BASE_URL
+    ikpu_service.IKPU_BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    ikpu_service.IKPU_BASE_URL = original_url
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def reset_stub():
+    StubTasnifHandler.calls = 0
+    StubTasnifHandler.status = 200
+    StubTasnifHandler.delay = 0.0
+
+
+def _fetch(cache, query):
+    return cache.get_or_fetch(query, 5, ikpu_service.IKPUService._fetch_from_tasnif)
+
+
+class TestIKPUSearchCache:
+    """IKPUSearchCache behaviour with a stub upstream"""
+
+    def test_fresh_hit_skips_upstream(self, stub_server):
+        cache = IKPUSearchCache(max_size=10, ttl=60, stale_ttl=120, persistent=False)
+
+        async def run():
+            first = await _fetch(cache, "Telefon")
+            second = await _fetch(cache, "  telefon ")
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first == second
+        assert StubTasnifHandler.calls == 1
+        stats = cache.get_stats()
+        assert stats["misses"] == 1
+        assert stats["memory_hits"] == 1
+        print(f"✅ Fresh hit served from memory: {stats}")
+
+    def test_stale_while_revalidate(self, stub_server):
+        cache = IKPUSearchCache(max_size=10, ttl=0, stale_ttl=60, persistent=False)
+
+        async def run():
+            first = await _fetch(cache, "telefon")
+            stale = await _fetch(cache, "telefon")
+            await asyncio.sleep(0.5)  # background refresh
+            return first, stale
+
+        first, stale = asyncio.run(run())
+        assert stale == first
+        assert StubTasnifHandler.calls == 2
+        assert cache.get_stats()["stale_hits"] == 1
+        assert cache._lru[cache.make_key("telefon", 5)][0][0]["name_uz"] == "Telefon #2"
+        print(f"✅ Stale result served and refreshed: {cache.get_stats()}")
+
+    def test_upstream_error_falls_back_to_cached(self, stub_server):
+        cache = IKPUSearchCache(max_size=10, ttl=0, stale_ttl=0, persistent=False)
+
+        async def run():
+            first = await _fetch(cache, "telefon")
+            StubTasnifHandler.status = 503
+            second = await _fetch(cache, "telefon")
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert second == first
+        assert cache.get_stats()["fetch_errors"] == 1
+        print("✅ Upstream 503 served last cached result")
+
+    def test_concurrent_misses_share_one_call(self, stub_server):
+        cache = IKPUSearchCache(max_size=10, ttl=60, stale_ttl=120, persistent=False)
+        StubTasnifHandler.delay = 0.2
+
+        async def run():
+            return await asyncio.gather(*[_fetch(cache, "telefon") for _ in range(10)])
+
+        results = asyncio.run(run())
+        assert all(r == results[0] for r in results)
+        assert StubTasnifHandler.calls == 1
+        print("✅ 10 concurrent misses -> 1 upstream call")
+
+    def test_lru_is_bounded(self, stub_server):
+        cache = IKPUSearchCache(max_size=3, ttl=60, stale_ttl=120, persistent=False)
+
+        async def run():
+            for q in ["a1", "b2", "c3", "d4"]:
+                await _fetch(cache, q)
+
+        asyncio.run(run())
+        assert cache.get_stats()["size"] == 3
+        assert cache.make_key("a1", 5) not in cache._lru
+        print("✅ LRU evicts oldest entry")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
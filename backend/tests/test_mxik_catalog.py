@@ -0,0 +1,80 @@
+"""
+Test compiled MXIK catalog (mxik_catalog.py)
+Tests:
+1. Compiled .idx file round-trips codes and names from mxik_codes.json
+2. mmap'd index gives the same search / best-match results as the JSON index
+3. Items whose fullCode cannot be stored are counted, not dropped silently
+"""
+
+import pytest
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from mxik_catalog import MXIKCatalog, build_catalog_file, compile_catalog
+from mxik_index import MXIKIndex, find_mxik_file
+
+
+@pytest.fixture(scope="module")
+def mxik_items():
+    path = find_mxik_file()
+    if not path:
+        pytest.skip("mxik_codes.json not found")
+    with open(path, 'r', encoding='utf-8') as f:
+        return path, json.load(f)
+
+
+@pytest.fixture(scope="module")
+def compiled_path(mxik_items, tmp_path_factory):
+    output = str(tmp_path_factory.mktemp("mxik") / "mxik_codes.idx")
+    build_catalog_file(mxik_items[0], output)
+    return output
+
+
+class TestMXIKCatalog:
+    """Compiled catalog vs JSON source"""
+
+    def test_round_trip(self, mxik_items, compiled_path):
+        _, items = mxik_items
+        catalog = MXIKCatalog.open_mapped(compiled_path)
+        assert len(catalog) == len(items)
+        for i, item in enumerate(items):
+            assert catalog.code(i) == item["fullCode"].ljust(17, '0')
+            assert catalog.name_uz(i) == item["nameUz"]
+            assert catalog.name_ru(i) == item["nameRu"]
+        print(f"✅ {len(catalog)} items round-trip through {compiled_path}")
+
+    def test_mapped_index_matches_json_index(self, mxik_items, compiled_path):
+        _, items = mxik_items
+        from_json = MXIKIndex.from_items(items)
+        mapped = MXIKIndex.from_compiled(compiled_path)
+
+        for query in ["telefon", "телефон", "kofe", "shampun", "atir", "парацетамол"]:
+            assert mapped.search(query, 10) == from_json.search(query, 10)
+        for name, category, brand in [
+            ("Samsung Galaxy S24 Ultra", "smartphones", "Samsung"),
+            ("Тирик отлар", "", ""),
+            ("Erkaklar ko'ylagi", "кийим", ""),
+        ]:
+            assert mapped.best_match(name, category, brand) == from_json.best_match(name, category, brand)
+        print("✅ mmap'd index matches JSON index")
+
+    def test_skipped_items_counted(self, capsys):
+        items = [
+            {"fullCode": "01234567890123456", "nameUz": "Olma", "nameRu": "Яблоко"},
+            {"fullCode": "1234", "nameUz": "Qisqa", "nameRu": ""},
+            {"fullCode": "012345678901234567", "nameUz": "Uzun", "nameRu": ""},
+            {"fullCode": "0123456A", "nameUz": "Harfli", "nameRu": ""},
+        ]
+        stats = {}
+        catalog = MXIKCatalog(compile_catalog(items, stats))
+        assert len(catalog) == 1 and catalog.name_uz(0) == "Olma"
+        assert stats == {"skipped": 3, "skipped_invalid": 2}
+        assert "2 items with unsupported fullCode skipped" in capsys.readouterr().out
+        print("✅ Unsupported codes counted and reported")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
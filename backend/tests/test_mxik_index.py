@@ -0,0 +1,115 @@
+"""
+Test MXIK inverted index against the original linear-scan scorer
+Tests:
+1. best_match gives the same code and score as the linear scan over a fixed query set
+2. containing() candidates equal a linear substring scan over nameUz / nameRu
+"""
+
+import pytest
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from mxik_index import MXIKIndex, find_mxik_file, MXIK_STOP_WORDS
+
+FIXED_QUERIES = [
+    ("Samsung Galaxy S24 Ultra", "smartphones", "Samsung"),
+    ("Тирик отлар", "", ""),
+    ("Erkaklar ko'ylagi", "кийим", ""),
+    ("Атропин кўз томчилари", "", ""),
+    ("парацетамол таблетка", "дори", ""),
+    ("kofe", "", "Nescafe"),
+    ("шампунь для волос", "", ""),
+    ("go", "", ""),
+]
+
+
+def linear_best_match(items, product_name, category="", brand=""):
+    """get_ikpu_for_product'ning asl chiziqli skani (indeksdan oldingi)"""
+    search_query = product_name.lower()
+    if brand:
+        search_query = f"{brand.lower()} {search_query}"
+
+    best_match = None
+    best_score = 0
+    query_words = [w for w in search_query.split() if w not in MXIK_STOP_WORDS and len(w) > 2]
+    normalized_query = " ".join(query_words)
+
+    for item in items:
+        name_uz = (item.get("nameUz", "") or "").lower()
+        name_ru = (item.get("nameRu", "") or "").lower()
+        full_code = item.get("fullCode", "")
+        if not full_code or len(full_code) < 8:
+            continue
+
+        score = 0
+        if normalized_query in name_uz or normalized_query in name_ru:
+            score += 100
+        for word in query_words:
+            if len(word) < 3:
+                continue
+            if word in name_uz or word in name_ru:
+                score += len(word) * 2
+            elif any(word in n or n in word for n in [name_uz, name_ru]):
+                score += len(word)
+        if category:
+            cat_lower = category.lower()
+            if cat_lower in name_uz or cat_lower in name_ru:
+                score += 20
+
+        if score > best_score:
+            best_score = score
+            best_match = {"code": full_code.ljust(17, '0'), "score": score}
+    return best_match
+
+
+@pytest.fixture(scope="module")
+def mxik_items():
+    path = find_mxik_file()
+    if not path:
+        pytest.skip("mxik_codes.json not found")
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def query_set(mxik_items):
+    """Qat'iy so'rovlar + katalogdan deterministik olingan nomlar (to'liq, qisman, kategoriya bilan)"""
+    queries = list(FIXED_QUERIES)
+    for i in range(0, len(mxik_items), 97):
+        words = mxik_items[i]["nameUz"].split()
+        queries.append((mxik_items[i]["nameUz"], "", ""))
+        queries.append((" ".join(words[:2]), words[-1] if len(words) > 2 else "", ""))
+        queries.append((words[0][:5], "", ""))
+    return queries
+
+
+class TestMXIKIndexRanking:
+    def test_best_match_equals_linear_scan(self, mxik_items, query_set):
+        index = MXIKIndex.from_items(mxik_items)
+        for name, category, brand in query_set:
+            expected = linear_best_match(mxik_items, name, category, brand)
+            actual = index.best_match(name, category, brand)
+            if expected is None:
+                assert actual is None, (name, category, brand)
+            else:
+                assert actual is not None, (name, category, brand)
+                assert (actual["code"], actual["score"]) == (expected["code"], expected["score"]), (name, category, brand)
+        print(f"✅ best_match == linear scan for {len(query_set)} queries")
+
+    def test_containing_equals_substring_scan(self, mxik_items, query_set):
+        index = MXIKIndex.from_items(mxik_items)
+        words = {w for name, _, _ in query_set for w in name.lower().split() if len(w) > 2}
+        for word in sorted(words)[:150]:
+            expected = {
+                i for i, item in enumerate(mxik_items)
+                if word in (item.get("nameUz") or "").lower() or word in (item.get("nameRu") or "").lower()
+            }
+            assert index.containing(word) == expected, word
+        print("✅ Inverted index candidates == substring scan")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
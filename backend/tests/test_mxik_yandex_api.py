@@ -8,6 +8,7 @@ import pytest
 import requests
 import os
 import time
+import json
 
 # Get BASE_URL from environment
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
@@ -98,6 +99,54 @@ class TestMXIKEndpoints:
         assert data.get("success") == True
         print(f"✅ MXIK Best Match with category: {data.get('match', {}).get('code')}")
 
+    def test_mxik_search_cross_script(self):
+        """Test GET /api/mxik/search - Latin, Cyrillic and typo queries find the same code"""
+        codes = []
+        for q in ["kofe", "кофе", "kofee"]:
+            response = requests.get(f"{BASE_URL}/api/mxik/search", params={"q": q, "limit": 3})
+            assert response.status_code == 200
+            data = response.json()
+            assert data.get("success") == True
+            assert data.get("count", 0) > 0
+            codes.append({r["fullCode"] for r in data["results"]})
+        assert codes[0] & codes[1] & codes[2]
+        print(f"✅ MXIK Search cross-script: {sorted(codes[0] & codes[1] & codes[2])}")
+
+    def test_mxik_search_similarity_ranked(self):
+        """Test GET /api/mxik/search - similarity is real and sorted descending"""
+        response = requests.get(f"{BASE_URL}/api/mxik/search", params={"q": "telifon", "limit": 10})
+        assert response.status_code == 200
+        data = response.json()
+        similarities = [r["similarity"] for r in data.get("results", [])]
+        assert similarities
+        assert similarities == sorted(similarities, reverse=True)
+        assert all(0 < s <= 100 for s in similarities)
+        print(f"✅ MXIK Search 'telifon' similarities: {similarities}")
+
+    def test_mxik_resolve_batch(self):
+        """Test POST /api/mxik/resolve-batch - NDJSON stream, duplicates resolved once"""
+        items = [
+            {"name": "Совуқ кофе"},
+            {"name": "совуқ  кофе"},
+            {"name": "Samsung Galaxy S24", "category": "smartphones", "brand": "Samsung"},
+        ]
+        response = requests.post(f"{BASE_URL}/api/mxik/resolve-batch", json={"items": items})
+        assert response.status_code == 200
+        assert "application/x-ndjson" in response.headers.get("content-type", "")
+
+        lines = [json.loads(line) for line in response.text.strip().split("\n")]
+        summary = lines[-1]
+        results = sorted(lines[:-1], key=lambda x: x["index"])
+        assert summary.get("done") == True
+        assert summary.get("total") == 3
+        assert summary.get("unique") == 2
+        assert len(results) == 3
+        assert results[0]["ikpu_code"] == results[1]["ikpu_code"]
+        for r in results:
+            assert r["confidence"] in ("high", "medium", "low", "default")
+            assert r["is_17_digit"] == True
+        print(f"✅ MXIK resolve-batch: {summary}")
+
 
 class TestYandexMarketConnection:
     """Yandex Market API connection tests"""
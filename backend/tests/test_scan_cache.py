@@ -0,0 +1,187 @@
+"""
+Test perceptual-hash AI scan result cache
+Tests:
+1. dHash survives JPEG recompression and resizing; different images differ
+2. Exact and near-duplicate hits skip the scanner, failures are not cached
+3. Near-duplicates are only served to the partner that cached them
+4. Persistent tier candidates are matched by digest / owner's Hamming distance
+5. Hit rate stats
+"""
+
+import pytest
+import asyncio
+import base64
+import io
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PIL import Image, ImageDraw
+
+import scan_cache
+from scan_cache import ScanResultCache, hamming, image_digest, image_phash
+
+
+def _product_photo(seed: int, size=(640, 480)) -> Image.Image:
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x0, y0 = rng.randrange(size[0]), rng.randrange(size[1])
+        x1, y1 = x0 + rng.randrange(40, 300), y0 + rng.randrange(40, 300)
+        draw.ellipse((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)))
+    return img
+
+
+def _b64(img: Image.Image, fmt="JPEG", **kwargs) -> str:
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **kwargs)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class TestPerceptualHash:
+    def test_robust_to_recompression_and_resize(self):
+        for seed in range(5):
+            img = _product_photo(seed)
+            original = image_phash(_b64(img, quality=95))
+            assert hamming(original, image_phash(_b64(img, quality=40))) <= 4
+            assert hamming(original, image_phash(_b64(img.resize((320, 240)), "PNG"))) <= 4
+            assert image_phash("data:image/jpeg;base64," + _b64(img, quality=95)) == original
+        print("✅ dHash stable under recompression / resize")
+
+    def test_different_images(self):
+        hashes = [image_phash(_b64(_product_photo(seed))) for seed in range(20)]
+        distances = [hamming(a, b) for i, a in enumerate(hashes) for b in hashes[i + 1:]]
+        assert min(distances) > 6
+        assert image_phash("not-an-image") is None
+        print("✅ Different photos are far apart")
+
+
+class TestScanCache:
+    def test_hits_and_failures(self):
+        cache = ScanResultCache(persistent=False)
+        calls = []
+        img = _product_photo(1)
+
+        async def scan(label, result):
+            calls.append(label)
+            return result
+
+        async def scenario():
+            first = await cache.get_or_scan("ns", _b64(img), lambda: scan("a", {"success": True, "name": "Fen"}),
+                                            cacheable=lambda r: r["success"], owner="p1")
+            exact = await cache.get_or_scan("ns", _b64(img), lambda: scan("b", {"success": True}))
+            near = await cache.get_or_scan("ns", _b64(img.resize((300, 225)), quality=50),
+                                           lambda: scan("c", {"success": True}), owner="p1")
+            other_ns = await cache.get_or_scan("other", _b64(img), lambda: scan("d", {"success": True}))
+            assert first == exact == near == {"success": True, "name": "Fen"}
+            assert other_ns == {"success": True}
+
+            # Xato natija keshlanmaydi
+            img2 = _b64(_product_photo(2))
+            await cache.get_or_scan("ns", img2, lambda: scan("e", {"success": False}),
+                                    cacheable=lambda r: r["success"])
+            await cache.get_or_scan("ns", img2, lambda: scan("f", {"success": True}),
+                                    cacheable=lambda r: r["success"])
+
+            # Yaroqsiz rasm - to'g'ridan-to'g'ri scan
+            await cache.get_or_scan("ns", "xx", lambda: scan("g", {"success": True}))
+
+            # Natija nusxa sifatida qaytadi
+            exact["name"] = "changed"
+            again = await cache.get_or_scan("ns", _b64(img), lambda: scan("h", {}))
+            assert again["name"] == "Fen"
+
+            # Near-duplicate: 2 bit farq -> o'xshashlik 62/64, 7 bit -> chegaradan tashqarida
+            found = await cache.lookup("ns", image_phash(_b64(img)) ^ 0b101, owner="p1")
+            assert found == ({"success": True, "name": "Fen"}, pytest.approx(62 / 64))
+            assert await cache.lookup("ns", image_phash(_b64(img)) ^ 0b1111111, owner="p1") is None
+
+        asyncio.run(scenario())
+        assert calls == ["a", "d", "e", "f", "g"]
+        stats = cache.get_stats()
+        assert stats["exact_hits"] + stats["near_duplicate_hits"] == 4
+        assert stats["near_duplicate_hits"] >= 1
+        assert stats["uncacheable"] == 1
+        assert stats["hit_rate"] == pytest.approx(4 / 9 * 100, abs=0.1)
+        print("✅ Exact / near-duplicate hits skip the scanner")
+
+    def test_near_duplicates_scoped_to_owner(self):
+        cache = ScanResultCache(persistent=False)
+        calls = []
+        img = _product_photo(5)
+        recompressed = _b64(img, quality=60)
+
+        async def scan(label):
+            calls.append(label)
+            return {"success": True, "label": label}
+
+        async def scenario():
+            await cache.get_or_scan("ns", _b64(img), lambda: scan("p1"), owner="p1")
+            # Boshqa partner / anonim: near-duplicate berilmaydi
+            other = await cache.get_or_scan("ns", recompressed, lambda: scan("p2"), owner="p2")
+            anonymous = await cache.get_or_scan("ns", _b64(img.resize((320, 240))), lambda: scan("anon"))
+            # Aynan bir xil baytlar - istalgan partner uchun hit
+            same_bytes = await cache.get_or_scan("ns", _b64(img), lambda: scan("x"), owner="p3")
+            # O'sha partner - near-duplicate hit
+            own = await cache.get_or_scan("ns", _b64(img, quality=50), lambda: scan("y"), owner="p1")
+            return other, anonymous, same_bytes, own
+
+        other, anonymous, same_bytes, own = asyncio.run(scenario())
+        assert other["label"] == "p2" and anonymous["label"] == "anon"
+        assert same_bytes["label"] == "p1" and own["label"] == "p1"
+        assert calls == ["p1", "p2", "anon"]
+        print("✅ Near-duplicates are scoped to the owning partner")
+
+    def test_persistent_tier(self, monkeypatch):
+        saved = []
+        img = _product_photo(3)
+        phash = image_phash(_b64(img))
+        digest = image_digest(_b64(img))
+
+        async def fake_candidates(namespace, bands, digest_, owner, limit=50):
+            assert namespace == "ns" and len(bands) == 4
+            if digest_ != digest:
+                return []
+            return [
+                {"digest": "a", "phash": f"{phash ^ 0xFFFF:016x}", "owner": owner,
+                 "result": {"name": "far"}, "created_at": datetime.utcnow()},
+                {"digest": "b", "phash": f"{phash ^ 0b1:016x}", "owner": "other",
+                 "result": {"name": "foreign"}, "created_at": datetime.utcnow()},
+                {"digest": "c", "phash": f"{phash ^ 0b11:016x}", "owner": owner,
+                 "result": {"name": "near"}, "created_at": datetime.utcnow()},
+                {"digest": digest, "phash": f"{phash:016x}", "owner": None, "result": {"name": "expired"},
+                 "created_at": datetime.utcnow() - timedelta(days=365)},
+            ]
+
+        async def fake_save(*args):
+            saved.append(args)
+
+        monkeypatch.setattr(scan_cache, "get_scan_cache_candidates", fake_candidates)
+        monkeypatch.setattr(scan_cache, "save_scan_cache_entry", fake_save)
+        cache = ScanResultCache()
+
+        async def never():
+            raise AssertionError("scanner should not be called")
+
+        result = asyncio.run(cache.get_or_scan("ns", _b64(img), never, owner="p1"))
+        assert result == {"name": "near"}
+        assert cache.get_stats()["persistent_hits"] == 1
+
+        async def scan():
+            return {"name": "new"}
+
+        new_img = _b64(_product_photo(4))
+        asyncio.run(cache.get_or_scan("ns", new_img, scan, owner="p1"))
+        assert len(saved) == 1
+        namespace, saved_digest, saved_phash, bands, owner = saved[0][:5]
+        assert (namespace, saved_digest, owner) == ("ns", image_digest(new_img), "p1")
+        assert len(saved_phash) == 16 and len(bands) == 4
+        print("✅ Persistent tier matches by Hamming distance")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,73 @@
+"""
+Test Aho–Corasick stop word automaton against the original per-word scans
+Tests:
+1. check_stop_words / check_yandex_stop_words find the same words
+2. remove_stop_words strips the same text as the per-word regex loop
+3. Case-insensitive removal keeps the surrounding text intact
+4. Stop words formed by a removal ("bhitu" -> "bu") are removed as well
+"""
+
+import pytest
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from uzum_rules import STOP_WORDS, check_stop_words, remove_stop_words
+from yandex_rules import YANDEX_STOP_WORDS, check_yandex_stop_words
+
+
+def _scan(text, words):
+    text_lower = text.lower()
+    return [w for w in words if w.lower() in text_lower]
+
+
+def _regex_remove(text):
+    result = text
+    for word in sorted(STOP_WORDS, key=len, reverse=True):
+        result = re.compile(re.escape(word), re.IGNORECASE).sub("", result)
+    return " ".join(result.split())
+
+
+def _random_texts(count=500):
+    rng = random.Random(6)
+    vocab = list(STOP_WORDS) + list(YANDEX_STOP_WORDS) + [
+        "Телефон", "ХИТ", "TOP", "Mahsulot", "sifatli", "kiyim", "яхши", "ORIGINAL", "\n"
+    ]
+    for _ in range(count):
+        words = [rng.choice(vocab) for _ in range(rng.randint(0, 40))]
+        yield rng.choice([" ", "", ", "]).join(words)
+
+
+class TestStopWordAutomaton:
+    """Automaton results vs original implementations"""
+
+    def test_check_matches_scan(self):
+        for text in _random_texts():
+            assert check_stop_words(text)["found_words"] == _scan(text, STOP_WORDS)
+            assert check_yandex_stop_words(text)["found_words"] == _scan(text, YANDEX_STOP_WORDS)
+        print("✅ check_stop_words / check_yandex_stop_words match per-word scan")
+
+    def test_remove_matches_regex_loop(self):
+        for text in _random_texts():
+            assert remove_stop_words(text) == _regex_remove(text)
+        print("✅ remove_stop_words matches per-word regex loop")
+
+    def test_remove_keeps_clean_text(self):
+        text = "Ajoyib   СКИДКА: Скидка ko'ylak - ХИТ сезона!"
+        assert remove_stop_words(text) == "Ajoyib : ko'ylak - сезона!"
+        assert check_stop_words("Ajoyib ko'ylak")["is_valid"]
+        print("✅ Stop words removed case-insensitively")
+
+    def test_remove_repeats_until_clean(self):
+        assert remove_stop_words("bhitu") == ""
+        assert remove_stop_words("Bu mahsulot bhitu yaxshi") == "mahsulot yaxshi"
+        for text in _random_texts():
+            assert not check_stop_words(remove_stop_words(text))["found_words"], text
+        print("✅ Removal repeats until no stop word is left")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
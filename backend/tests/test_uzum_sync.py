@@ -0,0 +1,310 @@
+"""
+Test incremental Uzum orders / stocks sync against a local stub Uzum API
+Tests:
+1. First sync pulls every order page; next sync re-pulls the lookback window and writes only changes
+2. Status changes on orders older than the window are picked up by the periodic full resync
+3. A pass cut off by UZUM_SYNC_MAX_PAGES is marked incomplete and resumed on the next run
+4. Stocks: only changed and removed SKUs are written
+5. Failed sync keeps the cursor and records the error; reads wait for the first sync
+6. Keyset pagination stays consistent while new orders arrive
+7. Worker runs one task per connected account and stops removed ones
+"""
+
+import pytest
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+import uzum_api_service
+import uzum_sync
+from uzum_sync import UzumSyncWorker, read_orders, read_stocks, get_sync_status
+
+BASE_MS = 1_760_000_000_000
+HOUR_MS = 3_600_000
+
+
+class MemoryStore:
+    """uzum_sync DB funksiyalarining xotiradagi o'rnini bosuvchisi"""
+
+    def __init__(self):
+        self.orders = {}
+        self.stocks = {}
+        self.state = {}
+        self.integrations = []
+        self.order_writes = 0
+        self.stock_writes = 0
+
+    async def get_active_marketplace_integrations(self, marketplace):
+        return list(self.integrations)
+
+    async def get_uzum_order_fingerprints(self, account_id, order_ids):
+        return {
+            order_id: self.orders[(account_id, order_id)]["fingerprint"]
+            for order_id in order_ids if (account_id, order_id) in self.orders
+        }
+
+    async def upsert_uzum_orders(self, account_id, orders):
+        self.order_writes += len(orders)
+        for order in orders:
+            self.orders[(account_id, order["order_id"])] = dict(order)
+
+    async def list_uzum_orders(self, account_id, limit, offset=0, after=None, status=None):
+        rows = [o for (acc, _), o in self.orders.items() if acc == account_id and (not status or o["status"] == status)]
+        rows.sort(key=lambda o: (o["date_created"], o["order_id"]), reverse=True)
+        total = len(rows)
+        if after:
+            rows = [o for o in rows if (o["date_created"], o["order_id"]) < after]
+            offset = 0
+        return {"items": rows[offset:offset + limit], "total": total}
+
+    async def get_uzum_stock_fingerprints(self, account_id):
+        return {sku: s["fingerprint"] for (acc, sku), s in self.stocks.items() if acc == account_id}
+
+    async def upsert_uzum_stocks(self, account_id, stocks, removed_sku_ids=()):
+        self.stock_writes += len(stocks) + len(removed_sku_ids)
+        for stock in stocks:
+            self.stocks[(account_id, stock["sku_id"])] = dict(stock)
+        for sku_id in removed_sku_ids:
+            self.stocks.pop((account_id, sku_id), None)
+
+    async def list_uzum_stocks(self, account_id, limit=None, after_sku_id=None):
+        rows = sorted((s for (acc, _), s in self.stocks.items() if acc == account_id), key=lambda s: s["sku_id"])
+        total = len(rows)
+        if after_sku_id is not None:
+            rows = [s for s in rows if s["sku_id"] > after_sku_id]
+        return {"items": rows[:limit] if limit else rows, "total": total}
+
+    async def get_uzum_sync_state(self, account_id):
+        return {res: dict(st) for (acc, res), st in self.state.items() if acc == account_id}
+
+    async def save_uzum_sync_state(self, account_id, resource, state):
+        self.state[(account_id, resource)] = dict(state)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    memory = MemoryStore()
+    for name in ("get_active_marketplace_integrations", "get_uzum_order_fingerprints",
+                 "upsert_uzum_orders", "list_uzum_orders",
+                 "get_uzum_stock_fingerprints", "upsert_uzum_stocks", "list_uzum_stocks",
+                 "get_uzum_sync_state", "save_uzum_sync_state"):
+        monkeypatch.setattr(uzum_sync, name, getattr(memory, name))
+    return memory
+
+
+@pytest.fixture
+def uzum_stub(monkeypatch):
+    import uvicorn
+
+    app = FastAPI()
+    state = {
+        "orders": [
+            {"id": 1000 + i, "status": "CREATED", "dateCreated": BASE_MS + i * HOUR_MS,
+             "dateUpdated": BASE_MS + i * HOUR_MS}
+            for i in range(25)
+        ],
+        "skus": [{"skuId": 500 + i, "productTitle": f"Mahsulot {i}", "amount": i} for i in range(6)],
+        "order_requests": [],
+        "fail": False
+    }
+
+    @app.get("/v2/fbs/orders")
+    async def orders(request: Request, limit: int = 10, offset: int = 0, dateFrom: int = None):
+        state["order_requests"].append({"offset": offset, "dateFrom": dateFrom})
+        if state["fail"]:
+            return JSONResponse({"errors": [{"message": "Internal error"}]}, status_code=500)
+        rows = sorted(state["orders"], key=lambda o: o["dateCreated"], reverse=True)
+        if dateFrom is not None:
+            # Uzum dateFrom yaratilgan vaqt bo'yicha filtrlaydi
+            rows = [o for o in rows if o["dateCreated"] >= dateFrom]
+        return {"payload": {"orders": rows[offset:offset + limit], "totalAmount": len(rows)}}
+
+    @app.get("/v2/fbs/sku/stocks")
+    async def stocks():
+        if state["fail"]:
+            return JSONResponse({"errors": []}, status_code=500)
+        return {"payload": {"skuAmountList": state["skus"]}}
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.02)
+    monkeypatch.setattr(uzum_api_service, "UZUM_API_BASE", f"http://127.0.0.1:{port}")
+    monkeypatch.setattr(uzum_sync, "UZUM_SYNC_PAGE_SIZE", 10)
+    yield state
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """uzum_sync.utc_now: BASE + 30 soat; lookback oynasi 12 soat"""
+    now = {"value": datetime.utcfromtimestamp((BASE_MS + 30 * HOUR_MS) / 1000)}
+    monkeypatch.setattr(uzum_sync, "utc_now", lambda: now["value"])
+    monkeypatch.setattr(uzum_sync, "UZUM_SYNC_ORDER_LOOKBACK_DAYS", 0.5)
+    return now
+
+
+class TestUzumSync:
+    def test_incremental_orders(self, store, uzum_stub, clock):
+        worker = UzumSyncWorker()
+        result = asyncio.run(worker.sync_account("p1", "key-1"))
+        assert result["success"] and result["orders"] == {"success": True, "synced": 25, "complete": True}
+        assert [r["offset"] for r in uzum_stub["order_requests"]] == [0, 10, 20]
+        assert uzum_stub["order_requests"][0]["dateFrom"] is None
+        cursor = store.state[("p1", "orders")]["cursor"]
+        assert cursor == datetime.utcfromtimestamp((BASE_MS + 24 * HOUR_MS) / 1000)
+
+        # Oyna ichidagi buyurtma holati o'zgardi (yaratilgan vaqti o'zgarmaydi)
+        uzum_stub["orders"][20].update(status="DELIVERED", dateUpdated=BASE_MS + 29 * HOUR_MS)
+        uzum_stub["order_requests"].clear()
+        store.order_writes = 0
+        result = asyncio.run(worker.sync_account("p1", "key-1"))
+        assert result["success"]
+        # min(cursor - overlap, hozir - 12 soat) dan keyin yaratilganlar qayta olinadi
+        assert uzum_stub["order_requests"] == [{"offset": 0, "dateFrom": BASE_MS + 18 * HOUR_MS}]
+        # Oynadagi 7 ta buyurtmadan faqat o'zgargani yoziladi
+        assert store.order_writes == 1
+        assert store.orders[("p1", "1020")]["status"] == "DELIVERED"
+        assert store.state[("p1", "orders")]["cursor"] == cursor
+        print("✅ Lookback window re-pulled, only changed orders written")
+
+    def test_full_resync_updates_old_orders(self, store, uzum_stub, clock):
+        worker = UzumSyncWorker()
+        asyncio.run(worker.sync_account("p1", "key-1"))
+
+        # Oynadan eski buyurtma holati o'zgardi - inkremental so'rov uni ko'rmaydi
+        uzum_stub["orders"][3].update(status="RETURNED", dateUpdated=BASE_MS + 29 * HOUR_MS)
+        store.order_writes = 0
+        asyncio.run(worker.sync_account("p1", "key-1"))
+        assert store.order_writes == 0 and store.orders[("p1", "1003")]["status"] == "CREATED"
+
+        # To'liq sinxronlash vaqti keldi
+        clock["value"] += timedelta(seconds=uzum_sync.UZUM_SYNC_FULL_RESYNC_INTERVAL)
+        uzum_stub["order_requests"].clear()
+        asyncio.run(worker.sync_account("p1", "key-1"))
+        assert [r["dateFrom"] for r in uzum_stub["order_requests"]] == [None, None, None]
+        assert store.order_writes == 1 and store.orders[("p1", "1003")]["status"] == "RETURNED"
+        assert store.state[("p1", "orders")]["full_sync_at"] == clock["value"]
+        print("✅ Periodic full resync picks up old order status changes")
+
+    def test_page_limit_resumes(self, store, uzum_stub, clock, monkeypatch):
+        monkeypatch.setattr(uzum_sync, "UZUM_SYNC_MAX_PAGES", 2)
+        worker = UzumSyncWorker()
+        result = asyncio.run(worker.sync_account("p1", "key-1"))
+        assert result["orders"] == {"success": True, "synced": 20, "complete": False}
+        status = asyncio.run(get_sync_status("p1"))["orders"]
+        assert status["complete"] is False and status["resume_offset"] == 20
+        assert status["full_sync_at"] is None
+
+        # Keyingi ishga tushish qolgan joydan davom etadi
+        uzum_stub["order_requests"].clear()
+        result = asyncio.run(worker.sync_account("p1", "key-1"))
+        assert result["orders"] == {"success": True, "synced": 5, "complete": True}
+        assert uzum_stub["order_requests"] == [{"offset": 20, "dateFrom": None}]
+        status = asyncio.run(get_sync_status("p1"))["orders"]
+        assert status["complete"] is True and status["full_sync_at"] == clock["value"].isoformat()
+        assert asyncio.run(read_orders("p1", limit=5))["total"] == 25
+        print("✅ Page limit marks the pass incomplete and resumes it")
+
+    def test_stocks_write_only_changes(self, store, uzum_stub):
+        worker = UzumSyncWorker()
+        asyncio.run(worker.sync_account("p1", "key-1"))
+        assert store.stock_writes == 6
+
+        store.stock_writes = 0
+        uzum_stub["skus"][0]["amount"] = 99
+        uzum_stub["skus"].pop()
+        result = asyncio.run(worker.sync_account("p1", "key-1"))
+        assert result["stocks"] == {"success": True, "synced": 2}
+        assert store.stock_writes == 2 and len(store.stocks) == 5
+
+        page = asyncio.run(read_stocks("p1", limit=3))
+        assert [s["skuId"] for s in page["skuAmountList"]] == [500, 501, 502]
+        assert page["skuAmountList"][0]["amount"] == 99 and page["total"] == 5
+        rest = asyncio.run(read_stocks("p1", limit=3, cursor=page["next_cursor"]))
+        assert [s["skuId"] for s in rest["skuAmountList"]] == [503, 504] and rest["next_cursor"] is None
+        print("✅ Only changed / removed SKUs written")
+
+    def test_failure_keeps_cursor(self, store, uzum_stub):
+        worker = UzumSyncWorker()
+        assert asyncio.run(read_orders("p1")) is None
+
+        asyncio.run(worker.sync_account("p1", "key-1"))
+        cursor = store.state[("p1", "orders")]["cursor"]
+
+        uzum_stub["fail"] = True
+        result = asyncio.run(worker.sync_account("p1", "key-1"))
+        assert result["success"] is False and result["orders"]["success"] is False
+        status = asyncio.run(get_sync_status("p1"))
+        assert status["orders"]["last_error"] and status["stocks"]["last_error"]
+        assert store.state[("p1", "orders")]["cursor"] == cursor
+        assert worker.failures == 2
+
+        # Oxirgi muvaffaqiyatli ma'lumot o'qilaveradi
+        assert asyncio.run(read_orders("p1", limit=5))["total"] == 25
+        assert asyncio.run(worker.sync_account("p2")) == {"success": False, "error": "Uzum API kaliti topilmadi"}
+        print("✅ Failure keeps cursor, last data still served")
+
+    def test_keyset_pagination(self, store, uzum_stub):
+        worker = UzumSyncWorker()
+        asyncio.run(worker.sync_account("p1", "key-1"))
+
+        first = asyncio.run(read_orders("p1", limit=10))
+        assert [o["id"] for o in first["orders"]] == list(range(1024, 1014, -1))
+
+        # Sahifalar orasida yangi buyurtma keldi
+        uzum_stub["orders"].append({"id": 2000, "status": "CREATED", "dateCreated": BASE_MS + 40 * HOUR_MS,
+                                    "dateUpdated": BASE_MS + 40 * HOUR_MS})
+        asyncio.run(worker.sync_account("p1", "key-1"))
+
+        second = asyncio.run(read_orders("p1", limit=10, cursor=first["next_cursor"]))
+        assert [o["id"] for o in second["orders"]] == list(range(1014, 1004, -1))
+        assert second["total"] == 26
+
+        with pytest.raises(ValueError):
+            asyncio.run(read_orders("p1", cursor="not-a-cursor"))
+        print("✅ Keyset pagination stable under new orders")
+
+    def test_worker_accounts(self, store, monkeypatch):
+        monkeypatch.setenv("UZUM_API_KEY", "platform-key")
+        store.integrations = [
+            {"partner_id": "p1", "credentials": {"api_key": "key-1"}},
+            {"partner_id": "p2", "credentials": {}}
+        ]
+        worker = UzumSyncWorker(interval=3600)
+
+        async def scenario():
+            first = await worker.refresh_accounts()
+            tasks = dict(worker._tasks)
+            store.integrations = []
+            second = await worker.refresh_accounts()
+            await asyncio.sleep(0)
+            cancelled = tasks["p1"].cancelled()
+            await worker.stop()
+            return first, second, cancelled
+
+        first, second, cancelled = asyncio.run(scenario())
+        assert first == {"platform": "platform-key", "p1": "key-1"}
+        assert second == {"platform": "platform-key"}
+        assert cancelled
+        assert worker.account_for_key("platform-key") == "platform"
+        assert worker.account_for_key("key-1") is None
+        print("✅ One task per connected account")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
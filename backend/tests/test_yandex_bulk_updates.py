@@ -0,0 +1,150 @@
+"""
+Test batched Yandex price and stock updates
+Tests:
+1. Prices are chunked to the batch size, sent concurrently, per-offer outcomes returned
+2. Invalid / duplicate items handled locally; stocks sent to the campaign endpoint
+3. Rate limit (420) retried with Retry-After; rejected chunks reported and retry_items resubmittable
+4. Per-minute quota delays chunks beyond the bucket
+"""
+
+import pytest
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+import yandex_service
+from yandex_service import YandexMarketAPI
+
+
+@pytest.fixture
+def yandex_stub(monkeypatch):
+    import uvicorn
+
+    app = FastAPI()
+    state = {"prices": [], "stocks": [], "in_flight": 0, "max_in_flight": 0,
+             "rate_limit_once": False, "reject_offer": None, "fail_status": None}
+
+    async def track(payload_items, store):
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.05)
+        state["in_flight"] -= 1
+        store.append(payload_items)
+
+    @app.post("/v2/businesses/{business_id}/offer-prices/updates")
+    async def price_updates(business_id: str, request: Request):
+        offers = (await request.json())["offers"]
+        if state["rate_limit_once"]:
+            state["rate_limit_once"] = False
+            return JSONResponse({"status": "ERROR"}, status_code=420, headers={"Retry-After": "0"})
+        if state["fail_status"]:
+            state["fail_status"], status = None, state["fail_status"]
+            return JSONResponse({"status": "ERROR"}, status_code=status)
+        if any(offer["offerId"] == state["reject_offer"] for offer in offers):
+            return JSONResponse({"status": "ERROR", "errors": [{"code": "BAD_REQUEST"}]}, status_code=400)
+        await track(offers, state["prices"])
+        return {"status": "OK"}
+
+    @app.put("/v2/campaigns/{campaign_id}/offers/stocks")
+    async def stock_updates(campaign_id: str, request: Request):
+        await track((await request.json())["skus"], state["stocks"])
+        return {"status": "OK"}
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.02)
+    monkeypatch.setattr(yandex_service, "YANDEX_API_BASE", f"http://127.0.0.1:{port}")
+    monkeypatch.setattr(yandex_service, "_bulk_buckets", {})
+    yield state
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+def _api():
+    return YandexMarketAPI(oauth_token="test", business_id="42", campaign_id="7")
+
+
+def _prices(n):
+    return [{"offer_id": f"SKU-{i}", "price": 1000 + i} for i in range(n)]
+
+
+class TestYandexBulkUpdates:
+    def test_prices_chunked_and_concurrent(self, yandex_stub):
+        result = asyncio.run(_api().bulk_update_prices(_prices(25), chunk_size=10, concurrency=3))
+        assert result["success"] and result["updated"] == 25 and result["chunks"] == 3
+        assert sorted(len(chunk) for chunk in yandex_stub["prices"]) == [5, 10, 10]
+        assert yandex_stub["max_in_flight"] > 1
+        sent = [offer for chunk in yandex_stub["prices"] for offer in chunk]
+        assert {"offerId": "SKU-0", "price": {"value": 1000, "currencyId": "UZS"}} in sent
+        assert [r["offer_id"] for r in result["results"]] == [f"SKU-{i}" for i in range(25)]
+        assert result["failed_chunks"] == [] and result["retry_items"] == []
+        print("✅ Prices chunked and sent concurrently")
+
+    def test_validation_dedup_and_stocks(self, yandex_stub):
+        prices = [{"offer_id": "A", "price": 100}, {"offer_id": "", "price": 5},
+                  {"offer_id": "B", "price": -1}, {"offer_id": "A", "price": 200}]
+        result = asyncio.run(_api().bulk_update_prices(prices))
+        assert result["total"] == 3 and result["updated"] == 1 and not result["success"]
+        assert yandex_stub["prices"] == [[{"offerId": "A", "price": {"value": 200, "currencyId": "UZS"}}]]
+
+        stocks = [{"offer_id": f"SKU-{i}", "count": i} for i in range(5)] + [{"offer_id": "X", "count": -3}]
+        result = asyncio.run(_api().bulk_update_stocks(stocks, chunk_size=2))
+        assert result["updated"] == 5 and result["failed"] == 1 and result["chunks"] == 3
+        sku = yandex_stub["stocks"][0][0]
+        assert sku["sku"].startswith("SKU-") and "updatedAt" in sku["items"][0]
+
+        result = asyncio.run(YandexMarketAPI(oauth_token="test").bulk_update_stocks(stocks))
+        assert result == {"success": False, "error": "campaign_id required"}
+        print("✅ Invalid and duplicate items handled, stocks updated")
+
+    def test_retry_and_partial_failures(self, yandex_stub, monkeypatch):
+        monkeypatch.setattr(yandex_service, "YANDEX_API_MAX_RETRIES", 1)
+        yandex_stub["rate_limit_once"] = True
+        result = asyncio.run(_api().bulk_update_prices(_prices(4), chunk_size=2, concurrency=1))
+        assert result["success"] and result["updated"] == 4
+
+        # Birinchi chunk 503 (qayta urinish mumkin), uchinchisi 400 (rad etilgan)
+        yandex_stub["fail_status"] = 503
+        yandex_stub["reject_offer"] = "SKU-5"
+        monkeypatch.setattr(yandex_service, "YANDEX_API_MAX_RETRIES", 0)
+        result = asyncio.run(_api().bulk_update_prices(_prices(6), chunk_size=2, concurrency=1))
+        assert result["updated"] == 2 and result["failed"] == 4
+        assert [(c["chunk"], c["status_code"], c["retryable"]) for c in result["failed_chunks"]] == [
+            (0, 503, True), (2, 400, False)
+        ]
+        failed = {r["offer_id"]: r["status_code"] for r in result["results"] if not r["success"]}
+        assert failed == {"SKU-0": 503, "SKU-1": 503, "SKU-4": 400, "SKU-5": 400}
+        assert [item["offer_id"] for item in result["retry_items"]] == ["SKU-0", "SKU-1"]
+
+        # Faqat qayta urinish mumkin bo'lgan chunk qayta yuboriladi
+        retry = asyncio.run(_api().bulk_update_prices(result["retry_items"]))
+        assert retry["success"] and retry["updated"] == 2
+        print("✅ 420 retried, failed chunks reported and resubmitted")
+
+    def test_per_minute_quota(self, yandex_stub, monkeypatch):
+        # 600/min = 10 offer/s, bucket sig'imi 50 offer
+        monkeypatch.setattr(yandex_service, "YANDEX_PRICE_UPDATES_PER_MINUTE", 600)
+        started = time.monotonic()
+        result = asyncio.run(_api().bulk_update_prices(_prices(60), chunk_size=50))
+        elapsed = time.monotonic() - started
+        assert result["success"]
+        # Ikkinchi chunk (10 offer) uchun ~1 soniya kutiladi
+        assert elapsed >= 0.9
+        print("✅ Per-minute quota respected")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
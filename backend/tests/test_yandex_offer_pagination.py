@@ -0,0 +1,133 @@
+"""
+Test Yandex offer-mappings pagination (nextPageToken)
+Tests:
+1. iter_offer_mappings follows nextPageToken across the whole catalog
+2. get_all_offers_status aggregates stats over all pages, offer list capped by limit
+3. Rate limit (420) is retried with Retry-After; API errors surface with status code
+4. Stopping early stops fetching (bounded prefetch)
+"""
+
+import pytest
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+import yandex_service
+from yandex_service import YandexMarketAPI
+
+CATALOG_SIZE = 450
+
+
+def _offer(i):
+    states = ["IN_WORK", "NEED_CONTENT", "REJECTED", "SUSPENDED"]
+    return {
+        "offer": {
+            "offerId": f"SKU-{i}",
+            "name": f"Mahsulot {i}",
+            "basicPrice": {"value": 1000 + i},
+            "processingState": {"status": states[i % 4]}
+        },
+        "mapping": {"marketSku": 10_000 + i} if i % 5 == 0 else {}
+    }
+
+
+@pytest.fixture
+def yandex_stub(monkeypatch):
+    import uvicorn
+
+    app = FastAPI()
+    state = {"pages": 0, "limits": [], "rate_limit_once": False, "fail": False}
+
+    @app.post("/v2/businesses/{business_id}/offer-mappings")
+    async def offer_mappings(business_id: str, request: Request, limit: int = 50, page_token: str = None):
+        if state["fail"]:
+            return JSONResponse({"status": "ERROR", "errors": [{"code": "UNAUTHORIZED"}]}, status_code=401)
+        if state["rate_limit_once"]:
+            state["rate_limit_once"] = False
+            return JSONResponse({"status": "ERROR"}, status_code=420, headers={"Retry-After": "0"})
+        state["pages"] += 1
+        state["limits"].append(limit)
+        start = int(page_token or 0)
+        end = min(start + limit, CATALOG_SIZE)
+        paging = {"nextPageToken": str(end)} if end < CATALOG_SIZE else {}
+        return {"status": "OK", "result": {"paging": paging, "offerMappings": [_offer(i) for i in range(start, end)]}}
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.02)
+    monkeypatch.setattr(yandex_service, "YANDEX_API_BASE", f"http://127.0.0.1:{port}")
+    yield state
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+def _api():
+    return YandexMarketAPI(oauth_token="test", business_id="42")
+
+
+class TestOfferPagination:
+    def test_follows_page_tokens(self, yandex_stub):
+        async def scenario():
+            return [page async for page in _api().iter_offer_mappings(page_size=100)]
+
+        pages = asyncio.run(scenario())
+        assert [len(page) for page in pages] == [100, 100, 100, 100, 50]
+        ids = [item["offer"]["offerId"] for page in pages for item in page]
+        assert ids == [f"SKU-{i}" for i in range(CATALOG_SIZE)]
+        assert yandex_stub["limits"] == [100] * 5
+        print("✅ nextPageToken followed across the whole catalog")
+
+    def test_status_aggregates_whole_catalog(self, yandex_stub):
+        result = asyncio.run(_api().get_all_offers_status(limit=10))
+        assert result["success"]
+        stats = result["stats"]
+        assert stats["total"] == CATALOG_SIZE
+        assert stats["ready"] == 90
+        assert stats["ready"] + stats["in_moderation"] + stats["need_content"] + stats["rejected"] + stats["other"] == CATALOG_SIZE
+        assert len(result["offers"]) == 10 and result["offers_truncated"]
+        assert result["offers"][0] == {
+            "offer_id": "SKU-0", "name": "Mahsulot 0", "status": "READY", "price": 1000, "market_sku": 10000
+        }
+        print("✅ Dashboard stats cover every page")
+
+    def test_rate_limit_and_errors(self, yandex_stub):
+        yandex_stub["rate_limit_once"] = True
+        result = asyncio.run(_api().get_all_offers_status(limit=0))
+        assert result["success"] and result["stats"]["total"] == CATALOG_SIZE
+
+        yandex_stub["fail"] = True
+        result = asyncio.run(_api().get_all_offers_status())
+        assert result["success"] is False and result["status_code"] == 401
+
+        result = asyncio.run(YandexMarketAPI(oauth_token="test").get_all_offers_status())
+        assert result == {"success": False, "error": "business_id required"}
+        print("✅ 420 retried, API errors reported")
+
+    def test_early_stop_bounds_fetching(self, yandex_stub):
+        async def scenario():
+            async for page in _api().iter_offer_mappings(page_size=10, prefetch=1):
+                await asyncio.sleep(0.2)
+                return page
+
+        page = asyncio.run(scenario())
+        assert len(page) == 10
+        # Iste'mol qilingan sahifa + navbatdagi + yuklanayotgan bitta
+        assert yandex_stub["pages"] <= 3
+        print("✅ Early stop cancels prefetching")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
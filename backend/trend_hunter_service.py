@@ -3,12 +3,13 @@ Trend Hunter Service - Real 1688 & AliExpress API Integration
 Uses RapidAPI for accessing Chinese wholesale data
 """
 import os
-import httpx
 from typing import List, Dict, Optional
 from datetime import datetime
 import json
 import logging
 
+from http_clients import http_client
+
 logger = logging.getLogger(__name__)
 
 # RapidAPI configuration
@@ -35,7 +36,7 @@ async def search_1688_products(query: str, limit: int = 10) -> List[Dict]:
         return []
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_client(RAPIDAPI_1688_HOST) as client:
             url = f"https://{RAPIDAPI_1688_HOST}/search"
             
             headers = {
@@ -91,7 +92,7 @@ async def search_aliexpress_products(query: str, limit: int = 10) -> List[Dict]:
         return []
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_client(RAPIDAPI_ALIEXPRESS_HOST) as client:
             url = f"https://{RAPIDAPI_ALIEXPRESS_HOST}/item_search"
             
             headers = {
@@ -145,7 +146,7 @@ async def get_product_details_1688(product_id: str) -> Optional[Dict]:
         return None
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_client(RAPIDAPI_1688_HOST) as client:
             url = f"https://{RAPIDAPI_1688_HOST}/product"
             
             headers = {
@@ -12,11 +12,12 @@ Endpoints:
 - POST /v1/fbs/product - Create product (if available)
 """
 
-import httpx
 import asyncio
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from http_clients import http_client
+
 UZUM_API_BASE = "https://api-seller.uzum.uz/api/seller-openapi"
 
 
@@ -45,7 +46,7 @@ class UzumMarketAPI:
     async def test_connection(self) -> Dict[str, Any]:
         """Test API connection by getting stocks"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(UZUM_API_BASE) as client:
                 response = await client.get(
                     f"{UZUM_API_BASE}/v2/fbs/sku/stocks",
                     headers=self.headers
@@ -86,7 +87,7 @@ class UzumMarketAPI:
     async def get_stocks(self) -> Dict[str, Any]:
         """Get all SKU stocks"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(UZUM_API_BASE) as client:
                 response = await client.get(
                     f"{UZUM_API_BASE}/v2/fbs/sku/stocks",
                     headers=self.headers
@@ -110,14 +111,22 @@ class UzumMarketAPI:
                 "error": str(e)
             }
     
-    async def get_orders(self, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
-        """Get FBS orders"""
+    async def get_orders(self, limit: int = 10, offset: int = 0, date_from: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get FBS orders
+        
+        Args:
+            date_from: faqat shu vaqtdan (epoch ms) keyingi buyurtmalar (inkremental sinxronizatsiya)
+        """
+        params = {"limit": limit, "offset": offset}
+        if date_from is not None:
+            params["dateFrom"] = date_from
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(UZUM_API_BASE) as client:
                 response = await client.get(
                     f"{UZUM_API_BASE}/v2/fbs/orders",
                     headers=self.headers,
-                    params={"limit": limit, "offset": offset}
+                    params=params
                 )
                 
                 if response.status_code == 200:
@@ -141,7 +150,7 @@ class UzumMarketAPI:
     async def get_order_by_id(self, order_id: str) -> Dict[str, Any]:
         """Get specific order by ID"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(UZUM_API_BASE) as client:
                 response = await client.get(
                     f"{UZUM_API_BASE}/v1/fbs/order/{order_id}",
                     headers=self.headers
@@ -168,7 +177,7 @@ class UzumMarketAPI:
     async def update_stock(self, sku_id: int, amount: int) -> Dict[str, Any]:
         """Update SKU stock amount"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(UZUM_API_BASE) as client:
                 response = await client.post(
                     f"{UZUM_API_BASE}/v1/fbs/sku/{sku_id}/stocks",
                     headers=self.headers,
@@ -195,7 +204,7 @@ class UzumMarketAPI:
     async def update_price(self, sku_id: int, price: int) -> Dict[str, Any]:
         """Update SKU price"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(UZUM_API_BASE) as client:
                 response = await client.post(
                     f"{UZUM_API_BASE}/v1/fbs/sku/{sku_id}/selling-price",
                     headers=self.headers,
@@ -222,7 +231,7 @@ class UzumMarketAPI:
     async def get_product_cards(self, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
         """Get product cards (if endpoint exists)"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(UZUM_API_BASE) as client:
                 response = await client.get(
                     f"{UZUM_API_BASE}/v1/product-card",
                     headers=self.headers,
@@ -24,7 +24,8 @@ import json
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from playwright.async_api import async_playwright, Browser, Page, BrowserContext, TimeoutError as PlaywrightTimeout
-import httpx
+
+from http_clients import http_client
 
 # URLs
 UZUM_SELLER_URL = "https://seller.uzum.uz"
@@ -1171,7 +1172,7 @@ class UzumFullAutomation:
 async def get_ikpu_code(product_name: str, category: str = "") -> Optional[str]:
     """tasnif.soliq.uz dan IKPU kodini olish"""
     try:
-        async with httpx.AsyncClient() as client:
+        async with http_client(TASNIF_API_URL) as client:
             response = await client.get(
                 f"{TASNIF_API_URL}/search",
                 params={"q": product_name, "limit": 5}
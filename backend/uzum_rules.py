@@ -3,6 +3,11 @@ Uzum Market Rules & Regulations Database
 Real data from official Uzum Market documentation (2024-2025)
 """
 
+from bisect import bisect_right
+from functools import lru_cache
+
+from stop_word_automaton import StopWordAutomaton
+
 # ========================================
 # STOP WORDS - Taqiqlangan so'zlar
 # ========================================
@@ -53,6 +58,9 @@ STOP_WORDS = {
     "@", "www.", "http",
 }
 
+# Import vaqtida bir marta quriladi (check/remove bitta o'tishda)
+STOP_WORDS_AUTOMATON = StopWordAutomaton(STOP_WORDS)
+
 # ========================================
 # UZUM MARKET KOMISSIYALARI (2024-2025)
 # 
@@ -199,6 +207,64 @@ LOGISTICS_FEES = {
     }
 }
 
+# ========================================
+# OLDINDAN KOMPILYATSIYA QILINGAN JADVALLAR
+# (import vaqtida; bisect bilan O(log n) qidiruv)
+# ========================================
+
+_PRICE_TIERS = sorted(PRICE_BASED_COMMISSION.values())
+PRICE_BREAKPOINTS = [min_price for min_price, _, _ in _PRICE_TIERS]
+PRICE_COMMISSIONS = [commission for _, _, commission in _PRICE_TIERS]
+PRICE_UPPER_BOUND = _PRICE_TIERS[-1][1]
+
+# Katta maishiy texnika - narxga asoslangan komissiya kamida 8%
+LARGE_APPLIANCE_CATEGORIES = ("appliances", "electronics")
+LARGE_APPLIANCE_SUBCATEGORIES = (
+    "refrigerators", "washing_machines", "air_conditioners", "appliances_large", "tv", "laptops"
+)
+LARGE_APPLIANCE_MIN_COMMISSION = 8
+
+
+def _base_commission(data, fallback: float = 17) -> float:
+    if isinstance(data, dict):
+        return data.get("base", fallback)
+    return data
+
+
+# Kategoriya -> integer id; har bir id uchun subkategoriya -> bazaviy komissiya
+CATEGORY_IDS = {category: i for i, category in enumerate(c for c in COMMISSION_RATES if c != "default")}
+_DEFAULT_COMMISSION = _base_commission(COMMISSION_RATES.get("default"))
+_CATEGORY_DEFAULT_COMMISSION = [
+    _base_commission(COMMISSION_RATES[c].get("default"), 17) if "default" in COMMISSION_RATES[c] else 17
+    for c in CATEGORY_IDS
+]
+_SUBCATEGORY_COMMISSION = [
+    {sub: _base_commission(data) for sub, data in COMMISSION_RATES[c].items()}
+    for c in CATEGORY_IDS
+]
+
+LOGISTICS_WEIGHT_BREAKPOINTS = [1, 5, 15]  # <1 small, <5 medium, <15 large, aks holda oversized
+LOGISTICS_TABLE = {
+    fulfillment: (fees["small"], fees["medium"], fees["large"], fees["oversized"])
+    for fulfillment, fees in LOGISTICS_FEES.items()
+}
+
+
+@lru_cache(maxsize=1024)
+def _resolve_category(category: str, subcategory: str = None):
+    """(category, subcategory) -> (narxsiz bazaviy komissiya, katta texnikami)"""
+    category_lower = category.lower()
+    sub_lower = subcategory.lower() if subcategory else None
+
+    is_large = category_lower in LARGE_APPLIANCE_CATEGORIES and sub_lower in LARGE_APPLIANCE_SUBCATEGORIES
+
+    category_id = CATEGORY_IDS.get(category_lower)
+    if category_id is None:
+        return _DEFAULT_COMMISSION, is_large
+    if sub_lower and sub_lower in _SUBCATEGORY_COMMISSION[category_id]:
+        return _SUBCATEGORY_COMMISSION[category_id][sub_lower], is_large
+    return _CATEGORY_DEFAULT_COMMISSION[category_id], is_large
+
 # ========================================
 # MEDIA TALABLARI
 # ========================================
@@ -259,12 +325,7 @@ CARD_REQUIREMENTS = {
 
 def check_stop_words(text: str) -> dict:
     """Matnda stop so'zlarni tekshirish"""
-    text_lower = text.lower()
-    found_words = []
-    
-    for word in STOP_WORDS:
-        if word.lower() in text_lower:
-            found_words.append(word)
+    found_words = STOP_WORDS_AUTOMATON.find(text)
     
     return {
         "has_stop_words": len(found_words) > 0,
@@ -275,22 +336,14 @@ def check_stop_words(text: str) -> dict:
 
 def remove_stop_words(text: str) -> str:
     """Matndan stop so'zlarni olib tashlash"""
-    result = text
-    for word in sorted(STOP_WORDS, key=len, reverse=True):
-        import re
-        pattern = re.compile(re.escape(word), re.IGNORECASE)
-        result = pattern.sub("", result)
-    
-    result = " ".join(result.split())
-    return result
+    return STOP_WORDS_AUTOMATON.remove(text)
 
 
 def get_commission_by_price(price: float) -> float:
     """Narxga asoslangan komissiyani olish"""
-    for level, (min_price, max_price, commission) in PRICE_BASED_COMMISSION.items():
-        if min_price <= price < max_price:
-            return commission
-    return 17  # Default
+    if not PRICE_BREAKPOINTS[0] <= price < PRICE_UPPER_BOUND:
+        return 17  # Default
+    return PRICE_COMMISSIONS[bisect_right(PRICE_BREAKPOINTS, price) - 1]
 
 
 def get_commission_rate(category: str, subcategory: str = None, price: float = None) -> float:
@@ -303,56 +356,26 @@ def get_commission_rate(category: str, subcategory: str = None, price: float = N
     - Qimmat tovarlar = past komissiya (3-10%)
     - Minimal 8% faqat katta maishiy texnika (muzlatgich, konditsioner)
     """
-    category_lower = category.lower()
+    base_commission, is_large = _resolve_category(category, subcategory)
     
     # Agar narx berilgan bo'lsa, asosan narxga asoslangan hisoblash
     if price is not None and price > 0:
         price_commission = get_commission_by_price(price)
         
         # Katta maishiy texnika uchun maxsus - minimal 8%
-        if category_lower in ["appliances", "electronics"]:
-            if subcategory and subcategory.lower() in ["refrigerators", "washing_machines", "air_conditioners", 
-                                                         "appliances_large", "tv", "laptops"]:
-                # Katta texnika - minimal 8%
-                return max(price_commission, 8)
+        if is_large:
+            return max(price_commission, LARGE_APPLIANCE_MIN_COMMISSION)
         
         return price_commission
     
     # Agar narx yo'q bo'lsa, kategoriya bo'yicha default
-    base_commission = 17
-    
-    if category_lower in COMMISSION_RATES:
-        cat_data = COMMISSION_RATES[category_lower]
-        if subcategory and subcategory.lower() in cat_data:
-            sub_data = cat_data[subcategory.lower()]
-            if isinstance(sub_data, dict):
-                base_commission = sub_data.get("base", 17)
-            else:
-                base_commission = sub_data
-        elif "default" in cat_data:
-            default_data = cat_data["default"]
-            if isinstance(default_data, dict):
-                base_commission = default_data.get("base", 17)
-            else:
-                base_commission = default_data
-    elif isinstance(COMMISSION_RATES.get("default"), dict):
-        base_commission = COMMISSION_RATES["default"].get("base", 17)
-    
     return base_commission
 
 
 def calculate_logistics_fee(weight_kg: float, fulfillment: str = "fbs") -> int:
     """Logistika xarajatini hisoblash"""
-    fees = LOGISTICS_FEES.get(fulfillment, LOGISTICS_FEES["fbs"])
-    
-    if weight_kg < 1:
-        return fees["small"]
-    elif weight_kg < 5:
-        return fees["medium"]
-    elif weight_kg < 15:
-        return fees["large"]
-    else:
-        return fees["oversized"]
+    fees = LOGISTICS_TABLE.get(fulfillment) or LOGISTICS_TABLE["fbs"]
+    return fees[bisect_right(LOGISTICS_WEIGHT_BREAKPOINTS, weight_kg)]
 
 
 def calculate_full_price(
@@ -0,0 +1,483 @@
+"""
+UZUM SYNC - Incremental Uzum orders / SKU stocks sync into the database
+=======================================================================
+Dashboard'lar har so'rovda Uzum API'ga murojaat qilmasligi uchun har bir
+ulangan partner (va UZUM_API_KEY platforma akkaunti) buyurtmalari hamda
+SKU qoldiqlari fonda lokal jadvallarga yoziladi; o'qish endpoint'lari
+ma'lumotni DB'dan beradi.
+
+Features:
+- Akkaunt bo'yicha alohida fon vazifasi (ulangan partnerlar davriy aniqlanadi)
+- Buyurtmalar: Uzum dateFrom yaratilgan vaqt bo'yicha filtrlaydi, shuning
+  uchun har safar oxirgi N kunda yaratilganlar qayta olinadi (holat
+  o'zgarishlari), eskilari davriy to'liq sinxronlashda yangilanadi;
+  faqat o'zgargan buyurtmalar yoziladi
+- Bir ishga tushish UZUM_SYNC_MAX_PAGES sahifadan oshmaydi - tugamagan
+  o'tish keyingi safar shu offset'dan davom ettiriladi
+- Qoldiqlar: Uzum to'liq ro'yxat qaytaradi - faqat o'zgargan / o'chgan SKU'lar yoziladi
+- Xato bo'lsa cursor surilmaydi (keyingi ishga tushishda qayta olinadi)
+- Keyset sahifalash (next_cursor) - yangi buyurtmalar kelganda ham barqaror
+- Statistika (/api/health/full)
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List, Tuple
+
+from database import (
+    get_active_marketplace_integrations,
+    get_uzum_order_fingerprints, upsert_uzum_orders, list_uzum_orders,
+    get_uzum_stock_fingerprints, upsert_uzum_stocks, list_uzum_stocks,
+    get_uzum_sync_state, save_uzum_sync_state, utc_now
+)
+from uzum_api_service import UzumMarketAPI
+
+UZUM_SYNC_ENABLED = os.getenv("UZUM_SYNC_ENABLED", "true").lower() == "true"
+# Akkaunt bo'yicha sinxronizatsiya oralig'i va ulangan partnerlarni qayta aniqlash (soniya)
+UZUM_SYNC_INTERVAL = float(os.getenv("UZUM_SYNC_INTERVAL", "300"))
+UZUM_SYNC_DISCOVERY_INTERVAL = float(os.getenv("UZUM_SYNC_DISCOVERY_INTERVAL", "600"))
+# Bir vaqtda sinxronlanadigan akkauntlar (Uzum API'ga bosim)
+UZUM_SYNC_CONCURRENCY = int(os.getenv("UZUM_SYNC_CONCURRENCY", "4"))
+UZUM_SYNC_PAGE_SIZE = int(os.getenv("UZUM_SYNC_PAGE_SIZE", "50"))
+# Bitta ishga tushishda o'qiladigan sahifalar; qolgani keyingi safar davom ettiriladi
+UZUM_SYNC_MAX_PAGES = int(os.getenv("UZUM_SYNC_MAX_PAGES", "200"))
+# Cursor'dan shuncha oldin yaratilganlar ham qayta olinadi (soat farqi, kechikkan yozuvlar)
+UZUM_SYNC_CURSOR_OVERLAP = float(os.getenv("UZUM_SYNC_CURSOR_OVERLAP", "600"))
+# Har safar oxirgi shuncha kunda yaratilgan buyurtmalar qayta olinadi (holat o'zgarishlari)
+UZUM_SYNC_ORDER_LOOKBACK_DAYS = float(os.getenv("UZUM_SYNC_ORDER_LOOKBACK_DAYS", "14"))
+# Undan eski buyurtmalar uchun to'liq sinxronlash oralig'i (soniya)
+UZUM_SYNC_FULL_RESYNC_INTERVAL = float(os.getenv("UZUM_SYNC_FULL_RESYNC_INTERVAL", "86400"))
+
+# UZUM_API_KEY (server.py /api/uzum-market/*) akkaunti
+PLATFORM_ACCOUNT = "platform"
+
+# Buyurtma oxirgi o'zgarish vaqti (birinchi topilgani)
+ORDER_MODIFIED_FIELDS = ("dateUpdated", "updatedAt", "lastModified", "dateStatusChanged", "dateCreated")
+
+
+class UzumSyncError(Exception):
+    """Uzum API sinxronizatsiya xatosi"""
+
+
+def to_utc_datetime(value: Any) -> Optional[datetime]:
+    """Uzum vaqti (epoch ms / s yoki ISO) -> naive UTC datetime"""
+    if isinstance(value, bool) or value in (None, ""):
+        return None
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if isinstance(value, (int, float)):
+        seconds = value / 1000 if value > 1e11 else value
+        return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    return None
+
+
+def order_record(order: dict, now: datetime) -> Optional[dict]:
+    """Uzum buyurtmasi -> uzum_orders yozuvi (fingerprint - o'zgarishni aniqlash uchun)"""
+    order_id = order.get("id", order.get("orderId"))
+    if order_id is None:
+        return None
+    created = to_utc_datetime(order.get("dateCreated")) or now
+    modified = next(
+        (dt for dt in (to_utc_datetime(order.get(field)) for field in ORDER_MODIFIED_FIELDS) if dt),
+        created
+    )
+    return {
+        "order_id": str(order_id),
+        "status": order.get("status"),
+        "date_created": created,
+        "modified_at": modified,
+        "fingerprint": hashlib.sha1(json.dumps(order, sort_keys=True, default=str).encode()).hexdigest(),
+        "data": order
+    }
+
+
+def stock_record(sku: dict) -> Optional[dict]:
+    """skuAmountList elementi -> uzum_stocks yozuvi (fingerprint - o'zgarishni aniqlash uchun)"""
+    sku_id = sku.get("skuId")
+    if sku_id is None:
+        return None
+    return {
+        "sku_id": int(sku_id),
+        "amount": int(sku.get("amount") or 0),
+        "fingerprint": hashlib.sha1(json.dumps(sku, sort_keys=True, default=str).encode()).hexdigest(),
+        "data": sku
+    }
+
+
+def orders_from_payload(payload: Any) -> List[dict]:
+    if isinstance(payload, list):
+        return payload
+    for key in ("orders", "list", "items"):
+        if isinstance(payload.get(key), list):
+            return payload[key]
+    return []
+
+
+def encode_order_cursor(date_created: datetime, order_id: str) -> str:
+    raw = f"{date_created.isoformat()}|{order_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_order_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Raises ValueError: noto'g'ri cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created, order_id = raw.split("|", 1)
+        return datetime.fromisoformat(created), order_id
+    except Exception:
+        raise ValueError("Noto'g'ri cursor")
+
+
+def _iso(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class UzumSyncWorker:
+    """
+    Ulangan har bir Uzum akkaunti uchun fon sinxronizatsiyasi
+
+    start() - FastAPI startup, stop() - shutdown.
+    sync_account() - darhol sinxronlash (endpoint'dan ham chaqiriladi).
+    """
+
+    def __init__(
+        self,
+        interval: float = UZUM_SYNC_INTERVAL,
+        discovery_interval: float = UZUM_SYNC_DISCOVERY_INTERVAL,
+        concurrency: int = UZUM_SYNC_CONCURRENCY
+    ):
+        self.interval = interval
+        self.discovery_interval = discovery_interval
+        self.concurrency = max(1, concurrency)
+
+        # account_id -> Uzum API kaliti
+        self.accounts: Dict[str, str] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._supervisor: Optional[asyncio.Task] = None
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+        # Stats
+        self.runs = 0
+        self.failures = 0
+        self.orders_synced = 0
+        self.stocks_synced = 0
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Lock / semaphore eski loop'ga bog'langan
+            self._loop = loop
+            self._locks = {}
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    # ==================== SYNC ====================
+
+    async def sync_orders(
+        self,
+        account_id: str,
+        api: UzumMarketAPI,
+        state: Dict[str, Any],
+        full: bool = False
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Buyurtmalarni sinxronlash -> (yozilganlar, holat yangilanishi)
+
+        - Tugamagan o'tish bo'lsa (resume_offset) - shu offset'dan davom etadi
+        - To'liq: birinchi marta, full=True yoki UZUM_SYNC_FULL_RESYNC_INTERVAL o'tgan bo'lsa
+        - Aks holda: min(cursor - overlap, hozir - lookback) dan keyin yaratilganlar
+        """
+        now = utc_now()
+        cursor = state.get("cursor")
+        if state.get("resume_offset") is not None and not full:
+            since, offset = state.get("resume_from"), state["resume_offset"]
+        else:
+            full_sync_at = state.get("full_sync_at")
+            full = full or cursor is None or full_sync_at is None or \
+                (now - full_sync_at).total_seconds() >= UZUM_SYNC_FULL_RESYNC_INTERVAL
+            since = None if full else min(
+                cursor - timedelta(seconds=UZUM_SYNC_CURSOR_OVERLAP),
+                now - timedelta(days=UZUM_SYNC_ORDER_LOOKBACK_DAYS)
+            )
+            offset = 0
+        date_from = int(since.replace(tzinfo=timezone.utc).timestamp() * 1000) if since else None
+        newest = cursor
+        synced = 0
+        exhausted = False
+
+        for _ in range(UZUM_SYNC_MAX_PAGES):
+            result = await api.get_orders(limit=UZUM_SYNC_PAGE_SIZE, offset=offset, date_from=date_from)
+            if not result.get("success"):
+                raise UzumSyncError(str(result.get("error"))[:300])
+
+            orders = orders_from_payload(result.get("data") or {})
+            records = [record for record in (order_record(order, now) for order in orders) if record]
+            # Oynadagi buyurtmalar har safar qaytadi - faqat o'zgarganlari yoziladi
+            known = await get_uzum_order_fingerprints(account_id, [record["order_id"] for record in records])
+            changed = [record for record in records if known.get(record["order_id"]) != record["fingerprint"]]
+            await upsert_uzum_orders(account_id, changed)
+            synced += len(changed)
+            for record in records:
+                if newest is None or record["date_created"] > newest:
+                    newest = record["date_created"]
+
+            offset += len(orders)
+            if len(orders) < UZUM_SYNC_PAGE_SIZE:
+                exhausted = True
+                break
+
+        self.orders_synced += synced
+        # cursor - ko'rilgan eng yangi buyurtma; o'tish tugamasa qolgani resume_* da saqlanadi
+        updates: Dict[str, Any] = {"cursor": newest}
+        if exhausted:
+            updates.update(resume_offset=None, resume_from=None)
+            if since is None:
+                updates["full_sync_at"] = now
+        else:
+            updates.update(resume_offset=offset, resume_from=since)
+            print(f"⚠️ Uzum sync {account_id}/orders: page limit reached, resuming at offset {offset} next run")
+        return synced, updates
+
+    async def sync_stocks(self, account_id: str, api: UzumMarketAPI) -> Tuple[int, datetime]:
+        """SKU qoldiqlari: faqat o'zgargan va Uzum'da qolmagan SKU'lar yoziladi"""
+        result = await api.get_stocks()
+        if not result.get("success"):
+            raise UzumSyncError(str(result.get("error"))[:300])
+
+        skus = (result.get("data") or {}).get("skuAmountList", [])
+        records = [record for record in map(stock_record, skus) if record]
+        known = await get_uzum_stock_fingerprints(account_id)
+        changed = [record for record in records if known.get(record["sku_id"]) != record["fingerprint"]]
+        current = {record["sku_id"] for record in records}
+        removed = [sku_id for sku_id in known if sku_id not in current]
+
+        await upsert_uzum_stocks(account_id, changed, removed)
+        self.stocks_synced += len(changed) + len(removed)
+        return len(changed) + len(removed), utc_now()
+
+    async def _run_resource(self, account_id: str, resource: str, api: UzumMarketAPI, full: bool) -> Dict[str, Any]:
+        state = dict((await get_uzum_sync_state(account_id)).get(resource) or {})
+        state["last_run_at"] = utc_now()
+        try:
+            if resource == "orders":
+                synced, updates = await self.sync_orders(account_id, api, state, full)
+            else:
+                synced, cursor = await self.sync_stocks(account_id, api)
+                updates = {"cursor": cursor}
+        except Exception as e:
+            self.failures += 1
+            state["last_error"] = str(e)[:500]
+            await save_uzum_sync_state(account_id, resource, state)
+            print(f"⚠️ Uzum sync {account_id}/{resource}: {e}")
+            return {"success": False, "error": state["last_error"]}
+
+        state.update(updates, last_success_at=utc_now(), last_error=None, items_synced=synced)
+        await save_uzum_sync_state(account_id, resource, state)
+        if resource == "orders":
+            return {"success": True, "synced": synced, "complete": state.get("resume_offset") is None}
+        return {"success": True, "synced": synced}
+
+    async def sync_account(self, account_id: str, api_key: Optional[str] = None, full: bool = False) -> Dict[str, Any]:
+        """
+        Akkauntni darhol sinxronlash (buyurtmalar + qoldiqlar)
+
+        full=True - buyurtmalar cursor'siz, boshidan qayta olinadi
+        (tugamagan o'tish ham boshidan boshlanadi).
+        Bir akkaunt uchun bir vaqtda bitta sinxronizatsiya.
+        """
+        api_key = api_key or self.accounts.get(account_id)
+        if not api_key:
+            return {"success": False, "error": "Uzum API kaliti topilmadi"}
+
+        self._ensure_loop()
+        lock = self._locks.setdefault(account_id, asyncio.Lock())
+        async with lock, self._semaphore:
+            self.runs += 1
+            api = UzumMarketAPI(api_key)
+            result: Dict[str, Any] = {"account_id": account_id}
+            try:
+                for resource in ("orders", "stocks"):
+                    result[resource] = await self._run_resource(account_id, resource, api, full)
+            except Exception as e:
+                # DB xatosi - keyingi davrda qayta uriniladi
+                self.failures += 1
+                print(f"❌ Uzum sync {account_id}: {e}")
+                return {**result, "success": False, "error": str(e)}
+            result["success"] = all(result[resource]["success"] for resource in ("orders", "stocks"))
+            return result
+
+    # ==================== WORKER ====================
+
+    def start(self):
+        """Fon sinxronizatsiyasini boshlash (FastAPI startup)"""
+        if not UZUM_SYNC_ENABLED or self._supervisor is not None:
+            return
+        self._supervisor = asyncio.create_task(self._supervise())
+        print("✅ Uzum sync worker started")
+
+    async def stop(self):
+        """Barcha fon vazifalarini to'xtatish (FastAPI shutdown)"""
+        tasks = [task for task in (self._supervisor, *self._tasks.values()) if task is not None]
+        self._supervisor = None
+        self._tasks = {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def refresh_accounts(self) -> Dict[str, str]:
+        """Ulangan akkauntlarni aniqlash; yangi akkauntga vazifa, uzilganiniki to'xtatiladi"""
+        accounts: Dict[str, str] = {}
+        platform_key = os.getenv("UZUM_API_KEY", "")
+        if platform_key:
+            accounts[PLATFORM_ACCOUNT] = platform_key
+        for integration in await get_active_marketplace_integrations("uzum"):
+            api_key = (integration.get("credentials") or {}).get("api_key")
+            if api_key:
+                accounts[str(integration["partner_id"])] = api_key
+
+        for account_id in list(self._tasks):
+            if accounts.get(account_id) != self.accounts.get(account_id):
+                # Uzilgan yoki kaliti o'zgargan
+                self._tasks.pop(account_id).cancel()
+        self.accounts = accounts
+        for account_id in accounts:
+            if account_id not in self._tasks:
+                self._tasks[account_id] = asyncio.create_task(self._account_loop(account_id))
+        return accounts
+
+    async def _supervise(self):
+        while True:
+            try:
+                await self.refresh_accounts()
+            except Exception as e:
+                print(f"⚠️ Uzum sync discovery error: {e}")
+            await asyncio.sleep(self.discovery_interval)
+
+    async def _account_loop(self, account_id: str):
+        # Akkauntlar bir vaqtda boshlanmasligi uchun
+        await asyncio.sleep(random.uniform(0, min(self.interval, 30)))
+        while True:
+            await self.sync_account(account_id)
+            await asyncio.sleep(self.interval * random.uniform(0.9, 1.1))
+
+    def account_for_key(self, api_key: str) -> Optional[str]:
+        """API kaliti bo'yicha sinxronlanayotgan akkaunt"""
+        return next((account_id for account_id, key in self.accounts.items() if key == api_key), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": UZUM_SYNC_ENABLED,
+            "running": self._supervisor is not None,
+            "accounts": len(self.accounts),
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "orders_synced": self.orders_synced,
+            "stocks_synced": self.stocks_synced
+        }
+
+
+# ==================== READ (DB) ====================
+
+async def get_sync_status(account_id: str) -> Dict[str, Any]:
+    """
+    resource -> {cursor, last_run_at, last_success_at, last_error, items_synced,
+    full_sync_at, resume_offset, complete}
+
+    complete=False - o'tish UZUM_SYNC_MAX_PAGES da to'xtagan, keyingi safar davom etadi.
+    """
+    states = await get_uzum_sync_state(account_id)
+    return {
+        resource: {
+            **{
+                key: _iso(state.get(key))
+                for key in ("cursor", "last_run_at", "last_success_at", "last_error", "items_synced",
+                            "full_sync_at", "resume_offset")
+            },
+            "complete": state.get("resume_offset") is None
+        }
+        for resource, state in states.items()
+    }
+
+
+async def read_orders(
+    account_id: str,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Sinxronlangan buyurtmalar (eng yangisi birinchi)
+
+    cursor (oldingi javobdagi next_cursor) - keyset sahifalash; bo'lmasa offset.
+    Akkaunt hali sinxronlanmagan yoki DB ishlamasa None.
+
+    Raises:
+        ValueError: noto'g'ri cursor
+    """
+    after = decode_order_cursor(cursor) if cursor else None
+    try:
+        state = (await get_uzum_sync_state(account_id)).get("orders")
+        if not state or not state.get("last_success_at"):
+            return None
+        page = await list_uzum_orders(account_id, limit, offset, after, status)
+    except Exception as e:
+        print(f"⚠️ Uzum orders DB read error: {e}")
+        return None
+
+    items = page["items"]
+    last = items[-1] if items and len(items) == limit else None
+    return {
+        "orders": [item["data"] for item in items],
+        "total": page["total"],
+        "limit": limit,
+        "offset": 0 if after else offset,
+        "next_cursor": encode_order_cursor(last["date_created"], last["order_id"]) if last else None,
+        "synced_at": _iso(state["last_success_at"])
+    }
+
+
+async def read_stocks(account_id: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Sinxronlangan SKU qoldiqlari (sku_id bo'yicha); limit=None - hammasi
+
+    Raises:
+        ValueError: noto'g'ri cursor
+    """
+    after = int(cursor) if cursor else None
+    try:
+        state = (await get_uzum_sync_state(account_id)).get("stocks")
+        if not state or not state.get("last_success_at"):
+            return None
+        page = await list_uzum_stocks(account_id, limit, after)
+    except Exception as e:
+        print(f"⚠️ Uzum stocks DB read error: {e}")
+        return None
+
+    items = page["items"]
+    return {
+        "skuAmountList": [item["data"] for item in items],
+        "total": page["total"],
+        "limit": limit,
+        "next_cursor": str(items[-1]["sku_id"]) if limit and len(items) == limit else None,
+        "synced_at": _iso(state["last_success_at"])
+    }
+
+
+# Singleton
+uzum_sync_worker = UzumSyncWorker()
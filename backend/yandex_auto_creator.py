@@ -20,7 +20,8 @@ import asyncio
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from pydantic import BaseModel
-import httpx
+
+from http_clients import http_client
 
 # Constants
 YANDEX_API_BASE = "https://api.partner.market.yandex.ru"
@@ -121,10 +122,11 @@ class YandexAutoCreator:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.get(
                     f"{YANDEX_API_BASE}/v2/campaigns",
-                    headers=headers
+                    headers=headers,
+                    timeout=15.0
                 )
                 
                 if response.status_code == 200:
@@ -382,7 +384,7 @@ Create an image that would convert browsers to buyers on Yandex Market."""
             return None
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(IMGBB_UPLOAD_URL) as client:
                 response = await client.post(
                     IMGBB_UPLOAD_URL,
                     data={
@@ -583,11 +585,12 @@ Respond in JSON format:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.post(
                     f"{YANDEX_API_BASE}/v2/businesses/{self.business_id}/offer-mappings/update",
                     headers=headers,
-                    json=product_data
+                    json=product_data,
+                    timeout=60.0
                 )
                 
                 if response.status_code == 200:
@@ -3,6 +3,11 @@ Yandex Market Rules & Regulations Database
 Real data from official Yandex Market documentation (2024-2025)
 """
 
+from bisect import bisect_right
+from functools import lru_cache
+
+from stop_word_automaton import StopWordAutomaton
+
 # ========================================
 # YANDEX MARKET KOMISSIYALARI (2024-2025)
 # Kategoriya va narxga asoslangan
@@ -142,6 +147,30 @@ YANDEX_LOGISTICS_FEES = {
     }
 }
 
+# ========================================
+# OLDINDAN KOMPILYATSIYA QILINGAN JADVALLAR
+# (import vaqtida; bisect bilan O(log n) qidiruv)
+# ========================================
+
+# Kategoriya -> integer id; har bir id uchun subkategoriya -> bazaviy komissiya
+YANDEX_CATEGORY_IDS = {
+    category: i for i, category in enumerate(c for c in YANDEX_COMMISSION_RATES if c != "default")
+}
+_YANDEX_DEFAULT_COMMISSION = YANDEX_COMMISSION_RATES["default"]["base"]
+_YANDEX_CATEGORY_DEFAULT_COMMISSION = [
+    YANDEX_COMMISSION_RATES[c].get("default", {"base": 12})["base"] for c in YANDEX_CATEGORY_IDS
+]
+_YANDEX_SUBCATEGORY_COMMISSION = [
+    {sub: data["base"] for sub, data in YANDEX_COMMISSION_RATES[c].items()}
+    for c in YANDEX_CATEGORY_IDS
+]
+
+YANDEX_LOGISTICS_WEIGHT_BREAKPOINTS = [1, 5, 15]  # <1 small, <5 medium, <15 large, aks holda oversized
+YANDEX_LOGISTICS_TABLE = {
+    fulfillment: (fees["small"], fees["medium"], fees["large"], fees["oversized"])
+    for fulfillment, fees in YANDEX_LOGISTICS_FEES.items()
+}
+
 # ========================================
 # MEDIA TALABLARI
 # ========================================
@@ -226,6 +255,8 @@ YANDEX_STOP_WORDS = {
     "гарантия возврата", "100% гарантия",
 }
 
+YANDEX_STOP_WORDS_AUTOMATON = StopWordAutomaton(YANDEX_STOP_WORDS)
+
 # ========================================
 # KATEGORIYA MAPPING (Yandex Market)
 # ========================================
@@ -311,31 +342,23 @@ YANDEX_CATEGORIES = {
 # HELPER FUNCTIONS
 # ========================================
 
+@lru_cache(maxsize=1024)
 def get_yandex_commission_rate(category: str, subcategory: str = None) -> float:
     """Kategoriya bo'yicha Yandex komissiyasini olish"""
-    category_lower = category.lower()
+    category_id = YANDEX_CATEGORY_IDS.get(category.lower())
+    if category_id is None:
+        return _YANDEX_DEFAULT_COMMISSION
     
-    if category_lower in YANDEX_COMMISSION_RATES:
-        cat_data = YANDEX_COMMISSION_RATES[category_lower]
-        if subcategory and subcategory.lower() in cat_data:
-            return cat_data[subcategory.lower()]["base"]
-        return cat_data.get("default", {"base": 12})["base"]
-    
-    return YANDEX_COMMISSION_RATES["default"]["base"]
+    sub_lower = subcategory.lower() if subcategory else None
+    if sub_lower and sub_lower in _YANDEX_SUBCATEGORY_COMMISSION[category_id]:
+        return _YANDEX_SUBCATEGORY_COMMISSION[category_id][sub_lower]
+    return _YANDEX_CATEGORY_DEFAULT_COMMISSION[category_id]
 
 
 def get_yandex_logistics_fee(weight_kg: float, fulfillment: str = "fbs") -> int:
     """Logistika xarajatini hisoblash (so'mda)"""
-    fees = YANDEX_LOGISTICS_FEES.get(fulfillment, YANDEX_LOGISTICS_FEES["fbs"])
-    
-    if weight_kg < 1:
-        return fees["small"]
-    elif weight_kg < 5:
-        return fees["medium"]
-    elif weight_kg < 15:
-        return fees["large"]
-    else:
-        return fees["oversized"]
+    fees = YANDEX_LOGISTICS_TABLE.get(fulfillment) or YANDEX_LOGISTICS_TABLE["fbs"]
+    return fees[bisect_right(YANDEX_LOGISTICS_WEIGHT_BREAKPOINTS, weight_kg)]
 
 
 def get_yandex_category_id(category: str, subcategory: str = None) -> int:
@@ -353,12 +376,7 @@ def get_yandex_category_id(category: str, subcategory: str = None) -> int:
 
 def check_yandex_stop_words(text: str) -> dict:
     """Matnda taqiqlangan so'zlarni tekshirish"""
-    text_lower = text.lower()
-    found_words = []
-    
-    for word in YANDEX_STOP_WORDS:
-        if word.lower() in text_lower:
-            found_words.append(word)
+    found_words = YANDEX_STOP_WORDS_AUTOMATON.find(text)
     
     return {
         "has_stop_words": len(found_words) > 0,
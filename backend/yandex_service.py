@@ -10,17 +10,82 @@ Auth: OAuth token
 """
 import os
 import json
-import httpx
-from typing import Optional, List, Dict, Any
+import time
+import asyncio
+from typing import Optional, List, Dict, Any, AsyncIterator, Callable, Tuple
 from datetime import datetime
+import httpx
 from dotenv import load_dotenv
 
+from ai_singleflight import text_generation_cache, prompt_key
+from ai_rate_limiter import TokenBucket, parse_retry_after
+from http_clients import http_client
+
 load_dotenv()
 
 # Yandex Market API endpoints
 YANDEX_API_BASE = "https://api.partner.market.yandex.ru"
 YANDEX_OAUTH_URL = "https://oauth.yandex.ru"
 
+# offer-mappings sahifalash: sahifa hajmi (API maksimumi 200) va oldindan yuklanadigan sahifalar
+YANDEX_OFFERS_PAGE_SIZE = int(os.getenv("YANDEX_OFFERS_PAGE_SIZE", "200"))
+YANDEX_OFFERS_PREFETCH = int(os.getenv("YANDEX_OFFERS_PREFETCH", "2"))
+# 420 / 429 (rate limit) javobida qayta urinishlar
+YANDEX_API_MAX_RETRIES = int(os.getenv("YANDEX_API_MAX_RETRIES", "3"))
+
+# Ommaviy narx / qoldiq yangilash: so'rov boshiga maksimum (Yandex limiti) va parallel so'rovlar
+YANDEX_PRICE_BATCH_SIZE = int(os.getenv("YANDEX_PRICE_BATCH_SIZE", "500"))
+YANDEX_STOCK_BATCH_SIZE = int(os.getenv("YANDEX_STOCK_BATCH_SIZE", "2000"))
+YANDEX_BULK_CONCURRENCY = int(os.getenv("YANDEX_BULK_CONCURRENCY", "4"))
+# Yandex e'lon qilgan limitlar: daqiqasiga yangilanadigan offer / SKU soni (0 = cheklovsiz)
+YANDEX_PRICE_UPDATES_PER_MINUTE = int(os.getenv("YANDEX_PRICE_UPDATES_PER_MINUTE", "10000"))
+YANDEX_STOCK_UPDATES_PER_MINUTE = int(os.getenv("YANDEX_STOCK_UPDATES_PER_MINUTE", "100000"))
+
+# Dashboard statistikasi kaliti
+OFFER_STATUS_STATS = {
+    "READY": "ready",
+    "IN_MODERATION": "in_moderation",
+    "NEED_CONTENT": "need_content",
+    "REJECTED": "rejected",
+    "OTHER": "other",
+}
+
+_PAGES_DONE = object()
+
+# (tur, business/campaign ID) -> daqiqalik limit bucket'i (barcha so'rovlar uchun umumiy)
+_bulk_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+
+def _bulk_bucket(kind: str, scope: str, per_minute: int) -> TokenBucket:
+    key = (kind, scope)
+    bucket = _bulk_buckets.get(key)
+    if bucket is None or bucket.per_minute != per_minute:
+        bucket = _bulk_buckets[key] = TokenBucket(per_minute)
+    return bucket
+
+
+async def _acquire_bulk_quota(bucket: TokenBucket, amount: int):
+    """amount ta offer uchun limit bo'shashini kutish"""
+    while True:
+        now = time.monotonic()
+        if bucket.available(amount, now):
+            bucket.consume(amount, now)
+            return
+        await asyncio.sleep(bucket.wait_time(amount, now))
+
+
+def _is_retryable(status_code: Optional[int]) -> bool:
+    """Tarmoq xatosi, rate limit (420/429) yoki 5xx - chunk qayta yuborilishi mumkin"""
+    return status_code is None or status_code in (420, 429) or status_code >= 500
+
+
+class YandexAPIError(Exception):
+    """Yandex Market API xatosi (status_code - HTTP kodi, ma'lum bo'lsa)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
 
 class YandexMarketAPI:
     """
@@ -60,7 +125,7 @@ class YandexMarketAPI:
     async def test_connection(self) -> dict:
         """Test API connection and get account info with shop names"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.get(
                     f"{YANDEX_API_BASE}/v2/campaigns",
                     headers=self.headers
@@ -132,7 +197,7 @@ class YandexMarketAPI:
     async def get_campaigns(self) -> dict:
         """Get list of seller's campaigns (shops)"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.get(
                     f"{YANDEX_API_BASE}/v2/campaigns",
                     headers=self.headers
@@ -282,11 +347,12 @@ class YandexMarketAPI:
                         "image_count": len(pictures)
                     }
             
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.post(
                     f"{YANDEX_API_BASE}/v2/businesses/{self.business_id}/offer-mappings/update",
                     headers=self.headers,
-                    json=payload
+                    json=payload,
+                    timeout=60.0
                 )
                 
                 response_data = response.json()
@@ -340,7 +406,7 @@ class YandexMarketAPI:
             return {"success": False, "error": "campaign_id required"}
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.get(
                     f"{YANDEX_API_BASE}/v2/campaigns/{self.campaign_id}/offer-mapping-entries",
                     headers=self.headers,
@@ -386,7 +452,7 @@ class YandexMarketAPI:
                 ]
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.post(
                     f"{YANDEX_API_BASE}/v2/businesses/{self.business_id}/offer-mappings/update",
                     headers=self.headers,
@@ -407,10 +473,213 @@ class YandexMarketAPI:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    async def _send_bulk_chunk(
+        self,
+        client,
+        method: str,
+        url: str,
+        payload: dict,
+        bucket: TokenBucket,
+        size: int
+    ) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Bitta chunk yuborish -> (status_code, xato)
+        
+        420 / 429 (Retry-After bo'yicha), 5xx va tarmoq xatolarida qayta urinadi.
+        """
+        status_code, error = None, None
+        for attempt in range(YANDEX_API_MAX_RETRIES + 1):
+            await _acquire_bulk_quota(bucket, size)
+            delay = None
+            try:
+                response = await client.request(method, url, headers=self.headers, json=payload)
+            except httpx.TransportError as e:
+                status_code, error = None, str(e) or type(e).__name__
+            else:
+                if response.status_code == 200:
+                    return 200, None
+                status_code, error = response.status_code, response.text[:500]
+                if not _is_retryable(status_code):
+                    break
+                delay = parse_retry_after(response.headers.get("retry-after"))
+            if attempt < YANDEX_API_MAX_RETRIES:
+                await asyncio.sleep(delay if delay is not None else 2 ** attempt)
+        return status_code, error
+    
+    async def _send_bulk(
+        self,
+        kind: str,
+        items: List[dict],
+        invalid: List[dict],
+        method: str,
+        url: str,
+        build_payload: Callable[[List[dict]], dict],
+        chunk_size: int,
+        concurrency: int,
+        bucket: TokenBucket
+    ) -> dict:
+        """
+        Yaroqli elementlarni chunk'larga bo'lib parallel yuborish
+        
+        Yandex chunk'ni butunlay qabul qiladi yoki rad etadi - offer natijasi
+        o'z chunk'i natijasi bilan bir xil. retry_items - qayta urinish mumkin
+        bo'lgan (rate limit, 5xx, tarmoq) chunk'lar elementlari, shu metodga
+        qaytadan berish uchun.
+        """
+        chunk_size = max(1, chunk_size)
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def send(chunk: List[dict]) -> Tuple[Optional[int], Optional[str]]:
+            async with semaphore:
+                return await self._send_bulk_chunk(client, method, url, build_payload(chunk), bucket, len(chunk))
+        
+        async with http_client(YANDEX_API_BASE) as client:
+            outcomes = await asyncio.gather(*(send(chunk) for chunk in chunks))
+        
+        results = list(invalid)
+        failed_chunks = []
+        retry_items = []
+        for index, (chunk, (status_code, error)) in enumerate(zip(chunks, outcomes)):
+            ok = status_code == 200
+            for item in chunk:
+                result = {"offer_id": item["offer_id"], "success": ok, "chunk": index}
+                if not ok:
+                    result.update({"error": error, "status_code": status_code})
+                results.append(result)
+            if not ok:
+                retryable = _is_retryable(status_code)
+                failed_chunks.append({
+                    "chunk": index,
+                    "offer_ids": [item["offer_id"] for item in chunk],
+                    "status_code": status_code,
+                    "error": error,
+                    "retryable": retryable
+                })
+                if retryable:
+                    retry_items.extend(chunk)
+        
+        updated = sum(1 for result in results if result["success"])
+        if updated:
+            print(f"✅ Yandex {kind}: {updated}/{len(results)} yangilandi ({len(chunks)} chunk)")
+        return {
+            "success": updated == len(results),
+            "total": len(results),
+            "updated": updated,
+            "failed": len(results) - updated,
+            "chunks": len(chunks),
+            "results": results,
+            "failed_chunks": failed_chunks,
+            "retry_items": retry_items
+        }
+    
+    async def bulk_update_prices(
+        self,
+        prices: List[dict],
+        currency: str = "UZS",
+        chunk_size: int = YANDEX_PRICE_BATCH_SIZE,
+        concurrency: int = YANDEX_BULK_CONCURRENCY
+    ) -> dict:
+        """
+        Ko'p offer narxini yangilash (POST /v2/businesses/{businessId}/offer-prices/updates)
+        
+        Args:
+            prices: [{"offer_id", "price", "currency"?, "discount_base"?}, ...]
+                    bir offer bir necha marta berilsa oxirgisi olinadi
+        
+        Returns:
+            results - har bir offer natijasi, failed_chunks - rad etilgan chunk'lar,
+            retry_items - qayta yuborish uchun elementlar (xuddi shu formatda)
+        """
+        if not self.business_id:
+            return {"success": False, "error": "business_id required"}
+        
+        valid: Dict[str, dict] = {}
+        invalid = []
+        for raw in prices:
+            offer_id = str(raw.get("offer_id") or "").strip()
+            price = raw.get("price")
+            if not offer_id or isinstance(price, bool) or not isinstance(price, (int, float)) or price <= 0:
+                invalid.append({"offer_id": offer_id or None, "success": False, "error": "offer_id va musbat price kerak"})
+                continue
+            item = {"offer_id": offer_id, "price": price, "currency": raw.get("currency") or currency}
+            if raw.get("discount_base"):
+                item["discount_base"] = raw["discount_base"]
+            valid.pop(offer_id, None)
+            valid[offer_id] = item
+        
+        def build_payload(chunk: List[dict]) -> dict:
+            offers = []
+            for item in chunk:
+                price = {"value": item["price"], "currencyId": item["currency"]}
+                if item.get("discount_base"):
+                    price["discountBase"] = item["discount_base"]
+                offers.append({"offerId": item["offer_id"], "price": price})
+            return {"offers": offers}
+        
+        return await self._send_bulk(
+            "prices", list(valid.values()), invalid, "POST",
+            f"{YANDEX_API_BASE}/v2/businesses/{self.business_id}/offer-prices/updates",
+            build_payload, chunk_size, concurrency,
+            _bulk_bucket("prices", str(self.business_id), YANDEX_PRICE_UPDATES_PER_MINUTE)
+        )
+    
+    async def bulk_update_stocks(
+        self,
+        stocks: List[dict],
+        chunk_size: int = YANDEX_STOCK_BATCH_SIZE,
+        concurrency: int = YANDEX_BULK_CONCURRENCY
+    ) -> dict:
+        """
+        Ko'p SKU qoldig'ini yangilash (PUT /v2/campaigns/{campaignId}/offers/stocks)
+        
+        Args:
+            stocks: [{"offer_id", "count", "warehouse_id"?}, ...]
+                    bir (offer, ombor) bir necha marta berilsa oxirgisi olinadi
+        
+        Returns:
+            bulk_update_prices bilan bir xil format
+        """
+        if not self.campaign_id:
+            return {"success": False, "error": "campaign_id required"}
+        
+        valid: Dict[Tuple[str, Any], dict] = {}
+        invalid = []
+        for raw in stocks:
+            offer_id = str(raw.get("offer_id") or "").strip()
+            count = raw.get("count")
+            if not offer_id or isinstance(count, bool) or not isinstance(count, int) or count < 0:
+                invalid.append({"offer_id": offer_id or None, "success": False, "error": "offer_id va count >= 0 kerak"})
+                continue
+            item = {"offer_id": offer_id, "count": count}
+            if raw.get("warehouse_id"):
+                item["warehouse_id"] = raw["warehouse_id"]
+            key = (offer_id, item.get("warehouse_id"))
+            valid.pop(key, None)
+            valid[key] = item
+        
+        updated_at = datetime.now().astimezone().isoformat(timespec="seconds")
+        
+        def build_payload(chunk: List[dict]) -> dict:
+            skus = []
+            for item in chunk:
+                sku = {"sku": item["offer_id"], "items": [{"count": item["count"], "updatedAt": updated_at}]}
+                if item.get("warehouse_id"):
+                    sku["warehouseId"] = item["warehouse_id"]
+                skus.append(sku)
+            return {"skus": skus}
+        
+        return await self._send_bulk(
+            "stocks", list(valid.values()), invalid, "PUT",
+            f"{YANDEX_API_BASE}/v2/campaigns/{self.campaign_id}/offers/stocks",
+            build_payload, chunk_size, concurrency,
+            _bulk_bucket("stocks", str(self.campaign_id), YANDEX_STOCK_UPDATES_PER_MINUTE)
+        )
+    
     async def get_categories(self) -> dict:
         """Get Yandex Market categories tree"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.post(
                     f"{YANDEX_API_BASE}/v2/categories/tree",
                     headers=self.headers,
@@ -448,7 +717,7 @@ class YandexMarketAPI:
             return {"success": False, "error": "business_id required"}
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 # Get offer details
                 response = await client.post(
                     f"{YANDEX_API_BASE}/v2/businesses/{self.business_id}/offer-mappings",
@@ -514,77 +783,142 @@ class YandexMarketAPI:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    async def _fetch_offer_mappings_page(
+        self,
+        client,
+        page_token: Optional[str],
+        page_size: int,
+        filters: Optional[dict] = None
+    ) -> dict:
+        """offer-mappings bitta sahifasi (rate limit'da Retry-After bo'yicha qayta urinish)"""
+        params = {"limit": page_size}
+        if page_token:
+            params["page_token"] = page_token
+        
+        for attempt in range(YANDEX_API_MAX_RETRIES + 1):
+            response = await client.post(
+                f"{YANDEX_API_BASE}/v2/businesses/{self.business_id}/offer-mappings",
+                headers=self.headers,
+                params=params,
+                json=filters or {}
+            )
+            if response.status_code in (420, 429) and attempt < YANDEX_API_MAX_RETRIES:
+                delay = parse_retry_after(response.headers.get("retry-after"))
+                await asyncio.sleep(delay if delay is not None else 2 ** attempt)
+                continue
+            if response.status_code != 200:
+                raise YandexAPIError(response.text, response.status_code)
+            return response.json().get("result", {})
+    
+    async def iter_offer_mappings(
+        self,
+        page_size: int = YANDEX_OFFERS_PAGE_SIZE,
+        filters: Optional[dict] = None,
+        prefetch: int = YANDEX_OFFERS_PREFETCH
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Butun katalog offer-mappings sahifalari (nextPageToken bo'yicha)
+        
+        Keyingi sahifa chaqiruvchi joriy sahifani qayta ishlayotganda
+        yuklanadi; xotirada ko'pi bilan prefetch + 1 sahifa turadi.
+        Generator to'xtatilsa yuklash ham to'xtaydi.
+        
+        Raises:
+            YandexAPIError: API xatosi (business_id yo'q, 4xx/5xx)
+        """
+        if not self.business_id:
+            raise YandexAPIError("business_id required")
+        
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, prefetch))
+        
+        async def fetch_pages():
+            try:
+                page_token = None
+                async with http_client(YANDEX_API_BASE) as client:
+                    while True:
+                        result = await self._fetch_offer_mappings_page(client, page_token, page_size, filters)
+                        await queue.put(result.get("offerMappings", []))
+                        next_token = result.get("paging", {}).get("nextPageToken")
+                        if not next_token or next_token == page_token:
+                            break
+                        page_token = next_token
+                await queue.put(_PAGES_DONE)
+            except Exception as e:
+                await queue.put(e)
+        
+        task = asyncio.create_task(fetch_pages())
+        try:
+            while True:
+                page = await queue.get()
+                if page is _PAGES_DONE:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                if page:
+                    yield page
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    
+    @staticmethod
+    def offer_status(item: dict) -> str:
+        """offer-mappings elementi holati: READY / IN_MODERATION / NEED_CONTENT / REJECTED / OTHER"""
+        if item.get("mapping", {}).get("marketSku"):
+            return "READY"
+        processing = item.get("offer", {}).get("processingState", {}).get("status")
+        if processing == "IN_WORK":
+            return "IN_MODERATION"
+        if processing in ("NEED_CONTENT", "REJECTED"):
+            return processing
+        return "OTHER"
+    
     async def get_all_offers_status(self, limit: int = 50) -> dict:
-        """Get status of all offers for real-time dashboard"""
+        """
+        Get status of all offers for real-time dashboard
+        
+        stats - butun katalog bo'yicha (barcha sahifalar), offers - birinchi `limit` ta
+        """
         if not self.business_id:
             return {"success": False, "error": "business_id required"}
         
+        stats = {
+            "total": 0,
+            "ready": 0,
+            "in_moderation": 0,
+            "need_content": 0,
+            "rejected": 0,
+            "other": 0
+        }
+        offer_list = []
+        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{YANDEX_API_BASE}/v2/businesses/{self.business_id}/offer-mappings",
-                    headers=self.headers,
-                    json={
-                        "limit": limit
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    offers = data.get("result", {}).get("offerMappings", [])
-                    
-                    # Categorize by status
-                    stats = {
-                        "total": len(offers),
-                        "ready": 0,
-                        "in_moderation": 0,
-                        "need_content": 0,
-                        "rejected": 0,
-                        "other": 0
-                    }
+            async for page in self.iter_offer_mappings():
+                for item in page:
+                    status = self.offer_status(item)
+                    stats["total"] += 1
+                    stats[OFFER_STATUS_STATS[status]] += 1
                     
-                    offer_list = []
-                    for item in offers:
+                    if len(offer_list) < limit:
                         offer = item.get("offer", {})
-                        mapping = item.get("mapping", {})
-                        
-                        status = "OTHER"
-                        if mapping.get("marketSku"):
-                            status = "READY"
-                            stats["ready"] += 1
-                        elif offer.get("processingState", {}).get("status") == "IN_WORK":
-                            status = "IN_MODERATION"
-                            stats["in_moderation"] += 1
-                        elif offer.get("processingState", {}).get("status") == "NEED_CONTENT":
-                            status = "NEED_CONTENT"
-                            stats["need_content"] += 1
-                        elif offer.get("processingState", {}).get("status") == "REJECTED":
-                            status = "REJECTED"
-                            stats["rejected"] += 1
-                        else:
-                            stats["other"] += 1
-                        
                         offer_list.append({
                             "offer_id": offer.get("offerId"),
                             "name": offer.get("name", "")[:50],
                             "status": status,
                             "price": offer.get("basicPrice", {}).get("value"),
-                            "market_sku": mapping.get("marketSku")
+                            "market_sku": item.get("mapping", {}).get("marketSku")
                         })
-                    
-                    return {
-                        "success": True,
-                        "stats": stats,
-                        "offers": offer_list,
-                        "last_updated": datetime.now().isoformat()
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": response.text
-                    }
+        except YandexAPIError as e:
+            return {"success": False, "error": str(e), "status_code": e.status_code}
         except Exception as e:
             return {"success": False, "error": str(e)}
+        
+        return {
+            "success": True,
+            "stats": stats,
+            "offers": offer_list,
+            "offers_truncated": stats["total"] > len(offer_list),
+            "last_updated": datetime.now().isoformat()
+        }
 
 
     async def get_orders(self, page: int = 1, status: str = None) -> dict:
@@ -600,7 +934,7 @@ class YandexMarketAPI:
             if status:
                 params["status"] = status
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.get(
                     f"{YANDEX_API_BASE}/v2/campaigns/{self.campaign_id}/orders",
                     headers=self.headers,
@@ -652,7 +986,7 @@ class YandexMarketAPI:
             if not date_from:
                 date_from = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.get(
                     f"{YANDEX_API_BASE}/v2/campaigns/{self.campaign_id}/stats/main",
                     headers=self.headers,
@@ -700,7 +1034,7 @@ class YandexMarketAPI:
             return {"success": False, "error": "business_id required"}
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 # Get offer mapping to check quality
                 response = await client.get(
                     f"{YANDEX_API_BASE}/v2/businesses/{self.business_id}/offer-mappings",
@@ -789,7 +1123,7 @@ class YandexMarketAPI:
         
         try:
             # Get current offer
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 get_response = await client.get(
                     f"{YANDEX_API_BASE}/v2/businesses/{self.business_id}/offer-mappings",
                     headers=self.headers,
@@ -856,7 +1190,14 @@ class YandexMarketAPI:
             return {"success": False, "error": str(e)}
     
     async def get_dashboard_data(self) -> dict:
-        """Get full dashboard data - products, orders, statistics"""
+        """
+        Get full dashboard data - products, orders, statistics
+        
+        Ulanish tekshiruvi va 3 ta ma'lumot so'rovi parallel yuboriladi:
+        dashboard vaqti eng sekin bitta chaqiruvga teng.
+        Biror bo'lim olinmasa u 0 bilan qoladi, lekin partial=True va
+        errors[bo'lim] bilan belgilanadi (bunday dashboard keshlanmaydi).
+        """
         result = {
             "success": True,
             "products": {"total": 0, "active": 0, "pending": 0},
@@ -866,16 +1207,32 @@ class YandexMarketAPI:
         }
         
         try:
-            # Check connection
-            connection_ok = await self.check_connection()
+            connection_ok, products_data, orders_data, stats_data = await asyncio.gather(
+                self.check_connection(),
+                # Faqat statistika - butun katalog
+                self.get_all_offers_status(limit=0),
+                self.get_orders(),
+                self.get_sales_statistics(),
+                return_exceptions=True
+            )
+            connection_ok = connection_ok is True
             result["connection_status"] = "active" if connection_ok else "error"
             
             if not connection_ok:
                 return result
             
-            # Get products
-            products_data = await self.get_all_offers_status()
-            if products_data.get("success"):
+            errors = {}
+            for section, data in (("products", products_data), ("orders", orders_data), ("revenue", stats_data)):
+                if isinstance(data, Exception):
+                    errors[section] = str(data) or type(data).__name__
+                elif not (isinstance(data, dict) and data.get("success")):
+                    errors[section] = (isinstance(data, dict) and data.get("error")) or "Ma'lumot olinmadi"
+            if errors:
+                result["partial"] = True
+                result["errors"] = errors
+            
+            # Products
+            if isinstance(products_data, dict) and products_data.get("success"):
                 stats = products_data.get("stats", {})
                 result["products"] = {
                     "total": stats.get("total", 0),
@@ -885,9 +1242,8 @@ class YandexMarketAPI:
                     "rejected": stats.get("rejected", 0)
                 }
             
-            # Get orders
-            orders_data = await self.get_orders()
-            if orders_data.get("success"):
+            # Orders
+            if isinstance(orders_data, dict) and orders_data.get("success"):
                 orders = orders_data.get("orders", [])
                 result["orders"] = {
                     "total": len(orders),
@@ -895,9 +1251,8 @@ class YandexMarketAPI:
                     "completed": len([o for o in orders if o.get("status") == "DELIVERED"])
                 }
             
-            # Get statistics
-            stats_data = await self.get_sales_statistics()
-            if stats_data.get("success"):
+            # Statistics
+            if isinstance(stats_data, dict) and stats_data.get("success"):
                 data = stats_data.get("data", {})
                 result["revenue"] = {
                     "total": data.get("total_revenue", 0),
@@ -923,22 +1278,22 @@ class YandexCardGenerator:
         price: float = 0,
         detected_info: dict = None
     ) -> dict:
-        """Generate Yandex Market product card using AI"""
-        EMERGENT_KEY = os.getenv("EMERGENT_LLM_KEY", "")
-        
-        if not EMERGENT_KEY:
-            return {
-                "success": False,
-                "error": "EMERGENT_LLM_KEY not configured"
-            }
-        
-        try:
-            from emergentintegrations.llm.chat import LlmChat, UserMessage
-            
-            chat = LlmChat(
-                api_key=EMERGENT_KEY,
-                session_id=f"yandex-card-{product_name[:15]}",
-                system_message="""Siz Yandex Market uchun professional SEO-mutaxassisisiz.
+        """Generate Yandex Market product card using AI (single-flight + qisqa kesh)"""
+        # Faqat prompt'ga kiradigan maydonlar (narx prompt'da ishlatilmaydi)
+        detected = detected_info or {}
+        key = prompt_key(
+            "yandex_card", product_name, category, brand, description,
+            detected.get("name", ""), detected.get("brand", ""), detected.get("specifications", [])
+        )
+        return await text_generation_cache.run(
+            key,
+            lambda: YandexCardGenerator._generate_card(
+                product_name, category, brand, description, price, detected_info
+            ),
+            cacheable=lambda result: result.get("success", False)
+        )
+    
+    SYSTEM_MESSAGE = """Siz Yandex Market uchun professional SEO-mutaxassisisiz.
 
 MUHIM QOIDALAR:
 1. Faqat RUSCHA yozing (Yandex Market faqat rus tilida)
@@ -947,21 +1302,29 @@ MUHIM QOIDALAR:
 4. Taqiqlangan so'zlar: "хит", "лучший", "топ", "оригинал", "скидка", "распродажа"
 5. Emoji va kontakt ma'lumotlari taqiqlangan
 6. Faqat JSON formatda javob bering"""
-            ).with_model("openai", "gpt-4o")
-            
-            detected_text = ""
-            if detected_info:
-                d_name = detected_info.get('name', '')
-                d_brand = detected_info.get('brand', '')
-                d_specs = ', '.join(detected_info.get('specifications', []))
-                detected_text = f"""
+    
+    @staticmethod
+    def build_prompt(
+        product_name: str,
+        category: str,
+        brand: str = "",
+        description: str = "",
+        detected_info: dict = None
+    ) -> str:
+        """Kartochka prompt'i (nom va bullet'lar tavsifdan oldin - streaming uchun)"""
+        detected_text = ""
+        if detected_info:
+            d_name = detected_info.get('name', '')
+            d_brand = detected_info.get('brand', '')
+            d_specs = ', '.join(detected_info.get('specifications', []))
+            detected_text = f"""
 AI SCANNER NATIJASI:
 - Aniqlangan: {d_name}
 - Brend: {d_brand}
 - Xususiyatlar: {d_specs}
 """
-            
-            prompt = f"""MAHSULOT: {product_name}
+        
+        return f"""MAHSULOT: {product_name}
 BREND: {brand or "ko'rsatilmagan"}
 KATEGORIYA: {category}
 QISQACHA: {description or "yo'q"}
@@ -974,17 +1337,17 @@ MUHIM: Yandex Market nomi MAX 60 BELGI bo'lishi kerak!
 {{
     "name": "Полное название товара на русском (MAX 60 символов! Формат: Бренд + Тип + Модель)",
     "name_uz": "O'zbekcha nom (MAX 60 belgi! Format: Brend + Tur + Model)",
+    "bullet_points": [
+        "Основная характеристика 1",
+        "Основная характеристика 2",
+        "... 5-7 пунктов"
+    ],
     "description": "Полное описание на русском (200-500 слов). Профессионально опиши характеристики, преимущества, способ использования.",
     "description_uz": "O'zbek tilida to'liq tavsif (200-500 so'z). Xususiyatlar, afzalliklar, ishlatish usuli haqida professional yoz.",
     "vendor": "{brand or 'Бренд'}",
     "vendorCode": "MODEL-001",
     "category": "{category}",
     "keywords": ["ключевое1", "ключевое2", "... 8-10 ключевых слов"],
-    "bullet_points": [
-        "Основная характеристика 1",
-        "Основная характеристика 2",
-        "... 5-7 пунктов"
-    ],
     "specifications": {{
         "Материал": "значение",
         "Размер": "значение",
@@ -994,6 +1357,66 @@ MUHIM: Yandex Market nomi MAX 60 BELGI bo'lishi kerak!
     }},
     "seo_score": 85
 }}"""
+    
+    @staticmethod
+    def finalize_card(card: dict) -> dict:
+        """Stop so'zlar tekshiruvi + nom uzunligi (generate_card javobi)"""
+        from yandex_rules import check_yandex_stop_words
+        title_check = check_yandex_stop_words(card.get("name", ""))
+        
+        validation_errors = []
+        if title_check["has_stop_words"]:
+            validation_errors.append(f"Taqiqlangan so'zlar: {', '.join(title_check['found_words'])}")
+        
+        # Yandex Market nomi MAX 60 belgi bo'lishi kerak!
+        if len(card.get("name", "")) > 60:
+            card["name"] = card["name"][:57] + "..."
+        
+        # O'zbekcha nom ham 60 belgidan oshmasligi kerak
+        if card.get("name_uz") and len(card.get("name_uz", "")) > 60:
+            card["name_uz"] = card["name_uz"][:57] + "..."
+        
+        return {
+            "success": True,
+            "card": card,
+            "validation": {
+                "is_valid": len(validation_errors) == 0,
+                "errors": validation_errors
+            },
+            "seo_score": card.get("seo_score", 80),
+            "api_ready": True  # This card can be sent directly to Yandex API!
+        }
+    
+    @staticmethod
+    async def _generate_card(
+        product_name: str,
+        category: str,
+        brand: str = "",
+        description: str = "",
+        price: float = 0,
+        detected_info: dict = None
+    ) -> dict:
+        """Generate Yandex Market product card using AI"""
+        EMERGENT_KEY = os.getenv("EMERGENT_LLM_KEY", "")
+        
+        if not EMERGENT_KEY:
+            return {
+                "success": False,
+                "error": "EMERGENT_LLM_KEY not configured"
+            }
+        
+        try:
+            from emergentintegrations.llm.chat import LlmChat, UserMessage
+            
+            chat = LlmChat(
+                api_key=EMERGENT_KEY,
+                session_id=f"yandex-card-{product_name[:15]}",
+                system_message=YandexCardGenerator.SYSTEM_MESSAGE
+            ).with_model("openai", "gpt-4o")
+            
+            prompt = YandexCardGenerator.build_prompt(
+                product_name, category, brand, description, detected_info
+            )
             
             response = await chat.send_message(UserMessage(text=prompt))
             
@@ -1007,33 +1430,7 @@ MUHIM: Yandex Market nomi MAX 60 BELGI bo'lishi kerak!
                 }
             
             card = json.loads(json_match.group())
-            
-            # Stop words check
-            from yandex_rules import check_yandex_stop_words
-            title_check = check_yandex_stop_words(card.get("name", ""))
-            
-            validation_errors = []
-            if title_check["has_stop_words"]:
-                validation_errors.append(f"Taqiqlangan so'zlar: {', '.join(title_check['found_words'])}")
-            
-            # Yandex Market nomi MAX 60 belgi bo'lishi kerak!
-            if len(card.get("name", "")) > 60:
-                card["name"] = card["name"][:57] + "..."
-            
-            # O'zbekcha nom ham 60 belgidan oshmasligi kerak
-            if card.get("name_uz") and len(card.get("name_uz", "")) > 60:
-                card["name_uz"] = card["name_uz"][:57] + "..."
-            
-            return {
-                "success": True,
-                "card": card,
-                "validation": {
-                    "is_valid": len(validation_errors) == 0,
-                    "errors": validation_errors
-                },
-                "seo_score": card.get("seo_score", 80),
-                "api_ready": True  # This card can be sent directly to Yandex API!
-            }
+            return YandexCardGenerator.finalize_card(card)
             
         except Exception as e:
             return {
@@ -21,7 +21,9 @@ import re
 import asyncio
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-import httpx
+
+from scan_cache import scan_result_cache
+from http_clients import http_client
 
 # Constants
 YANDEX_API_BASE = "https://api.partner.market.yandex.ru"
@@ -165,6 +167,12 @@ class YandexUniversalCreatorV3:
         return CATEGORY_MAP["general"]
     
     async def scan_product(self, image_base64: str) -> Dict[str, Any]:
+        """AI Scanner - rasmdan mahsulotni aniqlash (universal) - perceptual hash cache bilan"""
+        return await scan_result_cache.get_or_scan(
+            "yandex_v3", image_base64, lambda: self._scan_product(image_base64)
+        )
+    
+    async def _scan_product(self, image_base64: str) -> Dict[str, Any]:
         """AI Scanner - rasmdan mahsulotni aniqlash (universal)"""
         if not self.emergent_key:
             raise ValueError("EMERGENT_LLM_KEY topilmadi")
@@ -384,7 +392,7 @@ JSON format:
             return None
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with http_client(IMGBB_UPLOAD_URL) as client:
                 response = await client.post(
                     IMGBB_UPLOAD_URL,
                     data={
@@ -527,11 +535,12 @@ JSON format:
         
         # API ga yuborish
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.post(
                     f"{YANDEX_API_BASE}/v2/businesses/{self.business_id}/offer-mappings/update",
                     headers=self.headers,
-                    json=product_data
+                    json=product_data,
+                    timeout=60.0
                 )
                 
                 if response.status_code == 200:
@@ -677,11 +686,12 @@ JSON format:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with http_client(YANDEX_API_BASE) as client:
                 response = await client.post(
                     f"{YANDEX_API_BASE}/v2/businesses/{self.business_id}/offer-mappings/update",
                     headers=self.headers,
-                    json=product_data
+                    json=product_data,
+                    timeout=60.0
                 )
                 
                 if response.status_code == 200:
@@ -242,6 +242,35 @@ class TestUnifiedScannerEndpoints:
         assert validation.get("is_valid") == True, "Text should be valid"
         
         print("✅ Clean text validation working - No stop words detected")
+    
+    def test_compliance_validate_batch(self):
+        """Test POST /api/compliance/validate-batch checks Uzum and Yandex rules in one call"""
+        items = [
+            {"id": "1", "title": "Super original telefon aksiya bilan", "description": "Звоните: +998 90 123 45 67"},
+            {"id": "2", "title": "Samsung Galaxy A54 smartfon 128GB xotira"},
+            {"id": "3", "title": "Samsung Galaxy A54 smartfon 128GB xotira"}
+        ]
+        response = requests.post(
+            f"{BASE_URL}/api/compliance/validate-batch",
+            json={"items": items, "marketplaces": ["uzum", "yandex"], "include_cleaned": True},
+            timeout=30
+        )
+        
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        
+        data = response.json()
+        assert data.get("success") == True, "Request should be successful"
+        assert data.get("total") == 3, "Should validate every item"
+        assert data.get("unique_texts") == 3, "Duplicate titles should be validated once"
+        
+        first = data["results"][0]
+        assert first["is_valid"] == False, "Stop words should invalidate the card"
+        assert "super" in first["title"]["marketplaces"]["uzum"]["found_words"]
+        rules = [v["rule"] for v in first["description"]["marketplaces"]["yandex"]["violations"]]
+        assert "no_contacts" in rules, "Yandex forbids contacts in descriptions"
+        assert data["results"][1]["title"]["marketplaces"]["uzum"]["is_valid"] == True
+        
+        print(f"✅ Compliance batch working - summary: {data.get('summary')}")
 
 
 class TestPriceCalculations: